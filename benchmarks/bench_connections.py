@@ -0,0 +1,159 @@
+"""
+Counts database connections opened per command.
+
+Runs initdb, apply and rollback against a real database
+with and without connection pool and prints how many
+connections every command opened.
+
+Usage:
+    PILGRIMOR_DATABASE_URL=postgres://... python -m benchmarks.bench_connections
+    python benchmarks/bench_connections.py --database-url postgres://...
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from os.path import abspath, dirname, join
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+
+if __package__ in {None, ""}:
+    # Run as a script, pilgrimor is imported from the repository.
+    sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from pilgrimor.engine.postgresql_engine import PostgreSQLEngine  # noqa: E402
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import (  # noqa: E402
+    RawSQLMigator,
+)
+
+MIGRATIONS_NUMBER = 20
+
+
+class ConnectCounter:
+    """Wraps psycopg.Connection.connect and counts calls."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self._original = psycopg.Connection.connect
+
+    @contextmanager
+    def patch(self) -> Iterator["ConnectCounter"]:
+        """
+        Patches psycopg.Connection.connect while the context is active.
+
+        :yields: counter itself.
+        """
+        original = self._original
+
+        def counting_connect(cls: Any, *args: Any, **kwargs: Any) -> Any:
+            self.count += 1
+            return original.__func__(cls, *args, **kwargs)  # type: ignore
+
+        psycopg.Connection.connect = classmethod(counting_connect)  # type: ignore
+        try:
+            yield self
+        finally:
+            psycopg.Connection.connect = original  # type: ignore
+
+
+def create_migrations(migrations_dir: str) -> None:
+    """
+    Creates simple migrations.
+
+    :param migrations_dir: directory for migrations.
+    """
+    for number in range(1, MIGRATIONS_NUMBER + 1):
+        with open(join(migrations_dir, f"{number}_table.sql"), "w") as migration:
+            migration.write(
+                f"-- apply --\n"
+                f"CREATE TABLE bench_{number} (id INT);\n"
+                f"-- rollback --\n"
+                f"DROP TABLE bench_{number};\n",
+            )
+
+
+def run_commands(
+    database_url: str,
+    connection_pool: bool,
+) -> List[Tuple[str, int, float]]:
+    """
+    Runs commands and counts connections for every command.
+
+    :param database_url: url to database.
+    :param connection_pool: use connection pool or not.
+
+    :returns: list with command name, connections number and time.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as migrations_dir:
+        create_migrations(migrations_dir)
+        with PostgreSQLEngine(
+            database_url,
+            connection_pool=connection_pool,
+            pool_min_size=1,
+            pool_max_size=1,
+        ) as engine:
+            migrator = RawSQLMigator(engine, migrations_dir)
+            commands: Dict[str, Callable[[], None]] = {
+                "initdb": migrator.initialize_database,
+                "apply": lambda: migrator.apply_migrations("1.0.0"),
+                "rollback": lambda: migrator.rollback_migrations(latest=True),
+            }
+            for command_name, command in commands.items():
+                counter = ConnectCounter()
+                start = time.perf_counter()
+                with counter.patch():
+                    command()
+                results.append(
+                    (command_name, counter.count, time.perf_counter() - start),
+                )
+    return results
+
+
+@contextmanager
+def bench_schema(database_url: str) -> Iterator[str]:
+    """
+    Creates temporary schema and returns url that uses it.
+
+    :param database_url: url to database.
+
+    :yields: url with search_path set to the new schema.
+    """
+    schema = f"pilgrimor_bench_{os.getpid()}"
+    with psycopg.connect(database_url, autocommit=True) as connection:
+        connection.execute(f"CREATE SCHEMA {schema}")
+    try:
+        yield make_conninfo(database_url, options=f"-csearch_path={schema}")
+    finally:
+        with psycopg.connect(database_url, autocommit=True) as connection:
+            connection.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def main() -> None:
+    """Runs benchmark and prints results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--database-url",
+        default=os.environ.get("PILGRIMOR_DATABASE_URL"),
+        help="Url to database, PILGRIMOR_DATABASE_URL by default.",
+    )
+    database_url = parser.parse_args().database_url
+    if not database_url:
+        parser.error("set --database-url or PILGRIMOR_DATABASE_URL")
+    print(f"{'mode':<8}{'command':<10}{'connects':>10}{'seconds':>10}")
+    for connection_pool in (False, True):
+        mode = "pool" if connection_pool else "plain"
+        with bench_schema(database_url) as schema_url:
+            for command_name, connects, seconds in run_commands(
+                schema_url,
+                connection_pool,
+            ):
+                print(f"{mode:<8}{command_name:<10}{connects:>10}{seconds:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
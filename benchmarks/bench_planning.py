@@ -0,0 +1,341 @@
+"""
+Benchmark for planning overhead of RawSQLMigator.
+
+Generates synthetic migration directories and times
+planner methods and the whole apply planning path
+against an engine that only records queries,
+so the numbers do not depend on a database.
+
+Results can be saved to JSON together with the git commit
+and compared with results of another commit.
+
+Usage:
+    python -m benchmarks.bench_planning [--files 1000 10000 50000]
+        [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import io
+import json
+import platform
+import subprocess  # noqa: S404
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from os.path import join
+from typing import Any, Callable, Dict, List, Optional
+
+from pilgrimor.abc.engine import PilgrimoreEngine
+from pilgrimor.migrator.rawsql_migrator.migration_files import MigrationFileReader
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+
+APPLIED_VERSION = "0.1.0"
+NEW_VERSION = "0.2.0"
+NEW_MIGRATIONS = 10
+LARGE_ROW = "INSERT INTO data_{number} VALUES ({row}, 'payload {row}');\n"
+
+
+class RecordingEngine(PilgrimoreEngine):
+    """Engine that records queries and returns prepared state."""
+
+    def __init__(self, state_rows: List[Any]) -> None:
+        """
+        Initialize the engine.
+
+        :param state_rows: rows of pilgrimor table.
+        """
+        super().__init__("recording://")
+        self.state_rows = state_rows
+        self.queries: List[str] = []
+        self.version_migrations: List[Dict[str, Any]] = []
+
+    def execute_sql_with_return(
+        self,
+        sql_query: str,
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: Optional[bool] = True,
+    ) -> Optional[List[Any]]:
+        """
+        Records query and returns state rows.
+
+        :param sql_query: sql query to execute.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+
+        :returns: state rows for state query, None for other queries.
+        """
+        self.queries.append(sql_query)
+        if sql_query != self.system_table.state_query:
+            return None
+        return self.state_rows
+
+    def execute_sql_with_no_return(
+        self,
+        sql_query: str,
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: Optional[bool] = True,
+    ) -> None:
+        """
+        Records query.
+
+        :param sql_query: sql query to execute.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        """
+        self.queries.append(sql_query)
+
+    def execute_version_migrations(
+        self,
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+    ) -> None:
+        """
+        Records migrations.
+
+        :param version_migrations: list of dicts with migration data.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        """
+        self.version_migrations.extend(version_migrations)
+
+
+class PlanningMigrator(RawSQLMigator):
+    """Migrator that does not write versions to migration files."""
+
+    def _add_version_to_migration_file(
+        self,
+        migrations: List[str],
+        version: str,
+    ) -> None:
+        """
+        Skips writing, so the directory can be planned again.
+
+        :param migrations: List of migration to apply.
+        :param version: migration version.
+        """
+
+
+def create_migrations(
+    migrations_dir: str,
+    files: int,
+    large_files: int,
+    large_mb: int,
+) -> List[Any]:
+    """
+    Creates migrations, all but the last ones are applied.
+
+    Numbers are zero-padded, so names are sorted as numbers.
+
+    :param migrations_dir: directory for migrations.
+    :param files: number of migrations.
+    :param large_files: number of multi-megabyte migrations.
+    :param large_mb: size of multi-megabyte migration.
+
+    :returns: state rows of applied migrations.
+    """
+    large_rows = large_mb * 1024 * 1024 // len(LARGE_ROW.format(number=0, row=0))
+    step = max(files // max(large_files, 1), 1)
+    large_numbers = set(range(1, files + 1, step)[:large_files])
+    state_rows = []
+    for number in range(1, files + 1):
+        name = f"{number:05d}_table_{number}.sql"
+        parts = [
+            "-- apply --\n",
+            f"CREATE TABLE data_{number} (id INT, payload TEXT);\n",
+        ]
+        if number in large_numbers:
+            parts.extend(
+                LARGE_ROW.format(number=number, row=row) for row in range(large_rows)
+            )
+        parts.append(f"-- rollback --\nDROP TABLE data_{number};\n")
+        if number <= files - NEW_MIGRATIONS:
+            parts.append(f"\n-- pilgrimore_version {APPLIED_VERSION} -- \n")
+            state_rows.append((number, name, APPLIED_VERSION, None))
+        with open(join(migrations_dir, name), "w") as migration_file:
+            migration_file.write("".join(parts))
+    return state_rows
+
+
+def measure(operation: Callable[[], Any], repeat: int) -> float:
+    """
+    Returns the best time of the operation.
+
+    :param operation: function to measure.
+    :param repeat: number of runs.
+
+    :returns: seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_cases(
+    migrations_dir: str,
+    state_rows: List[Any],
+    repeat: int,
+) -> Dict[str, float]:
+    """
+    Times planner methods on the directory.
+
+    Cases that read files get a new reader on every run,
+    so files are read and parsed again.
+
+    :param migrations_dir: directory with migrations.
+    :param state_rows: rows of pilgrimor table.
+    :param repeat: number of runs of every case.
+
+    :returns: seconds by case name.
+    """
+
+    def new_migrator() -> PlanningMigrator:  # noqa: WPS430
+        return PlanningMigrator(RecordingEngine(state_rows), migrations_dir)
+
+    migrator = new_migrator()
+    names = migrator._get_migration_files()  # noqa: WPS437
+
+    def get_exist_migrations() -> None:  # noqa: WPS430
+        migrator.migration_files = MigrationFileReader(migrations_dir)
+        migrator._get_exist_migrations()  # noqa: WPS437
+
+    def apply_planning() -> None:  # noqa: WPS430
+        with redirect_stdout(io.StringIO()):
+            new_migrator().apply_migrations(NEW_VERSION)
+
+    return {
+        "get_migration_files": measure(
+            migrator._get_migration_files,  # noqa: WPS437
+            repeat,
+        ),
+        "check_migrations_number": measure(
+            lambda: migrator._check_migrations_number(set(names)),  # noqa: WPS437
+            repeat,
+        ),
+        "sort_migrations": measure(
+            lambda: migrator._sort_migrations(names),  # noqa: WPS437
+            repeat,
+        ),
+        "get_exist_migrations": measure(get_exist_migrations, repeat),
+        "apply_planning": measure(apply_planning, repeat),
+    }
+
+
+def git_commit() -> str:
+    """
+    Returns current git commit.
+
+    :returns: commit hash, with `-dirty` if there are changes.
+    """
+    try:
+        commit = subprocess.check_output(  # noqa: S603, S607
+            ["git", "rev-parse", "HEAD"],
+            text=True,
+        ).strip()
+        changes = subprocess.check_output(  # noqa: S603, S607
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if changes else commit
+
+
+def compare(
+    results: List[Dict[str, Any]],
+    baseline_path: str,
+    threshold: float,
+) -> bool:
+    """
+    Prints ratio of results to baseline.
+
+    :param results: current results.
+    :param baseline_path: path to JSON with baseline results.
+    :param threshold: ratio that is a regression.
+
+    :returns: True if there are regressions.
+    """
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    baseline_seconds = {
+        (result["case"], result["files"], result["size"]): result["seconds"]
+        for result in baseline["results"]
+    }
+    print(f"compared with {baseline['commit']}")
+    regression = False
+    for result in results:
+        key = (result["case"], result["files"], result["size"])
+        if key not in baseline_seconds:
+            continue
+        ratio = result["seconds"] / max(baseline_seconds[key], 1e-9)
+        mark = ""
+        if ratio > threshold:
+            mark = "  REGRESSION"
+            regression = True
+        print(
+            f"{result['case']:<25}{result['files']:>7}{result['size']:>7}"
+            f"{ratio:>9.2f}x{mark}",
+        )
+    return regression
+
+
+def main() -> None:  # noqa: WPS210
+    """Runs benchmark and prints results."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--sizes", nargs="+", default=["small", "large"])
+    parser.add_argument("--large-files", type=int, default=10)
+    parser.add_argument("--large-mb", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results to JSON file.")
+    parser.add_argument("--compare", help="Compare with results from JSON file.")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'case':<25}{'files':>7}{'size':>7}{'seconds':>10}")
+    for files in args.files:
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as migrations_dir:
+                state_rows = create_migrations(
+                    migrations_dir,
+                    files,
+                    large_files=args.large_files if size == "large" else 0,
+                    large_mb=args.large_mb,
+                )
+                for case, seconds in run_cases(
+                    migrations_dir,
+                    state_rows,
+                    args.repeat,
+                ).items():
+                    print(f"{case:<25}{files:>7}{size:>7}{seconds:>10.4f}")
+                    results.append(
+                        {
+                            "case": case,
+                            "files": files,
+                            "size": size,
+                            "seconds": seconds,
+                        },
+                    )
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "repeat": args.repeat,
+                    "results": results,
+                },
+                output_file,
+                indent=2,
+            )
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
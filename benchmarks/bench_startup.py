@@ -0,0 +1,212 @@
+"""
+Benchmark for CLI startup time.
+
+Every case runs a new Python process, so module imports,
+settings parsing and engine lookup are measured like
+on a container start. `apply` runs against the in-memory
+engine with nothing to do, it is the pure startup overhead.
+
+With `--imports` the slowest imports of `apply`
+reported by `python -X importtime` are printed.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 10] [--imports 15]
+        [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess  # noqa: S404
+import sys
+import tempfile
+from functools import partial
+from os.path import abspath, dirname, join
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.bench_planning import git_commit, measure
+
+ROOT_DIR = dirname(dirname(abspath(__file__)))
+PYPROJECT = """
+[tool.pilgrimor]
+migrations_dir = "./migrations"
+database_engine = "MEMORY"
+"""
+MIGRATION = "-- apply --\nCREATE TABLE a (id INT);\n-- rollback --\nDROP TABLE a;\n"
+
+CASES = {
+    "python": ["-c", "pass"],
+    "import": ["-c", "import pilgrimor.__main__"],
+    "help": ["-m", "pilgrimor", "--help"],
+    "apply": ["-m", "pilgrimor", "apply"],
+}
+
+
+def create_project(project_dir: str) -> Dict[str, str]:
+    """
+    Creates project with one applied migration.
+
+    :param project_dir: directory of the project.
+
+    :returns: environment for pilgrimor processes.
+    """
+    with open(join(project_dir, "pyproject.toml"), "w") as pyproject_file:
+        pyproject_file.write(PYPROJECT)
+    os.mkdir(join(project_dir, "migrations"))
+    with open(join(project_dir, "migrations", "1_a.sql"), "w") as migration_file:
+        migration_file.write(MIGRATION)
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [ROOT_DIR, env.get("PYTHONPATH")]),
+    )
+    env["PILGRIMOR_DATABASE_URL"] = f"memory://{join(project_dir, 'state.json')}"
+    for command in (["initdb"], ["apply", "--version", "0.1"]):
+        run_python(["-m", "pilgrimor", *command], project_dir, env)
+    return env
+
+
+def run_python(arguments: List[str], cwd: str, env: Dict[str, str]) -> str:
+    """
+    Runs new Python process.
+
+    :param arguments: interpreter arguments.
+    :param cwd: working directory.
+    :param env: environment.
+
+    :returns: stderr of the process.
+    """
+    return subprocess.run(  # noqa: S603
+        [sys.executable, *arguments],
+        cwd=cwd,
+        env=env,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    ).stderr
+
+
+def slowest_imports(
+    project_dir: str,
+    env: Dict[str, str],
+    top: int,
+) -> List[Tuple[int, str]]:
+    """
+    Returns imports with the biggest cumulative time.
+
+    Only top-level imports are counted,
+    modules imported by them are not repeated.
+
+    :param project_dir: directory of the project.
+    :param env: environment.
+    :param top: number of imports.
+
+    :returns: list of microseconds and module names.
+    """
+    stderr = run_python(
+        ["-X", "importtime", *CASES["apply"]],
+        project_dir,
+        env,
+    )
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if module[1] != " ":
+            imports.append((int(cumulative), module.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def read_baseline(path: str) -> Dict[str, float]:
+    """
+    Reads results to compare with.
+
+    :param path: path to JSON with baseline results.
+
+    :returns: seconds by case.
+    """
+    with open(path) as baseline_file:
+        baseline_data = json.load(baseline_file)
+    print(f"compared with {baseline_data['commit']}")
+    return {result["case"]: result["seconds"] for result in baseline_data["results"]}
+
+
+def run_cases(
+    project_dir: str,
+    env: Dict[str, str],
+    args: argparse.Namespace,
+    baseline: Dict[str, float],
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Measures all cases and prints them with ratio to baseline.
+
+    :param project_dir: directory of the project.
+    :param env: environment.
+    :param args: command line arguments.
+    :param baseline: seconds by case to compare with.
+
+    :returns: results and True if any case is slower than the threshold.
+    """
+    results = []
+    regression = False
+    print(f"{'case':<10}{'seconds':>10}")
+    for case, arguments in CASES.items():
+        seconds = measure(
+            partial(run_python, arguments, project_dir, env),
+            args.repeat,
+        )
+        line = f"{case:<10}{seconds:>10.4f}"
+        if case in baseline:
+            ratio = seconds / max(baseline[case], 1e-9)
+            line = f"{line}{ratio:>9.2f}x"
+            if ratio > args.threshold:
+                line = f"{line}  REGRESSION"
+                regression = True
+        print(line)
+        results.append({"case": case, "seconds": seconds})
+    return results, regression
+
+
+def main() -> None:
+    """Runs benchmark and prints results."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--imports", type=int, default=0)
+    parser.add_argument("--output", help="Write results to JSON file.")
+    parser.add_argument("--compare", help="Compare with results from JSON file.")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    baseline = read_baseline(args.compare) if args.compare else {}
+    with tempfile.TemporaryDirectory() as project_dir:
+        env = create_project(project_dir)
+        results, regression = run_cases(project_dir, env, args, baseline)
+        if args.imports:
+            print(f"\n{'microseconds':>12}  import")
+            for microseconds, module in slowest_imports(
+                project_dir,
+                env,
+                args.imports,
+            ):
+                print(f"{microseconds:>12}  {module}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(
+                {
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "repeat": args.repeat,
+                    "results": results,
+                },
+                output_file,
+                indent=2,
+            )
+    if regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
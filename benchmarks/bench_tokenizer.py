@@ -0,0 +1,86 @@
+"""
+Micro-benchmark for SQL statement tokenizer.
+
+Generates a corpus of large migration files with string literals,
+comments and function bodies and compares tokenizer speed
+with plain `str.split(";")`.
+
+Usage:
+    python -m benchmarks.bench_tokenizer [--files 20] [--rows 20000]
+"""
+import argparse
+import time
+from typing import Callable, List
+
+from pilgrimor.sql.tokenizer import iter_statements
+
+FUNCTION_BODY = """
+CREATE FUNCTION touch_{number}() RETURNS trigger AS $body$
+BEGIN
+    NEW.updated_at = now();
+    RETURN NEW;
+END;
+$body$ LANGUAGE plpgsql;
+"""
+
+
+def make_migration(number: int, rows: int) -> str:
+    """
+    Creates text of one large migration.
+
+    :param number: migration number.
+    :param rows: number of INSERT statements.
+
+    :returns: migration text.
+    """
+    lines = [
+        "-- apply --",
+        f"CREATE TABLE data_{number} (id INT, payload TEXT);",
+        "/* seed data; generated */",
+        FUNCTION_BODY.format(number=number),
+    ]
+    lines.extend(
+        f"INSERT INTO data_{number} VALUES ({row}, 'value;{row} it''s'); -- row {row}"
+        for row in range(rows)
+    )
+    lines.append("-- rollback --")
+    lines.append(f"DROP TABLE data_{number};")
+    return "\n".join(lines)
+
+
+def measure(corpus: List[str], split: Callable[[str], int]) -> float:
+    """
+    Measures time of splitting the whole corpus.
+
+    :param corpus: migration texts.
+    :param split: function that splits text and returns number of statements.
+
+    :returns: seconds.
+    """
+    start = time.perf_counter()
+    for text in corpus:
+        split(text)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Runs benchmark and prints results."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    corpus = [make_migration(number, args.rows) for number in range(args.files)]
+    megabytes = sum(len(text) for text in corpus) / 1024 / 1024
+
+    print(f"corpus: {args.files} files, {megabytes:.1f} MB")
+    for name, split in (
+        ("str.split", lambda text: len(text.split(";"))),
+        ("tokenizer", lambda text: sum(1 for _ in iter_statements(text))),
+    ):
+        seconds = measure(corpus, split)
+        print(f"{name:<10}{seconds:>8.3f} s{megabytes / seconds:>10.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
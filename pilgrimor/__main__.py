@@ -1,23 +1,51 @@
 from pilgrimor.cli import get_parse_args
-from pilgrimor.cli.rawsql_cli import RawSQLMigratorCLI
-from pilgrimor.engine.engine import get_engine
-from pilgrimor.settings import PilgrimorSettings
 
 
 def main() -> None:
-    """Initializes all necessary instances and run migrator."""
+    """
+    Initializes all necessary instances and run migrator.
+
+    Arguments are parsed before anything else is imported,
+    so `--help` and wrong arguments do not load the engine.
+    """
     namespace = get_parse_args()
-    settings = PilgrimorSettings().add_new_fields()
-    print(settings)
-    engine = get_engine(  # type: ignore
-        settings,
-    )(settings.database_url)
-    cli = RawSQLMigratorCLI(
-        namespace,
-        engine,
-        settings.migrations_dir,
+
+    from pilgrimor.cli.rawsql_cli import RawSQLMigratorCLI  # noqa: WPS433
+    from pilgrimor.engine.engine import get_engine  # noqa: WPS433
+    from pilgrimor.settings import get_settings  # noqa: WPS433
+
+    settings = get_settings()
+    engine_class = get_engine(settings)
+    database_targets = settings.database_targets()
+    if len(database_targets) > 1:
+        from pilgrimor.migrator.fanout import FanOutExecutor  # noqa: WPS433
+
+        fanout = FanOutExecutor(
+            engine_class,  # type: ignore
+            settings.engine_options(),
+            database_targets,
+            settings.migrations_dir,
+            parse_cache=settings.parse_cache,
+            version_manifest=settings.version_manifest,
+            concurrency=settings.concurrency,
+            fail_fast=settings.fail_fast,
+        )
+        RawSQLMigratorCLI(namespace, None, settings.migrations_dir, fanout=fanout)()
+        return
+
+    engine = engine_class(  # type: ignore
+        database_targets[0],
+        **settings.engine_options(),
     )
-    cli()
+    with engine:
+        cli = RawSQLMigratorCLI(
+            namespace,
+            engine,
+            settings.migrations_dir,
+            parse_cache=settings.parse_cache,
+            version_manifest=settings.version_manifest,
+        )
+        cli()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,38 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from contextlib import asynccontextmanager, contextmanager
+from types import TracebackType
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Type
 
+from pilgrimor.migrator.system_table import SystemTable
+from pilgrimor.profiler import Profiler
 
-class PilgrimoreEngine(ABC):
+
+class BasePilgrimoreEngine(ABC):
+    """
+    Attributes of sync and asyncio engines.
+
+    Engines of both kinds are created the same way,
+    they differ only in the way they execute queries.
+
+    Migrators build statements on pilgrimor table with `system_table`,
+    engines of databases with more features can replace it.
+    """
+
+    system_table = SystemTable()
+
+    def __init__(self, database_url: str, **engine_options: Any) -> None:
+        """
+        Initialize the engine.
+
+        :param database_url: url to database.
+        :param engine_options: engine specific options from settings.
+        """
+        self.database_url = database_url
+        self.engine_options = engine_options
+        self.profiler = Profiler()
+
+
+class PilgrimoreEngine(BasePilgrimoreEngine):
     """
     Base class for any engine for pilgrimor.
 
@@ -25,13 +55,37 @@ class PilgrimoreEngine(ABC):
     then the rest will be in a transaction.
     """
 
-    def __init__(self, database_url: str) -> None:
+    def __enter__(self) -> "PilgrimoreEngine":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
         """
-        Initialize the engine.
+        Releases all resources held by the engine.
 
-        :param database_url: url to database.
+        Engines that keep connections open between
+        queries must close them here.
         """
-        self.database_url = database_url
+
+    @contextmanager
+    def migration_lock(self) -> Iterator[bool]:
+        """
+        Holds lock that lets only one runner migrate the database.
+
+        Migrators hold it while they load the state,
+        plan and execute migrations. Engines without
+        locking let every runner go at once.
+
+        :yields: True if the lock was taken after waiting for another runner.
+        """
+        yield False
 
     @abstractmethod
     def execute_sql_with_return(
@@ -72,7 +126,109 @@ class PilgrimoreEngine(ABC):
     @abstractmethod
     def execute_version_migrations(
         self,
-        version_migrations: List[Dict[str, str]],
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+    ) -> None:
+        """
+        Executes all migrations sql queries and do not return any output.
+
+        By default query must be executed in transaction.
+
+        Every migration dict has `migration` name and full `query`,
+        `statements` key, if present, has the same query
+        already split into statements.
+        Optional keys: `in_transaction` overrides in_transaction
+        for the migration, `settings` has database settings
+        for the migration, `depends_on` has names of migrations
+        that must be done before it and `base_dir` is the directory
+        for relative paths of copy blocks.
+
+        :param version_migrations: list of dicts with migration data for single version.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        """
+
+
+class AsyncPilgrimoreEngine(BasePilgrimoreEngine):
+    """
+    Base class for any asyncio engine for pilgrimor.
+
+    Works the same way as PilgrimoreEngine,
+    but all methods are coroutines, so migrations
+    can run inside the event loop of the application.
+    """
+
+    async def __aenter__(self) -> "AsyncPilgrimoreEngine":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Releases all resources held by the engine.
+
+        Engines that keep connections open between
+        queries must close them here.
+        """
+
+    @asynccontextmanager
+    async def migration_lock(self) -> AsyncIterator[bool]:
+        """
+        Holds lock that lets only one runner migrate the database.
+
+        See PilgrimoreEngine.migration_lock.
+
+        :yields: True if the lock was taken after waiting for another runner.
+        """
+        yield False
+
+    @abstractmethod
+    async def execute_sql_with_return(
+        self,
+        sql_query: str,
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: Optional[bool] = True,
+    ) -> Optional[List[Any]]:
+        """
+        Executes sql query and return output.
+
+        By default query must be executed in transaction.
+
+        :param sql_query: sql query to execute.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+
+        :return: list with results.
+        """
+
+    @abstractmethod
+    async def execute_sql_with_no_return(
+        self,
+        sql_query: str,
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: Optional[bool] = True,
+    ) -> None:
+        """
+        Executes sql query.
+
+        By default query must be executed in transaction.
+
+        :param sql_query: sql query to execute.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        """
+
+    @abstractmethod
+    async def execute_version_migrations(
+        self,
+        version_migrations: List[Dict[str, Any]],
         sql_query_params: Optional[List[Any]] = None,
         in_transaction: bool = True,
     ) -> None:
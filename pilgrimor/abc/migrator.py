@@ -1,22 +1,31 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from pilgrimor.abc.engine import PilgrimoreEngine
-from pilgrimor.exceptions import ApplyMigrationsError
-from pilgrimor.utils import success_text
+from pilgrimor.abc.engine import AsyncPilgrimoreEngine, PilgrimoreEngine
+from pilgrimor.exceptions import (
+    ApplyMigrationsError,
+    BasePilgrimorError,
+    VersionAlreadyExistsError,
+)
+from pilgrimor.migrator.state import MigrationStateSnapshot
+from pilgrimor.migrator.system_table import VERSION_KEY_SCHEMA_VERSION
+from pilgrimor.profiler import Profiler
+from pilgrimor.utils import attention_text, success_text
 
 
-class BaseMigrator(ABC):
+class CommonMigrator(ABC):
     """
-    Base migrator.
+    Attributes and planning methods of sync and asyncio migrators.
 
-    Can make 3 base operations:
-        1) Create new migrations.
-        2) Apply migrations.
-        3) Rollback migrations.
+    Migrators of both kinds decide what to execute the same way,
+    they differ only in the way they execute it.
     """
 
-    def __init__(self, engine: PilgrimoreEngine, migration_dir: str) -> None:
+    def __init__(
+        self,
+        engine: Union[PilgrimoreEngine, AsyncPilgrimoreEngine],
+        migration_dir: str,
+    ) -> None:
         """
         Initializes the migrator.
 
@@ -24,7 +33,157 @@ class BaseMigrator(ABC):
         :param migration_dir: path to the directory with migration files.
         """
         self.engine = engine
+        self.system_table = engine.system_table
         self.migrations_dir = migration_dir
+        self._state: Optional[MigrationStateSnapshot] = None
+        self.profiler = Profiler()
+
+    def _get_new_migrations(self, version: str, waited: bool) -> List[str]:
+        """
+        Returns new migrations for the version.
+
+        If the runner waited for the migration lock and the version
+        was applied meanwhile, there is nothing to apply.
+
+        :param version: version for new migrations.
+        :param waited: runner waited for the migration lock or not.
+
+        :raises VersionAlreadyExistsError: if version already existed.
+
+        :returns: migrations that will be applied.
+        """
+        try:
+            return self._get_migrations_with_version(version=version)
+        except VersionAlreadyExistsError:
+            if not waited:
+                raise
+        print(attention_text(f"Version {version} is applied by another runner."))
+        return []
+
+    def _get_rollback_migrations(
+        self,
+        version: Optional[str],
+        latest: bool,
+    ) -> List[str]:
+        """
+        Returns migrations to roll back.
+
+        :param version: version to which it is rolled back.
+        :param latest: rollback only latests migrations.
+
+        :returns: migrations that will be rolled back.
+        """
+        to_rollback_migations: List[str] = []
+        with self.profiler.phase("scan migrations"):
+            if version:
+                to_rollback_migations = self._get_rollback_migration_by_version(
+                    version,
+                )
+            if latest:
+                to_rollback_migations = self._get_last_applied_migrations()
+        return to_rollback_migations
+
+    def _get_version_lookup(
+        self,
+        state: MigrationStateSnapshot,
+        version: Optional[str],
+        latest: bool,
+    ) -> Optional[Tuple[str, Optional[List[Any]]]]:
+        """
+        Returns indexed query of records that answers version questions.
+
+        Tables get version_key in schema 4,
+        versions of older tables are compared in memory.
+
+        :param state: loaded state.
+        :param version: version of the command.
+        :param latest: command works with the biggest version or not.
+
+        :returns: query and its parameters or None.
+        """
+        if state.schema_version < VERSION_KEY_SCHEMA_VERSION:
+            return None
+        return self.system_table.version_lookup(version, latest)
+
+    def _refresh_migration_files(self) -> None:
+        """
+        Makes the next scan see the current migration directory.
+
+        Called when a command starts, migrators without
+        cached migration files do nothing.
+        """
+
+    @abstractmethod
+    def _get_exist_migrations(self) -> Dict[str, List[str]]:
+        """
+        Returns migrations with a known version.
+
+        In case a situation arises when the previous
+        migration did not have a version,
+        but the one we are considering has,
+        stop the migration and report
+        that the migration history is incorrect
+
+        :raises IncorrectMigrationHistoryError: if incorrect migration history.
+
+        :returns: Dict with keys as version and value as list of migrations.
+        """
+
+    @abstractmethod
+    def _get_migrations_with_version(self, version: str) -> List[str]:
+        """
+        Returns new migrations by version.
+
+        :param version: version for new migrations.
+
+        :raises VersionAlreadyExistsError: if version is already exists.
+        :raises BiggerVersionsExistsError: if bigger versions are exists.
+        :raises NoNewMigrationsError: if no new migrations.
+        """
+
+    @abstractmethod
+    def _get_rollback_migration_by_version(self, version: str) -> List[str]:
+        """
+        Rolls back migrations to specified version.
+
+        :param version: version to which it is rolled back
+
+        :raises VersionAlreadyExistsError: if version is already exists.
+        """
+
+    @abstractmethod
+    def _get_last_applied_migrations(self) -> List[str]:
+        """
+        Returns last applied migrations.
+
+        :returns: set of last applied migrations.
+        """
+
+
+class BaseMigrator(CommonMigrator):
+    """
+    Base migrator.
+
+    Can make 3 base operations:
+        1) Create new migrations.
+        2) Apply migrations.
+        3) Rollback migrations.
+    """
+
+    engine: PilgrimoreEngine
+
+    @property
+    def state(self) -> MigrationStateSnapshot:
+        """
+        Returns snapshot of applied migrations.
+
+        Snapshot is loaded on the first access.
+
+        :returns: state snapshot.
+        """
+        if self._state is None:
+            self._state = self._load_state()
+        return self._state
 
     @abstractmethod
     def initialize_database(self) -> None:
@@ -39,16 +198,35 @@ class BaseMigrator(ABC):
         If the version is specified,
         get new migrations and apply them.
 
+        Applied migrations are skipped.
+
+        Migrations are applied under the migration lock of the engine,
+        runners that waited for it see migrations applied by the leader.
+        Without version nothing is locked or loaded
+        if the database is known to be up to date.
+
         :param version: version for new migrations.
         """
-        if version:
-            self.run_migrations(
-                self._get_migrations_with_version(version=version),
-                version,
-            )
-        else:
-            for m_version, migrations in self._get_exist_migrations().items():
-                self.run_migrations(migrations, m_version)
+        self._refresh_migration_files()
+        if not version and self._is_up_to_date():
+            print(success_text("Database is up to date."))
+            return
+        with self.engine.migration_lock() as waited:
+            with self.profiler.phase("load state"):
+                self._state = self._load_state(version)
+            self._apply_baseline()
+            if version:
+                with self.profiler.phase("scan migrations"):
+                    new_migrations = self._get_new_migrations(version, waited)
+                if new_migrations:
+                    self.run_migrations(new_migrations, version)
+            else:
+                with self.profiler.phase("scan migrations"):
+                    exist_migrations = self._get_exist_migrations()
+                for m_version, migrations in exist_migrations.items():
+                    if to_apply_migrations := self.state.not_applied(migrations):
+                        self.run_migrations(to_apply_migrations, m_version)
+            self._mark_up_to_date()
 
     def rollback_migrations(
         self,
@@ -70,15 +248,14 @@ class BaseMigrator(ABC):
         :param version: version for migrations.
         :param latest: rollback only latests migrations.
         """
-        if version:
-            to_rollback_migations = self._get_rollback_migration_by_version(version)
-        if latest:
-            to_rollback_migations = self._get_last_applied_migrations()
-
-        self.run_migrations(
-            migrations=to_rollback_migations,
-            apply=False,
-        )
+        self._refresh_migration_files()
+        with self.engine.migration_lock():
+            with self.profiler.phase("load state"):
+                self._state = self._load_state(version, latest)
+            self.run_migrations(
+                migrations=self._get_rollback_migrations(version, latest),
+                apply=False,
+            )
 
     def run_migrations(  # noqa: C901
         self,
@@ -111,6 +288,63 @@ class BaseMigrator(ABC):
             raise ApplyMigrationsError from exc
         print(success_text(f"Command {command} done."))
 
+    def _load_state(
+        self,
+        version: Optional[str] = None,
+        latest: bool = False,
+    ) -> MigrationStateSnapshot:
+        """
+        Loads state of applied migrations from the database.
+
+        Commands that compare versions look them up by index too.
+
+        :param version: version of the command.
+        :param latest: command works with the biggest version or not.
+
+        :returns: state snapshot.
+        """
+        state = MigrationStateSnapshot.from_result(
+            self.engine.execute_sql_with_return(
+                sql_query=self.system_table.state_query,
+                sql_query_params=None,
+            ),
+        )
+        if (lookup := self._get_version_lookup(state, version, latest)) is not None:
+            query, query_params = lookup
+            state.use_lookup(
+                None if latest else version,
+                self.engine.execute_sql_with_return(
+                    sql_query=query,
+                    sql_query_params=query_params,
+                ),
+            )
+        return state
+
+    def _apply_baseline(self) -> None:
+        """
+        Applies baseline to a fresh database.
+
+        Migrators without baselines do nothing.
+        """
+
+    def _is_up_to_date(self) -> bool:
+        """
+        Checks quickly that all migrations are applied.
+
+        Migrators without fast check always answer no,
+        so the state is loaded and checked in full.
+
+        :returns: True if there is nothing to apply.
+        """
+        return False
+
+    def _mark_up_to_date(self) -> None:
+        """
+        Remembers that all migrations are applied, if they are.
+
+        Migrators without fast check do nothing.
+        """
+
     @abstractmethod
     def _apply_migrations(self, migrations: List[str], version: str) -> None:
         """
@@ -147,48 +381,188 @@ class BaseMigrator(ABC):
         :returns: None.
         """
 
-    @abstractmethod
-    def _get_exist_migrations(self) -> Dict[str, List[str]]:
+
+class AsyncBaseMigrator(CommonMigrator):
+    """
+    Base asyncio migrator.
+
+    Works like BaseMigrator, but executes migrations
+    with AsyncPilgrimoreEngine, so they can run
+    in the event loop of the application.
+
+    Planning methods of CommonMigrator stay synchronous,
+    because they only read migration files and the state snapshot.
+    """
+
+    engine: AsyncPilgrimoreEngine
+
+    @property
+    def state(self) -> MigrationStateSnapshot:
         """
-        Returns migrations with a known version.
+        Returns snapshot of applied migrations.
 
-        In case a situation arises when the previous
-        migration did not have a version,
-        but the one we are considering has,
-        stop the migration and report
-        that the migration history is incorrect
+        Snapshot is loaded at the start of every command.
 
-        :raises IncorrectMigrationHistoryError: if incorrect migration history.
+        :raises BasePilgrimorError: if snapshot is not loaded.
 
-        :returns: Dict with keys as version and value as list of migrations.
+        :returns: state snapshot.
         """
+        if self._state is None:
+            raise BasePilgrimorError("Migrations state is not loaded.")
+        return self._state
 
     @abstractmethod
-    def _get_migrations_with_version(self, version: str) -> List[str]:
+    async def initialize_database(self) -> None:
+        """Initialize new table for migration control."""
+
+    async def apply_migrations(self, version: Optional[str]) -> None:
         """
-        Returns new migrations by version.
+        Applies new migrations.
+
+        See BaseMigrator.apply_migrations.
 
         :param version: version for new migrations.
+        """
+        self._refresh_migration_files()
+        if not version and await self._is_up_to_date():
+            print(success_text("Database is up to date."))
+            return
+        async with self.engine.migration_lock() as waited:
+            with self.profiler.phase("load state"):
+                self._state = await self._load_state(version)
+            await self._apply_baseline()
+            if version:
+                with self.profiler.phase("scan migrations"):
+                    new_migrations = self._get_new_migrations(version, waited)
+                if new_migrations:
+                    await self.run_migrations(new_migrations, version)
+            else:
+                with self.profiler.phase("scan migrations"):
+                    exist_migrations = self._get_exist_migrations()
+                for m_version, migrations in exist_migrations.items():
+                    if to_apply_migrations := self.state.not_applied(migrations):
+                        await self.run_migrations(to_apply_migrations, m_version)
+            await self._mark_up_to_date()
+
+    async def rollback_migrations(
+        self,
+        version: Optional[str] = None,
+        latest: bool = False,
+    ) -> None:
+        """
+        Rolls back migrations.
 
-        :raises VersionAlreadyExistsError: if version is already exists.
-        :raises BiggerVersionsExistsError: if bigger versions are exists.
-        :raises NoNewMigrationsError: if no new migrations.
+        See BaseMigrator.rollback_migrations.
+
+        :param version: version for migrations.
+        :param latest: rollback only latests migrations.
         """
+        self._refresh_migration_files()
+        async with self.engine.migration_lock():
+            with self.profiler.phase("load state"):
+                self._state = await self._load_state(version, latest)
+            await self.run_migrations(
+                migrations=self._get_rollback_migrations(version, latest),
+                apply=False,
+            )
 
-    @abstractmethod
-    def _get_rollback_migration_by_version(self, version: str) -> List[str]:
+    async def run_migrations(
+        self,
+        migrations: List[str],
+        version: Optional[str] = None,
+        apply: bool = True,
+    ) -> None:
         """
-        Rolls back migrations to specified version.
+        Runs migrations.
 
-        :param version: version to which it is rolled back
+        If apply is True, apply new migrations.
+        Else roll back migrations.
 
-        :raises VersionAlreadyExistsError: if version is already exists.
+        :param migrations: List of migration.
+        :param version: migration version.
+        :param apply: to apply or not.
+
+        :raises ApplyMigrationsError: error in migrations.
+        """
+        command = "apply" if apply else "rollback"
+        try:
+            if apply and version:
+                await self._apply_migrations(migrations=migrations, version=version)
+            elif not apply:
+                await self._rollback_migrations(migrations=migrations)
+        except Exception as exc:
+            raise ApplyMigrationsError from exc
+        print(success_text(f"Command {command} done."))
+
+    async def _load_state(
+        self,
+        version: Optional[str] = None,
+        latest: bool = False,
+    ) -> MigrationStateSnapshot:
+        """
+        Loads state of applied migrations from the database.
+
+        Commands that compare versions look them up by index too.
+
+        :param version: version of the command.
+        :param latest: command works with the biggest version or not.
+
+        :returns: state snapshot.
+        """
+        state = MigrationStateSnapshot.from_result(
+            await self.engine.execute_sql_with_return(
+                sql_query=self.system_table.state_query,
+                sql_query_params=None,
+            ),
+        )
+        if (lookup := self._get_version_lookup(state, version, latest)) is not None:
+            query, query_params = lookup
+            state.use_lookup(
+                None if latest else version,
+                await self.engine.execute_sql_with_return(
+                    sql_query=query,
+                    sql_query_params=query_params,
+                ),
+            )
+        return state
+
+    async def _apply_baseline(self) -> None:
+        """
+        Applies baseline to a fresh database.
+
+        Migrators without baselines do nothing.
+        """
+
+    async def _is_up_to_date(self) -> bool:
+        """
+        Checks quickly that all migrations are applied.
+
+        See BaseMigrator._is_up_to_date.
+
+        :returns: True if there is nothing to apply.
+        """
+        return False
+
+    async def _mark_up_to_date(self) -> None:
+        """
+        Remembers that all migrations are applied, if they are.
+
+        See BaseMigrator._mark_up_to_date.
         """
 
     @abstractmethod
-    def _get_last_applied_migrations(self) -> List[str]:
+    async def _apply_migrations(self, migrations: List[str], version: str) -> None:
         """
-        Returns last applied migrations.
+        Applies new migration.
 
-        :returns: set of last applied migrations.
+        :param migrations: List of migration.
+        :param version: migration version.
+        """
+
+    @abstractmethod
+    async def _rollback_migrations(self, migrations: List[str]) -> None:
+        """
+        Rolls back migration.
+
+        :param migrations: List of migration.
         """
@@ -1,6 +1,24 @@
 from argparse import ArgumentDefaultsHelpFormatter, ArgumentParser, Namespace
 
 
+def add_profile_arguments(command_parser: ArgumentParser) -> None:
+    """
+    Adds profiling arguments to the command.
+
+    :param command_parser: parser of the command.
+    """
+    command_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print timings of planning phases, migrations and statements.",
+    )
+    command_parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="Write timings to JSON file, implies --profile.",
+    )
+
+
 def get_parse_args() -> Namespace:
     """
     Parses input terminal args.
@@ -14,10 +32,15 @@ def get_parse_args() -> Namespace:
         dest="command",
     )
 
-    commands.add_parser(
+    initdb_parser = commands.add_parser(
         "initdb",
         help=("Initialize you database."),
     )
+    initdb_parser.add_argument(
+        "--upgrade",
+        action="store_true",
+        help="Upgrade existing pilgrimor table to the latest schema.",
+    )
 
     migrate_parser = commands.add_parser(
         "apply",
@@ -28,6 +51,12 @@ def get_parse_args() -> Namespace:
         "-v",
         help="Set release version for migration(s).",
     )
+    migrate_parser.add_argument(
+        "--plan",
+        metavar="PATH",
+        help="Execute plan from JSON file made by plan command.",
+    )
+    add_profile_arguments(migrate_parser)
 
     downgrade_command = commands.add_parser(
         "rollback",
@@ -43,5 +72,103 @@ def get_parse_args() -> Namespace:
         action="store_true",
         help=("Downgrade last applied version."),
     )
+    add_profile_arguments(downgrade_command)
+
+    plan_parser = commands.add_parser(
+        "plan",
+        help=("Show what apply or rollback would execute."),
+    )
+    plan_parser.add_argument(
+        "--version",
+        "-v",
+        help="Release version for new migration(s) or version to rollback to.",
+    )
+    plan_parser.add_argument(
+        "--rollback",
+        action="store_true",
+        help="Plan rollback instead of apply.",
+    )
+    plan_parser.add_argument(
+        "--latest",
+        action="store_true",
+        help="Plan rollback of last applied version.",
+    )
+    plan_parser.add_argument(
+        "--json",
+        metavar="PATH",
+        help="Write plan to JSON file for apply --plan.",
+    )
+
+    history_parser = commands.add_parser(
+        "history",
+        help=("Show the slowest applied migrations."),
+    )
+    history_parser.add_argument(
+        "--limit",
+        type=int,
+        default=10,
+        help="Number of migrations.",
+    )
+    history_parser.add_argument(
+        "--json",
+        metavar="PATH",
+        help="Write history to JSON file.",
+    )
+    history_parser.add_argument(
+        "--estimate",
+        metavar="PATH",
+        help="Estimate pending migrations with history of another environment.",
+    )
+
+    status_parser = commands.add_parser(
+        "status",
+        help=("Show migrations that are not applied."),
+    )
+    status_parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Exit with code 1 if there are pending migrations.",
+    )
+
+    commands.add_parser(
+        "manifest",
+        help=("Write versions from migration files to pilgrimor.lock."),
+    )
+
+    squash_parser = commands.add_parser(
+        "squash",
+        help=("Squash migrations into a baseline."),
+    )
+    squash_parser.add_argument(
+        "--up-to",
+        required=True,
+        help="Last version covered by the baseline.",
+    )
+    squash_parser.add_argument(
+        "--scratch-url",
+        required=True,
+        help="Url of empty database, migrations are applied to it.",
+    )
+    squash_parser.add_argument(
+        "--pg-dump",
+        default="pg_dump",
+        help="pg_dump executable.",
+    )
+
+    template_parser = commands.add_parser(
+        "template",
+        help=("Migrate template database and create databases from it."),
+    )
+    template_parser.add_argument(
+        "--databases",
+        type=int,
+        default=0,
+        help="Number of databases created from the template.",
+    )
+    template_parser.add_argument(
+        "--name",
+        default="pilgrimor_template",
+        help="Name of template database.",
+    )
 
     return parser.parse_args()
@@ -1,9 +1,30 @@
+import json
 from argparse import Namespace
+from typing import Callable, List, Optional, Tuple
 
 from pilgrimor.abc.engine import PilgrimoreEngine
 from pilgrimor.cli.base_cli import BaseCLI
+from pilgrimor.migrator.fanout import STATUS_OK, FanOutExecutor, mask_url
+from pilgrimor.migrator.history import (
+    HistoryRecord,
+    describe_estimate,
+    describe_history,
+    describe_trends,
+    estimate_pending,
+    read_reference,
+    write_histories,
+)
+from pilgrimor.migrator.plan import (
+    STEP_APPLY,
+    STEP_ROLLBACK,
+    describe_plan,
+    read_plan,
+    write_plan,
+)
+from pilgrimor.migrator.rawsql_migrator.manifest import MANIFEST_FILE_NAME
 from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
-from pilgrimor.utils import error_text
+from pilgrimor.profiler import Profiler
+from pilgrimor.utils import attention_text, error_text, success_text
 
 
 class RawSQLMigratorCLI(BaseCLI):
@@ -12,33 +33,57 @@ class RawSQLMigratorCLI(BaseCLI):
     def __init__(
         self,
         namespace: Namespace,
-        engine: PilgrimoreEngine,
+        engine: Optional[PilgrimoreEngine],
         migrations_dir: str,
+        parse_cache: bool = False,
+        fanout: Optional[FanOutExecutor] = None,
+        version_manifest: bool = False,
     ) -> None:
         """
         Initialize the CLI.
 
+        If fanout is set, commands are run on all its databases
+        and engine is not used.
+
         :param namespace: namespace with args from the command line.
         :param engine: sql engine.
         :param migrations_dir: directory with migrations.
+        :param parse_cache: keep parsed migrations in persistent cache or not.
+        :param fanout: executor for many databases.
+        :param version_manifest: keep versions in manifest file or not.
         """
         self.namespace: Namespace = namespace
-        self.migrator: RawSQLMigator = RawSQLMigator(
-            engine,
-            migrations_dir,
-        )
+        self.migrations_dir = migrations_dir
+        self.fanout = fanout
+        self.migrator: Optional[RawSQLMigator] = None
+        if engine is not None:
+            self.migrator = RawSQLMigator(
+                engine,
+                migrations_dir,
+                parse_cache=parse_cache,
+                version_manifest=version_manifest,
+            )
 
     def apply(self) -> None:
         """
         Apply command.
 
-        Runs apply_migarations method in the migrator.
+        Runs apply_migarations method in the migrator,
+        or apply_plan method if plan file is set.
         """
         version = self.namespace.version
-        try:
-            self.migrator.apply_migrations(version)
-        except Exception as exc:
-            exit(error_text(str(exc)))
+        if plan_path := self.namespace.plan:
+            if version:
+                exit(error_text("You must set only a version or a plan"))
+            try:
+                plan = read_plan(plan_path)
+            except (OSError, ValueError) as exc:
+                exit(error_text(f"Can't read plan - {exc}"))
+            self._run_profiled_command(lambda migrator: migrator.apply_plan(plan))
+            return
+        self._run_profiled_command(
+            lambda migrator: migrator.apply_migrations(version),
+        )
 
     def rollback(self) -> None:  # noqa: C901
         """
@@ -64,34 +109,306 @@ class RawSQLMigratorCLI(BaseCLI):
             )
 
         if version:
-            try:
-                self.migrator.rollback_migrations(
+            self._run_profiled_command(
+                lambda migrator: migrator.rollback_migrations(
                     version=version,
                     latest=False,
-                )
-            except Exception as exc:
-                exit(
-                    error_text(
-                        str(exc),
-                    ),
-                )
+                ),
+            )
         if latest:
-            try:
-                self.migrator.rollback_migrations(
+            self._run_profiled_command(
+                lambda migrator: migrator.rollback_migrations(
                     version=None,
                     latest=True,
-                )
-            except Exception as exc:  # noqa: WPS440
-                exit(
-                    error_text(
-                        str(exc),
-                    ),
-                )
+                ),
+            )
+
+    def plan(self) -> None:  # noqa: C901
+        """
+        Plan command.
+
+        Prints steps that apply or rollback would execute,
+        nothing is executed. Plan can be saved to JSON file
+        and executed later with `apply --plan`.
+        """
+        if self.fanout is not None:
+            exit(error_text("Plan works with one database only."))
+        version = self.namespace.version
+        command = STEP_APPLY
+        if self.namespace.rollback:
+            command = STEP_ROLLBACK
+            if bool(version) == self.namespace.latest:
+                exit(error_text("You must set a version or --latest flag"))
+        elif self.namespace.latest:
+            exit(error_text("--latest flag works only with --rollback"))
+
+        try:
+            plan = self.migrator.plan_migrations(  # type: ignore
+                command,
+                version,
+            )
+        except Exception as exc:
+            exit(error_text(str(exc)))
+        print(describe_plan(plan))
+        if self.namespace.json:
+            write_plan(plan, self.namespace.json)
 
     def initdb(self) -> None:
         """
         Initdb command.
 
-        Runs initialize_database method in the migrator.
+        Runs initialize_database method in the migrator,
+        or upgrade_database if --upgrade is set.
+        """
+        if self.namespace.upgrade:
+            self._run_command(lambda migrator: migrator.upgrade_database())
+            return
+        self._run_command(lambda migrator: migrator.initialize_database())
+
+    def history(self) -> None:
+        """
+        History command.
+
+        Prints the slowest migrations of the database,
+        or durations on every database with fan-out.
+        With --estimate prints estimated duration
+        of pending migrations.
+        """
+        reference = self._read_reference()
+        histories: List[Tuple[str, List[HistoryRecord]]] = []
+        estimates: List[Tuple[str, str]] = []
+
+        def collect(migrator: RawSQLMigator) -> None:  # noqa: WPS430
+            target = mask_url(migrator.engine.database_url)
+            records = migrator.get_history()
+            histories.append((target, records))
+            if self.namespace.estimate:
+                estimate = estimate_pending(
+                    migrator._get_to_apply_migrations(),  # noqa: WPS437
+                    records,
+                    reference,
+                )
+                estimates.append((target, describe_estimate(estimate)))
+
+        self._run_command(collect)
+        self._print_histories(histories, estimates)
+        if self.namespace.json:
+            write_histories(histories, self.namespace.json)
+
+    def status(self) -> None:
+        """
+        Status command.
+
+        Prints pending migrations of every database.
+        With --check exits with code 1 if any database
+        has pending migrations, for readiness probes.
+        """
+        statuses: List[Tuple[str, List[str]]] = []
+
+        def collect(migrator: RawSQLMigator) -> None:  # noqa: WPS430
+            statuses.append(
+                (
+                    mask_url(migrator.engine.database_url),
+                    migrator.get_pending_migrations(),
+                ),
+            )
+
+        self._run_command(collect)
+        for target, pending in statuses:
+            if len(statuses) > 1:
+                print(attention_text(target))
+            self._print_pending(pending)
+        if self.namespace.check and any(pending for _, pending in statuses):
+            exit(error_text("There are pending migrations."))
+
+    def manifest(self) -> None:
+        """
+        Manifest command.
+
+        Writes versions from markers in migration files
+        to the version manifest, it is done once
+        before `version_manifest` setting is enabled.
+        """
+        if self.fanout is not None:
+            migration_files = self.fanout.migration_files
+        else:
+            migration_files = self.migrator.migration_files  # type: ignore
+
+        try:
+            converted = migration_files.convert_to_manifest()
+        except Exception as exc:
+            exit(error_text(str(exc)))
+        print(
+            success_text(
+                f"Versions of {converted} migrations "
+                f"written to {MANIFEST_FILE_NAME}.",
+            ),
+        )
+        if migration_files.manifest is None:
+            print(attention_text("Set version_manifest = true to use it."))
+
+    def squash(self) -> None:
+        """
+        Squash command.
+
+        Creates baseline with MigrationSquasher
+        on the scratch database.
+        """
+        from pilgrimor.migrator.squash import MigrationSquasher  # noqa: WPS433
+
+        if self.fanout is not None:
+            engine_class = self.fanout.engine_class
+            engine_options = self.fanout.engine_options
+            migration_files = self.fanout.migration_files
+        else:
+            engine = self.migrator.engine  # type: ignore
+            engine_class = type(engine)
+            engine_options = engine.engine_options
+            migration_files = self.migrator.migration_files  # type: ignore
+
+        try:
+            with engine_class(
+                self.namespace.scratch_url,
+                **engine_options,
+            ) as scratch_engine:
+                MigrationSquasher(
+                    scratch_engine,
+                    self.migrations_dir,
+                    migration_files=migration_files,
+                    pg_dump=self.namespace.pg_dump,
+                ).squash(self.namespace.up_to)
+        except Exception as exc:
+            exit(error_text(str(exc.__cause__ or exc)))
+
+    def template(self) -> None:
+        """
+        Template command.
+
+        Builds template database if migrations changed
+        and prints urls of databases created from it.
+        Template is created on the server of the database.
+        """
+        from pilgrimor.migrator.template import TemplateDatabase  # noqa: WPS433
+
+        if self.fanout is not None:
+            exit(error_text("Template works with one database only."))
+        engine = self.migrator.engine  # type: ignore
+        template = TemplateDatabase(
+            engine.database_url,
+            self.migrations_dir,
+            template_name=self.namespace.name,
+            engine_class=type(engine),
+            engine_options=engine.engine_options,
+        )
+        try:
+            for database_url in template.provision(self.namespace.databases):
+                print(database_url)
+        except Exception as exc:
+            exit(error_text(str(exc.__cause__ or exc)))
+
+    def _run_command(self, command: Callable[[RawSQLMigator], None]) -> None:
+        """
+        Runs command on one database or on all fan-out databases.
+
+        Exits if command failed on any database.
+
+        :param command: function that gets the migrator.
+        """
+        if self.fanout is not None:
+            results = self.fanout.run(command)
+            if failed := [result for result in results if result.status != STATUS_OK]:
+                exit(error_text(f"Command failed on {len(failed)} database(s)."))
+            return
+
+        try:
+            command(self.migrator)  # type: ignore
+        except Exception as exc:
+            exit(error_text(str(exc)))
+
+    def _run_profiled_command(self, command: Callable[[RawSQLMigator], None]) -> None:
+        """
+        Runs command with profiler if --profile is set.
+
+        Every database gets its own profiler,
+        reports are printed even if the command failed.
+
+        :param command: function that gets the migrator.
+        """
+        profile_json = self.namespace.profile_json
+        if not self.namespace.profile and not profile_json:
+            self._run_command(command)
+            return
+
+        profiles: List[Tuple[str, Profiler]] = []
+
+        def profiled_command(migrator: RawSQLMigator) -> None:  # noqa: WPS430
+            profiler = Profiler(enabled=True)
+            migrator.profiler = profiler
+            migrator.engine.profiler = profiler
+            try:
+                command(migrator)
+            finally:
+                profiles.append((mask_url(migrator.engine.database_url), profiler))
+
+        try:
+            self._run_command(profiled_command)
+        finally:
+            for target, profiler in profiles:
+                print(attention_text(f"Profile of {target}"))
+                print(profiler.report())
+            if profile_json:
+                with open(profile_json, "w") as profile_file:
+                    json.dump(
+                        [
+                            {"target": target, **profiler.to_dict()}
+                            for target, profiler in profiles
+                        ],
+                        profile_file,
+                        indent=2,
+                    )
+
+    def _read_reference(self) -> List[HistoryRecord]:
+        """
+        Reads history for --estimate from JSON file.
+
+        :returns: history records or empty list without --estimate.
+        """
+        if not self.namespace.estimate:
+            return []
+        try:
+            return read_reference(self.namespace.estimate)
+        except (OSError, ValueError, TypeError) as exc:
+            exit(error_text(f"Can't read history - {exc}"))
+
+    def _print_histories(
+        self,
+        histories: List[Tuple[str, List[HistoryRecord]]],
+        estimates: List[Tuple[str, str]],
+    ) -> None:
+        """
+        Prints history of one database or trends of many and estimates.
+
+        :param histories: history records by database.
+        :param estimates: description of estimate by database.
+        """
+        if len(histories) == 1:
+            print(describe_history(histories[0][1], self.namespace.limit))
+        else:
+            print(describe_trends(histories, self.namespace.limit))
+        for target, estimate_text in estimates:
+            if len(estimates) > 1:
+                print(attention_text(target))
+            print(estimate_text)
+
+    def _print_pending(self, pending: List[str]) -> None:
+        """
+        Prints pending migrations of one database.
+
+        :param pending: names of pending migrations.
         """
-        self.migrator.initialize_database()
+        if not pending:
+            print(success_text("Database is up to date."))
+            return
+        print(attention_text(f"{len(pending)} pending migrations:"))
+        for migration in pending:
+            print(migration)
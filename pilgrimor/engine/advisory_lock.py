@@ -0,0 +1,156 @@
+"""
+Leader election for runners that migrate the same database.
+
+With leader election enabled, every `apply` and `rollback`
+holds a session advisory lock while it loads the state,
+plans and executes migrations.
+The first runner becomes the leader, the others wait
+until it finishes and then see its migrations as applied.
+
+Followers try the lock again when the leader notifies
+the channel on release, or after the poll interval,
+so a leader that lost its connection is noticed too.
+"""
+import hashlib
+import select
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator
+
+from pilgrimor.utils import attention_text
+
+MIGRATION_LOCK_NAME = "pilgrimor"
+MIGRATION_LOCK_CHANNEL = "pilgrimor_migrations"
+
+TRY_LOCK_QUERY = "SELECT pg_try_advisory_lock(%s)"
+LISTEN_QUERY = f"LISTEN {MIGRATION_LOCK_CHANNEL}"
+UNLISTEN_QUERY = f"UNLISTEN {MIGRATION_LOCK_CHANNEL}"
+# Notification is sent on commit of the statement, after the unlock.
+UNLOCK_QUERY = (
+    f"SELECT pg_advisory_unlock(%s), pg_notify('{MIGRATION_LOCK_CHANNEL}', '')"
+)
+WAIT_MESSAGE = "Migrations are run by another runner, waiting for it."
+
+
+def lock_key(name: str) -> int:
+    """
+    Returns advisory lock key for the name.
+
+    :param name: name of the locked object.
+
+    :returns: signed 64-bit key.
+    """
+    return int.from_bytes(
+        hashlib.sha256(name.encode()).digest()[:8],
+        "big",
+        signed=True,
+    )
+
+
+@contextmanager
+def advisory_lock(
+    connection: Any,
+    poll_interval: float,
+    name: str = MIGRATION_LOCK_NAME,
+) -> Iterator[bool]:
+    """
+    Holds migration lock on the connection.
+
+    Connection must be in autocommit mode and must
+    not be used for anything else while the lock is held.
+
+    :param connection: psycopg connection.
+    :param poll_interval: maximum seconds between tries of the lock.
+    :param name: name of the lock.
+
+    :yields: True if the lock was taken after waiting for another runner.
+    """
+    key = lock_key(name)
+    waited = not _try_lock(connection, key)
+    if waited:
+        print(attention_text(WAIT_MESSAGE))
+        connection.execute(LISTEN_QUERY)
+        while not _try_lock(connection, key):
+            # Socket becomes readable when notification arrives,
+            # it is consumed by the next query.
+            select.select([connection.fileno()], [], [], poll_interval)
+        connection.execute(UNLISTEN_QUERY)
+    try:
+        yield waited
+    finally:
+        connection.execute(UNLOCK_QUERY, (key,))
+
+
+@asynccontextmanager
+async def async_advisory_lock(
+    connection: Any,
+    poll_interval: float,
+    name: str = MIGRATION_LOCK_NAME,
+) -> AsyncIterator[bool]:
+    """
+    Holds migration lock on the asyncio connection.
+
+    See advisory_lock.
+
+    :param connection: psycopg AsyncConnection.
+    :param poll_interval: maximum seconds between tries of the lock.
+    :param name: name of the lock.
+
+    :yields: True if the lock was taken after waiting for another runner.
+    """
+    key = lock_key(name)
+    waited = not await _async_try_lock(connection, key)
+    if waited:
+        print(attention_text(WAIT_MESSAGE))
+        await connection.execute(LISTEN_QUERY)
+        while not await _async_try_lock(connection, key):
+            await _wait_readable(connection.fileno(), poll_interval)
+        await connection.execute(UNLISTEN_QUERY)
+    try:
+        yield waited
+    finally:
+        await connection.execute(UNLOCK_QUERY, (key,))
+
+
+def _try_lock(connection: Any, key: int) -> bool:
+    """
+    Tries to take the lock without waiting.
+
+    :param connection: psycopg connection.
+    :param key: lock key.
+
+    :returns: True if the lock is taken.
+    """
+    return connection.execute(TRY_LOCK_QUERY, (key,)).fetchone()[0]  # type: ignore
+
+
+async def _async_try_lock(connection: Any, key: int) -> bool:
+    """
+    Tries to take the lock without waiting.
+
+    :param connection: psycopg AsyncConnection.
+    :param key: lock key.
+
+    :returns: True if the lock is taken.
+    """
+    cursor = await connection.execute(TRY_LOCK_QUERY, (key,))
+    return (await cursor.fetchone())[0]  # type: ignore
+
+
+async def _wait_readable(fileno: int, timeout: float) -> None:
+    """
+    Waits until the socket is readable or timeout is over.
+
+    :param fileno: socket descriptor.
+    :param timeout: seconds to wait.
+    """
+    import asyncio  # noqa: WPS433
+
+    loop = asyncio.get_running_loop()
+    readable = asyncio.Event()
+    loop.add_reader(fileno, readable.set)
+    try:
+        await asyncio.wait_for(readable.wait(), timeout)
+    except asyncio.TimeoutError:
+        return
+    finally:
+        loop.remove_reader(fileno)
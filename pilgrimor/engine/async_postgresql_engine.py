@@ -0,0 +1,686 @@
+import asyncio
+import sys
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from psycopg.rows import Row
+
+from pilgrimor.abc.engine import AsyncPilgrimoreEngine
+from pilgrimor.engine.advisory_lock import async_advisory_lock
+from pilgrimor.engine.postgresql_engine import (
+    STATEMENTS_SEPARATOR,
+    BackfillProgress,
+    BasePostgreSQLEngine,
+    describe_migrations,
+    find_failed_query,
+    find_pipeline_failure,
+    form_result,
+    get_migration_queries,
+    get_settings_queries,
+    migration_parts,
+    print_failure,
+    split_by_transaction,
+)
+from pilgrimor.engine.retry import RetryReport, async_run_with_retries
+from pilgrimor.engine.scheduler import async_run_migration_graph
+from pilgrimor.exceptions import EngineConfigurationError
+from pilgrimor.sql.backfill import (
+    DROP_PROGRESS_QUERY,
+    GET_PROGRESS_QUERY,
+    INITIALIZE_PROGRESS_QUERY,
+    SAVE_PROGRESS_QUERY,
+    Backfill,
+)
+from pilgrimor.sql.copy_blocks import CopyBlock
+from pilgrimor.utils import error_text
+
+try:
+    import psycopg  # noqa: WPS433
+except ImportError:
+    sys.exit(error_text("You must install psycopg, psycopg-c and psycopg-binary."))
+
+
+class AsyncPostgreSQLEngine(BasePostgreSQLEngine, AsyncPilgrimoreEngine):
+    """
+    Asyncio engine to execute sql queries.
+
+    Works like PostgreSQLEngine, but uses psycopg.AsyncConnection,
+    so it doesn't block the event loop.
+
+    Engine can use its own AsyncConnectionPool
+    or an existing pool of the application.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        connection_pool: bool = False,
+        pool_min_size: int = 1,
+        pool_max_size: int = 4,
+        pipeline: bool = False,
+        parallel_migrations: int = 1,
+        lock_timeout: Optional[str] = None,
+        lock_retries: int = 0,
+        lock_retry_delay: float = 0.5,
+        lock_retry_max_delay: float = 30,
+        leader_election: bool = False,
+        leader_poll_interval: float = 1,
+        pool: Optional[Any] = None,
+        **engine_options: Any,
+    ) -> None:
+        """
+        Initialize the engine.
+
+        :param database_url: url to database.
+        :param connection_pool: use connection pool or not.
+        :param pool_min_size: minimum number of connections in the pool.
+        :param pool_max_size: maximum number of connections in the pool.
+        :param pipeline: execute versions in transaction in pipeline mode or not.
+        :param parallel_migrations: number of independent migrations
+            executed not in transaction at the same time.
+        :param lock_timeout: lock_timeout for migrations without
+            lock_timeout directive.
+        :param lock_retries: number of retries after lock timeout,
+            deadlock and serialization errors.
+        :param lock_retry_delay: delay before the first retry in seconds.
+        :param lock_retry_max_delay: maximum delay before retry in seconds.
+        :param leader_election: let only one runner migrate
+            the database at a time or not.
+        :param leader_poll_interval: maximum seconds between tries
+            of the migration lock while another runner holds it.
+        :param pool: existing psycopg_pool.AsyncConnectionPool,
+            it is not closed by the engine.
+        :param engine_options: other engine options.
+        """
+        super().__init__(
+            database_url,
+            connection_pool=connection_pool or pool is not None,
+            pool_min_size=pool_min_size,
+            pool_max_size=pool_max_size,
+            pipeline=pipeline,
+            parallel_migrations=parallel_migrations,
+            lock_timeout=lock_timeout,
+            lock_retries=lock_retries,
+            lock_retry_delay=lock_retry_delay,
+            lock_retry_max_delay=lock_retry_max_delay,
+            leader_election=leader_election,
+            leader_poll_interval=leader_poll_interval,
+            **engine_options,
+        )
+        self._pool = pool
+        self._own_pool = pool is None
+
+    async def close(self) -> None:
+        """Closes connection pool if it was opened by the engine."""
+        if self._pool is not None and self._own_pool:
+            await self._pool.close()
+            self._pool = None
+
+    @asynccontextmanager
+    async def migration_lock(self) -> AsyncIterator[bool]:
+        """
+        Holds advisory lock, so only one runner migrates the database.
+
+        See PostgreSQLEngine.migration_lock.
+
+        :raises EngineConfigurationError: if the pool is too small for the lock.
+
+        :yields: True if the lock was taken after waiting for another runner.
+        """
+        if not self.leader_election:
+            yield False
+            return
+        self._check_lock_pool()
+        async with self._connection(autocommit=True) as connection:
+            async with async_advisory_lock(
+                connection,
+                self.leader_poll_interval,
+            ) as waited:
+                yield waited
+
+    async def execute_sql_with_return(
+        self,
+        sql_query: str,
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: Optional[bool] = True,
+    ) -> Optional[List[Any]]:
+        """
+        Executes sql query and return output.
+
+        :param sql_query: sql query to execute.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+
+        :return: None or list with results.
+        """
+        async with self._connection(autocommit=not in_transaction) as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    query=sql_query,
+                    params=sql_query_params,
+                )
+                result = await cursor.fetchall()
+
+        return form_result(result=result)
+
+    async def execute_sql_with_no_return(
+        self,
+        sql_query: str,
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: Optional[bool] = True,
+    ) -> None:
+        """
+        Executes sql query.
+
+        :param sql_query: sql query to execute.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        """
+        async with self._connection(autocommit=not in_transaction) as connection:
+            async with connection.cursor() as cursor:
+                await cursor.execute(
+                    query=sql_query,
+                    params=sql_query_params,
+                )
+
+    async def execute_version_migrations(
+        self,
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+    ) -> None:
+        """
+        Executes all migrations sql queries and do not return any output.
+
+        Migrations are grouped by transaction mode like in PostgreSQLEngine.
+
+        :param version_migrations: sql queries dict by migrations.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute migrations without
+            `in_transaction` key in transaction or not.
+        """
+        for group_in_transaction, migrations_group in split_by_transaction(
+            self._with_lock_timeout(version_migrations),
+            in_transaction,
+        ):
+            await self._execute_migrations_group(
+                migrations_group,
+                sql_query_params,
+                group_in_transaction,
+            )
+
+    async def _execute_migrations_group(
+        self,
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+    ) -> None:
+        """
+        Executes migrations with the same transaction mode.
+
+        :param version_migrations: sql queries dict by migrations.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        """
+        if not in_transaction and self.parallel_migrations > 1:
+            await async_run_migration_graph(
+                version_migrations,
+                lambda migration: self._execute_autocommit_migration(
+                    migration,
+                    sql_query_params,
+                ),
+                self.parallel_migrations,
+            )
+            return
+
+        if in_transaction:
+            report = RetryReport(
+                describe_migrations(version_migrations),
+                self.retry_policy,
+            )
+            await async_run_with_retries(
+                lambda: self._execute_migrations_on_connection(
+                    version_migrations,
+                    sql_query_params,
+                    in_transaction,
+                    report,
+                ),
+                report,
+            )
+            return
+        await self._execute_migrations_on_connection(
+            version_migrations,
+            sql_query_params,
+            in_transaction,
+        )
+
+    async def _execute_migrations_on_connection(
+        self,
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+        report: Optional[RetryReport] = None,
+    ) -> None:
+        """
+        Executes migrations with the same transaction mode on one connection.
+
+        :param version_migrations: sql queries dict by migrations.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        :param report: report of retries to measure migrations in.
+        """
+        async with self._connection(autocommit=not in_transaction) as connection:
+            if in_transaction and self._use_pipeline(version_migrations):
+                await self._execute_pipeline_migrations(
+                    connection,
+                    version_migrations,
+                    sql_query_params,
+                )
+                return
+
+            cursor = connection.cursor()
+            if in_transaction:
+                async with connection.transaction():
+                    await self._execute_migrations_on_cursor(
+                        cursor,
+                        version_migrations,
+                        sql_query_params,
+                        in_transaction,
+                        report,
+                    )
+            else:
+                await self._execute_migrations_on_cursor(
+                    cursor,
+                    version_migrations,
+                    sql_query_params,
+                    in_transaction,
+                    report,
+                )
+            await cursor.close()
+
+    async def _execute_migrations_on_cursor(
+        self,
+        cursor: "psycopg.AsyncCursor[Row]",
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+        report: Optional[RetryReport] = None,
+    ) -> None:
+        """
+        Executes migrations one by one on the cursor.
+
+        :param cursor: psycopg async cursor.
+        :param version_migrations: sql queries dict by migrations.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        :param report: report of retries to measure migrations in.
+        """
+        for migration in version_migrations:
+            with report.measure(migration["migration"]) if report else nullcontext():
+                await self._execute_migration_operations(
+                    cursor,
+                    migration,
+                    sql_query_params,
+                    in_transaction,
+                )
+            print(f"migration: {migration['migration']} - OK")
+
+    async def _execute_autocommit_migration(
+        self,
+        migration: Dict[str, Any],
+        sql_query_params: Optional[List[Any]] = None,
+    ) -> None:
+        """
+        Executes one migration not in transaction on its own connection.
+
+        :param migration: migrations sql queries dict.
+        :param sql_query_params: parameters for sql query.
+        """
+        async with self._connection(autocommit=True) as connection:
+            async with connection.cursor() as cursor:
+                await self._execute_migration_operations(
+                    cursor,
+                    migration,
+                    sql_query_params,
+                    in_transaction=False,
+                )
+        print(f"migration: {migration['migration']} - OK")
+
+    async def _execute_pipeline_migrations(
+        self,
+        connection: "psycopg.AsyncConnection[Any]",
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+    ) -> None:
+        """
+        Executes migrations in one transaction in pipeline mode.
+
+        :param connection: psycopg async connection.
+        :param version_migrations: sql queries dict by migrations.
+        :param sql_query_params: parameters for sql query.
+
+        :raises Exception: error in migration query.
+        """
+        executed: List[Tuple[Dict[str, Any], str, "psycopg.AsyncCursor[Any]"]] = []
+        try:
+            async with connection.pipeline():
+                async with connection.transaction():
+                    for migration in version_migrations:
+                        for query in get_migration_queries(migration, True):
+                            cursor = connection.cursor()
+                            await cursor.execute(query=query, params=sql_query_params)
+                            executed.append((migration, query, cursor))
+        except (Exception, psycopg.DatabaseError) as error:
+            failed_migration, failed_query = find_pipeline_failure(
+                version_migrations,
+                executed,
+            )
+            print_failure(failed_migration, error, failed_query)
+            raise error
+
+        for migration in version_migrations:
+            print(f"migration: {migration['migration']} - OK")
+
+    async def _execute_migration_operations(
+        self,
+        cursor: "psycopg.AsyncCursor[Row]",
+        migration: Dict[str, Any],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+    ) -> None:
+        """
+        Executes all operation sql queries in one migration.
+
+        In transaction without parameters all statements
+        between copy blocks are sent to the database in one batch,
+        unless the profiler is enabled.
+        Backfill is executed before the statements.
+
+        :param cursor: psycopg async cursor.
+        :param migration: migrations sql queries dict.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+
+        :raises Exception: error in migration query.
+        """
+        if backfill := migration.get("backfill"):
+            await self._execute_backfill(cursor, migration, backfill)
+
+        migration_queries = get_migration_queries(migration, in_transaction)
+        batched = self._is_batched(sql_query_params, in_transaction)
+        for part in migration_parts(migration_queries, batched):
+            if isinstance(part, CopyBlock):
+                await self._copy_from_file(cursor, migration, part)
+            else:
+                await self._execute_migration_batch(
+                    cursor,
+                    migration,
+                    part,
+                    sql_query_params,
+                    in_transaction,
+                )
+
+    async def _execute_backfill(
+        self,
+        cursor: "psycopg.AsyncCursor[Row]",
+        migration: Dict[str, Any],
+        backfill: Backfill,
+    ) -> None:
+        """
+        Executes backfill statements chunk by chunk.
+
+        Works like PostgreSQLEngine backfill.
+
+        :param cursor: psycopg async cursor.
+        :param migration: migrations sql queries dict.
+        :param backfill: backfill options.
+
+        :raises Exception: error in backfill query.
+        """
+        await cursor.execute(INITIALIZE_PROGRESS_QUERY)
+        await cursor.execute(GET_PROGRESS_QUERY, {"migration": migration["migration"]})
+        progress = BackfillProgress(migration["migration"], await cursor.fetchone())
+        set_queries, reset_queries = get_settings_queries(migration, False)
+        await self._execute_queries(cursor, set_queries)
+        try:
+            while True:
+                await cursor.execute(*progress.chunk_query(backfill))  # type: ignore
+                start, end, keys_count = await cursor.fetchone()  # type: ignore
+                if not keys_count:
+                    break
+                chunk_rows = await async_run_with_retries(
+                    lambda: self._execute_backfill_chunk(
+                        cursor,
+                        migration,
+                        (start, end),  # noqa: B023
+                        progress,
+                    ),
+                    RetryReport(
+                        progress.describe_chunk((start, end)),
+                        self.retry_policy,
+                    ),
+                )
+                progress.add_chunk(end, chunk_rows)
+                if backfill.sleep:
+                    await asyncio.sleep(backfill.sleep)
+            await cursor.execute(
+                DROP_PROGRESS_QUERY,
+                {"migration": migration["migration"]},
+            )
+        except (Exception, psycopg.DatabaseError) as error:
+            progress.print_stop(error)
+            raise error
+        finally:
+            await self._execute_queries(cursor, reset_queries)
+
+    async def _execute_queries(
+        self,
+        cursor: "psycopg.AsyncCursor[Row]",
+        queries: List[str],
+    ) -> None:
+        """
+        Executes queries one by one.
+
+        :param cursor: psycopg async cursor.
+        :param queries: queries without parameters.
+        """
+        for query in queries:
+            await cursor.execute(query)  # type: ignore
+
+    async def _execute_backfill_chunk(
+        self,
+        cursor: "psycopg.AsyncCursor[Row]",
+        migration: Dict[str, Any],
+        bounds: Tuple[Any, Any],
+        progress: BackfillProgress,
+    ) -> int:
+        """
+        Executes backfill statements for one chunk in transaction.
+
+        :param cursor: psycopg async cursor.
+        :param migration: migrations sql queries dict.
+        :param bounds: first and last key of the chunk.
+        :param progress: progress of the backfill before the chunk.
+
+        :returns: number of changed rows in the chunk.
+        """
+        start, end = bounds
+        chunk_rows = 0
+        async with cursor.connection.transaction():
+            for statement in migration["backfill_statements"]:
+                await self._execute_statement(
+                    cursor,
+                    migration,
+                    statement,
+                    {"start": start, "end": end},
+                )
+                chunk_rows += max(cursor.rowcount, 0)
+            await cursor.execute(
+                SAVE_PROGRESS_QUERY,
+                progress.save_params(end, chunk_rows),
+            )
+        return chunk_rows
+
+    async def _copy_from_file(
+        self,
+        cursor: "psycopg.AsyncCursor[Row]",
+        migration: Dict[str, Any],
+        copy_block: CopyBlock,
+    ) -> None:
+        """
+        Loads data file of copy block with COPY FROM STDIN.
+
+        Chunks are read in a worker thread,
+        so reading and decompression don't block the event loop.
+
+        :param cursor: psycopg async cursor.
+        :param migration: migrations sql queries dict.
+        :param copy_block: copy block.
+
+        :raises Exception: error in data file or in COPY.
+        """
+        started = time.perf_counter()
+        chunks = copy_block.iter_chunks(migration.get("base_dir"))
+        try:
+            async with cursor.copy(copy_block.copy_query()) as copy:  # type: ignore
+                while chunk := await asyncio.to_thread(next, chunks, b""):
+                    await copy.write(chunk)
+        except (Exception, psycopg.DatabaseError) as error:
+            print(f"{migration['migration']}, it not be applied", error)
+            print(f"Failed copy from file:\n{copy_block.path}")
+            raise error
+        finally:
+            chunks.close()
+        if self.profiler.enabled:
+            self.profiler.add_statement(
+                migration["migration"],
+                copy_block.copy_query(),
+                time.perf_counter() - started,
+                cursor.rowcount,
+            )
+
+    async def _execute_statement(
+        self,
+        cursor: "psycopg.AsyncCursor[Row]",
+        migration: Dict[str, Any],
+        query: str,
+        sql_query_params: Any = None,
+    ) -> None:
+        """
+        Executes one statement and records it in the profiler.
+
+        :param cursor: psycopg async cursor.
+        :param migration: migrations sql queries dict.
+        :param query: sql statement.
+        :param sql_query_params: parameters for sql query.
+        """
+        started = time.perf_counter()
+        await cursor.execute(query=query, params=sql_query_params)  # type: ignore
+        self.profiler.add_statement(
+            migration["migration"],
+            query,
+            time.perf_counter() - started,
+            cursor.rowcount,
+        )
+
+    async def _execute_migration_batch(
+        self,
+        cursor: "psycopg.AsyncCursor[Row]",
+        migration: Dict[str, Any],
+        migration_queries: List[str],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+    ) -> None:
+        """
+        Executes migration statements with one query.
+
+        :param cursor: psycopg async cursor.
+        :param migration: migrations sql queries dict.
+        :param migration_queries: migration statements.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+
+        :raises Exception: error in migration query.
+        """
+        batch = STATEMENTS_SEPARATOR.join(migration_queries)
+        try:
+            await self._execute_statement(cursor, migration, batch, sql_query_params)
+        except (Exception, psycopg.DatabaseError) as error:
+            failed_query = None
+            if in_transaction:
+                failed_query = find_failed_query(migration_queries, error)
+            print_failure(migration["migration"], error, failed_query, in_transaction)
+            raise error
+
+    @asynccontextmanager
+    async def _connection(
+        self,
+        autocommit: bool,
+    ) -> AsyncIterator["psycopg.AsyncConnection[Any]"]:
+        """
+        Returns connection to the database.
+
+        :param autocommit: set autocommit for the connection or not.
+
+        :yields: psycopg async connection.
+        """
+        started = time.perf_counter()
+        if not self.connection_pool:
+            connection = await psycopg.AsyncConnection.connect(
+                self.database_url,
+                autocommit=autocommit,
+            )
+            async with connection:
+                await self._profile_connection(connection, started)
+                yield connection
+            return
+
+        pool = await self._get_pool()
+        async with pool.connection() as pool_connection:
+            await pool_connection.set_autocommit(autocommit)
+            await self._profile_connection(pool_connection, started)
+            yield pool_connection
+
+    async def _profile_connection(
+        self,
+        connection: "psycopg.AsyncConnection[Any]",
+        started: float,
+    ) -> None:
+        """
+        Records time to get the connection and its round trip.
+
+        :param connection: psycopg async connection.
+        :param started: time when getting the connection started.
+        """
+        if not self.profiler.enabled:
+            return
+        connected = time.perf_counter()
+        await connection.execute("SELECT 1")
+        round_trip = time.perf_counter() - connected
+        if not connection.autocommit:
+            await connection.rollback()
+        self.profiler.add_connection(connected - started, round_trip)
+
+    async def _get_pool(self) -> Any:
+        """
+        Returns connection pool, opens it on the first call.
+
+        :raises EngineConfigurationError: if psycopg-pool is not installed.
+
+        :returns: psycopg_pool.AsyncConnectionPool.
+        """
+        if self._pool is None:
+            try:
+                from psycopg_pool import AsyncConnectionPool  # noqa: WPS433
+            except ImportError:
+                raise EngineConfigurationError(
+                    "You must install psycopg-pool to use connection_pool.",
+                )
+            self._pool = AsyncConnectionPool(
+                self.database_url,
+                open=False,
+                **self._pool_options(),
+            )
+            await self._pool.open()
+        return self._pool
@@ -1,16 +1,37 @@
+import hashlib
 import sys
-from importlib.metadata import entry_points
+from functools import lru_cache
+from importlib import import_module
+from typing import Any, List, Optional, Type
 
+from pilgrimor import __version__
 from pilgrimor.abc.engine import PilgrimoreEngine
-from pilgrimor.engine.postgresql_engine import PostgreSQLEngine
-from pilgrimor.settings import PilgrimorSettings
+from pilgrimor.settings import ResolvedSettings
+from pilgrimor.startup_cache import read_cache, write_cache
 
+ENGINES_ENTRY_POINT = "pilgrimor_engine"
+ENGINE_CACHE = "engine"
+
+# Built-in engines, modules are imported only when the engine is used.
 engines_map = {
-    "PSQL": PostgreSQLEngine,
+    "PSQL": "pilgrimor.engine.postgresql_engine:PostgreSQLEngine",
+    "MEMORY": "pilgrimor.engine.memory_engine:InMemoryEngine",
 }
 
 
-def get_engine(settings: PilgrimorSettings) -> PilgrimoreEngine:  # noqa: C901
+def import_engine(path: str) -> Type[PilgrimoreEngine]:
+    """
+    Imports engine class.
+
+    :param path: path like `module:ClassName`.
+
+    :returns: engine class.
+    """
+    module_name, class_name = path.split(":")
+    return getattr(import_module(module_name), class_name)  # type: ignore
+
+
+def get_engine(settings: ResolvedSettings) -> Type[PilgrimoreEngine]:
     """
     Returns the engine.
 
@@ -22,13 +43,34 @@ def get_engine(settings: PilgrimorSettings) -> PilgrimoreEngine:  # noqa: C901
 
     :returns: SQL engine.
     """
-    if engine := engines_map.get(settings.database_engine):
-        return engine  # type: ignore
+    return load_engine(settings.database_engine)
+
+
+@lru_cache(maxsize=None)
+def load_engine(database_engine: str) -> Type[PilgrimoreEngine]:  # noqa: C901
+    """
+    Finds and imports the engine once per process.
+
+    Installed distributions are scanned for
+    engine entry points only if the engine is not built-in.
+    Path of the found engine is kept in the startup cache,
+    so they are scanned again only if it can't be imported.
+
+    :param database_engine: engine name from settings.
+
+    :returns: SQL engine.
+    """
+    if engine_path := engines_map.get(database_engine):
+        return import_engine(engine_path)
+
+    cache_key = engine_cache_key(database_engine)
+    if cached_engine := _import_cached_engine(cache_key):
+        return cached_engine
 
-    engine = entry_points().get("pilgrimor_engine")  # type: ignore
+    engine = _engine_entry_points()
 
     if not engine:
-        sys.exit("You set %s database engine, but do not install it.")
+        sys.exit(f"You set {database_engine} database engine, but do not install it.")
 
     if len(engine) > 1:
         sys.exit("You install many migrators. Please install required one.")
@@ -38,10 +80,53 @@ def get_engine(settings: PilgrimorSettings) -> PilgrimoreEngine:  # noqa: C901
     except IndexError:
         sys.exit("Can't load any external engine.")
 
-    if engine.__name__ != settings.database_engine:
+    if engine.__name__ != database_engine:
         sys.exit(
             f"You set {engine.__name__} database engine, "
             f"but install another one or many",
         )
 
-    return engine
+    write_cache(ENGINE_CACHE, cache_key, f"{engine.__module__}:{engine.__name__}")
+    return engine  # type: ignore
+
+
+def engine_cache_key(database_engine: str) -> str:
+    """
+    Returns key of the cached engine path.
+
+    :param database_engine: engine name from settings.
+
+    :returns: hex digest.
+    """
+    key_parts = [__version__, database_engine, sys.executable, sys.path]
+    return hashlib.sha256(repr(key_parts).encode()).hexdigest()
+
+
+def _import_cached_engine(cache_key: str) -> Optional[Type[PilgrimoreEngine]]:
+    """
+    Imports engine found by the previous run.
+
+    :param cache_key: key of the cached engine path.
+
+    :returns: engine class or None if it is not cached or can't be imported.
+    """
+    engine_path = read_cache(ENGINE_CACHE, cache_key)
+    if not isinstance(engine_path, str):
+        return None
+    try:
+        return import_engine(engine_path)
+    except (ImportError, AttributeError, ValueError):
+        return None
+
+
+def _engine_entry_points() -> List[Any]:
+    """
+    Returns installed engine entry points.
+
+    :returns: list of entry points.
+    """
+    from importlib.metadata import entry_points  # noqa: WPS433
+
+    if sys.version_info >= (3, 10):
+        return list(entry_points(group=ENGINES_ENTRY_POINT))
+    return list(entry_points().get(ENGINES_ENTRY_POINT, []))
@@ -0,0 +1,484 @@
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pilgrimor.abc.engine import PilgrimoreEngine
+from pilgrimor.engine.advisory_lock import WAIT_MESSAGE
+from pilgrimor.exceptions import InMemoryEngineError
+from pilgrimor.migrator.state import StateRecord
+from pilgrimor.migrator.system_table import (
+    FINGERPRINT_KEY,
+    FINGERPRINT_QUERY,
+    HISTORY_QUERY,
+    LATEST_VERSION_QUERY,
+    RECORDS_QUERY,
+    STATE_QUERY,
+    VERSIONS_SINCE_QUERY,
+    PostgreSQLSystemTable,
+)
+from pilgrimor.migrator.version_key import version_key
+from pilgrimor.sql.tokenizer import split_statements
+from pilgrimor.utils import attention_text
+
+MEMORY_URL_PREFIX = "memory://"
+SQL_STRING = r"'(?P<{0}>(?:[^']|'')*)'"
+STATEMENT_START = r"^(?:\s|--[^\n]*\n|/\*[\s\S]*?\*/)*"
+
+QueryResult = Optional[List[Any]]
+
+CREATE_TABLE_PATTERN = re.compile(
+    STATEMENT_START + r"CREATE\s+TABLE\s+pilgrimor\s*\(",
+    re.IGNORECASE,
+)
+INSERT_PATTERN = re.compile(
+    STATEMENT_START
+    + r"INSERT\s+INTO\s+pilgrimor\s*\(\s*name\s*,\s*version\b[^)]*\)\s*"
+    + r"(?:VALUES\s*\(|SELECT)\s*{0}\s*,\s*{1}(?:\s*,\s*{2}\s*,\s*{3})?".format(
+        SQL_STRING.format("name"),
+        SQL_STRING.format("version"),
+        SQL_STRING.format("checksum"),
+        SQL_STRING.format("host"),
+    ),
+    re.IGNORECASE,
+)
+COMMENT_PATTERN = re.compile(
+    STATEMENT_START
+    + r"COMMENT\s+ON\s+TABLE\s+pilgrimor\s+IS\s+{0}".format(
+        SQL_STRING.format("comment"),
+    ),
+    re.IGNORECASE,
+)
+CREATE_META_PATTERN = re.compile(
+    STATEMENT_START + r"CREATE\s+TABLE\s+pilgrimor_meta\s*\(",
+    re.IGNORECASE,
+)
+INSERT_META_PATTERN = re.compile(
+    STATEMENT_START
+    + r"INSERT\s+INTO\s+pilgrimor_meta\s*\(\s*key\s*,\s*value\s*\)\s*"
+    + r"VALUES\s*\(\s*{0}\s*,\s*{1}".format(
+        SQL_STRING.format("key"),
+        SQL_STRING.format("value"),
+    ),
+    re.IGNORECASE,
+)
+DELETE_META_PATTERN = re.compile(
+    STATEMENT_START
+    + r"DELETE\s+FROM\s+pilgrimor_meta\s+WHERE\s+key\s*=\s*{0}".format(
+        SQL_STRING.format("key"),
+    ),
+    re.IGNORECASE,
+)
+DELETE_PATTERN = re.compile(
+    STATEMENT_START
+    + r"DELETE\s+FROM\s+pilgrimor\s+WHERE\s+name\s*=\s*{0}".format(
+        SQL_STRING.format("name"),
+    ),
+    re.IGNORECASE,
+)
+
+
+def unquote(sql_string: str) -> str:
+    """
+    Returns value of sql string literal without quotes.
+
+    :param sql_string: literal text between quotes.
+
+    :returns: value.
+    """
+    return sql_string.replace("''", "'")
+
+
+class InMemoryEngine(PilgrimoreEngine):
+    """
+    Engine that keeps pilgrimor table in memory.
+
+    Statements are recorded and not executed,
+    only statements on pilgrimor table are interpreted,
+    so migrations can be planned and checked without a database.
+
+    With `memory://path/to/state.json` url the pilgrimor table
+    is saved to the file after every change and loaded
+    on the next start, with `memory://` it lives
+    as long as the engine.
+
+    It understands statements of PostgreSQL system table,
+    so the versioned schema can be checked without PostgreSQL.
+    """
+
+    system_table = PostgreSQLSystemTable()
+
+    def __init__(self, database_url: str, **engine_options: Any) -> None:
+        """
+        Initialize the engine.
+
+        :param database_url: `memory://` url with optional state file path.
+        :param engine_options: engine specific options, they are ignored.
+        """
+        super().__init__(database_url, **engine_options)
+        self.state_path = database_url[len(MEMORY_URL_PREFIX) :]  # noqa: E203
+        self.initialized = False
+        self.comment: Optional[str] = None
+        self.meta: Optional[Dict[str, str]] = None
+        self.records: List[StateRecord] = []
+        # Hosts of migrations inserted with history.
+        self.hosts: Dict[str, str] = {}
+        self.statements: List[str] = []
+        self.version_migrations: List[Dict[str, Any]] = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._migration_lock = threading.Lock()
+        self._load()
+
+    @contextmanager
+    def migration_lock(self) -> Iterator[bool]:
+        """
+        Holds lock, so only one thread migrates with the engine.
+
+        :yields: True if the lock was taken after waiting for another thread.
+        """
+        waited = not self._migration_lock.acquire(blocking=False)
+        if waited:
+            print(attention_text(WAIT_MESSAGE))
+            self._migration_lock.acquire()
+        try:
+            yield waited
+        finally:
+            self._migration_lock.release()
+
+    def execute_sql_with_return(
+        self,
+        sql_query: str,
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: Optional[bool] = True,
+    ) -> Optional[List[Any]]:
+        """
+        Records sql query and returns result of queries on pilgrimor tables.
+
+        Queries of the system table are known by their text,
+        any other query returns nothing.
+
+        :param sql_query: sql query to execute.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+
+        :return: list with records or None.
+        """
+        with self._lock:
+            self.statements.append(sql_query)
+            if (select := self._query_handlers().get(sql_query)) is None:
+                return None
+            return select(sql_query_params)
+
+    def execute_sql_with_no_return(
+        self,
+        sql_query: str,
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: Optional[bool] = True,
+    ) -> None:
+        """
+        Records sql query.
+
+        :param sql_query: sql query to execute.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        """
+        with self._lock:
+            for statement in split_statements(sql_query):
+                self._execute_statement(statement)
+            self._save()
+
+    def execute_version_migrations(
+        self,
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+    ) -> None:
+        """
+        Records all migrations sql queries.
+
+        Backfill statements are recorded before the statements,
+        like real engines execute them.
+
+        :param version_migrations: sql queries dict by migrations.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        """
+        with self._lock:
+            for migration in version_migrations:
+                statements = migration.get("statements")
+                if statements is None:
+                    statements = split_statements(migration["query"])
+                for statement in migration.get("backfill_statements", []):
+                    self._execute_statement(statement)
+                for statement in statements:
+                    self._execute_statement(statement)
+                self.version_migrations.append(migration)
+                print(f"migration: {migration['migration']} - OK")
+            self._save()
+
+    def _execute_statement(self, statement: str) -> None:
+        """
+        Records statement and applies it to pilgrimor tables.
+
+        :param statement: sql statement.
+        """
+        self.statements.append(statement)
+        for pattern, apply_statement in self._statement_handlers():
+            if match := pattern.match(statement):
+                apply_statement(match)
+                return
+
+    def _statement_handlers(
+        self,
+    ) -> List[Tuple["re.Pattern[str]", Callable[["re.Match[str]"], None]]]:
+        """
+        Returns statements on pilgrimor tables and their handlers.
+
+        :returns: statement patterns with functions that apply them.
+        """
+        return [
+            (CREATE_TABLE_PATTERN, self._create_table),
+            (INSERT_PATTERN, self._insert),
+            (COMMENT_PATTERN, self._comment),
+            (DELETE_PATTERN, self._delete),
+            (CREATE_META_PATTERN, self._create_meta),
+            (INSERT_META_PATTERN, self._insert_meta),
+            (DELETE_META_PATTERN, self._delete_meta),
+        ]
+
+    def _query_handlers(
+        self,
+    ) -> Dict[str, Callable[[Optional[List[Any]]], QueryResult]]:
+        """
+        Returns queries of system table and their handlers.
+
+        :returns: query texts with functions that answer them.
+        """
+        return {
+            STATE_QUERY: self._select_state,
+            RECORDS_QUERY: self._select_state,
+            FINGERPRINT_QUERY: self._select_fingerprint,
+            HISTORY_QUERY: self._select_history,
+            VERSIONS_SINCE_QUERY: self._select_versions_since,
+            LATEST_VERSION_QUERY: self._select_latest_version,
+        }
+
+    def _select_state(self, sql_query_params: Optional[List[Any]]) -> QueryResult:
+        """
+        Returns records of pilgrimor table with its comment.
+
+        :param sql_query_params: parameters of the query.
+
+        :returns: rows, empty table gives one row with the comment only.
+        """
+        self._check_initialized()
+        if not self.records:
+            return [(None, None, None, self.comment)]
+        return [(*record, self.comment) for record in self.records]
+
+    def _select_fingerprint(
+        self,
+        sql_query_params: Optional[List[Any]],
+    ) -> QueryResult:
+        """
+        Returns comment of pilgrimor table with saved fingerprint.
+
+        :param sql_query_params: parameters of the query.
+
+        :returns: comment and fingerprint or None if it isn't saved.
+        """
+        self._check_initialized()
+        fingerprint = self._get_meta().get(FINGERPRINT_KEY)
+        if fingerprint is None:
+            return None
+        return [self.comment, fingerprint]
+
+    def _select_history(self, sql_query_params: Optional[List[Any]]) -> QueryResult:
+        """
+        Returns records inserted with history.
+
+        Statements are not executed, so durations are zero
+        and times and rows are unknown.
+
+        :param sql_query_params: parameters of the query.
+
+        :returns: rows of HISTORY_COLUMNS or None.
+        """
+        self._check_initialized()
+        history = [
+            (name, version, self.hosts[name], None, None, 0.0, None)
+            for _, name, version in self.records
+            if name in self.hosts
+        ]
+        return history or None
+
+    def _select_versions_since(
+        self,
+        sql_query_params: Optional[List[Any]],
+    ) -> QueryResult:
+        """
+        Returns records with version key not less than the parameter.
+
+        :param sql_query_params: version key.
+
+        :returns: (name, version, version_key) rows or None.
+        """
+        since_key = (sql_query_params or [""])[0]
+        found = [record for record in self._keyed_records() if record[2] >= since_key]
+        return found or None
+
+    def _select_latest_version(
+        self,
+        sql_query_params: Optional[List[Any]],
+    ) -> QueryResult:
+        """
+        Returns records of the version with the biggest key.
+
+        :param sql_query_params: parameters of the query.
+
+        :returns: (name, version, version_key) rows or None.
+        """
+        keyed = self._keyed_records()
+        if not keyed:
+            return None
+        latest = max(keyed, key=lambda record: record[2])[1]
+        return [record for record in keyed if record[1] == latest]
+
+    def _create_table(self, match: "re.Match[str]") -> None:
+        """
+        Creates pilgrimor table.
+
+        :param match: matched statement.
+
+        :raises InMemoryEngineError: if pilgrimor table exists.
+        """
+        if self.initialized:
+            raise InMemoryEngineError('relation "pilgrimor" already exists')
+        self.initialized = True
+
+    def _insert(self, match: "re.Match[str]") -> None:
+        """
+        Inserts migration record into pilgrimor table.
+
+        :param match: matched statement with name and version,
+            and with checksum and host if history is inserted too.
+        """
+        self._check_initialized()
+        name = unquote(match.group("name"))
+        self.records.append((self._next_id, name, unquote(match.group("version"))))
+        self._next_id += 1
+        if (host := match.group("host")) is not None:
+            self.hosts[name] = unquote(host)
+
+    def _comment(self, match: "re.Match[str]") -> None:
+        """
+        Sets comment of pilgrimor table.
+
+        :param match: matched statement with comment.
+        """
+        self._check_initialized()
+        self.comment = unquote(match.group("comment"))
+
+    def _delete(self, match: "re.Match[str]") -> None:
+        """
+        Deletes migration record from pilgrimor table.
+
+        :param match: matched statement with name.
+        """
+        self._check_initialized()
+        name = unquote(match.group("name"))
+        self.records = [record for record in self.records if record[1] != name]
+        self.hosts.pop(name, None)
+
+    def _create_meta(self, match: "re.Match[str]") -> None:
+        """
+        Creates pilgrimor_meta table.
+
+        :param match: matched statement.
+
+        :raises InMemoryEngineError: if pilgrimor_meta table exists.
+        """
+        if self.meta is not None:
+            raise InMemoryEngineError('relation "pilgrimor_meta" already exists')
+        self.meta = {}
+
+    def _insert_meta(self, match: "re.Match[str]") -> None:
+        """
+        Inserts or updates value in pilgrimor_meta table.
+
+        :param match: matched statement with key and value.
+        """
+        self._get_meta()[unquote(match.group("key"))] = unquote(match.group("value"))
+
+    def _delete_meta(self, match: "re.Match[str]") -> None:
+        """
+        Deletes value from pilgrimor_meta table.
+
+        :param match: matched statement with key.
+        """
+        self._get_meta().pop(unquote(match.group("key")), None)
+
+    def _keyed_records(self) -> List[Tuple[str, str, str]]:
+        """
+        Returns records with version keys, like version_key column has them.
+
+        :returns: (name, version, version_key) records in apply order.
+        """
+        self._check_initialized()
+        return [
+            (name, version, version_key(version)) for _, name, version in self.records
+        ]
+
+    def _check_initialized(self) -> None:
+        """
+        Checks pilgrimor table exists.
+
+        :raises InMemoryEngineError: if pilgrimor table does not exist.
+        """
+        if not self.initialized:
+            raise InMemoryEngineError('relation "pilgrimor" does not exist')
+
+    def _get_meta(self) -> Dict[str, str]:
+        """
+        Returns pilgrimor_meta table.
+
+        :raises InMemoryEngineError: if pilgrimor_meta table does not exist.
+
+        :returns: values by keys.
+        """
+        if self.meta is None:
+            raise InMemoryEngineError('relation "pilgrimor_meta" does not exist')
+        return self.meta
+
+    def _load(self) -> None:
+        """Loads pilgrimor table from the state file if it exists."""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, "r") as state_file:
+            state = json.load(state_file)
+        self.initialized = state["initialized"]
+        self.comment = state.get("comment")
+        self.meta = state.get("meta")
+        self.hosts = state.get("hosts", {})
+        self.records = [tuple(record) for record in state["records"]]  # type: ignore
+        self._next_id = state["next_id"]
+
+    def _save(self) -> None:
+        """Saves pilgrimor table to the state file."""
+        if not self.state_path:
+            return
+        with open(self.state_path, "w") as state_file:
+            json.dump(
+                {
+                    "initialized": self.initialized,
+                    "comment": self.comment,
+                    "meta": self.meta,
+                    "hosts": self.hosts,
+                    "records": self.records,
+                    "next_id": self._next_id,
+                },
+                state_file,
+            )
@@ -1,18 +1,538 @@
 import sys
-from typing import Any, Dict, List, Optional
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 from psycopg.rows import Row
 
-from pilgrimor.abc.engine import PilgrimoreEngine
-from pilgrimor.utils import error_text
+from pilgrimor.abc.engine import BasePilgrimoreEngine, PilgrimoreEngine
+from pilgrimor.engine.advisory_lock import advisory_lock
+from pilgrimor.engine.retry import RetryPolicy, RetryReport, run_with_retries
+from pilgrimor.engine.scheduler import run_migration_graph
+from pilgrimor.exceptions import EngineConfigurationError
+from pilgrimor.migrator.system_table import PostgreSQLSystemTable
+from pilgrimor.sql.backfill import (
+    DROP_PROGRESS_QUERY,
+    GET_PROGRESS_QUERY,
+    INITIALIZE_PROGRESS_QUERY,
+    SAVE_PROGRESS_QUERY,
+    Backfill,
+)
+from pilgrimor.sql.copy_blocks import CopyBlock, has_copy_blocks, parse_copy_block
+from pilgrimor.sql.tokenizer import split_statements
+from pilgrimor.utils import error_text, warning_text
 
 try:
     import psycopg  # noqa: WPS433
 except ImportError:
     sys.exit(error_text("You must install psycopg, psycopg-c and psycopg-binary."))
 
+STATEMENTS_SEPARATOR = "\n;\n"
 
-class PostgreSQLEngine(PilgrimoreEngine):
+
+def get_migration_queries(
+    migration: Dict[str, Any],
+    in_transaction: bool = True,
+) -> List[str]:
+    """
+    Returns statements of the migration.
+
+    If migration has settings, they are set before
+    the statements and reset after them,
+    in transaction with SET LOCAL.
+
+    :param migration: migrations sql queries dict.
+    :param in_transaction: migration is executed in transaction or not.
+
+    :returns: list with statements.
+    """
+    migration_queries = migration.get("statements")
+    if migration_queries is None:
+        migration_queries = split_statements(migration["query"])
+    if not migration.get("settings"):
+        return migration_queries  # type: ignore
+
+    set_queries, reset_queries = get_settings_queries(migration, in_transaction)
+    return [*set_queries, *migration_queries, *reset_queries]
+
+
+def get_settings_queries(
+    migration: Dict[str, Any],
+    in_transaction: bool = True,
+) -> Tuple[List[str], List[str]]:
+    """
+    Returns queries that set and reset settings of the migration.
+
+    :param migration: migrations sql queries dict.
+    :param in_transaction: migration is executed in transaction or not.
+
+    :returns: set queries and reset queries.
+    """
+    scope = "SET LOCAL" if in_transaction else "SET"
+    set_queries = []
+    reset_queries = []
+    for name, setting_value in (migration.get("settings") or {}).items():
+        quoted_value = setting_value.replace("'", "''")
+        set_queries.append(f"{scope} {name} = '{quoted_value}'")
+        if in_transaction:
+            reset_queries.append(f"SET LOCAL {name} TO DEFAULT")
+        else:
+            reset_queries.append(f"RESET {name}")
+    return set_queries, reset_queries
+
+
+def split_copy_blocks(
+    migration_queries: List[str],
+) -> List[Union[CopyBlock, List[str]]]:
+    """
+    Splits statements into copy blocks and lists of other statements.
+
+    :param migration_queries: statements of the migration.
+
+    :returns: copy blocks and statements between them in the original order.
+    """
+    parts: List[Union[CopyBlock, List[str]]] = []
+    for query in migration_queries:
+        if copy_block := parse_copy_block(query):
+            parts.append(copy_block)
+        elif parts and isinstance(parts[-1], list):
+            parts[-1].append(query)
+        else:
+            parts.append([query])
+    return parts
+
+
+def migrations_have_copy_blocks(version_migrations: List[Dict[str, Any]]) -> bool:
+    """
+    Checks if any migration has copy blocks.
+
+    :param version_migrations: sql queries dict by migrations.
+
+    :returns: True if there are copy blocks.
+    """
+    return any(
+        has_copy_blocks(get_migration_queries(migration))
+        for migration in version_migrations
+    )
+
+
+class BackfillProgress:
+    """
+    Progress of backfill in pilgrimor_backfill table and in this run.
+
+    Sync and asyncio engines execute the same queries
+    with these values and print the same lines.
+    """
+
+    def __init__(self, migration: str, saved: Optional[Any]) -> None:
+        """
+        Initialize progress with saved progress of the migration.
+
+        :param migration: migration name.
+        :param saved: row with last key and changed rows of previous runs
+            or None if backfill is not started.
+        """
+        self.migration = migration
+        self.after: Any = None
+        self.rows = 0
+        if saved is not None:
+            self.after, self.rows = saved
+        self.run_rows = 0
+        self.started = time.perf_counter()
+        if self.after is not None:
+            print(
+                f"{migration}: continue backfill after {self.after}, "
+                f"{self.rows} rows done",
+            )
+
+    def chunk_query(self, backfill: Backfill) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Returns query with bounds of the next chunk and its parameters.
+
+        :param backfill: backfill options.
+
+        :returns: query and parameters.
+        """
+        if self.after is None:
+            return backfill.chunk_query(resume=False), None
+        return backfill.chunk_query(resume=True), {"after": self.after}
+
+    def save_params(self, last_key: Any, chunk_rows: int) -> Dict[str, Any]:
+        """
+        Returns parameters of query that saves progress with the chunk.
+
+        :param last_key: last key of the chunk.
+        :param chunk_rows: number of changed rows in the chunk.
+
+        :returns: dict with parameters.
+        """
+        return {
+            "migration": self.migration,
+            "last_key": str(last_key),
+            "rows": self.rows + chunk_rows,
+        }
+
+    def add_chunk(self, last_key: Any, chunk_rows: int) -> None:
+        """
+        Adds committed chunk and prints progress line with rows per second.
+
+        :param last_key: last key of the chunk.
+        :param chunk_rows: number of changed rows in the chunk.
+        """
+        self.after = last_key
+        self.rows += chunk_rows
+        self.run_rows += chunk_rows
+        rows_per_second = self.run_rows / max(time.perf_counter() - self.started, 1e-6)
+        print(
+            f"{self.migration}: {self.rows} rows, {rows_per_second:.0f} rows/s, "
+            f"last key {last_key}",
+        )
+
+    def describe_chunk(self, bounds: Tuple[Any, Any]) -> str:
+        """
+        Returns chunk name for retry messages.
+
+        :param bounds: first and last key of the chunk.
+
+        :returns: migration name with chunk bounds.
+        """
+        return f"{self.migration} chunk {bounds[0]} - {bounds[1]}"
+
+    def print_stop(self, error: Exception) -> None:
+        """
+        Prints key after which the failed backfill continues.
+
+        :param error: error in backfill query.
+        """
+        print(f"{self.migration}, backfill stopped after key {self.after}", error)
+
+
+def with_default_settings(
+    version_migrations: List[Dict[str, Any]],
+    default_settings: Dict[str, str],
+) -> List[Dict[str, Any]]:
+    """
+    Adds settings to migrations that don't set them.
+
+    :param version_migrations: sql queries dict by migrations.
+    :param default_settings: settings for all migrations.
+
+    :returns: copies of migrations with settings.
+    """
+    return [
+        {
+            **migration,
+            "settings": {**default_settings, **(migration.get("settings") or {})},
+        }
+        for migration in version_migrations
+    ]
+
+
+def describe_migrations(version_migrations: List[Dict[str, Any]]) -> str:
+    """
+    Returns names of migrations for messages.
+
+    :param version_migrations: sql queries dict by migrations.
+
+    :returns: comma separated names.
+    """
+    return ", ".join(migration["migration"] for migration in version_migrations)
+
+
+def split_by_transaction(
+    version_migrations: List[Dict[str, Any]],
+    in_transaction: bool = True,
+) -> List[Tuple[bool, List[Dict[str, Any]]]]:
+    """
+    Groups consecutive migrations with the same transaction mode.
+
+    Mode of migration is taken from `in_transaction` key,
+    in_transaction argument is used for migrations without it.
+
+    :param version_migrations: sql queries dict by migrations.
+    :param in_transaction: default transaction mode.
+
+    :returns: list with transaction mode and migrations of every group.
+    """
+    groups: List[Tuple[bool, List[Dict[str, Any]]]] = []
+    for migration in version_migrations:
+        migration_in_transaction = migration.get("in_transaction", in_transaction)
+        if groups and groups[-1][0] == migration_in_transaction:
+            groups[-1][1].append(migration)
+        else:
+            groups.append((migration_in_transaction, [migration]))
+    return groups
+
+
+def find_failed_query(
+    migration_queries: List[str],
+    error: Exception,
+) -> Optional[str]:
+    """
+    Finds batch statement by error position.
+
+    :param migration_queries: statements of the batch.
+    :param error: error from the database.
+
+    :returns: failed statement or None if position is unknown.
+    """
+    diag = getattr(error, "diag", None)
+    if diag is None or not diag.statement_position:
+        return None
+    error_position = int(diag.statement_position) - 1
+    query_start = 0
+    for query in migration_queries:
+        query_end = query_start + len(query)
+        if error_position <= query_end:
+            return query
+        query_start = query_end + len(STATEMENTS_SEPARATOR)
+    return None
+
+
+def find_pipeline_failure(
+    version_migrations: List[Dict[str, Any]],
+    executed: List[Tuple[Dict[str, Any], str, Any]],
+) -> Tuple[str, Optional[str]]:
+    """
+    Finds failed migration and statement of pipeline.
+
+    Every statement has its own cursor, so after an error
+    the first cursor without result is the failed statement.
+
+    :param version_migrations: sql queries dict by migrations.
+    :param executed: migration, statement and cursor of sent statements.
+
+    :returns: name of failed migration and failed statement if it is known.
+    """
+    for migration, query, cursor in executed:
+        if cursor.pgresult is None:
+            return migration["migration"], query
+    return version_migrations[0]["migration"], None
+
+
+def migration_parts(
+    migration_queries: List[str],
+    batched: bool,
+) -> List[Union[CopyBlock, List[str]]]:
+    """
+    Returns copy blocks and statements to send with one query.
+
+    :param migration_queries: statements of the migration.
+    :param batched: send statements between copy blocks with one query or not.
+
+    :returns: copy blocks and lists of statements in the original order.
+    """
+    if batched:
+        return split_copy_blocks(migration_queries)
+    return [parse_copy_block(query) or [query] for query in migration_queries]
+
+
+def print_failure(
+    migration_name: str,
+    error: Exception,
+    failed_query: Optional[str] = None,
+    in_transaction: bool = True,
+) -> None:
+    """
+    Prints failed migration and statement.
+
+    :param migration_name: name of failed migration.
+    :param error: error from the database.
+    :param failed_query: failed statement if it is known.
+    :param in_transaction: migration was executed in transaction or not.
+    """
+    print(f"{migration_name}, it not be applied", error)
+    if failed_query:
+        print(f"Failed statement:\n{failed_query}")
+    if in_transaction:
+        print("All version migrations will be rollback")
+
+
+def form_result(result: Any) -> Optional[List[Any]]:
+    """
+    Create list with record from query result.
+
+    :param result: result from query.
+
+    :returns: :return: None or list with results.
+    """
+    result_length = len(result)
+
+    if result_length == 1:
+        return list(result[0])
+    elif result_length == 0:
+        return None
+
+    to_return_result = []
+    for record in result:
+        if len(record) == 1:
+            to_return_result.append(record[0])
+        elif len(record) > 1:
+            to_return_result.append(record)
+    return to_return_result
+
+
+class BasePostgreSQLEngine(BasePilgrimoreEngine):
+    """
+    Options and helpers of sync and asyncio PostgreSQL engines.
+
+    PostgreSQLEngine and AsyncPostgreSQLEngine decide
+    what to execute with these methods,
+    they differ only in the way they execute it.
+    """
+
+    system_table = PostgreSQLSystemTable()
+
+    def __init__(
+        self,
+        database_url: str,
+        connection_pool: bool = False,
+        pool_min_size: int = 1,
+        pool_max_size: int = 4,
+        pipeline: bool = False,
+        parallel_migrations: int = 1,
+        lock_timeout: Optional[str] = None,
+        lock_retries: int = 0,
+        lock_retry_delay: float = 0.5,
+        lock_retry_max_delay: float = 30,
+        leader_election: bool = False,
+        leader_poll_interval: float = 1,
+        **engine_options: Any,
+    ) -> None:
+        """
+        Initialize the engine.
+
+        If connection_pool is True, all queries share connections
+        from one pool, which lives until the engine is closed.
+        Otherwise every query opens its own connection.
+
+        :param database_url: url to database.
+        :param connection_pool: use connection pool or not.
+        :param pool_min_size: minimum number of connections in the pool.
+        :param pool_max_size: maximum number of connections in the pool.
+        :param pipeline: execute versions in transaction in pipeline mode or not.
+        :param parallel_migrations: number of independent migrations
+            executed not in transaction at the same time.
+        :param lock_timeout: lock_timeout for migrations without
+            lock_timeout directive.
+        :param lock_retries: number of retries after lock timeout,
+            deadlock and serialization errors.
+        :param lock_retry_delay: delay before the first retry in seconds.
+        :param lock_retry_max_delay: maximum delay before retry in seconds.
+        :param leader_election: let only one runner migrate
+            the database at a time or not.
+        :param leader_poll_interval: maximum seconds between tries
+            of the migration lock while another runner holds it.
+        :param engine_options: other engine options.
+        """
+        super().__init__(database_url, **engine_options)
+        self.connection_pool = connection_pool
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pipeline = pipeline
+        self.parallel_migrations = parallel_migrations
+        self.lock_timeout = lock_timeout
+        self.retry_policy = RetryPolicy(
+            retries=lock_retries,
+            delay=lock_retry_delay,
+            max_delay=lock_retry_max_delay,
+        )
+        self.leader_election = leader_election
+        self.leader_poll_interval = leader_poll_interval
+        self._pool: Optional[Any] = None
+        self._own_pool = True
+
+    def _check_lock_pool(self) -> None:
+        """
+        Checks the pool has a connection for migrations while the lock is held.
+
+        :raises EngineConfigurationError: if the pool is too small for the lock.
+        """
+        if self._own_pool and self.connection_pool and self.pool_max_size < 2:
+            raise EngineConfigurationError(
+                "leader_election with connection_pool "
+                "needs pool_max_size of at least 2.",
+            )
+
+    def _pool_options(self) -> Dict[str, Any]:
+        """
+        Returns options of the connection pool opened by the engine.
+
+        :returns: keyword arguments for psycopg_pool pools.
+        """
+        return {"min_size": self.pool_min_size, "max_size": self.pool_max_size}
+
+    def _with_lock_timeout(
+        self,
+        version_migrations: List[Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Adds lock_timeout to migrations without lock_timeout directive.
+
+        :param version_migrations: sql queries dict by migrations.
+
+        :returns: migrations with lock_timeout if it is set for the engine.
+        """
+        if not self.lock_timeout:
+            return version_migrations
+        return with_default_settings(
+            version_migrations,
+            {"lock_timeout": self.lock_timeout},
+        )
+
+    def _is_batched(
+        self,
+        sql_query_params: Optional[List[Any]],
+        in_transaction: bool,
+    ) -> bool:
+        """
+        Checks if statements between copy blocks are sent with one query.
+
+        Statements are batched in transaction without parameters,
+        unless the profiler measures every statement.
+
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+
+        :returns: True if statements are batched.
+        """
+        return in_transaction and sql_query_params is None and not self.profiler.enabled
+
+    def _use_pipeline(self, version_migrations: List[Dict[str, Any]]) -> bool:
+        """
+        Checks if migrations in transaction are executed in pipeline mode.
+
+        Pipeline is not used with the profiler and with copy blocks.
+
+        :param version_migrations: sql queries dict by migrations.
+
+        :returns: True if pipeline mode is used.
+        """
+        if not self._is_pipeline_available() or self.profiler.enabled:
+            return False
+        return not migrations_have_copy_blocks(version_migrations)
+
+    def _is_pipeline_available(self) -> bool:
+        """
+        Checks if pipeline mode is enabled and supported by libpq.
+
+        :returns: True if pipeline mode can be used.
+        """
+        if not self.pipeline:
+            return False
+        if psycopg.Pipeline.is_supported():
+            return True
+        print(
+            warning_text(
+                "Pipeline mode is not supported by libpq, "
+                "migrations will be executed without it.",
+            ),
+        )
+        self.pipeline = False
+        return False
+
+
+class PostgreSQLEngine(BasePostgreSQLEngine, PilgrimoreEngine):
     """
     Engine to execute sql quries.
 
@@ -33,13 +553,33 @@ class PostgreSQLEngine(PilgrimoreEngine):
     then the rest will be in a transaction.
     """
 
-    def __init__(self, database_url: str) -> None:
+    def close(self) -> None:
+        """Closes connection pool if it was opened."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    @contextmanager
+    def migration_lock(self) -> Iterator[bool]:
         """
-        Creates connection pool.
+        Holds advisory lock, so only one runner migrates the database.
 
-        :param database_url: url to database.
+        Lock is held by a separate connection, from the pool
+        if connection_pool is set, so the pool needs one more
+        connection for migrations. Lock is released
+        by the database if the runner dies.
+
+        :raises EngineConfigurationError: if the pool is too small for the lock.
+
+        :yields: True if the lock was taken after waiting for another runner.
         """
-        self.database_url = database_url
+        if not self.leader_election:
+            yield False
+            return
+        self._check_lock_pool()
+        with self._connection(autocommit=True) as connection:
+            with advisory_lock(connection, self.leader_poll_interval) as waited:
+                yield waited
 
     def execute_sql_with_return(
         self,
@@ -62,7 +602,7 @@ class PostgreSQLEngine(PilgrimoreEngine):
         if not in_transaction:
             autocommit = True
 
-        with psycopg.connect(self.database_url, autocommit=autocommit) as connection:
+        with self._connection(autocommit=autocommit) as connection:
             with connection.cursor() as cursor:
                 cursor.execute(
                     query=sql_query,
@@ -70,7 +610,7 @@ class PostgreSQLEngine(PilgrimoreEngine):
                 )
                 result = cursor.fetchall()
 
-        return self._form_result(result=result)
+        return form_result(result=result)
 
     def execute_sql_with_no_return(
         self,
@@ -91,7 +631,7 @@ class PostgreSQLEngine(PilgrimoreEngine):
         if not in_transaction:
             autocommit = True
 
-        with psycopg.connect(self.database_url, autocommit=autocommit) as connection:
+        with self._connection(autocommit=autocommit) as connection:
             with connection.cursor() as cursor:
                 cursor.execute(
                     query=sql_query,
@@ -100,55 +640,307 @@ class PostgreSQLEngine(PilgrimoreEngine):
 
     def execute_version_migrations(
         self,
-        version_migrations: List[Dict[str, str]],
+        version_migrations: List[Dict[str, Any]],
         sql_query_params: Optional[List[Any]] = None,
         in_transaction: bool = True,
     ) -> None:
         """
         Executes all migrations sql queries and do not return any output.
 
+        Consecutive migrations in transaction are executed
+        in one transaction, every group of migrations
+        not in transaction is executed between them.
+
+        If pipeline is set, migrations in transaction
+        are executed in pipeline mode.
+        If parallel_migrations is bigger than 1, migrations
+        not in transaction are executed on separate connections,
+        independent migrations at the same time.
+
+        After lock timeout, deadlock and serialization errors
+        the transaction of the group is retried, not in transaction
+        the failed statement is retried.
+
+        :param version_migrations: sql queries dict by migrations.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute migrations without
+            `in_transaction` key in transaction or not.
+        """
+        for group_in_transaction, migrations_group in split_by_transaction(
+            self._with_lock_timeout(version_migrations),
+            in_transaction,
+        ):
+            self._execute_migrations_group(
+                migrations_group,
+                sql_query_params,
+                group_in_transaction,
+            )
+
+    def _execute_migrations_group(
+        self,
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+    ) -> None:
+        """
+        Executes migrations with the same transaction mode.
+
+        :param version_migrations: sql queries dict by migrations.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        """
+        if not in_transaction and self.parallel_migrations > 1:
+            run_migration_graph(
+                version_migrations,
+                lambda migration: self._execute_autocommit_migration(
+                    migration,
+                    sql_query_params,
+                ),
+                self.parallel_migrations,
+            )
+            return
+
+        if in_transaction:
+            report = RetryReport(
+                describe_migrations(version_migrations),
+                self.retry_policy,
+            )
+            run_with_retries(
+                lambda: self._execute_migrations_on_connection(
+                    version_migrations,
+                    sql_query_params,
+                    in_transaction,
+                    report,
+                ),
+                report,
+            )
+            return
+        self._execute_migrations_on_connection(
+            version_migrations,
+            sql_query_params,
+            in_transaction,
+        )
+
+    def _execute_migrations_on_connection(
+        self,
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+        report: Optional[RetryReport] = None,
+    ) -> None:
+        """
+        Executes migrations with the same transaction mode on one connection.
+
         :param version_migrations: sql queries dict by migrations.
         :param sql_query_params: parameters for sql query.
         :param in_transaction: execute in transaction or not.
+        :param report: report of retries to measure migrations in.
         """
         autocommit = False
         if not in_transaction:
             autocommit = True
-        connection = psycopg.connect(self.database_url, autocommit=autocommit)
-        cursor = connection.cursor()
-        if in_transaction:
-            with connection.transaction():
-                for tr_migration in version_migrations:
-                    self._execute_migration_operations(
+        with self._connection(autocommit=autocommit) as connection:
+            if in_transaction and self._use_pipeline(version_migrations):
+                self._execute_pipeline_migrations(
+                    connection,
+                    version_migrations,
+                    sql_query_params,
+                )
+                return
+
+            cursor = connection.cursor()
+            if in_transaction:
+                with connection.transaction():
+                    self._execute_migrations_on_cursor(
                         cursor,
-                        tr_migration,
+                        version_migrations,
                         sql_query_params,
                         in_transaction,
+                        report,
                     )
-                    print(f"migration: {tr_migration['migration']} - OK")
-            connection.close()
-        else:
-            for migration in version_migrations:
+            else:
+                self._execute_migrations_on_cursor(
+                    cursor,
+                    version_migrations,
+                    sql_query_params,
+                    in_transaction,
+                    report,
+                )
+            cursor.close()
+
+    def _execute_migrations_on_cursor(
+        self,
+        cursor: psycopg.Cursor[Row],
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+        report: Optional[RetryReport] = None,
+    ) -> None:
+        """
+        Executes migrations one by one on the cursor.
+
+        :param cursor: psycopg driver cursor.
+        :param version_migrations: sql queries dict by migrations.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+        :param report: report of retries to measure migrations in.
+        """
+        for migration in version_migrations:
+            with report.measure(migration["migration"]) if report else nullcontext():
                 self._execute_migration_operations(
                     cursor,
                     migration,
                     sql_query_params,
                     in_transaction,
                 )
-                print(f"migration: {migration['migration']} - OK")
-            cursor.close()
-            connection.close()
+            print(f"migration: {migration['migration']} - OK")
+
+    def _execute_autocommit_migration(
+        self,
+        migration: Dict[str, Any],
+        sql_query_params: Optional[List[Any]] = None,
+    ) -> None:
+        """
+        Executes one migration not in transaction on its own connection.
+
+        :param migration: migrations sql queries dict.
+        :param sql_query_params: parameters for sql query.
+        """
+        with self._connection(autocommit=True) as connection:
+            with connection.cursor() as cursor:
+                self._execute_migration_operations(
+                    cursor,
+                    migration,
+                    sql_query_params,
+                    in_transaction=False,
+                )
+        print(f"migration: {migration['migration']} - OK")
+
+    def _execute_pipeline_migrations(
+        self,
+        connection: "psycopg.Connection[Any]",
+        version_migrations: List[Dict[str, Any]],
+        sql_query_params: Optional[List[Any]] = None,
+    ) -> None:
+        """
+        Executes migrations in one transaction in pipeline mode.
+
+        Statements are sent without waiting for results,
+        every statement has its own cursor to find the failed one.
+
+        :param connection: psycopg connection.
+        :param version_migrations: sql queries dict by migrations.
+        :param sql_query_params: parameters for sql query.
+
+        :raises Exception: error in migration query.
+        """
+        executed: List[Tuple[Dict[str, Any], str, "psycopg.Cursor[Any]"]] = []
+        try:
+            with connection.pipeline():
+                with connection.transaction():
+                    for migration in version_migrations:
+                        for query in get_migration_queries(migration, True):
+                            cursor = connection.cursor()
+                            cursor.execute(query=query, params=sql_query_params)
+                            executed.append((migration, query, cursor))
+        except (Exception, psycopg.DatabaseError) as error:
+            failed_migration, failed_query = find_pipeline_failure(
+                version_migrations,
+                executed,
+            )
+            print_failure(failed_migration, error, failed_query)
+            raise error
+
+        for migration in version_migrations:
+            print(f"migration: {migration['migration']} - OK")
+
+    @contextmanager
+    def _connection(self, autocommit: bool) -> Iterator["psycopg.Connection[Any]"]:
+        """
+        Returns connection to the database.
+
+        Takes connection from the pool if connection_pool is set,
+        else opens new connection and closes it after use.
+
+        :param autocommit: set autocommit for the connection or not.
+
+        :yields: psycopg connection.
+        """
+        started = time.perf_counter()
+        if not self.connection_pool:
+            with psycopg.connect(
+                self.database_url,
+                autocommit=autocommit,
+            ) as connection:
+                self._profile_connection(connection, started)
+                yield connection
+            return
+
+        with self._get_pool().connection() as pool_connection:
+            pool_connection.autocommit = autocommit
+            self._profile_connection(pool_connection, started)
+            yield pool_connection
+
+    def _profile_connection(
+        self,
+        connection: "psycopg.Connection[Any]",
+        started: float,
+    ) -> None:
+        """
+        Records time to get the connection and its round trip.
+
+        Round trip is measured with `SELECT 1`,
+        transaction opened by it is rolled back.
+
+        :param connection: psycopg connection.
+        :param started: time when getting the connection started.
+        """
+        if not self.profiler.enabled:
+            return
+        connected = time.perf_counter()
+        connection.execute("SELECT 1")
+        round_trip = time.perf_counter() - connected
+        if not connection.autocommit:
+            connection.rollback()
+        self.profiler.add_connection(connected - started, round_trip)
+
+    def _get_pool(self) -> Any:
+        """
+        Returns connection pool, opens it on the first call.
+
+        :raises EngineConfigurationError: if psycopg-pool is not installed.
+
+        :returns: psycopg_pool.ConnectionPool.
+        """
+        if self._pool is None:
+            try:
+                from psycopg_pool import ConnectionPool  # noqa: WPS433
+            except ImportError:
+                raise EngineConfigurationError(
+                    "You must install psycopg-pool to use connection_pool.",
+                )
+            self._pool = ConnectionPool(
+                self.database_url,
+                open=True,
+                **self._pool_options(),
+            )
+        return self._pool
 
     def _execute_migration_operations(
         self,
         cursor: psycopg.Cursor[Row],
-        migration: Dict[str, str],
+        migration: Dict[str, Any],
         sql_query_params: Optional[List[Any]] = None,
         in_transaction: bool = True,
     ) -> None:
         """
         Executes all operation sql queries in one migration.
 
+        In transaction without parameters all statements
+        between copy blocks are sent to the database in one batch,
+        unless the profiler is enabled.
+        Backfill is executed before the statements.
+
         :param cursor: psycopg driver cursir
         :param migration: migrations sql queries dict.
         :param sql_query_params: parameters for sql query.
@@ -156,39 +948,208 @@ class PostgreSQLEngine(PilgrimoreEngine):
 
         :raises Exception: error in migration query.
         """
-        migration_queries = migration["query"].split(";")
-        for query in migration_queries:
-            try:
-                cursor.execute(
-                    query=query,
-                    params=sql_query_params,
+        if backfill := migration.get("backfill"):
+            self._execute_backfill(cursor, migration, backfill)
+
+        migration_queries = get_migration_queries(migration, in_transaction)
+        batched = self._is_batched(sql_query_params, in_transaction)
+        for part in migration_parts(migration_queries, batched):
+            if isinstance(part, CopyBlock):
+                self._copy_from_file(cursor, migration, part)
+            else:
+                self._execute_migration_batch(
+                    cursor,
+                    migration,
+                    part,
+                    sql_query_params,
+                    in_transaction,
                 )
-            except (Exception, psycopg.DatabaseError) as error:
-                print(f"{migration['migration']}, it not be applied", error)
-                if not in_transaction:
-                    continue
-                print("All version migrations will be rollback")
-                raise error
 
-    def _form_result(self, result: Any) -> Optional[List[Any]]:
+    def _execute_backfill(
+        self,
+        cursor: psycopg.Cursor[Row],
+        migration: Dict[str, Any],
+        backfill: Backfill,
+    ) -> None:
         """
-        Create list with record from query result.
+        Executes backfill statements chunk by chunk.
 
-        :param result: result from query.
+        Every chunk is committed together with its last key
+        in pilgrimor_backfill table, so the next run
+        continues after the last committed chunk.
 
-        :returns: :return: None or list with results.
+        :param cursor: psycopg driver cursor.
+        :param migration: migrations sql queries dict.
+        :param backfill: backfill options.
+
+        :raises Exception: error in backfill query.
         """
-        result_length = len(result)
+        cursor.execute(INITIALIZE_PROGRESS_QUERY)
+        cursor.execute(GET_PROGRESS_QUERY, {"migration": migration["migration"]})
+        progress = BackfillProgress(migration["migration"], cursor.fetchone())
+        set_queries, reset_queries = get_settings_queries(migration, False)
+        self._execute_queries(cursor, set_queries)
+        try:
+            while True:
+                cursor.execute(*progress.chunk_query(backfill))  # type: ignore
+                start, end, keys_count = cursor.fetchone()  # type: ignore
+                if not keys_count:
+                    break
+                chunk_rows = run_with_retries(
+                    lambda: self._execute_backfill_chunk(
+                        cursor,
+                        migration,
+                        (start, end),  # noqa: B023
+                        progress,
+                    ),
+                    RetryReport(
+                        progress.describe_chunk((start, end)),
+                        self.retry_policy,
+                    ),
+                )
+                progress.add_chunk(end, chunk_rows)
+                if backfill.sleep:
+                    time.sleep(backfill.sleep)
+            cursor.execute(DROP_PROGRESS_QUERY, {"migration": migration["migration"]})
+        except (Exception, psycopg.DatabaseError) as error:
+            progress.print_stop(error)
+            raise error
+        finally:
+            self._execute_queries(cursor, reset_queries)
+
+    def _execute_queries(
+        self,
+        cursor: psycopg.Cursor[Row],
+        queries: List[str],
+    ) -> None:
+        """
+        Executes queries one by one.
 
-        if result_length == 1:
-            return list(result[0])
-        elif result_length == 0:
-            return None
+        :param cursor: psycopg driver cursor.
+        :param queries: queries without parameters.
+        """
+        for query in queries:
+            cursor.execute(query)  # type: ignore
 
-        to_return_result = []
-        for record in result:
-            if len(record) == 1:
-                to_return_result.append(record[0])
-            elif len(record) > 1:
-                to_return_result.append(record)
-        return to_return_result
+    def _execute_backfill_chunk(
+        self,
+        cursor: psycopg.Cursor[Row],
+        migration: Dict[str, Any],
+        bounds: Tuple[Any, Any],
+        progress: BackfillProgress,
+    ) -> int:
+        """
+        Executes backfill statements for one chunk in transaction.
+
+        :param cursor: psycopg driver cursor.
+        :param migration: migrations sql queries dict.
+        :param bounds: first and last key of the chunk.
+        :param progress: progress of the backfill before the chunk.
+
+        :returns: number of changed rows in the chunk.
+        """
+        start, end = bounds
+        chunk_rows = 0
+        with cursor.connection.transaction():
+            for statement in migration["backfill_statements"]:
+                self._execute_statement(
+                    cursor,
+                    migration,
+                    statement,
+                    {"start": start, "end": end},
+                )
+                chunk_rows += max(cursor.rowcount, 0)
+            cursor.execute(SAVE_PROGRESS_QUERY, progress.save_params(end, chunk_rows))
+        return chunk_rows
+
+    def _copy_from_file(
+        self,
+        cursor: psycopg.Cursor[Row],
+        migration: Dict[str, Any],
+        copy_block: CopyBlock,
+    ) -> None:
+        """
+        Loads data file of copy block with COPY FROM STDIN.
+
+        File is sent by chunks, so memory usage
+        does not depend on the file size.
+        Relative paths are resolved against `base_dir` of migration.
+
+        :param cursor: psycopg driver cursor.
+        :param migration: migrations sql queries dict.
+        :param copy_block: copy block.
+
+        :raises Exception: error in data file or in COPY.
+        """
+        started = time.perf_counter()
+        try:
+            with cursor.copy(copy_block.copy_query()) as copy:  # type: ignore
+                for chunk in copy_block.iter_chunks(migration.get("base_dir")):
+                    copy.write(chunk)
+        except (Exception, psycopg.DatabaseError) as error:
+            print(f"{migration['migration']}, it not be applied", error)
+            print(f"Failed copy from file:\n{copy_block.path}")
+            raise error
+        if self.profiler.enabled:
+            self.profiler.add_statement(
+                migration["migration"],
+                copy_block.copy_query(),
+                time.perf_counter() - started,
+                cursor.rowcount,
+            )
+
+    def _execute_statement(
+        self,
+        cursor: psycopg.Cursor[Row],
+        migration: Dict[str, Any],
+        query: str,
+        sql_query_params: Any = None,
+    ) -> None:
+        """
+        Executes one statement and records it in the profiler.
+
+        :param cursor: psycopg driver cursor.
+        :param migration: migrations sql queries dict.
+        :param query: sql statement.
+        :param sql_query_params: parameters for sql query.
+        """
+        started = time.perf_counter()
+        cursor.execute(query=query, params=sql_query_params)  # type: ignore
+        self.profiler.add_statement(
+            migration["migration"],
+            query,
+            time.perf_counter() - started,
+            cursor.rowcount,
+        )
+
+    def _execute_migration_batch(
+        self,
+        cursor: psycopg.Cursor[Row],
+        migration: Dict[str, Any],
+        migration_queries: List[str],
+        sql_query_params: Optional[List[Any]] = None,
+        in_transaction: bool = True,
+    ) -> None:
+        """
+        Executes migration statements with one query.
+
+        If the database reports position of the error,
+        failed statement is printed.
+
+        :param cursor: psycopg driver cursor.
+        :param migration: migrations sql queries dict.
+        :param migration_queries: migration statements.
+        :param sql_query_params: parameters for sql query.
+        :param in_transaction: execute in transaction or not.
+
+        :raises Exception: error in migration query.
+        """
+        batch = STATEMENTS_SEPARATOR.join(migration_queries)
+        try:
+            self._execute_statement(cursor, migration, batch, sql_query_params)
+        except (Exception, psycopg.DatabaseError) as error:
+            failed_query = None
+            if in_transaction:
+                failed_query = find_failed_query(migration_queries, error)
+            print_failure(migration["migration"], error, failed_query, in_transaction)
+            raise error
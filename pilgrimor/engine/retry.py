@@ -0,0 +1,197 @@
+import asyncio
+import random
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, NamedTuple, TypeVar
+
+from psycopg import errors
+
+from pilgrimor.utils import attention_text, warning_text
+
+RETRYABLE_ERRORS = (
+    errors.LockNotAvailable,
+    errors.DeadlockDetected,
+    errors.SerializationFailure,
+)
+
+ResultType = TypeVar("ResultType")
+
+
+class RetryPolicy(NamedTuple):
+    """
+    Retries of transactions failed because of locks.
+
+    Delay before retry grows exponentially from delay to max_delay,
+    the real delay is a random value up to it (full jitter),
+    so migrators of many databases don't retry at the same time.
+    """
+
+    retries: int = 0
+    delay: float = 0.5
+    max_delay: float = 30
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Returns delay before retry.
+
+        :param attempt: number of the failed attempt, starting from 0.
+
+        :returns: seconds.
+        """
+        max_delay = min(self.max_delay, self.delay * 2**attempt)
+        return random.uniform(0, max_delay)  # noqa: S311
+
+
+class RetryReport:
+    """
+    Counts retries and lock wait of one operation.
+
+    Lock wait is recorded for every attempt, failed and successful,
+    by migrations measured with `measure`. Time of an attempt
+    that measured no migrations, like a pipeline, is recorded
+    by the description of the operation.
+
+    PostgreSQL doesn't report how long a statement waited
+    for locks, so time of the statements is recorded,
+    it is the upper bound of the lock wait.
+    Failed attempts were waiting for locks most of this time.
+    """
+
+    def __init__(self, description: str, policy: RetryPolicy) -> None:
+        """
+        Initialize the report.
+
+        :param description: what is retried, for messages.
+        :param policy: retry policy.
+        """
+        self.description = description
+        self.policy = policy
+        self.retries = 0
+        self.lock_wait: Dict[str, float] = {}
+        self._attempt: Dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, migration: str) -> Iterator[None]:
+        """
+        Measures one migration in the current attempt.
+
+        :param migration: migration name.
+
+        :yields: nothing.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._attempt[migration] = self._attempt.get(migration, 0) + (
+                time.perf_counter() - started
+            )
+
+    def failed(self, error: Exception, seconds: float) -> float:
+        """
+        Registers failed attempt.
+
+        :param error: error of the attempt.
+        :param seconds: duration of the attempt.
+
+        :raises Exception: the error if there are no retries left.
+
+        :returns: delay before the next attempt.
+        """
+        self._finish_attempt(seconds)
+        if self.retries >= self.policy.retries:
+            if self.retries:
+                print(warning_text(f"{self.summary()}, no retries left"))
+            raise error
+        delay = self.policy.backoff(self.retries)
+        self.retries += 1
+        print(
+            warning_text(
+                f"{self.description}: {type(error).__name__}, "
+                f"retry {self.retries}/{self.policy.retries} in {delay:.2f}s",
+            ),
+        )
+        return delay
+
+    def done(self, seconds: float) -> None:
+        """
+        Registers successful attempt.
+
+        Prints number of retries if there were any.
+
+        :param seconds: duration of the attempt.
+        """
+        self._finish_attempt(seconds)
+        if self.retries:
+            print(attention_text(self.summary()))
+
+    def summary(self) -> str:
+        """
+        Returns retries and lock wait of every migration.
+
+        :returns: summary line.
+        """
+        lock_wait = ", ".join(
+            f"{name} {seconds:.2f}s" for name, seconds in self.lock_wait.items()
+        )
+        return f"{self.description}: {self.retries} retries, lock wait {lock_wait}"
+
+    def _finish_attempt(self, seconds: float) -> None:
+        """
+        Adds time of the attempt to lock wait.
+
+        :param seconds: duration of the attempt.
+        """
+        attempt = self._attempt or {self.description: seconds}
+        for name, attempt_seconds in attempt.items():
+            self.lock_wait[name] = self.lock_wait.get(name, 0) + attempt_seconds
+        self._attempt = {}
+
+
+def run_with_retries(
+    operation: Callable[[], ResultType],
+    report: RetryReport,
+) -> ResultType:
+    """
+    Runs operation and retries it after lock errors.
+
+    Operation must be a whole transaction
+    or a statement not in transaction.
+
+    :param operation: function to run.
+    :param report: report of the operation with its retry policy.
+
+    :returns: result of the operation.
+    """
+    while True:
+        started = time.perf_counter()
+        try:
+            result = operation()
+        except RETRYABLE_ERRORS as error:
+            time.sleep(report.failed(error, time.perf_counter() - started))
+            continue
+        report.done(time.perf_counter() - started)
+        return result
+
+
+async def async_run_with_retries(
+    operation: Callable[[], Awaitable[ResultType]],
+    report: RetryReport,
+) -> ResultType:
+    """
+    Runs coroutine function and retries it after lock errors.
+
+    :param operation: coroutine function to run.
+    :param report: report of the operation with its retry policy.
+
+    :returns: result of the operation.
+    """
+    while True:
+        started = time.perf_counter()
+        try:
+            result = await operation()
+        except RETRYABLE_ERRORS as error:
+            await asyncio.sleep(report.failed(error, time.perf_counter() - started))
+            continue
+        report.done(time.perf_counter() - started)
+        return result
@@ -0,0 +1,144 @@
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+MigrationData = Dict[str, Any]
+
+
+def get_dependencies(version_migrations: List[MigrationData]) -> Dict[str, Set[str]]:
+    """
+    Returns dependencies of migrations from `depends_on` key.
+
+    Dependencies on migrations that are not in the list are ignored.
+
+    :param version_migrations: sql queries dict by migrations.
+
+    :returns: set of previous migrations by migration.
+    """
+    names = {migration["migration"] for migration in version_migrations}
+    return {
+        migration["migration"]: set(migration.get("depends_on", ())) & names
+        for migration in version_migrations
+    }
+
+
+def release_dependents(waiting: Dict[str, Set[str]], finished: str) -> List[str]:
+    """
+    Removes finished migration from dependencies of waiting migrations.
+
+    :param waiting: set of unfinished dependencies by migration.
+    :param finished: name of finished migration.
+
+    :returns: migrations without unfinished dependencies.
+    """
+    released = []
+    for name, dependencies in waiting.items():
+        if finished in dependencies:
+            dependencies.discard(finished)
+            if not dependencies:
+                released.append(name)
+    return released
+
+
+def run_migration_graph(  # noqa: WPS210, WPS231
+    version_migrations: List[MigrationData],
+    run_migration: Callable[[MigrationData], None],
+    max_workers: int,
+) -> None:
+    """
+    Runs migrations in threads in the order of dependencies.
+
+    Migration starts when all its dependencies are done,
+    at most max_workers migrations run at the same time.
+    After the first error new migrations are not started,
+    running ones are waited for.
+
+    :param version_migrations: sql queries dict by migrations.
+    :param run_migration: function that executes one migration.
+    :param max_workers: maximum number of migrations at the same time.
+
+    :raises Exception: the first error of migrations.
+    """
+    by_name = {migration["migration"]: migration for migration in version_migrations}
+    position = {name: index for index, name in enumerate(by_name)}
+    waiting = get_dependencies(version_migrations)
+    ready = [name for name, dependencies in waiting.items() if not dependencies]
+    errors: List[BaseException] = []
+    running: Dict[Future, str] = {}  # type: ignore
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while running or (ready and not errors):
+            while ready and not errors:
+                name = ready.pop(0)
+                running[executor.submit(run_migration, by_name[name])] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished = running.pop(future)
+                if error := future.exception():
+                    errors.append(error)
+                else:
+                    ready.extend(release_dependents(waiting, finished))
+            ready.sort(key=position.__getitem__)
+
+    if errors:
+        raise errors[0]
+
+
+async def async_run_migration_graph(
+    version_migrations: List[MigrationData],
+    run_migration: Callable[[MigrationData], Awaitable[None]],
+    max_workers: int,
+) -> None:
+    """
+    Runs migrations as asyncio tasks in the order of dependencies.
+
+    Works like run_migration_graph.
+
+    :param version_migrations: sql queries dict by migrations.
+    :param run_migration: coroutine function that executes one migration.
+    :param max_workers: maximum number of migrations at the same time.
+
+    :raises Exception: the first error of migrations.
+    """
+    dependencies = get_dependencies(version_migrations)
+    finished = {name: asyncio.Event() for name in dependencies}
+    semaphore = asyncio.Semaphore(max_workers)
+    errors: List[BaseException] = []
+
+    async def run(migration: MigrationData) -> None:  # noqa: WPS430
+        name = migration["migration"]
+        for dependency in dependencies[name]:
+            await finished[dependency].wait()
+        async with semaphore:
+            if not errors:
+                await _run_or_release_all(run_migration, migration, errors, finished)
+        finished[name].set()
+
+    await asyncio.gather(*(run(migration) for migration in version_migrations))
+    if errors:
+        raise errors[0]
+
+
+async def _run_or_release_all(
+    run_migration: Callable[[MigrationData], Awaitable[None]],
+    migration: MigrationData,
+    errors: List[BaseException],
+    finished: Dict[str, asyncio.Event],
+) -> None:
+    """
+    Runs migration, after an error lets all waiting migrations go on.
+
+    Waiting migrations are not started after an error,
+    they only stop waiting.
+
+    :param run_migration: coroutine function that executes one migration.
+    :param migration: sql queries dict of the migration.
+    :param errors: errors of migrations, the error is added to it.
+    :param finished: finish events by migration.
+    """
+    try:
+        await run_migration(migration)
+    except Exception as exc:
+        errors.append(exc)
+        for event in finished.values():
+            event.set()
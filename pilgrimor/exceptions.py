@@ -32,3 +32,23 @@ class NoNewMigrationsError(ApplyMigrationsError):
 
 class RollBackMigrationsError(BasePilgrimorError):
     """Error for unsuccessful migrations rollback."""
+
+
+class InMemoryEngineError(BasePilgrimorError):
+    """Error of statement in the in-memory engine."""
+
+
+class SquashMigrationsError(BasePilgrimorError):
+    """Error if migrations can't be squashed into a baseline."""
+
+
+class PlanMismatchError(BasePilgrimorError):
+    """Error if migrations or database changed after the plan was made."""
+
+
+class VersionManifestError(BasePilgrimorError):
+    """Error if version manifest can't be read."""
+
+
+class EngineConfigurationError(BasePilgrimorError):
+    """Error if engine options don't work together or a package is missing."""
@@ -0,0 +1,201 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Type
+from urllib.parse import urlsplit, urlunsplit
+
+from pilgrimor.abc.engine import PilgrimoreEngine
+from pilgrimor.migrator.rawsql_migrator.migration_files import MigrationFileReader
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+from pilgrimor.utils import error_text, success_text, warning_text
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"
+
+
+class TargetResult(NamedTuple):
+    """Result of a command on one database."""
+
+    target: str
+    status: str
+    seconds: float
+    error: Optional[str] = None
+
+
+def mask_url(database_url: str) -> str:
+    """
+    Hides password in database url.
+
+    :param database_url: url to database.
+
+    :returns: url without password.
+    """
+    parts = urlsplit(database_url)
+    if parts.password is None:
+        return database_url
+    netloc = parts.netloc.rsplit("@", 1)[1]
+    return urlunsplit(parts._replace(netloc=f"{parts.username}:***@{netloc}"))
+
+
+class FanOutExecutor:
+    """
+    Runs one migrator command on many databases.
+
+    Every database gets its own engine and migrator,
+    all migrators share one reader, so migration files
+    are read and parsed once for all databases.
+    Databases are migrated in a thread pool,
+    at most `concurrency` databases at the same time.
+
+    With fail_fast, databases that were not started yet
+    are skipped after the first failure.
+    """
+
+    def __init__(  # noqa: WPS211
+        self,
+        engine_class: Type[PilgrimoreEngine],
+        engine_options: Dict[str, Any],
+        database_urls: List[str],
+        migrations_dir: str,
+        parse_cache: bool = False,
+        version_manifest: bool = False,
+        concurrency: int = 4,
+        fail_fast: bool = True,
+    ) -> None:
+        """
+        Initialize the executor.
+
+        :param engine_class: class of the engine.
+        :param engine_options: options for every engine.
+        :param database_urls: urls of all databases.
+        :param migrations_dir: directory with migrations.
+        :param parse_cache: keep parsed migrations in persistent cache or not.
+        :param version_manifest: keep versions in manifest file or not.
+        :param concurrency: number of databases migrated at the same time.
+        :param fail_fast: skip not started databases after the first failure.
+        """
+        self.engine_class = engine_class
+        self.engine_options = engine_options
+        self.database_urls = database_urls
+        self.migrations_dir = migrations_dir
+        self.concurrency = max(concurrency, 1)
+        self.fail_fast = fail_fast
+        self.migration_files = MigrationFileReader(
+            migrations_dir,
+            parse_cache=parse_cache,
+            version_manifest=version_manifest,
+        )
+
+    def run(self, command: Callable[[RawSQLMigator], None]) -> List[TargetResult]:
+        """
+        Runs command on all databases and prints summary.
+
+        :param command: function that gets migrator of one database.
+
+        :returns: results in the order of database urls.
+        """
+        results: Dict[str, TargetResult] = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures: Dict[Future, str] = {  # type: ignore
+                executor.submit(self._run_target, database_url, command): database_url
+                for database_url in self.database_urls
+            }
+            pending: Set[Future] = set(futures)  # type: ignore
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                failed = False
+                for future in done:
+                    results[futures[future]] = future.result()
+                    failed = failed or future.result().status == STATUS_FAILED
+                if failed and self.fail_fast:
+                    pending = self._cancel_pending(pending, futures, results)
+        self.migration_files.close()
+
+        ordered_results = [results[database_url] for database_url in self.database_urls]
+        self.print_summary(ordered_results)
+        return ordered_results
+
+    def print_summary(self, results: List[TargetResult]) -> None:
+        """
+        Prints table with results of all databases.
+
+        :param results: results of the command.
+        """
+        width = max(len(result.target) for result in results)
+        colors = {
+            STATUS_OK: success_text,
+            STATUS_FAILED: error_text,
+            STATUS_SKIPPED: warning_text,
+        }
+        for result in results:
+            line = (
+                f"{result.target:<{width}}  {result.status:<7}  {result.seconds:.2f}s"
+            )
+            if result.error:
+                line = f"{line}  {result.error}"
+            print(colors[result.status](line))
+
+    def _run_target(
+        self,
+        database_url: str,
+        command: Callable[[RawSQLMigator], None],
+    ) -> TargetResult:
+        """
+        Runs command on one database.
+
+        :param database_url: url to database.
+        :param command: function that gets migrator of the database.
+
+        :returns: result of the command.
+        """
+        target = mask_url(database_url)
+        start = time.perf_counter()
+        try:
+            with self.engine_class(database_url, **self.engine_options) as engine:
+                command(
+                    RawSQLMigator(
+                        engine,
+                        self.migrations_dir,
+                        migration_files=self.migration_files,
+                    ),
+                )
+        except Exception as exc:
+            error = exc.__cause__ or exc
+            return TargetResult(
+                target=target,
+                status=STATUS_FAILED,
+                seconds=time.perf_counter() - start,
+                error=str(error) or type(error).__name__,
+            )
+        return TargetResult(
+            target=target,
+            status=STATUS_OK,
+            seconds=time.perf_counter() - start,
+        )
+
+    def _cancel_pending(
+        self,
+        pending: Set[Future],  # type: ignore
+        futures: Dict[Future, str],  # type: ignore
+        results: Dict[str, TargetResult],
+    ) -> Set[Future]:  # type: ignore
+        """
+        Cancels not started databases and marks them skipped.
+
+        :param pending: not finished futures.
+        :param futures: database url by future.
+        :param results: results by database url.
+
+        :returns: futures that are already running.
+        """
+        running = set()
+        for future in pending:
+            if future.cancel():
+                results[futures[future]] = TargetResult(
+                    target=mask_url(futures[future]),
+                    status=STATUS_SKIPPED,
+                    seconds=0,
+                )
+            else:
+                running.add(future)
+        return running
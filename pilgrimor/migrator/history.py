@@ -0,0 +1,241 @@
+"""
+Execution history of applied migrations.
+
+Durations of the same migrations on different databases
+show how much slower or faster one environment is,
+so the runtime of pending migrations in production
+can be estimated from their runs on staging.
+"""
+import json
+from datetime import datetime
+from statistics import median
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from pilgrimor.migrator.state import MigrationStateSnapshot
+from pilgrimor.migrator.system_table import HISTORY_COLUMNS
+
+
+class HistoryRecord(NamedTuple):
+    """Applied migration with its timings."""
+
+    name: str
+    version: str
+    host: Optional[str]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    duration: float
+    rows: Optional[int]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns record as JSON compatible dict.
+
+        :returns: dict with record fields.
+        """
+        record = self._asdict()
+        for field in ("started_at", "finished_at"):
+            if record[field] is not None:
+                record[field] = record[field].isoformat()
+        return record
+
+
+class Estimate(NamedTuple):
+    """Estimated duration of pending migrations."""
+
+    seconds: float
+    scale: float
+    known: int
+    unknown: List[str]
+
+
+def history_records(result: Optional[List[Any]]) -> List[HistoryRecord]:
+    """
+    Converts result of HISTORY_QUERY into records.
+
+    :param result: result from the engine.
+
+    :returns: records in apply order.
+    """
+    records = []
+    for row in MigrationStateSnapshot.normalize_rows(result):
+        columns: Dict[str, Any] = dict(zip(HISTORY_COLUMNS, row))
+        records.append(HistoryRecord(**columns))
+    return records
+
+
+def slowest(records: Iterable[HistoryRecord], limit: int) -> List[HistoryRecord]:
+    """
+    Returns the slowest records.
+
+    :param records: history records.
+    :param limit: number of records.
+
+    :returns: records, the slowest first.
+    """
+    return sorted(records, key=lambda record: record.duration, reverse=True)[:limit]
+
+
+def describe_history(records: List[HistoryRecord], limit: int) -> str:
+    """
+    Returns table of the slowest migrations.
+
+    :param records: history records.
+    :param limit: number of migrations.
+
+    :returns: text table.
+    """
+    if not records:
+        return "No history, migrations were applied without timings."
+    total = sum(record.duration for record in records)
+    lines = [
+        f"{len(records)} migrations, {total:.3f}s in total",
+        f"{'seconds':>10} {'rows':>10}  {'version':<12}{'host':<20}migration",
+    ]
+    for record in slowest(records, limit):
+        rows = "-" if record.rows is None else str(record.rows)
+        lines.append(
+            f"{record.duration:>10.3f} {rows:>10}  {record.version:<12}"
+            f"{record.host or '-':<20}{record.name}",
+        )
+    return "\n".join(lines)
+
+
+def describe_trends(
+    histories: List[Tuple[str, List[HistoryRecord]]],
+    limit: int,
+) -> str:
+    """
+    Returns durations of the slowest migrations on every database.
+
+    :param histories: database names and their records.
+    :param limit: number of migrations.
+
+    :returns: text table, one column for every database.
+    """
+    durations = [
+        {record.name: record.duration for record in records}
+        for _, records in histories
+    ]
+    longest: Dict[str, float] = {}
+    for database_durations in durations:
+        for name, duration in database_durations.items():
+            longest[name] = max(duration, longest.get(name, 0))
+    names = sorted(longest, key=longest.__getitem__, reverse=True)[:limit]
+
+    lines = [
+        f"{number:>10}  {target}"
+        for number, (target, _) in enumerate(histories, start=1)
+    ]
+    lines.append(
+        "".join(f"{number:>10}" for number in range(1, len(histories) + 1))
+        + "  migration",
+    )
+    for name in names:
+        cells = []
+        for database_durations in durations:
+            if name in database_durations:
+                cells.append(f"{database_durations[name]:>10.3f}")
+            else:
+                cells.append(f"{'-':>10}")
+        lines.append("".join(cells) + f"  {name}")
+    return "\n".join(lines)
+
+
+def estimate_pending(
+    pending: List[str],
+    records: List[HistoryRecord],
+    reference: List[HistoryRecord],
+) -> Estimate:
+    """
+    Estimates duration of pending migrations from another environment.
+
+    Durations from the reference environment are scaled
+    by the median ratio of durations of migrations
+    applied in both environments.
+
+    :param pending: migrations not applied in this environment.
+    :param records: history of this environment.
+    :param reference: history of the reference environment.
+
+    :returns: estimate.
+    """
+    reference_durations = {record.name: record.duration for record in reference}
+    ratios = [
+        record.duration / reference_durations[record.name]
+        for record in records
+        if reference_durations.get(record.name)
+    ]
+    scale = median(ratios) if ratios else 1.0
+    known = [name for name in pending if name in reference_durations]
+    return Estimate(
+        seconds=scale * sum(reference_durations[name] for name in known),
+        scale=scale,
+        known=len(known),
+        unknown=[name for name in pending if name not in reference_durations],
+    )
+
+
+def describe_estimate(estimate: Estimate) -> str:
+    """
+    Returns text of the estimate.
+
+    :param estimate: estimate.
+
+    :returns: text.
+    """
+    pending = estimate.known + len(estimate.unknown)
+    text = (
+        f"{estimate.known} of {pending} pending migrations will take about "
+        f"{estimate.seconds:.3f}s (reference durations x{estimate.scale:.2f})"
+    )
+    if estimate.unknown:
+        text = f"{text}\nNo reference for: {', '.join(estimate.unknown)}"
+    return text
+
+
+def write_histories(
+    histories: List[Tuple[str, List[HistoryRecord]]],
+    path: str,
+) -> None:
+    """
+    Writes histories to JSON file.
+
+    :param histories: database names and their records.
+    :param path: path to the file.
+    """
+    with open(path, "w") as history_file:
+        json.dump(
+            [
+                {
+                    "target": target,
+                    "history": [record.to_dict() for record in records],
+                }
+                for target, records in histories
+            ],
+            history_file,
+            indent=2,
+        )
+
+
+def read_reference(path: str) -> List[HistoryRecord]:
+    """
+    Reads history written by write_histories.
+
+    If the file has many databases, the longest
+    duration of every migration is used.
+
+    :param path: path to the file.
+
+    :returns: records.
+    """
+    with open(path) as history_file:
+        histories = json.load(history_file)
+    longest: Dict[str, HistoryRecord] = {}
+    for target in histories:
+        for raw_record in target["history"]:
+            record = HistoryRecord(**raw_record)
+            if record.name not in longest or (
+                record.duration > longest[record.name].duration
+            ):
+                longest[record.name] = record
+    return list(longest.values())
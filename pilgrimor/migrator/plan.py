@@ -0,0 +1,238 @@
+"""
+Execution plans of migrations.
+
+Plan is the ordered list of steps that apply or rollback
+command would execute. It is made without executing anything,
+so it can be reviewed, saved as JSON and executed later
+exactly as it was planned.
+"""
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from pilgrimor.migrator.state import MigrationStateSnapshot
+from pilgrimor.sql.backfill import Backfill
+from pilgrimor.sql.locks import estimate_lock, strongest_lock
+
+PLAN_FORMAT = 1
+STEP_APPLY = "apply"
+STEP_ROLLBACK = "rollback"
+STEP_BASELINE = "baseline"
+PREVIEW_LENGTH = 72
+LEADING_COMMENTS_PATTERN = re.compile(r"^(?:\s*--[^\n]*(?:\n|$))+")
+
+
+def state_fingerprint(state: MigrationStateSnapshot) -> str:
+    """
+    Returns hash of applied migrations.
+
+    :param state: state snapshot.
+
+    :returns: sha256 hex digest of names and versions in apply order.
+    """
+    digest = hashlib.sha256()
+    for name in state.applied_names:
+        digest.update(f"{name}\0{state.version_by_name[name]}\n".encode())
+    return digest.hexdigest()
+
+
+def transaction_groups(
+    version_migrations: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """
+    Splits migrations into groups executed together.
+
+    Consecutive migrations that run in transaction
+    share one group, migrations that run not in transaction
+    are grouped too, but every one of them is committed by itself.
+
+    :param version_migrations: list of dicts with migrations data.
+
+    :returns: groups with `in_transaction` flag and migration names.
+    """
+    groups: List[Dict[str, Any]] = []
+    for migration in version_migrations:
+        in_transaction = migration["in_transaction"]
+        if not groups or groups[-1]["in_transaction"] != in_transaction:
+            groups.append({"in_transaction": in_transaction, "migrations": []})
+        groups[-1]["migrations"].append(migration["migration"])
+    return groups
+
+
+def dump_migration(migration: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Converts migration dict into JSON compatible dict.
+
+    :param migration: migration dict from the planner.
+
+    :returns: migration with estimated locks.
+    """
+    statements = [
+        *migration.get("backfill_statements", []),
+        *migration["statements"],
+    ]
+    dumped = {
+        "migration": migration["migration"],
+        "in_transaction": migration["in_transaction"],
+        "settings": migration["settings"],
+        "statements": migration["statements"],
+        "locks": [estimate_lock(statement) for statement in migration["statements"]],
+        "lock": strongest_lock(statements),
+    }
+    if "depends_on" in migration:
+        dumped["depends_on"] = list(migration["depends_on"])
+    if "backfill" in migration:
+        dumped["backfill"] = migration["backfill"]._asdict()
+        dumped["backfill_statements"] = migration["backfill_statements"]
+    return dumped
+
+
+def load_migration(dumped: Dict[str, Any], migrations_dir: str) -> Dict[str, Any]:
+    """
+    Converts migration from the plan back into migration dict.
+
+    :param dumped: migration from the plan.
+    :param migrations_dir: directory with migrations.
+
+    :returns: migration dict for the engine.
+    """
+    migration = {
+        "migration": dumped["migration"],
+        "query": "".join(f"{statement};\n" for statement in dumped["statements"]),
+        "statements": dumped["statements"],
+        "in_transaction": dumped["in_transaction"],
+        "settings": dumped["settings"],
+        "base_dir": migrations_dir,
+    }
+    if "depends_on" in dumped:
+        migration["depends_on"] = dumped["depends_on"]
+    if "backfill" in dumped:
+        migration["backfill"] = Backfill(**dumped["backfill"])
+        migration["backfill_statements"] = dumped["backfill_statements"]
+    return migration
+
+
+def plan_step(
+    kind: str,
+    version: Optional[str],
+    migrations: List[str],
+    version_migrations: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Returns step of the plan.
+
+    :param kind: apply, rollback or baseline.
+    :param version: version of migrations, None for rollback.
+    :param migrations: names of migrations registered by the step.
+    :param version_migrations: list of dicts with migrations data.
+
+    :returns: JSON compatible step.
+    """
+    return {
+        "kind": kind,
+        "version": version,
+        "migrations": migrations,
+        "transaction_groups": transaction_groups(version_migrations),
+        "version_migrations": [
+            dump_migration(migration) for migration in version_migrations
+        ],
+    }
+
+
+def statement_preview(statement: str) -> str:
+    """
+    Returns statement in one line without leading comments.
+
+    :param statement: SQL statement.
+
+    :returns: shortened statement.
+    """
+    preview = " ".join(LEADING_COMMENTS_PATTERN.sub("", statement).split())
+    if len(preview) > PREVIEW_LENGTH:
+        return f"{preview[:PREVIEW_LENGTH - 3]}..."
+    return preview
+
+
+def describe_plan(plan: Dict[str, Any]) -> str:
+    """
+    Returns readable description of the plan.
+
+    :param plan: plan.
+
+    :returns: text with steps, transaction groups, statements and locks.
+    """
+    if not plan["steps"]:
+        return "Nothing to do."
+    lines = []
+    for number, step in enumerate(plan["steps"], start=1):
+        lines.extend(describe_step(number, step))
+    return "\n".join(lines)
+
+
+def describe_step(number: int, step: Dict[str, Any]) -> List[str]:
+    """
+    Returns lines of plan description for one step.
+
+    :param number: number of the step.
+    :param step: step of the plan.
+
+    :returns: title, transaction groups, statements and locks of the step.
+    """
+    title = f"Step {number}: {step['kind']}"
+    if step["version"]:
+        title = f"{title} {step['version']}"
+    lines = [title]
+    dumped = {
+        migration["migration"]: migration for migration in step["version_migrations"]
+    }
+    for group in step["transaction_groups"]:
+        if group["in_transaction"]:
+            lines.append("  transaction:")
+        else:
+            lines.append("  no transaction, every migration is committed:")
+        for name in group["migrations"]:
+            lines.extend(describe_migration(dumped[name]))
+    return lines
+
+
+def describe_migration(migration: Dict[str, Any]) -> List[str]:
+    """
+    Returns lines of plan description for one migration.
+
+    :param migration: dumped migration of the step.
+
+    :returns: migration with its lock and every statement with its lock.
+    """
+    lines = [f"    {migration['migration']} [{migration['lock'] or 'no lock'}]"]
+    for statement, lock in zip(migration["statements"], migration["locks"]):
+        lines.append(f"      {lock or '-':<24} {statement_preview(statement)}")
+    return lines
+
+
+def write_plan(plan: Dict[str, Any], path: str) -> None:
+    """
+    Writes plan to JSON file.
+
+    :param plan: plan.
+    :param path: path to the file.
+    """
+    with open(path, "w") as plan_file:
+        json.dump(plan, plan_file, indent=2)
+
+
+def read_plan(path: str) -> Dict[str, Any]:
+    """
+    Reads plan from JSON file.
+
+    :param path: path to the file.
+
+    :raises ValueError: if file has unknown format.
+
+    :returns: plan.
+    """
+    with open(path) as plan_file:
+        plan = json.load(plan_file)
+    if plan.get("format") != PLAN_FORMAT:
+        raise ValueError(f"Unknown plan format in {path}")
+    return plan
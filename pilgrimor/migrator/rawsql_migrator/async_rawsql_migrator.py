@@ -0,0 +1,182 @@
+from typing import Any, List, Optional
+
+from pilgrimor.abc.engine import AsyncPilgrimoreEngine
+from pilgrimor.abc.migrator import AsyncBaseMigrator
+from pilgrimor.migrator.rawsql_migrator.migration_files import MigrationFileReader
+from pilgrimor.migrator.rawsql_migrator.planner import RawSQLPlanner
+from pilgrimor.migrator.system_table import (
+    CLEAR_FINGERPRINT_COMMAND,
+    META_SCHEMA_VERSION,
+)
+from pilgrimor.utils import success_text
+
+
+class AsyncRawSQLMigator(RawSQLPlanner, AsyncBaseMigrator):
+    """
+    Asyncio migrator for .sql files.
+
+    Plans migrations the same way as RawSQLMigator
+    and executes them with AsyncPilgrimoreEngine.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncPilgrimoreEngine,
+        migration_dir: str,
+        parse_cache: bool = False,
+        migration_files: Optional[MigrationFileReader] = None,
+        write_versions: bool = True,
+        version_manifest: bool = False,
+    ) -> None:
+        """
+        Initializes the migrator.
+
+        :param engine: Asyncio migration engine.
+        :param migration_dir: path to the directory with migration files.
+        :param parse_cache: keep parsed migrations in persistent cache or not.
+        :param migration_files: reader shared with other migrators.
+        :param write_versions: add versions to applied migration files or not.
+        :param version_manifest: keep versions in manifest file or not.
+        """
+        super().__init__(engine, migration_dir)
+        self.write_versions = write_versions
+        self.migration_files = migration_files or MigrationFileReader(
+            migration_dir,
+            parse_cache=parse_cache,
+            version_manifest=version_manifest,
+        )
+
+    async def initialize_database(self) -> None:
+        """Initialize new table for migration control."""
+        await self.engine.execute_sql_with_no_return(
+            sql_query=self.system_table.initialize_query(),
+            sql_query_params=None,
+        )
+        print(success_text("Database initialized!"))
+
+    async def upgrade_database(self) -> None:
+        """Upgrades pilgrimor table to the latest schema."""
+        if not (query := self._get_upgrade_query(await self._load_state())):
+            return
+        await self.engine.execute_sql_with_no_return(
+            sql_query=query,
+            sql_query_params=None,
+        )
+        print(
+            success_text(
+                f"Database upgraded to schema {self.system_table.schema_version}.",
+            ),
+        )
+
+    async def _apply_baseline(self) -> None:
+        """
+        Applies the newest baseline to a fresh database.
+
+        Covered migrations are recorded as applied
+        in the same transaction as the baseline.
+        """
+        if (baseline := self._get_baseline()) is None:
+            return
+        with self.profiler.phase("build queries"):
+            baseline_migration = self._get_baseline_migration(baseline)
+        with self.profiler.phase("execute"):
+            await self.engine.execute_version_migrations(
+                version_migrations=[baseline_migration],
+                sql_query_params=None,
+                in_transaction=True,
+            )
+        for migration, version in baseline.covered:
+            self.state.add([migration], version)
+        print(success_text(f"Baseline {baseline.version} applied."))
+
+    async def _apply_migrations(self, migrations: List[str], version: str) -> None:
+        """
+        Applies new migrations.
+
+        See RawSQLMigator._apply_migrations.
+
+        :param migrations: List of migration to apply.
+        :param version: migration version.
+        """
+        with self.profiler.phase("build queries"):
+            version_migrations, is_concurrently = self._get_version_migrations(
+                migrations,
+                is_rollback=False,
+                version=version,
+            )
+
+        with self.profiler.phase("execute"):
+            await self.engine.execute_version_migrations(
+                version_migrations=version_migrations,
+                sql_query_params=None,
+                in_transaction=not is_concurrently,
+            )
+
+        self.state.add(migrations, version)
+        if not self._add_versions(migrations, version):
+            await self._rollback_migrations(migrations=migrations)
+
+    async def _rollback_migrations(  # noqa: WPS324
+        self,
+        migrations: List[str],
+        **kwargs: Any,
+    ) -> None:
+        """
+        Rolls back migration.
+
+        :param migrations: List of migration to rollback.
+        :param kwargs: any named arguments.
+        """
+        with self.profiler.phase("build queries"):
+            version_migrations, is_concurrently = self._get_version_migrations(
+                migrations,
+                is_rollback=True,
+            )
+        await self._forget_fingerprint()
+
+        with self.profiler.phase("execute"):
+            await self.engine.execute_version_migrations(
+                version_migrations=version_migrations,
+                sql_query_params=None,
+                in_transaction=not is_concurrently,
+            )
+
+        self.state.remove(migrations)
+
+    async def _is_up_to_date(self) -> bool:
+        """
+        Compares the directory with fingerprint saved by the last apply.
+
+        See RawSQLMigator._is_up_to_date.
+
+        :returns: True if the directory was fully applied.
+        """
+        if (query := self.system_table.fingerprint_query) is None:
+            return False
+        with self.profiler.phase("check fingerprint"):
+            try:
+                saved = await self.engine.execute_sql_with_return(
+                    sql_query=query,
+                    sql_query_params=None,
+                )
+            except Exception:
+                return False
+            return self._matches_fingerprint(saved)
+
+    async def _mark_up_to_date(self) -> None:
+        """Saves fingerprint of the directory if nothing is pending."""
+        if (command := self._get_save_fingerprint_command()) is None:
+            return
+        await self.engine.execute_sql_with_no_return(
+            sql_query=command,
+            sql_query_params=None,
+        )
+
+    async def _forget_fingerprint(self) -> None:
+        """Drops saved fingerprint before migrations are rolled back."""
+        if self.state.schema_version < META_SCHEMA_VERSION:
+            return
+        await self.engine.execute_sql_with_no_return(
+            sql_query=CLEAR_FINGERPRINT_COMMAND,
+            sql_query_params=None,
+        )
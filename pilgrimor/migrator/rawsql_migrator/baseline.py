@@ -0,0 +1,113 @@
+import os
+import re
+from os.path import isdir, join
+from typing import List, NamedTuple, Optional, Tuple
+
+from packaging.version import parse as version_parse
+
+BASELINE_DIR = "baseline"
+BASELINE_HEADER = "-- pilgrimor baseline {version}"
+COVERS_LINE = "-- covers: {migration} {version}"
+COVERS_PATTERN = re.compile(
+    r"^-- covers: (?P<migration>\S+) (?P<version>\S+)[ \t]*$",
+    re.MULTILINE,
+)
+DUMP_SKIPPED_LINE_PATTERN = re.compile(
+    r"^(?:\\.*|SELECT pg_catalog\.set_config\('search_path', '', false\);)$",
+)
+
+
+class Baseline(NamedTuple):
+    """
+    Schema of all migrations up to a version in one file.
+
+    Fresh database gets the baseline instead of
+    the covered migrations, covered migrations are recorded
+    in pilgrimor table as applied with their versions.
+    """
+
+    name: str
+    version: str
+    covered: List[Tuple[str, str]]
+
+
+def baseline_name(version: str) -> str:
+    """
+    Returns name of the baseline file relative to migrations_dir.
+
+    :param version: last covered version.
+
+    :returns: baseline name.
+    """
+    return join(BASELINE_DIR, f"{version}.sql")
+
+
+def find_baseline(migrations_dir: str) -> Optional[Baseline]:
+    """
+    Finds the baseline with the biggest version.
+
+    :param migrations_dir: directory with migrations.
+
+    :returns: baseline or None if there are no baselines.
+    """
+    baseline_dir = join(migrations_dir, BASELINE_DIR)
+    if not isdir(baseline_dir):
+        return None
+    versions = [
+        file_name[: -len(".sql")]
+        for file_name in os.listdir(baseline_dir)
+        if file_name.endswith(".sql") and not file_name.startswith(".")
+    ]
+    if not versions:
+        return None
+    version = max(versions, key=version_parse)
+    name = baseline_name(version)
+    with open(join(migrations_dir, name), "r") as baseline_file:
+        text = baseline_file.read()
+    return Baseline(
+        name=name,
+        version=version,
+        covered=[
+            (match.group("migration"), match.group("version"))
+            for match in COVERS_PATTERN.finditer(text)
+        ],
+    )
+
+
+def clean_dump(dump: str) -> str:
+    """
+    Removes lines of pg_dump output that can't be executed as a migration.
+
+    psql meta commands are removed and so is the empty search_path,
+    dumped names are schema qualified and pilgrimor table
+    must be found after the baseline.
+
+    :param dump: pg_dump output.
+
+    :returns: sql text.
+    """
+    return "\n".join(
+        line
+        for line in dump.splitlines()
+        if not DUMP_SKIPPED_LINE_PATTERN.match(line)
+    )
+
+
+def render_baseline(version: str, covered: List[Tuple[str, str]], schema: str) -> str:
+    """
+    Returns text of the baseline file.
+
+    :param version: last covered version.
+    :param covered: covered migrations with their versions.
+    :param schema: schema sql.
+
+    :returns: baseline text.
+    """
+    lines = [BASELINE_HEADER.format(version=version)]
+    lines.extend(
+        COVERS_LINE.format(migration=migration, version=migration_version)
+        for migration, migration_version in covered
+    )
+    lines.append("")
+    lines.append(clean_dump(schema).strip())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,123 @@
+"""
+Versions of applied migrations in one file.
+
+Without the manifest the version is appended to every
+applied migration file, and every file is read to find it.
+The manifest keeps all versions in `pilgrimor.lock`
+next to migrations, it is read once and replaced
+as a whole, so readers never see a half-written file.
+"""
+import json
+import os
+import tempfile
+from os.path import basename, dirname
+from typing import Dict, Iterable, Optional, Tuple
+
+from pilgrimor.exceptions import VersionManifestError
+
+MANIFEST_FILE_NAME = "pilgrimor.lock"
+MANIFEST_FORMAT = 1
+
+
+class VersionManifest:
+    """
+    Manifest file with versions of migrations.
+
+    File is read again only if its stat was changed,
+    for example by another runner or by `git pull`.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Initialize the manifest.
+
+        :param path: path to the manifest file.
+        """
+        self.path = path
+        self._stat: Optional[Tuple[int, int]] = None
+        self._versions: Dict[str, str] = {}
+
+    def exists(self) -> bool:
+        """
+        Checks if manifest file exists.
+
+        :returns: True if the file exists.
+        """
+        return os.path.isfile(self.path)
+
+    def versions(self) -> Dict[str, str]:
+        """
+        Returns versions of migrations.
+
+        :raises VersionManifestError: if the file is not a manifest.
+
+        :returns: dict with migration names and versions.
+        """
+        try:
+            stat_result = os.stat(self.path)
+        except FileNotFoundError:
+            self._stat = None
+            self._versions = {}
+            return self._versions
+        stat = (stat_result.st_mtime_ns, stat_result.st_size)
+        if stat != self._stat:
+            self._versions = self._read()
+            self._stat = stat
+        return self._versions
+
+    def get(self, migration: str) -> Optional[str]:
+        """
+        Returns version of migration.
+
+        :param migration: migration name.
+
+        :returns: version or None if migration has no version.
+        """
+        return self.versions().get(migration)
+
+    def write(self, versions: Iterable[Tuple[str, str]]) -> None:
+        """
+        Replaces manifest file.
+
+        Versions are written to a hidden temporary file
+        in the same directory, it is renamed to the manifest
+        only after it is written completely.
+
+        :param versions: migration names and versions in apply order.
+        """
+        manifest = {"format": MANIFEST_FORMAT, "versions": dict(versions)}
+        descriptor, temp_path = tempfile.mkstemp(
+            prefix=f".{basename(self.path)}.",
+            dir=dirname(self.path) or ".",
+        )
+        try:
+            with os.fdopen(descriptor, "w") as temp_file:
+                json.dump(manifest, temp_file, indent=2)
+                temp_file.write("\n")
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._stat = None
+
+    def _read(self) -> Dict[str, str]:
+        """
+        Reads versions from the manifest file.
+
+        :raises VersionManifestError: if the file is not a manifest.
+
+        :returns: dict with migration names and versions.
+        """
+        with open(self.path) as manifest_file:
+            try:
+                manifest = json.load(manifest_file)
+            except ValueError as exc:
+                raise VersionManifestError(f"Can't read {self.path} - {exc}")
+        if not isinstance(manifest, dict) or manifest.get("format") != MANIFEST_FORMAT:
+            raise VersionManifestError(
+                f"Unknown format of {self.path}, "
+                f"it is written by a newer pilgrimor.",
+            )
+        return manifest["versions"]
@@ -0,0 +1,995 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from os.path import join, relpath
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from pilgrimor.exceptions import (
+    MigrationNumberRepeatNumberError,
+    VersionManifestError,
+    WrongMigrationNumberError,
+)
+from pilgrimor.migrator.rawsql_migrator.manifest import (
+    MANIFEST_FILE_NAME,
+    VersionManifest,
+)
+from pilgrimor.sql.backfill import Backfill
+from pilgrimor.sql.copy_blocks import find_copy_blocks
+from pilgrimor.sql.directives import (
+    Directives,
+    directive_flag,
+    parse_directives,
+    requires_autocommit,
+)
+from pilgrimor.sql.tokenizer import (
+    NON_SPACE_PATTERN,
+    SQLTokenizeError,
+    code_only,
+    iter_statements,
+)
+
+VERSION_MARKER_PATTERN = re.compile(r"pilgrimore_version.*\n")
+ROLLBACK_SEPARATOR = "-- rollback --"
+CACHE_FILE_NAME = ".pilgrimor_cache"
+
+StatementOffsets = Tuple[Tuple[int, int], ...]
+
+
+class ParsedMigration(NamedTuple):
+    """
+    Parsed migration file.
+
+    Offsets are positions in the migration text,
+    so the file is read only when its queries are needed.
+    """
+
+    version: Optional[str]
+    rollback_start: Optional[int]
+    checksum: str
+    apply_statements: StatementOffsets = ()
+    rollback_statements: StatementOffsets = ()
+    directives: Directives = ()
+    apply_in_transaction: bool = True
+    rollback_in_transaction: bool = True
+
+    def directive(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """
+        Returns value of pilgrimor directive.
+
+        :param name: directive name.
+        :param default: value if directive is not set.
+
+        :returns: directive value.
+        """
+        return dict(self.directives).get(name, default)
+
+    def apply_query(self, text: str) -> str:
+        """
+        Returns apply part of the migration.
+
+        :param text: migration text.
+
+        :returns: apply query, whole text if there is no rollback part.
+        """
+        if self.rollback_start is None:
+            return text
+        return text[: self.rollback_start]
+
+    def rollback_query(self, text: str) -> Optional[str]:
+        """
+        Returns rollback part of the migration.
+
+        :param text: migration text.
+
+        :returns: rollback query or None if there is no rollback part.
+        """
+        if self.rollback_start is None:
+            return None
+        return text[self.rollback_start + len(ROLLBACK_SEPARATOR) :]  # noqa: E203
+
+    def statements(self, text: str, rollback: bool = False) -> List[str]:
+        """
+        Returns statements of apply or rollback part.
+
+        :param text: migration text.
+        :param rollback: return rollback statements or apply statements.
+
+        :returns: list with statements.
+        """
+        offsets = self.rollback_statements if rollback else self.apply_statements
+        return [text[start:end] for start, end in offsets]
+
+
+def migration_number(migration: str) -> int:
+    """
+    Returns number of migration from its name.
+
+    :param migration: migration name.
+
+    :raises WrongMigrationNumberError: if name doesn't start with <number>_.
+
+    :returns: migration number.
+    """
+    try:
+        return int(migration.split("_")[0])
+    except ValueError:
+        raise WrongMigrationNumberError(
+            f"There is migration with wrong number - {migration}\n"
+            f"Migration name must be - <number>_<migration_name>.sql",
+        )
+
+
+class Migration:
+    """
+    Migration file in the catalog.
+
+    Number and path are known from directory listing,
+    version, checksum and offsets of apply statements
+    are known after the file is read or parsed,
+    checksum is None until then.
+    """
+
+    __slots__ = ("number", "name", "path", "version", "checksum", "offsets")
+
+    def __init__(self, number: int, name: str, path: str) -> None:
+        """
+        Initialize the migration.
+
+        :param number: migration number.
+        :param name: file name.
+        :param path: path to the file.
+        """
+        self.number = number
+        self.name = name
+        self.path = path
+        self.version: Optional[str] = None
+        self.checksum: Optional[str] = None
+        self.offsets: Optional[StatementOffsets] = None
+
+    def __repr__(self) -> str:
+        """
+        Returns representation of the migration.
+
+        :returns: representation with name.
+        """
+        return f"Migration({self.name!r})"
+
+    def describe(
+        self,
+        version: Optional[str],
+        checksum: Optional[str],
+        offsets: Optional[StatementOffsets] = None,
+    ) -> None:
+        """
+        Sets what is known from the file content.
+
+        :param version: version of the migration.
+        :param checksum: checksum of the file, None if it is unknown.
+        :param offsets: offsets of apply statements, None if not parsed.
+        """
+        self.version = version
+        self.checksum = checksum
+        self.offsets = offsets
+
+
+class MigrationCatalog:
+    """
+    Migration files of the directory in numeric order.
+
+    Numbers are checked and migrations are sorted
+    once when the catalog is built, lookups by
+    number and name are dict lookups.
+    """
+
+    def __init__(self, migrations: Iterable[Migration]) -> None:
+        """
+        Builds the catalog.
+
+        :param migrations: migrations in any order.
+
+        :raises MigrationNumberRepeatNumberError: migration number duplicates.
+        """
+        self.by_number: Dict[int, Migration] = {}
+        for migration in migrations:
+            if migration.number in self.by_number:
+                raise MigrationNumberRepeatNumberError(
+                    f"There are two or more migrations "
+                    f"with number {migration.number}",
+                )
+            self.by_number[migration.number] = migration
+        self.migrations = [
+            self.by_number[number] for number in sorted(self.by_number)
+        ]
+        self.by_name = {migration.name: migration for migration in self.migrations}
+
+    def __iter__(self) -> Iterator[Migration]:
+        """
+        Iterates over migrations in numeric order.
+
+        :returns: iterator over migrations.
+        """
+        return iter(self.migrations)
+
+    def __len__(self) -> int:
+        """
+        Returns number of migrations.
+
+        :returns: number of migrations.
+        """
+        return len(self.migrations)
+
+    def __contains__(self, migration: object) -> bool:
+        """
+        Checks if there is migration with the name.
+
+        :param migration: migration name.
+
+        :returns: True if migration is in the catalog.
+        """
+        return migration in self.by_name
+
+    @property
+    def names(self) -> List[str]:
+        """
+        Returns names of migrations.
+
+        :returns: names in numeric order.
+        """
+        return [migration.name for migration in self.migrations]
+
+    def get(self, migration: str) -> Optional[Migration]:
+        """
+        Returns migration by name.
+
+        :param migration: migration name.
+
+        :returns: migration or None if there is no such file.
+        """
+        return self.by_name.get(migration)
+
+    def sort(self, migrations: Iterable[str], desc: bool = False) -> List[str]:
+        """
+        Sorts migration names by their numbers.
+
+        Applied migrations which files were removed
+        are sorted by the number from their names.
+
+        :param migrations: migration names.
+        :param desc: reverse or not.
+
+        :returns: sorted names.
+        """
+
+        def get_migration_number(name: str) -> int:  # noqa: WPS430
+            if (migration := self.by_name.get(name)) is not None:
+                return migration.number
+            return migration_number(name)
+
+        return sorted(migrations, key=get_migration_number, reverse=desc)
+
+
+def version_marker(text: str) -> Optional[str]:
+    """
+    Returns version written to the migration after apply.
+
+    :param text: migration text.
+
+    :returns: version or None if migration has no version.
+    """
+    if search_result := VERSION_MARKER_PATTERN.search(text):
+        return search_result.group().split(" ")[1]
+    return None
+
+
+def parse_migration(text: str, checksum: str) -> ParsedMigration:
+    """
+    Parses migration text.
+
+    Transaction mode is taken from `transaction` directive,
+    without it migration runs not in transaction
+    only if its statements can't run in transaction block.
+    Backfill migrations are applied not in transaction,
+    every chunk has its own transaction.
+
+    :param text: migration text.
+    :param checksum: checksum of the migration file.
+
+    :raises ValueError: if transaction or backfill directives are wrong.
+
+    :returns: parsed migration.
+    """
+    version = version_marker(text)
+
+    separator_start = text.find(ROLLBACK_SEPARATOR)
+    rollback_start: Optional[int] = None
+    rollback_statements: StatementOffsets = ()
+    if separator_start == -1:
+        apply_statements = _statement_offsets(text)
+    else:
+        rollback_start = separator_start
+        apply_statements = _statement_offsets(text[:separator_start])
+        rollback_offset = separator_start + len(ROLLBACK_SEPARATOR)
+        rollback_statements = _statement_offsets(
+            text[rollback_offset:],
+            rollback_offset,
+        )
+
+    directives = parse_directives(text)
+    try:
+        in_transaction = directive_flag(dict(directives).get("transaction"))
+    except ValueError as exc:
+        raise ValueError(f"Wrong transaction directive - {exc}") from exc
+    apply_in_transaction = _in_transaction(text, apply_statements, in_transaction)
+    if Backfill.from_directives(directives) is not None:
+        apply_in_transaction = False
+
+    return ParsedMigration(
+        version=version,
+        rollback_start=rollback_start,
+        checksum=checksum,
+        apply_statements=apply_statements,
+        rollback_statements=rollback_statements,
+        directives=directives,
+        apply_in_transaction=apply_in_transaction,
+        rollback_in_transaction=_in_transaction(
+            text,
+            rollback_statements,
+            in_transaction,
+        ),
+    )
+
+
+def migrations_hash(migrations_dir: str) -> str:
+    """
+    Returns hash of all files in migrations directory.
+
+    Hidden files, like parse cache, are skipped.
+
+    :param migrations_dir: directory with migrations.
+
+    :returns: sha256 hex digest.
+    """
+    digest = hashlib.sha256()
+    paths: List[str] = []
+    for root, dirs, files in os.walk(migrations_dir):
+        dirs[:] = [dir_name for dir_name in dirs if not dir_name.startswith(".")]
+        paths.extend(
+            join(root, file_name)
+            for file_name in files
+            if not file_name.startswith(".")
+        )
+    for path in sorted(paths):
+        digest.update(relpath(path, migrations_dir).encode())
+        digest.update(b"\0")
+        with open(path, "rb") as migration_file:
+            digest.update(hashlib.sha256(migration_file.read()).digest())
+    return digest.hexdigest()
+
+
+def _migration_entries(migrations_dir: str) -> List[Tuple[str, str]]:
+    """
+    Lists migration files.
+
+    Hidden files, like parse cache, version manifest
+    and directories are skipped.
+
+    :param migrations_dir: directory with migrations.
+
+    :returns: names and paths of files.
+    """
+    with os.scandir(migrations_dir) as entries:
+        return [
+            (entry.name, entry.path)
+            for entry in entries
+            if not entry.name.startswith(".")
+            and entry.name != MANIFEST_FILE_NAME
+            and entry.is_file()
+        ]
+
+
+def _in_transaction(
+    text: str,
+    offsets: StatementOffsets,
+    in_transaction: Optional[bool],
+) -> bool:
+    """
+    Decides if statements run in transaction.
+
+    :param text: migration text.
+    :param offsets: offsets of statements.
+    :param in_transaction: value of transaction directive.
+
+    :returns: True if statements run in transaction.
+    """
+    if in_transaction is not None:
+        return in_transaction
+    return not requires_autocommit(text[start:end] for start, end in offsets)
+
+
+def _statement_offsets(sql: str, base_offset: int = 0) -> StatementOffsets:
+    """
+    Returns offsets of all statements.
+
+    Copy blocks before statements or at the end of the text
+    are statements too, engines load their data files with COPY.
+
+    :param sql: SQL text.
+    :param base_offset: offset of SQL text in the migration text.
+
+    :returns: tuple with (start, end) of every statement.
+    """
+    copy_blocks = find_copy_blocks(sql)
+    offsets = []
+    for statement in iter_statements(sql):
+        start = statement.start
+        for block_start, block_end in copy_blocks:
+            if start <= block_start < statement.end:
+                if _is_comment(sql[start:block_start]):
+                    offsets.append((block_start, block_end))
+                    next_code = NON_SPACE_PATTERN.search(sql, block_end)
+                    start = next_code.start()  # type: ignore
+        offsets.append((start, statement.end))
+
+    if copy_blocks:
+        last_end = offsets[-1][1] if offsets else 0
+        offsets.extend(block for block in copy_blocks if block[0] >= last_end)
+    return tuple((start + base_offset, end + base_offset) for start, end in offsets)
+
+
+def _is_comment(sql: str) -> bool:
+    """
+    Checks if SQL text has only comments.
+
+    :param sql: SQL text.
+
+    :returns: True if there is no code.
+    """
+    try:
+        return not code_only(sql).strip()
+    except SQLTokenizeError:
+        return False
+
+
+class MigrationParseCache:
+    """
+    Persistent cache of parsed migrations.
+
+    Stores parsed migrations in SQLite file next to migrations.
+    Record is valid while file stat (mtime and size) is the same,
+    if stat was changed but content hash is the same,
+    only stat is updated.
+    """
+
+    format_version = 5
+
+    def __init__(self, cache_path: str) -> None:
+        """
+        Opens cache file, recreates it if format was changed.
+
+        :param cache_path: path to cache file.
+        """
+        self.connection = sqlite3.connect(cache_path, check_same_thread=False)
+        self.connection.execute("PRAGMA synchronous = OFF")
+        (user_version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if user_version != self.format_version:
+            self.connection.execute("DROP TABLE IF EXISTS parsed_migrations")
+            self.connection.execute(
+                f"PRAGMA user_version = {self.format_version}",
+            )
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parsed_migrations (
+                name TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                checksum TEXT NOT NULL,
+                parsed TEXT NOT NULL
+            )
+            """,
+        )
+
+    def get(
+        self,
+        name: str,
+    ) -> Optional[Tuple[int, int, ParsedMigration]]:
+        """
+        Returns cached record.
+
+        :param name: migration name.
+
+        :returns: mtime, size and parsed migration or None.
+        """
+        record = self.connection.execute(
+            "SELECT mtime_ns, size, parsed FROM parsed_migrations WHERE name = ?",
+            (name,),
+        ).fetchone()
+        if record is None:
+            return None
+        mtime_ns, size, parsed = record
+        (  # noqa: WPS236
+            version,
+            rollback_start,
+            checksum,
+            apply_statements,
+            rollback_statements,
+            directives,
+            apply_in_transaction,
+            rollback_in_transaction,
+        ) = json.loads(parsed)
+        return (
+            mtime_ns,
+            size,
+            ParsedMigration(
+                version=version,
+                rollback_start=rollback_start,
+                checksum=checksum,
+                apply_statements=tuple(map(tuple, apply_statements)),
+                rollback_statements=tuple(map(tuple, rollback_statements)),
+                directives=tuple(map(tuple, directives)),
+                apply_in_transaction=apply_in_transaction,
+                rollback_in_transaction=rollback_in_transaction,
+            ),
+        )
+
+    def put(
+        self,
+        name: str,
+        stat_result: os.stat_result,
+        parsed_migration: ParsedMigration,
+    ) -> None:
+        """
+        Stores parsed migration.
+
+        :param name: migration name.
+        :param stat_result: stat of migration file.
+        :param parsed_migration: parsed migration.
+        """
+        self.connection.execute(
+            "INSERT OR REPLACE INTO parsed_migrations VALUES (?, ?, ?, ?, ?)",
+            (
+                name,
+                stat_result.st_mtime_ns,
+                stat_result.st_size,
+                parsed_migration.checksum,
+                json.dumps(parsed_migration),
+            ),
+        )
+
+    def flush(self) -> None:
+        """Commits changes to the cache file."""
+        self.connection.commit()
+
+    def close(self) -> None:
+        """Commits changes and closes cache file."""
+        self.flush()
+        self.connection.close()
+
+
+class MigrationFileReader:
+    """
+    Reads and parses migration files.
+
+    Every file is parsed at most once per run.
+    With persistent cache, files that were not changed
+    since the previous run are not read at all.
+
+    Reader keeps catalog of migration files, the directory
+    is listed once, until the catalog is invalidated
+    after migration files are changed.
+
+    With version manifest, versions are taken from it
+    instead of markers in migration files.
+    Until the manifest is written, markers are used,
+    the first write converts them into the manifest.
+
+    One reader can be shared between threads,
+    lock must be held to change migration files.
+    """
+
+    def __init__(
+        self,
+        migrations_dir: str,
+        parse_cache: bool = False,
+        version_manifest: bool = False,
+    ) -> None:
+        """
+        Initialize the reader.
+
+        :param migrations_dir: path to the directory with migration files.
+        :param parse_cache: use persistent parse cache or not.
+        :param version_manifest: keep versions in manifest file or not.
+        """
+        self.migrations_dir = migrations_dir
+        self.cache: Optional[MigrationParseCache] = None
+        if parse_cache:
+            self.cache = MigrationParseCache(join(migrations_dir, CACHE_FILE_NAME))
+        self.manifest: Optional[VersionManifest] = None
+        if version_manifest:
+            self.manifest = VersionManifest(join(migrations_dir, MANIFEST_FILE_NAME))
+        self._parsed: Dict[str, ParsedMigration] = {}
+        self._catalog: Optional[MigrationCatalog] = None
+        self._catalog_is_valid = False
+        self.lock = threading.RLock()
+
+    def catalog(self) -> MigrationCatalog:
+        """
+        Returns catalog of migration files.
+
+        Catalog is built on the first call and after
+        invalidate_catalog, migrations that were in
+        the previous catalog keep what is known about their content.
+
+        :returns: catalog.
+        """
+        with self.lock:
+            previous = self._catalog
+            if previous is not None and self._catalog_is_valid:
+                return previous
+            entries = _migration_entries(self.migrations_dir)
+            if previous is not None and previous.by_name.keys() == {
+                name for name, _ in entries
+            }:
+                self._catalog_is_valid = True
+                return previous
+            catalog = MigrationCatalog(
+                Migration(migration_number(name), name, path)
+                for name, path in entries
+            )
+            for migration in catalog:
+                known = previous and previous.get(migration.name)
+                if known and known.checksum is not None:
+                    migration.describe(known.version, known.checksum, known.offsets)
+                elif parsed_migration := self._parsed.get(migration.name):
+                    migration.describe(
+                        parsed_migration.version,
+                        parsed_migration.checksum,
+                        parsed_migration.apply_statements,
+                    )
+            self._catalog = catalog
+            self._catalog_is_valid = True
+            return catalog
+
+    def invalidate_catalog(self) -> None:
+        """
+        Lists the directory again on the next catalog call.
+
+        Must be called after migration files are added,
+        removed, renamed or get versions.
+        """
+        with self.lock:
+            self._catalog_is_valid = False
+
+    def get(self, migration: str) -> ParsedMigration:
+        """
+        Returns parsed migration.
+
+        :param migration: migration name.
+
+        :returns: parsed migration.
+        """
+        with self.lock:
+            return self._get(migration)
+
+    def _get(self, migration: str) -> ParsedMigration:
+        """
+        Returns parsed migration without lock.
+
+        :param migration: migration name.
+
+        :returns: parsed migration.
+        """
+        if migration in self._parsed:
+            return self._parsed[migration]
+
+        if self.cache is None:
+            return self._read(migration)[1]
+
+        stat_result = os.stat(join(self.migrations_dir, migration))
+        cached = self.cache.get(migration)
+        if cached is None:
+            return self._read(migration)[1]
+
+        mtime_ns, size, parsed_migration = cached
+        if (mtime_ns, size) == (stat_result.st_mtime_ns, stat_result.st_size):
+            self._parsed[migration] = parsed_migration
+            return parsed_migration
+        return self._read(migration, parsed_migration)[1]
+
+    def read(
+        self,
+        migration: str,
+        cached_migration: Optional[ParsedMigration] = None,
+    ) -> Tuple[str, ParsedMigration]:
+        """
+        Reads migration file and parses it if needed.
+
+        Migration is not parsed again if its checksum
+        is the same as checksum of already parsed one.
+
+        :param migration: migration name.
+        :param cached_migration: parsed migration from persistent cache.
+
+        :returns: migration text and parsed migration.
+        """
+        with self.lock:
+            return self._read(migration, cached_migration)
+
+    def _read(
+        self,
+        migration: str,
+        cached_migration: Optional[ParsedMigration] = None,
+    ) -> Tuple[str, ParsedMigration]:
+        """
+        Reads migration file without lock.
+
+        :param migration: migration name.
+        :param cached_migration: parsed migration from persistent cache.
+
+        :returns: migration text and parsed migration.
+        """
+        path = join(self.migrations_dir, migration)
+        with open(path, "rb") as migration_file:
+            raw_text = migration_file.read()
+        checksum = hashlib.sha256(raw_text).hexdigest()
+        text = raw_text.decode()
+
+        parsed_migration = self._parsed.get(migration, cached_migration)
+        if parsed_migration is not None and parsed_migration.checksum == checksum:
+            if migration not in self._parsed:
+                self._store(migration, path, parsed_migration)
+            return text, parsed_migration
+
+        parsed_migration = parse_migration(text, checksum)
+        self._store(migration, path, parsed_migration)
+        return text, parsed_migration
+
+    def _store(
+        self,
+        migration: str,
+        path: str,
+        parsed_migration: ParsedMigration,
+    ) -> None:
+        """
+        Remembers parsed migration for this run and in persistent cache.
+
+        :param migration: migration name.
+        :param path: path to migration file.
+        :param parsed_migration: parsed migration.
+        """
+        self._parsed[migration] = parsed_migration
+        self._describe(
+            migration,
+            parsed_migration.version,
+            parsed_migration.checksum,
+            parsed_migration.apply_statements,
+        )
+        if self.cache is not None:
+            self.cache.put(migration, os.stat(path), parsed_migration)
+
+    def _describe(
+        self,
+        migration: str,
+        version: Optional[str],
+        checksum: Optional[str],
+        offsets: Optional[StatementOffsets] = None,
+    ) -> None:
+        """
+        Updates migration in the catalog.
+
+        Files that are not in the catalog, like baselines, are skipped.
+
+        :param migration: migration name.
+        :param version: version of the migration.
+        :param checksum: checksum of the file, None if it is unknown.
+        :param offsets: offsets of apply statements, None if not parsed.
+        """
+        if self._catalog is None:
+            return
+        if (catalog_migration := self._catalog.get(migration)) is not None:
+            catalog_migration.describe(version, checksum, offsets)
+
+    def identity(self, migration: str) -> Tuple[Optional[str], str]:
+        """
+        Returns version and checksum of migration.
+
+        With persistent cache the migration is parsed and stored,
+        so the next run needs only stat of the file.
+        Without it the file is hashed, not parsed,
+        and the result is kept in the catalog.
+
+        :param migration: migration name.
+
+        :returns: version and checksum.
+        """
+        version, checksum = self._identity(migration)
+        if self._uses_manifest():
+            return self.manifest.get(migration), checksum  # type: ignore
+        return version, checksum
+
+    def _identity(self, migration: str) -> Tuple[Optional[str], str]:
+        """
+        Returns version from the file and checksum of migration.
+
+        :param migration: migration name.
+
+        :returns: version and checksum.
+        """
+        with self.lock:
+            if self.cache is not None or migration in self._parsed:
+                parsed_migration = self._get(migration)
+                return parsed_migration.version, parsed_migration.checksum
+            catalog_migration = self._catalog and self._catalog.get(migration)
+            if catalog_migration and catalog_migration.checksum is not None:
+                return catalog_migration.version, catalog_migration.checksum
+            with open(join(self.migrations_dir, migration), "rb") as migration_file:
+                raw_text = migration_file.read()
+            version = version_marker(raw_text.decode())
+            checksum = hashlib.sha256(raw_text).hexdigest()
+            self._describe(migration, version, checksum)
+        return version, checksum
+
+    def fingerprint(self, migrations: Iterable[str]) -> str:
+        """
+        Returns fingerprint of migration set.
+
+        Fingerprint changes if any migration is added,
+        removed, renamed, changed or gets a version.
+
+        :param migrations: migration names.
+
+        :returns: sha256 hex digest.
+        """
+        digest = hashlib.sha256()
+        for migration in migrations:
+            version, checksum = self.identity(migration)
+            digest.update(f"{migration}\0{version or ''}\0{checksum}\n".encode())
+        return digest.hexdigest()
+
+    def stat_fingerprint(self, migrations: Iterable[str]) -> str:
+        """
+        Returns fingerprint of migration set from file stats.
+
+        Only stat of every file is needed, size and mtime
+        change when a file is changed or gets a version marker.
+        Stat of the version manifest is included if it is used.
+
+        :param migrations: migration names.
+
+        :returns: sha256 hex digest.
+        """
+        digest = hashlib.sha256()
+        paths = [join(self.migrations_dir, migration) for migration in migrations]
+        if self._uses_manifest():
+            paths.append(self.manifest.path)  # type: ignore
+        for path in paths:
+            stat_result = os.stat(path)
+            digest.update(
+                f"{relpath(path, self.migrations_dir)}\0{stat_result.st_size}"
+                f"\0{stat_result.st_mtime_ns}\n".encode(),
+            )
+        return digest.hexdigest()
+
+    def version(self, migration: str) -> Optional[str]:
+        """
+        Returns version of migration.
+
+        With written manifest the file is not read.
+
+        :param migration: migration name.
+
+        :returns: version or None if migration has no version.
+        """
+        if self._uses_manifest():
+            return self.manifest.get(migration)  # type: ignore
+        return self.get(migration).version
+
+    def add_versions(self, migrations: Iterable[str], version: str) -> None:
+        """
+        Writes version of applied migrations to the manifest.
+
+        Migrations that already have a version keep it.
+        If there is no manifest yet, versions from markers
+        in migration files are written to it too.
+
+        :param migrations: applied migrations.
+        :param version: version of migrations.
+        """
+        with self.lock:
+            versions = self._manifest_versions()
+            for migration in migrations:
+                versions.setdefault(migration, version)
+            self._write_manifest(versions)
+
+    def convert_to_manifest(self) -> int:
+        """
+        Writes versions from markers in migration files to the manifest.
+
+        Manifest is written even if the reader doesn't use it,
+        markers are kept in migration files.
+
+        :raises VersionManifestError: if manifest already exists.
+
+        :returns: number of migrations with version.
+        """
+        with self.lock:
+            manifest = self.manifest
+            self.manifest = VersionManifest(
+                join(self.migrations_dir, MANIFEST_FILE_NAME),
+            )
+            if self.manifest.exists():
+                path = self.manifest.path
+                self.manifest = manifest
+                raise VersionManifestError(f"{path} already exists.")
+            try:
+                versions = self._marker_versions()
+                self._write_manifest(versions)
+            finally:
+                self.manifest = manifest
+        return len(versions)
+
+    def _uses_manifest(self) -> bool:
+        """
+        Checks if versions are taken from the manifest.
+
+        :returns: True if manifest is enabled and written.
+        """
+        return self.manifest is not None and self.manifest.exists()
+
+    def _manifest_versions(self) -> Dict[str, str]:
+        """
+        Returns versions for the next manifest.
+
+        :returns: versions from the manifest or from markers if it doesn't exist.
+        """
+        if self._uses_manifest():
+            return dict(self.manifest.versions())  # type: ignore
+        return self._marker_versions()
+
+    def _marker_versions(self) -> Dict[str, str]:
+        """
+        Returns versions from markers in migration files.
+
+        :returns: dict with migration names and versions.
+        """
+        versions = {}
+        for catalog_migration in self.catalog():
+            if marker := self._get(catalog_migration.name).version:
+                versions[catalog_migration.name] = marker
+        return versions
+
+    def _write_manifest(self, versions: Dict[str, str]) -> None:
+        """
+        Writes manifest with migrations in numeric order.
+
+        :param versions: dict with migration names and versions.
+        """
+        self.manifest.write(  # type: ignore
+            (migration, versions[migration])
+            for migration in self.catalog().sort(versions)
+        )
+
+    def forget(self, migration: str) -> None:
+        """
+        Drops parsed migration after the file was changed.
+
+        :param migration: migration name.
+        """
+        with self.lock:
+            self._parsed.pop(migration, None)
+            self._describe(migration, None, None)
+
+    def flush(self) -> None:
+        """Saves parsed migrations into persistent cache."""
+        with self.lock:
+            if self.cache is not None:
+                self.cache.flush()
+
+    def close(self) -> None:
+        """Closes persistent cache."""
+        with self.lock:
+            if self.cache is not None:
+                self.cache.close()
+                self.cache = None
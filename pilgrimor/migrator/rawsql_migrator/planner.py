@@ -0,0 +1,766 @@
+import socket
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pilgrimor.exceptions import (
+    BiggerVersionsExistsError,
+    IncorrectMigrationHistoryError,
+    NoNewMigrationsError,
+    VersionAlreadyExistsError,
+)
+from pilgrimor.migrator.plan import (
+    STEP_APPLY,
+    STEP_BASELINE,
+    STEP_ROLLBACK,
+    plan_step,
+)
+from pilgrimor.migrator.rawsql_migrator.baseline import Baseline, find_baseline
+from pilgrimor.migrator.rawsql_migrator.migration_files import MigrationFileReader
+from pilgrimor.migrator.state import MigrationStateSnapshot
+from pilgrimor.migrator.system_table import (
+    HISTORY_SCHEMA_VERSION,
+    META_SCHEMA_VERSION,
+    VERSION_KEY_SCHEMA_VERSION,
+    SystemTable,
+    history_insert_command,
+    migration_checksum,
+    parse_schema_version,
+    save_fingerprint_command,
+    start_mark_command,
+)
+from pilgrimor.migrator.version_key import version_key
+from pilgrimor.profiler import Profiler
+from pilgrimor.sql.backfill import Backfill
+from pilgrimor.sql.dependencies import build_dependencies, touched_objects
+from pilgrimor.sql.directives import session_settings
+from pilgrimor.utils import attention_text, error_text, warning_text
+
+
+class RawSQLPlanner:
+    """
+    Planning part of migrators for .sql files.
+
+    Reads migration files and decides what must be executed,
+    the database is known only through the state snapshot,
+    so the same planner works with sync and async engines.
+    """
+
+    migrations_dir: str
+    system_table: SystemTable
+    migration_files: MigrationFileReader
+    state: MigrationStateSnapshot
+    profiler: Profiler
+    write_versions: bool
+
+    def _get_migrations_with_version(self, version: str) -> List[str]:
+        """
+        Returns new migrations.
+
+        Workflow:
+        Firstly, check is version already exists,
+        if yes print error message and stop the migrator.
+        Secondly, check is version bigger exists,
+        if yes, print what version(s) is bigger and
+        stop the migrator.
+        Thirdly, get migration to apply, if there are no new
+        migrations print attention message and stop the migrator.
+        Fourth, get apply commands, because every migration
+        file must have `apply` and `rollback` sections.
+        Fifth, apply new migrations and create new record in
+        pilgrimor table.
+
+        :param version: version for new migrations.
+
+        :raises VersionAlreadyExistsError: if version is already exists.
+        :raises BiggerVersionsExistsError: if bigger versions are exists.
+        :raises NoNewMigrationsError: if no new migrations.
+
+        :returns: migrations that will be applied.
+        """
+        if self._is_version_exists(version=version):
+            raise VersionAlreadyExistsError(
+                f"Version {version} already exists. Please choose another one.",
+            )
+        if bigger_versions := self._is_version_bigger_exists(version=version):
+            raise BiggerVersionsExistsError(
+                f"There are bigger versions - {', '.join(bigger_versions)}"
+                f"Please choose another version.",
+            )
+
+        if not (to_apply_migrations := self._get_to_apply_migrations()):
+            raise NoNewMigrationsError("There are no new migrations to apply.")
+
+        return list(to_apply_migrations)
+
+    def _get_exist_migrations(self) -> Dict[str, List[str]]:  # noqa: WPS210
+        """
+        Returns migrations with a known version.
+
+        Iterate through the existing migration files
+        and try to find an indication of which
+        version this migration is linked to.
+
+        In case a situation arises when the previous
+        migration did not have a version,
+        but the one we are considering has,
+        stop the migration and report
+        that the migration history is incorrect
+
+        :raises IncorrectMigrationHistoryError: if incorrect migration history.
+
+        :returns: Dict with keys as version and value as list of migrations.
+        """
+        is_previous_migration_has_version = True
+        to_apply_migration: Dict[str, List[str]] = {}
+
+        for catalog_migration in self.migration_files.catalog():
+            migration = catalog_migration.name
+            migration_version = self.migration_files.version(migration)
+            if migration_version:
+                if not is_previous_migration_has_version:
+                    raise IncorrectMigrationHistoryError(
+                        "Incorrect migration history",
+                    )
+                to_apply_migration.setdefault(
+                    migration_version,
+                    [],
+                ).append(migration)
+                is_previous_migration_has_version = True
+            else:
+                is_previous_migration_has_version = False
+
+        self.migration_files.flush()
+        return to_apply_migration
+
+    def _get_rollback_migration_by_version(self, version: str) -> List[str]:
+        """
+        Rolls back migrations to specified version.
+
+        :param version: version to which it is rolled back
+
+        :raises VersionAlreadyExistsError: if version is already exists.
+
+        :returns: migrations by selected version.
+        """
+        if not self._is_version_exists(version=version):
+            raise VersionAlreadyExistsError(
+                f"Can't find version - {version} in migrations. "
+                f"Please choose another one.",
+            )
+
+        return self._get_migrations_by_version(version=version)
+
+    def _get_rollback_migration_query(
+        self,
+        migration: str,
+    ) -> Tuple[str, List[str]]:
+        """
+        Return full rollback migration query with technical table record.
+
+        :param migration: rollback migration.
+
+        :returns: full migration query and its statements.
+        """
+        query, parsed_migration = self.migration_files.read(migration)
+        rollback_query = parsed_migration.rollback_query(query)
+        if rollback_query is None:
+            print(
+                warning_text(
+                    f"You don't split apply and rollback "
+                    f"context in migration {migration}."
+                    f"Can't rollback this migration.",
+                ),
+            )
+            return "", []
+        return (
+            self._drop_migration_from_system_table(
+                rollback_query,
+                migration,
+            ),
+            [
+                *parsed_migration.statements(query, rollback=True),
+                self._get_drop_system_command(migration),
+            ],
+        )
+
+    def _get_apply_migration_query(
+        self,
+        migration: str,
+        version: str,
+    ) -> Tuple[str, List[str]]:
+        """
+        Return full apply migration query with technical table record.
+
+        :param migration: rollback migration.
+        :param version: migration version.
+
+        :returns: full migration query and its statements.
+        """
+        query, parsed_migration = self.migration_files.read(migration)
+        if parsed_migration.rollback_start is None:
+            print(
+                warning_text(
+                    f"You don't split apply and rollback context in migration "
+                    f"{migration}. All commands will be applied.",
+                ),
+            )
+        apply_query = parsed_migration.apply_query(query)
+        statements = parsed_migration.statements(query)
+        if self.state.schema_version < HISTORY_SCHEMA_VERSION:
+            return (
+                self._add_migration_to_system_table(
+                    apply_query,
+                    migration,
+                    version,
+                ),
+                [*statements, self._get_insert_system_command(migration, version)],
+            )
+
+        in_transaction = parsed_migration.apply_in_transaction
+        start_command = start_mark_command(in_transaction)
+        system_command = history_insert_command(
+            migration,
+            version,
+            migration_checksum(apply_query),
+            socket.gethostname(),
+            in_transaction,
+            key=self._get_version_key(version),
+        )
+        return (
+            f"{start_command};\n{apply_query}\n{system_command};\n",
+            [start_command, *statements, system_command],
+        )
+
+    def _get_baseline(self) -> Optional[Baseline]:
+        """
+        Returns baseline if the database is fresh.
+
+        Database that has any applied migration
+        is never changed by a baseline.
+
+        :returns: the newest baseline or None.
+        """
+        if self.state.applied_names:
+            return None
+        return find_baseline(self.migrations_dir)
+
+    def _get_baseline_migration(self, baseline: Baseline) -> Dict[str, Any]:
+        """
+        Returns baseline as migration dict.
+
+        Baseline statements are followed by records
+        of all covered migrations in pilgrimor table.
+
+        :param baseline: baseline.
+
+        :returns: migration dict.
+        """
+        query, parsed_baseline = self.migration_files.read(baseline.name)
+        system_commands = [
+            self._get_insert_system_command(migration, version)
+            for migration, version in baseline.covered
+        ]
+        return {
+            "migration": baseline.name,
+            "query": "{0}\n{1};\n".format(query, ";\n".join(system_commands)),
+            "statements": [*parsed_baseline.statements(query), *system_commands],
+            "in_transaction": True,
+            "settings": {},
+            "base_dir": self.migrations_dir,
+        }
+
+    def _get_plan_steps(
+        self,
+        command: str,
+        version: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns steps that apply or rollback command would execute.
+
+        State snapshot is changed like after execution
+        of every step, so it must be reloaded after planning.
+
+        :param command: apply or rollback.
+        :param version: version of new migrations or version to rollback to,
+            rollback without version plans the last applied version.
+
+        :returns: steps of the plan.
+        """
+        if command == STEP_ROLLBACK:
+            return [self._get_rollback_plan_step(version)]
+
+        steps = []
+        if (baseline := self._get_baseline()) is not None:
+            steps.append(self._get_baseline_plan_step(baseline))
+
+        if version:
+            exist_migrations = {version: self._get_migrations_with_version(version)}
+        else:
+            exist_migrations = self._get_exist_migrations()
+        for m_version, migrations in exist_migrations.items():
+            if not (to_apply_migrations := self.state.not_applied(migrations)):
+                continue
+            version_migrations, _ = self._get_version_migrations(
+                to_apply_migrations,
+                is_rollback=False,
+                version=m_version,
+            )
+            steps.append(
+                plan_step(
+                    STEP_APPLY,
+                    m_version,
+                    to_apply_migrations,
+                    version_migrations,
+                ),
+            )
+            self.state.add(to_apply_migrations, m_version)
+        return steps
+
+    def _get_rollback_plan_step(self, version: Optional[str]) -> Dict[str, Any]:
+        """
+        Returns step that rollback command would execute.
+
+        :param version: version to rollback to,
+            without version the last applied version is planned.
+
+        :returns: rollback step.
+        """
+        if version:
+            migrations = self._get_rollback_migration_by_version(version)
+        else:
+            migrations = self._get_last_applied_migrations()
+        version_migrations, _ = self._get_version_migrations(
+            migrations,
+            is_rollback=True,
+        )
+        self.state.remove(migrations)
+        return plan_step(STEP_ROLLBACK, None, migrations, version_migrations)
+
+    def _get_baseline_plan_step(self, baseline: Baseline) -> Dict[str, Any]:
+        """
+        Returns step that applies baseline to empty database.
+
+        :param baseline: baseline migration.
+
+        :returns: baseline step with covered migrations.
+        """
+        baseline_step = plan_step(
+            STEP_BASELINE,
+            baseline.version,
+            [migration for migration, _ in baseline.covered],
+            [self._get_baseline_migration(baseline)],
+        )
+        baseline_step["covered"] = [list(covered) for covered in baseline.covered]
+        for migration, covered_version in baseline.covered:
+            self.state.add([migration], covered_version)
+        return baseline_step
+
+    def _get_version_migrations(  # noqa: WPS234
+        self,
+        migrations: List[str],
+        is_rollback: bool,
+        version: str = "",
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Confirm list with migrations data.
+
+        :param is_rollback: rollback or apply migrations.
+        :param migrations: List of migration to apply.
+        :param version: migration version.
+        :returns: list of dicts with migrations and is_concurrently flag,
+            is_concurrently is True if any migration runs not in transaction.
+        """
+        version_migrations = []
+        for migration in migrations:
+            version_migration = self._get_version_migration(
+                migration,
+                is_rollback,
+                version,
+            )
+            if version_migration is not None:
+                version_migrations.append(version_migration)
+        concurrent_migrations = [
+            version_migration
+            for version_migration in version_migrations
+            if not version_migration["in_transaction"]
+        ]
+        if concurrent_migrations:
+            self._add_migration_dependencies(concurrent_migrations)
+        self.migration_files.flush()
+        return version_migrations, bool(concurrent_migrations)
+
+    def _get_version_migration(
+        self,
+        migration: str,
+        is_rollback: bool,
+        version: str = "",
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Returns data of one migration to execute.
+
+        Backfill statements are executed in chunks,
+        so they are moved from statements to backfill_statements.
+
+        :param migration: migration name.
+        :param is_rollback: rollback or apply migration.
+        :param version: migration version.
+
+        :returns: dict with migration data or None if rollback is empty.
+        """
+        if is_rollback:
+            to_execute_query, statements = self._get_rollback_migration_query(
+                migration,
+            )
+        else:
+            to_execute_query, statements = self._get_apply_migration_query(
+                migration,
+                version,
+            )
+        if not to_execute_query:
+            return None
+
+        parsed_migration = self.migration_files.get(migration)
+        in_transaction = parsed_migration.apply_in_transaction
+        if is_rollback:
+            in_transaction = parsed_migration.rollback_in_transaction
+        version_migration = {
+            "migration": migration,
+            "query": to_execute_query,
+            "statements": statements,
+            "in_transaction": in_transaction,
+            "settings": session_settings(parsed_migration.directives),
+            "base_dir": self.migrations_dir,
+        }
+        backfill = Backfill.from_directives(parsed_migration.directives)
+        if backfill is not None and not is_rollback:
+            system_start = int(self.state.schema_version >= HISTORY_SCHEMA_VERSION)
+            version_migration["backfill"] = backfill
+            version_migration["backfill_statements"] = statements[system_start:-1]
+            version_migration["statements"] = [
+                *statements[:system_start],
+                statements[-1],
+            ]
+        return version_migration
+
+    def _add_migration_dependencies(
+        self,
+        version_migrations: List[Dict[str, Any]],
+    ) -> None:
+        """
+        Adds `depends_on` key to migrations executed not in transaction.
+
+        Dependencies are declared with
+        `-- pilgrimor: depends_on=1_a.sql,2_b.sql` directive
+        or found by tables and indexes used by migrations.
+        The last statement (pilgrimor system table command)
+        is not used to find dependencies.
+
+        :param version_migrations: list of dicts with migrations data.
+        """
+        migrations = [migration["migration"] for migration in version_migrations]
+        objects = {
+            migration["migration"]: touched_objects(
+                migration.get("backfill_statements", migration["statements"][:-1]),
+            )
+            for migration in version_migrations
+        }
+        declared = {}
+        for migration in migrations:
+            depends_on = self.migration_files.get(migration).directive("depends_on")
+            if depends_on:
+                declared[migration] = frozenset(
+                    name.strip() for name in depends_on.split(",") if name.strip()
+                )
+        dependencies = build_dependencies(migrations, objects, declared)
+        for version_migration in version_migrations:
+            version_migration["depends_on"] = dependencies[
+                version_migration["migration"]
+            ]
+
+    def _get_to_apply_migrations(self) -> List[str]:
+        """
+        Gets new migrations.
+
+        :returns: not applied migrations in numeric order.
+        """
+        return self.state.not_applied(self._get_migration_files())
+
+    def _matches_fingerprint(self, saved: Optional[List[Any]]) -> bool:
+        """
+        Compares the directory with fingerprint saved by the last apply.
+
+        If stats of migration files are the same as after
+        the last apply, files are not read. Otherwise,
+        for example in another checkout, contents are hashed.
+
+        :param saved: result of fingerprint query of the system table,
+            comment of pilgrimor table and saved fingerprint.
+
+        :returns: True if the directory was fully applied.
+        """
+        if not saved:
+            return False
+        comment, saved_fingerprint = saved
+        if parse_schema_version(comment) < META_SCHEMA_VERSION:
+            return False
+        fingerprint, _, stat_fingerprint = str(saved_fingerprint).partition(" ")
+        migrations = self._get_migration_files()
+        if stat_fingerprint == self.migration_files.stat_fingerprint(migrations):
+            return True
+        return fingerprint == self.migration_files.fingerprint(migrations)
+
+    def _get_save_fingerprint_command(self) -> Optional[str]:
+        """
+        Returns query that saves fingerprint of the directory.
+
+        :returns: query or None if pilgrimor_meta doesn't exist
+            or something is pending.
+        """
+        if self.state.schema_version < META_SCHEMA_VERSION:
+            return None
+        if self._get_to_apply_migrations():
+            return None
+        migrations = self._get_migration_files()
+        return save_fingerprint_command(
+            self.migration_files.fingerprint(migrations),
+            self.migration_files.stat_fingerprint(migrations),
+        )
+
+    def _refresh_migration_files(self) -> None:
+        """Makes the catalog of migration files be listed again."""
+        self.migration_files.invalidate_catalog()
+
+    def _get_migration_files(self) -> List[str]:
+        """
+        Returns all migration files.
+
+        :returns: list with migrations in numeric order.
+        """
+        return self.migration_files.catalog().names
+
+    def _get_applied_migrations(self) -> List[str]:
+        """
+        Returns all applied migrations from state snapshot.
+
+        :returns: list with migrations.
+        """
+        return self.state.applied_names
+
+    def _get_last_applied_migrations(self) -> List[str]:
+        """
+        Returns last applied migrations.
+
+        :returns: set of last applied migrations.
+        """
+        return self._sort_migrations(
+            self.state.last_version_migrations(),
+            desc=True,
+        )
+
+    def _get_migrations_by_version(self, version: str) -> List[str]:
+        """
+        Returns all migrations by version.
+
+        :param version: migration version.
+
+        :returns: set with migratons.
+        """
+        return self._sort_migrations(
+            self.state.migrations_since_version(version),
+            desc=True,
+        )
+
+    def _is_version_exists(self, version: str) -> bool:
+        """
+        Checks is version exists.
+
+        :param version: version number.
+
+        :returns: True if version exists else False.
+        """
+        return self.state.is_version_exists(version)
+
+    def _is_version_bigger_exists(
+        self,
+        version: str,
+    ) -> Optional[Tuple[str, ...]]:
+        """
+        Checks if there are migrations higher in version than the specified one.
+
+        If yes then return tuple with versions
+        that are higher than the specified one.
+        Else return None.
+
+        :param version: version of new migrations.
+
+        :returns: tuple with versions or None.
+        """
+        return self.state.bigger_versions(version)
+
+    def _sort_migrations(
+        self,
+        migrations: Iterable[str],
+        desc: bool = False,
+    ) -> List[str]:
+        """
+        Sort migrations by their numbers.
+
+        :param migrations: List of migrations.
+        :param desc: reverse or not.
+
+        :returns: sorted list of migrations
+        """
+        return self.migration_files.catalog().sort(migrations, desc=desc)
+
+    def _add_migration_to_system_table(
+        self,
+        query: str,
+        migration: str,
+        version: str,
+    ) -> str:
+        """
+        Inserts new migration to pilgrimor database.
+
+        :param query: query from migration.
+        :param migration: migration.
+        :param version: version.
+
+        :returns: query
+        """
+        system_command = self._get_insert_system_command(migration, version)
+        return "{0}{1}{2};\n".format(query, "\n", system_command)
+
+    def _get_insert_system_command(self, migration: str, version: str) -> str:
+        """
+        Returns query that inserts migration to pilgrimor table.
+
+        :param migration: migration.
+        :param version: version.
+
+        :returns: query without semicolon.
+        """
+        if (key := self._get_version_key(version)) is not None:
+            return f"""
+        INSERT INTO pilgrimor (name, version, version_key)
+        VALUES ('{migration}', '{version}', '{key}')
+        """.strip()
+        return f"""
+        INSERT INTO pilgrimor (name, version)
+        VALUES ('{migration}', '{version}')
+        """.strip()
+
+    def _get_version_key(self, version: str) -> Optional[str]:
+        """
+        Returns version key for pilgrimor table.
+
+        :param version: version.
+
+        :returns: version key or None if the table has no version_key.
+        """
+        if self.state.schema_version < VERSION_KEY_SCHEMA_VERSION:
+            return None
+        return version_key(version)
+
+    def _drop_migration_from_system_table(
+        self,
+        query: str,
+        migration: str,
+    ) -> str:
+        """
+        Drop migration from pilgrimor database.
+
+        :param query: query from migration.
+        :param migration: migration.
+
+        :returns: query
+        """
+        system_command = self._get_drop_system_command(migration)
+        return "{0}{1}{2};\n".format(query, "\n", system_command)
+
+    def _get_drop_system_command(self, migration: str) -> str:
+        """
+        Returns query that drops migration from pilgrimor table.
+
+        :param migration: migration.
+
+        :returns: query without semicolon.
+        """
+        return f"""
+        DELETE FROM pilgrimor
+        WHERE name = '{migration}'
+        """.strip()
+
+    def _add_version_to_migration_file(
+        self,
+        migrations: List[str],
+        version: str,
+    ) -> None:
+        """
+        Adds migration version to migration file.
+
+        With version manifest, versions of all migrations
+        are written to it at once instead.
+
+        :param migrations: List of migration to apply.
+        :param version: migration version.
+        """
+        if self.migration_files.manifest is not None:
+            self.migration_files.add_versions(migrations, version)
+            return
+        catalog = self.migration_files.catalog()
+        with self.migration_files.lock:
+            for migration in migrations:
+                if self.migration_files.get(migration).version is not None:
+                    continue
+                with open(catalog.by_name[migration].path, "a") as migration_file:
+                    migration_file.write(
+                        f"\n-- pilgrimore_version {version} -- \n",
+                    )
+                self.migration_files.forget(migration)
+                self.migration_files.get(migration)
+            self.migration_files.invalidate_catalog()
+            self.migration_files.flush()
+
+    def _get_upgrade_query(self, state: MigrationStateSnapshot) -> Optional[str]:
+        """
+        Returns query that upgrades pilgrimor table to the latest schema.
+
+        :param state: state of pilgrimor table.
+
+        :returns: query or None if the table is already upgraded.
+        """
+        query = self.system_table.upgrade_query(
+            state.schema_version,
+            list(state.names_by_version),
+        )
+        if not query:
+            print(attention_text("Database is already upgraded."))
+        return query
+
+    def _add_versions(self, migrations: List[str], version: str) -> bool:
+        """
+        Adds version to applied migration files if versions are written.
+
+        :param migrations: applied migrations.
+        :param version: migration version.
+
+        :returns: False if versions can't be written
+            and applied migrations must be rolled back.
+        """
+        if not self.write_versions:
+            return True
+        try:
+            with self.profiler.phase("write versions"):
+                self._add_version_to_migration_file(
+                    migrations=migrations,
+                    version=version,
+                )
+        except Exception as exc:
+            print(
+                error_text(
+                    f"Can't set version in migration file\n"
+                    f"Rolling back migrations {migrations}\n"
+                    f"Reason - {exc}",
+                ),
+            )
+            return False
+        return True
@@ -1,245 +1,280 @@
-import re
-from os import listdir
-from os.path import isfile, join
-from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
-
-from packaging.version import parse as version_parse
+from typing import Any, Dict, List, Optional
 
+from pilgrimor.abc.engine import PilgrimoreEngine
 from pilgrimor.abc.migrator import BaseMigrator
 from pilgrimor.exceptions import (
-    BiggerVersionsExistsError,
-    IncorrectMigrationHistoryError,
-    MigrationNumberRepeatNumberError,
-    NoNewMigrationsError,
-    VersionAlreadyExistsError,
-    WrongMigrationNumberError,
+    ApplyMigrationsError,
+    BasePilgrimorError,
+    PlanMismatchError,
+)
+from pilgrimor.migrator.history import HistoryRecord, history_records
+from pilgrimor.migrator.plan import (
+    PLAN_FORMAT,
+    STEP_APPLY,
+    STEP_BASELINE,
+    STEP_ROLLBACK,
+    load_migration,
+    state_fingerprint,
+)
+from pilgrimor.migrator.rawsql_migrator.migration_files import (
+    MigrationFileReader,
+    migrations_hash,
 )
-from pilgrimor.utils import error_text, success_text, warning_text
+from pilgrimor.migrator.rawsql_migrator.planner import RawSQLPlanner
+from pilgrimor.migrator.system_table import (
+    CLEAR_FINGERPRINT_COMMAND,
+    HISTORY_QUERY,
+    HISTORY_SCHEMA_VERSION,
+    META_SCHEMA_VERSION,
+)
+from pilgrimor.utils import success_text
+
+# Base of version for migrations without version on a fresh database.
+FIRST_VERSION = "0"
 
 
-class RawSQLMigator(BaseMigrator):
+class RawSQLMigator(RawSQLPlanner, BaseMigrator):
     """
     Migrator for .sql files.
 
     Can apply migration and monitor the state of the database.
     """
 
+    def __init__(
+        self,
+        engine: PilgrimoreEngine,
+        migration_dir: str,
+        parse_cache: bool = False,
+        migration_files: Optional[MigrationFileReader] = None,
+        write_versions: bool = True,
+        version_manifest: bool = False,
+    ) -> None:
+        """
+        Initializes the migrator.
+
+        :param engine: Migration engine.
+        :param migration_dir: path to the directory with migration files.
+        :param parse_cache: keep parsed migrations in persistent cache or not.
+        :param migration_files: reader shared with other migrators.
+        :param write_versions: add versions to applied migration files or not.
+        :param version_manifest: keep versions in manifest file or not.
+        """
+        super().__init__(engine, migration_dir)
+        self.write_versions = write_versions
+        self.migration_files = migration_files or MigrationFileReader(
+            migration_dir,
+            parse_cache=parse_cache,
+            version_manifest=version_manifest,
+        )
+
     def initialize_database(self) -> None:
         """Initialize new table for migration control."""
-        query = """
-        CREATE TABLE pilgrimor (
-            id SERIAL,
-            name VARCHAR(100) NOT NULL,
-            version VARCHAR(25) NOT NULL
+        self.engine.execute_sql_with_no_return(
+            sql_query=self.system_table.initialize_query(),
+            sql_query_params=None,
         )
-        """
+        print(success_text("Database initialized!"))
+
+    def upgrade_database(self) -> None:
+        """Upgrades pilgrimor table to the latest schema."""
+        if not (query := self._get_upgrade_query(self._load_state())):
+            return
         self.engine.execute_sql_with_no_return(
             sql_query=query,
             sql_query_params=None,
         )
-        print(success_text("Database initialized!"))
+        print(
+            success_text(
+                f"Database upgraded to schema {self.system_table.schema_version}.",
+            ),
+        )
 
-    def _get_migrations_with_version(self, version: str) -> List[str]:
+    def get_history(self) -> List[HistoryRecord]:
         """
-        Returns new migrations.
-
-        Workflow:
-        Firstly, check is version already exists,
-        if yes print error message and stop the migrator.
-        Secondly, check is version bigger exists,
-        if yes, print what version(s) is bigger and
-        stop the migrator.
-        Thirdly, get migration to apply, if there are no new
-        migrations print attention message and stop the migrator.
-        Fourth, get apply commands, because every migration
-        file must have `apply` and `rollback` sections.
-        Fifth, apply new migrations and create new record in
-        pilgrimor table.
-
-        :param version: version for new migrations.
-
-        :raises VersionAlreadyExistsError: if version is already exists.
-        :raises BiggerVersionsExistsError: if bigger versions are exists.
-        :raises NoNewMigrationsError: if no new migrations.
-
-        :returns: migrations that will be applied.
-        """
-        if self._is_version_exists(version=version):
-            raise VersionAlreadyExistsError(
-                f"Version {version} already exists. Please choose another one.",
-            )
-        if bigger_versions := self._is_version_bigger_exists(version=version):
-            raise BiggerVersionsExistsError(
-                f"There are bigger versions - {', '.join(bigger_versions)}"
-                f"Please choose another version.",
-            )
+        Returns applied migrations with timings.
 
-        if not (to_apply_migrations := self._get_to_apply_migrations()):
-            raise NoNewMigrationsError("There are no new migrations to apply.")
+        State snapshot is loaded too, so pending
+        migrations can be found after it.
 
-        return list(to_apply_migrations)
+        :raises BasePilgrimorError: if the engine or pilgrimor table
+            has no history.
 
-    def _get_exist_migrations(self) -> Dict[str, List[str]]:  # noqa: WPS210
+        :returns: records in apply order.
         """
-        Returns migrations with a known version.
-
-        Iterate through the existing migration files
-        and try to find an indication of which
-        version this migration is linked to.
-
-        In case a situation arises when the previous
-        migration did not have a version,
-        but the one we are considering has,
-        stop the migration and report
-        that the migration history is incorrect
+        if self.system_table.schema_version < HISTORY_SCHEMA_VERSION:
+            raise BasePilgrimorError("History is not recorded by the engine.")
+        self._state = self._load_state()
+        if self.state.schema_version < HISTORY_SCHEMA_VERSION:
+            raise BasePilgrimorError(
+                "History is not recorded, run `initdb --upgrade` first.",
+            )
+        return history_records(
+            self.engine.execute_sql_with_return(
+                sql_query=HISTORY_QUERY,
+                sql_query_params=None,
+            ),
+        )
 
-        :raises IncorrectMigrationHistoryError: if incorrect migration history.
+    def migrations_fingerprint(self) -> str:
+        """
+        Returns fingerprint of all migration files.
 
-        :returns: Dict with keys as version and value as list of migrations.
+        :returns: sha256 hex digest.
         """
-        all_migrations = self._get_migration_files()
-        is_previous_migration_has_version = True
-        to_apply_migration: Dict[str, List[str]] = {}
-
-        for migration in all_migrations:
-            full_path_migration = join(self.migrations_dir, migration)
-            with open(full_path_migration, "r") as migration_file:
-                migration_context = migration_file.read()
-
-                search_result = re.search(
-                    r"pilgrimore_version.*\n",
-                    migration_context,
-                )
-                if search_result:
-                    if not is_previous_migration_has_version:
-                        raise IncorrectMigrationHistoryError(  # noqa: WPS220
-                            "Incorrect migration history",
-                        )
-                    migration_version = search_result.group().split(
-                        " ",
-                    )[1]
-                    to_apply_migration.setdefault(
-                        migration_version,
-                        [],
-                    ).append(migration)
-                    is_previous_migration_has_version = True
-                else:
-                    is_previous_migration_has_version = False
-
-        return to_apply_migration
-
-    def _get_rollback_migration_by_version(self, version: str) -> List[str]:
+        return self.migration_files.fingerprint(self._get_migration_files())
+
+    def get_pending_migrations(self) -> List[str]:
         """
-        Rolls back migrations to specified version.
+        Returns migrations that are not applied.
 
-        :param version: version to which it is rolled back
+        Saved fingerprint is checked first, if it matches
+        the directory, the state is not loaded.
+        If the full check finds nothing pending,
+        the fingerprint is saved for the next check.
 
-        :raises VersionAlreadyExistsError: if version is already exists.
+        :returns: pending migrations, with and without versions.
+        """
+        self._refresh_migration_files()
+        if self._is_up_to_date():
+            return []
+        with self.profiler.phase("load state"):
+            self._state = self._load_state()
+        if pending := self._get_to_apply_migrations():
+            return pending
+        self._mark_up_to_date()
+        return []
 
-        :returns: migrations by selected version.
+    def apply_all_migrations(self, pending_version_suffix: str = ".post1") -> None:
         """
-        if not self._is_version_exists(version=version):
-            raise VersionAlreadyExistsError(
-                f"Can't find version - {version} in migrations. "
-                f"Please choose another one.",
-            )
+        Applies migrations with and without version.
 
-        return self._get_migrations_by_version(version=version)
+        Migrations with version are applied like `apply` without version,
+        then migrations without version are applied with version
+        made of the last applied version and the suffix.
+        With write_versions=False migration files are not changed.
 
-    def _get_rollback_migration_query(self, migration: str) -> str:
+        :param pending_version_suffix: suffix of version
+            for migrations without version.
         """
-        Return full rollback migration query with technical table record.
+        self.apply_migrations(None)
+        if pending := self.get_pending_migrations():
+            last_version = self.state.last_version or FIRST_VERSION
+            self.run_migrations(pending, f"{last_version}{pending_version_suffix}")
+
+    def plan_migrations(
+        self,
+        command: str,
+        version: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Makes execution plan of apply or rollback command.
+
+        Nothing is executed, the plan keeps
+        hash of migrations and fingerprint of the database state,
+        so apply_plan executes it only if nothing changed.
 
-        :param migration: rollback migration.
+        :param command: apply or rollback.
+        :param version: version like in apply or rollback command,
+            rollback without version plans the last applied version.
 
-        :returns: full migration query.
+        :returns: JSON compatible plan.
         """
-        query = Path(
-            join(self.migrations_dir, migration),
-        ).read_text()
-        try:
-            rollback_query = query.split("-- rollback --")[1]
-        except KeyError:
-            print(
-                warning_text(
-                    f"You don't split apply and rollback "
-                    f"context in migration {migration}."
-                    f"Can't rollback this migration.",
-                ),
+        self._refresh_migration_files()
+        with self.profiler.phase("load state"):
+            self._state = self._load_state(
+                version,
+                latest=command == STEP_ROLLBACK and not version,
             )
-            return ""
-        return self._drop_migration_from_system_table(
-            rollback_query,
-            migration,
-        )
+        fingerprint = state_fingerprint(self.state)
+        try:
+            with self.profiler.phase("scan migrations"):
+                steps = self._get_plan_steps(command, version)
+        finally:
+            self._state = None
+        return {
+            "format": PLAN_FORMAT,
+            "command": command,
+            "migrations_hash": migrations_hash(self.migrations_dir),
+            "state": fingerprint,
+            "steps": steps,
+        }
 
-    def _get_apply_migration_query(
-        self,
-        migration: str,
-        version: str,
-    ) -> str:
+    def apply_plan(self, plan: Dict[str, Any]) -> None:
         """
-        Return full apply migration query with technical table record.
+        Executes steps of the plan without planning again.
 
-        :param migration: rollback migration.
-        :param version: migration version.
+        :param plan: plan made by plan_migrations.
 
-        :returns: full migration query.
+        :raises PlanMismatchError: if migrations or database changed.
+        :raises ApplyMigrationsError: error in migrations.
         """
-        query = Path(
-            join(self.migrations_dir, migration),
-        ).read_text()
-        try:
-            apply_query = query.split("-- rollback --")[0]
-        except KeyError:
-            print(
-                warning_text(
-                    f"You don't split apply and rollback context in migration "
-                    f"{migration}. All commands will be applied.",
+        self._refresh_migration_files()
+        with self.engine.migration_lock():
+            with self.profiler.phase("load state"):
+                self._state = self._load_state()
+            if plan["migrations_hash"] != migrations_hash(self.migrations_dir):
+                raise PlanMismatchError("Migrations changed after the plan was made.")
+            if plan["state"] != state_fingerprint(self.state):
+                raise PlanMismatchError("Database changed after the plan was made.")
+
+            for step in plan["steps"]:
+                try:
+                    self._execute_plan_step(step)
+                except Exception as exc:
+                    raise ApplyMigrationsError from exc
+                print(success_text(f"Command {step['kind']} done."))
+            self._mark_up_to_date()
+
+    def _execute_plan_step(self, step: Dict[str, Any]) -> None:
+        """
+        Executes one step of the plan and updates the state.
+
+        :param step: step of the plan.
+        """
+        version_migrations = [
+            load_migration(migration, self.migrations_dir)
+            for migration in step["version_migrations"]
+        ]
+        if step["kind"] == STEP_ROLLBACK:
+            self._forget_fingerprint()
+        with self.profiler.phase("execute"):
+            self.engine.execute_version_migrations(
+                version_migrations=version_migrations,
+                sql_query_params=None,
+                in_transaction=all(
+                    migration["in_transaction"] for migration in version_migrations
                 ),
             )
-            apply_query = query
-        return self._add_migration_to_system_table(
-            apply_query,
-            migration,
-            version,
-        )
 
-    def _get_version_migrations(  # noqa: WPS234
-        self,
-        migrations: List[str],
-        is_rollback: bool,
-        version: str = "",
-    ) -> Tuple[List[Dict[str, str]], bool]:
+        if step["kind"] == STEP_BASELINE:
+            for migration, version in step["covered"]:
+                self.state.add([migration], version)
+        elif step["kind"] == STEP_APPLY:
+            self.state.add(step["migrations"], step["version"])
+            self._write_versions(step["migrations"], step["version"])
+        else:
+            self.state.remove(step["migrations"])
+
+    def _apply_baseline(self) -> None:
         """
-        Confirm list with migrations data.
+        Applies the newest baseline to a fresh database.
 
-        :param is_rollback: rollback or apply migrations.
-        :param migrations: List of migration to apply.
-        :param version: migration version.
-        :returns: list of dicts with migrations and is_concurrently flag.
+        Covered migrations are recorded as applied
+        in the same transaction as the baseline.
         """
-        version_migrations = []
-        is_concurrently = False
-        for migration in migrations:
-            if is_rollback:
-                to_execute_query = self._get_rollback_migration_query(migration)
-                if not to_execute_query:
-                    continue
-            else:
-                to_execute_query = self._get_apply_migration_query(migration, version)
-
-            if "concurrently" in to_execute_query.lower():
-                is_concurrently = True
-
-            version_migrations.append(
-                {
-                    "migration": migration,
-                    "query": to_execute_query,
-                },
+        if (baseline := self._get_baseline()) is None:
+            return
+        with self.profiler.phase("build queries"):
+            baseline_migration = self._get_baseline_migration(baseline)
+        with self.profiler.phase("execute"):
+            self.engine.execute_version_migrations(
+                version_migrations=[baseline_migration],
+                sql_query_params=None,
+                in_transaction=True,
             )
-        return version_migrations, is_concurrently
+        for migration, version in baseline.covered:
+            self.state.add([migration], version)
+        print(success_text(f"Baseline {baseline.version} applied."))
 
     def _apply_migrations(self, migrations: List[str], version: str) -> None:
         """
@@ -259,22 +294,34 @@ class RawSQLMigator(BaseMigrator):
         :param migrations: List of migration to apply.
         :param version: migration version.
         """
-        version_migrations, is_concurrently = self._get_version_migrations(
-            migrations,
-            is_rollback=False,
-            version=version,
-        )
+        with self.profiler.phase("build queries"):
+            version_migrations, is_concurrently = self._get_version_migrations(
+                migrations,
+                is_rollback=False,
+                version=version,
+            )
 
-        self.engine.execute_version_migrations(
-            version_migrations=version_migrations,
-            sql_query_params=None,
-            in_transaction=not is_concurrently,
-        )
+        with self.profiler.phase("execute"):
+            self.engine.execute_version_migrations(
+                version_migrations=version_migrations,
+                sql_query_params=None,
+                in_transaction=not is_concurrently,
+            )
 
-        self._add_version_to_migration_file(
-            migrations=migrations,
-            version=version,
-        )
+        self.state.add(migrations, version)
+        self._write_versions(migrations, version)
+
+    def _write_versions(self, migrations: List[str], version: str) -> None:
+        """
+        Adds version to applied migration files.
+
+        If any exception is raised, rollback applied migrations.
+
+        :param migrations: applied migrations.
+        :param version: migration version.
+        """
+        if not self._add_versions(migrations, version):
+            self._rollback_migrations(migrations=migrations)
 
     def _rollback_migrations(  # noqa: WPS324
         self,
@@ -290,296 +337,59 @@ class RawSQLMigator(BaseMigrator):
         :param migrations: List of migration to apply.
         :param kwargs: any named arguments.
         """
-        version_migrations, is_concurrently = self._get_version_migrations(
-            migrations,
-            is_rollback=True,
-        )
-
-        self.engine.execute_version_migrations(
-            version_migrations=version_migrations,
-            sql_query_params=None,
-            in_transaction=not is_concurrently,
-        )
-
-    def _get_to_apply_migrations(self) -> List[str]:
-        """
-        Gets new migrations.
-
-        Get all applied migrations and all exist migrations.
-        If there are no applied_migrations, return all_migrations.
-        Else find difference between all_migrations and applied_migrations.
-
-        :returns: set of new migrations.
-        """
-        applied_migrations = self._get_applied_migrations()
-        all_migrations = self._get_migration_files()
-
-        if applied_migrations:
-            to_apply_migrations = set(all_migrations) - set(applied_migrations)
-        else:
-            to_apply_migrations = set(all_migrations)
-
-        return self._sort_migrations(to_apply_migrations)
-
-    def _get_migration_files(self) -> List[str]:
-        """
-        Returns all migration files.
-
-        :returns: list with migratons.
-        """
-        all_migrations = {
-            sql_file
-            for sql_file in listdir(self.migrations_dir)
-            if isfile(join(self.migrations_dir, sql_file))
-        }
-
-        self._check_migrations_number(all_migrations)
+        with self.profiler.phase("build queries"):
+            version_migrations, is_concurrently = self._get_version_migrations(
+                migrations,
+                is_rollback=True,
+            )
+        self._forget_fingerprint()
 
-        return self._sort_migrations(all_migrations)
+        with self.profiler.phase("execute"):
+            self.engine.execute_version_migrations(
+                version_migrations=version_migrations,
+                sql_query_params=None,
+                in_transaction=not is_concurrently,
+            )
 
-    def _get_applied_migrations(self) -> List[str]:
-        """
-        Returns all applied migrations from database.
+        self.state.remove(migrations)
 
-        :returns: list with migrations.
-        """
-        query = """
-        SELECT name
-        FROM pilgrimor
+    def _is_up_to_date(self) -> bool:
         """
+        Compares the directory with fingerprint saved by the last apply.
 
-        query_result = self.engine.execute_sql_with_return(
-            sql_query=query,
-            sql_query_params=None,
-        )
-        return query_result if query_result else []
-
-    def _get_last_applied_migrations(self) -> List[str]:
-        """
-        Returns last applied migrations.
+        It is one query by primary key, schema version is read with it.
+        pilgrimor_meta exists since schema 3, the query fails on older tables,
+        they and tables of engines without versioned schema
+        are always checked in full.
 
-        :returns: set of last applied migrations.
+        :returns: True if the directory was fully applied.
         """
-        query = """
-        SELECT name
-        FROM pilgrimor
-        WHERE version = (
-            SELECT version
-            FROM pilgrimor
-            ORDER BY id DESC
-            LIMIT 1
-        )
-        """
-
-        migrations = self.engine.execute_sql_with_return(
-            sql_query=query,
+        if (query := self.system_table.fingerprint_query) is None:
+            return False
+        with self.profiler.phase("check fingerprint"):
+            try:
+                saved = self.engine.execute_sql_with_return(
+                    sql_query=query,
+                    sql_query_params=None,
+                )
+            except Exception:
+                return False
+            return self._matches_fingerprint(saved)
+
+    def _mark_up_to_date(self) -> None:
+        """Saves fingerprint of the directory if nothing is pending."""
+        if (command := self._get_save_fingerprint_command()) is None:
+            return
+        self.engine.execute_sql_with_no_return(
+            sql_query=command,
             sql_query_params=None,
         )
 
-        return self._sort_migrations(
-            migrations if migrations else [],
-            desc=True,
-        )
-
-    def _get_migrations_by_version(self, version: str) -> List[str]:
-        """
-        Returns all migrations by version.
-
-        :param version: migration version.
-
-        :returns: set with migratons.
-        """
-        query = """
-        SELECT name
-        FROM pilgrimor
-        WHERE version = %s
-        OR id > (
-            SELECT id
-            FROM pilgrimor
-            WHERE version = %s
-            ORDER BY id DESC
-            LIMIT 1
-        )
-        """
-
-        result = self.engine.execute_sql_with_return(
-            sql_query=query,
-            sql_query_params=[version, version],
-        )
-
-        return self._sort_migrations(
-            result if result else [],
-            desc=True,
-        )
-
-    def _is_version_exists(self, version: str) -> bool:
-        """
-        Checks is version exists.
-
-        :param version: version number.
-
-        :returns: True if version exists else False.
-        """
-        query = """
-        SELECT EXISTS(
-            SELECT version
-            FROM pilgrimor
-            WHERE version = %s
-        )
-        """
-        result: Optional[List[bool]] = self.engine.execute_sql_with_return(
-            sql_query=query,
-            sql_query_params=[version],
-        )
-        return result[0] if result else False
-
-    def _is_version_bigger_exists(
-        self,
-        version: str,
-    ) -> Optional[Tuple[str, ...]]:
-        """
-        Checks if there are migrations higher in version than the specified one.
-
-        If yes then return tuple with versions
-        that are higher than the specified one.
-        Else return None.
-
-        :param version: version of new migrations.
-
-        :returns: tuple with versions or None.
-        """
-        query = """
-        SELECT version
-        FROM pilgrimor
-        GROUP BY version
-        """
-        versions = self.engine.execute_sql_with_return(
-            sql_query=query,
+    def _forget_fingerprint(self) -> None:
+        """Drops saved fingerprint before migrations are rolled back."""
+        if self.state.schema_version < META_SCHEMA_VERSION:
+            return
+        self.engine.execute_sql_with_no_return(
+            sql_query=CLEAR_FINGERPRINT_COMMAND,
             sql_query_params=None,
         )
-        if versions:
-            return tuple(
-                exist_version
-                for exist_version in versions
-                if version_parse(exist_version) > version_parse(version)
-            )
-
-        return None
-
-    def _check_migrations_number(self, migrations: Set[str]) -> None:
-        """
-        Checks migrations number.
-
-        Migration numbers can not repeat and should
-        start with <number>_.
-
-        :param migrations: migrations.
-
-        :raises WrongMigrationNumberError: if migration has wrong number.
-        :raises MigrationNumberRepeatNumberError: migration number duplicates.
-        """
-        exists_numbers = []
-        for migration in migrations:
-            try:
-                migration_number = int(migration.split("_")[0])
-            except (KeyError, ValueError):
-                raise WrongMigrationNumberError(
-                    f"There is migration with wrong number - {migration}\n"
-                    f"Migration name must be - <number>_<migration_name>.sql",
-                )
-            if migration_number in exists_numbers:
-                raise MigrationNumberRepeatNumberError(
-                    f"There are two or more migrations with number {migration_number}",
-                )
-            exists_numbers.append(migration_number)
-
-    def _sort_migrations(
-        self,
-        migrations: Iterable[str],
-        desc: bool = False,
-    ) -> List[str]:
-        """
-        Sort migrations.
-
-        :param migrations: List of migrations.
-        :param desc: reverse or not.
-
-        :returns: sorted list of migrations
-        """
-
-        def get_migration_number(file_name: str) -> str:  # noqa: WPS430
-            return file_name.split("_")[0]
-
-        return sorted(migrations, key=get_migration_number, reverse=desc)
-
-    def _add_migration_to_system_table(
-        self,
-        query: str,
-        migration: str,
-        version: str,
-    ) -> str:
-        """
-        Inserts new migration to pilgrimor database.
-
-        :param query: query from migration.
-        :param migration: migration.
-        :param version: version.
-
-        :returns: query
-        """
-        system_command = f"""
-        INSERT INTO pilgrimor (name, version)
-        VALUES ('{migration}', '{version}');
-        """
-        return "{0}{1}{2}".format(query, "\n", system_command)
-
-    def _drop_migration_from_system_table(
-        self,
-        query: str,
-        migration: str,
-    ) -> str:
-        """
-        Drop migration from pilgrimor database.
-
-        :param query: query from migration.
-        :param migration: migration.
-
-        :returns: query
-        """
-        system_command = f"""
-        DELETE FROM pilgrimor
-        WHERE name = '{migration}';
-        """
-        return "{0}{1}{2}".format(query, "\n", system_command)
-
-    def _add_version_to_migration_file(
-        self,
-        migrations: List[str],
-        version: str,
-    ) -> None:
-        """
-        Adds migration version to migration file.
-
-        :param migrations: List of migration to apply.
-        :param version: migration version.
-        """
-        for migration in migrations:
-            query = Path(
-                join(self.migrations_dir, migration),
-            ).read_text()
-            if query.find("pilgrimore_version") == -1:
-                try:
-                    path_to_migration = join(self.migrations_dir, migration)
-                    with open(path_to_migration, "a") as migration_file:
-                        migration_file.write(  # noqa: WPS220
-                            f"\n-- pilgrimore_version {version} -- \n",
-                        )
-                except Exception as exc:
-                    print(
-                        error_text(
-                            f"Can't set version in migration file\n"
-                            f"Rolling back migrations {migrations}\n"
-                            f"Reason - {exc}",
-                        ),
-                    )
-                    self._rollback_migrations(migrations=migrations)
@@ -0,0 +1,159 @@
+import subprocess  # noqa: S404
+from os import makedirs
+from os.path import exists, join
+from typing import Dict, List, Optional
+
+from packaging.version import parse as version_parse
+
+from pilgrimor.abc.engine import PilgrimoreEngine
+from pilgrimor.exceptions import SquashMigrationsError
+from pilgrimor.migrator.rawsql_migrator.baseline import (
+    BASELINE_DIR,
+    baseline_name,
+    find_baseline,
+    render_baseline,
+)
+from pilgrimor.migrator.rawsql_migrator.migration_files import MigrationFileReader
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+from pilgrimor.utils import success_text
+
+PG_DUMP_EXCLUDED_TABLES = ("pilgrimor", "pilgrimor_backfill")
+
+
+class MigrationSquasher:
+    """
+    Squashes migrations up to a version into a baseline.
+
+    Covered migrations are applied to an empty scratch database,
+    its schema is dumped with pg_dump and saved
+    in `baseline/<version>.sql` of migrations_dir.
+    Only schema is dumped, data inserted by migrations
+    is not in the baseline.
+    """
+
+    def __init__(
+        self,
+        scratch_engine: PilgrimoreEngine,
+        migrations_dir: str,
+        migration_files: Optional[MigrationFileReader] = None,
+        pg_dump: str = "pg_dump",
+    ) -> None:
+        """
+        Initialize the squasher.
+
+        :param scratch_engine: engine of empty scratch database.
+        :param migrations_dir: directory with migrations.
+        :param migration_files: reader shared with other migrators.
+        :param pg_dump: pg_dump executable.
+        """
+        self.scratch_engine = scratch_engine
+        self.migrations_dir = migrations_dir
+        self.pg_dump = pg_dump
+        self.migrator = RawSQLMigator(
+            scratch_engine,
+            migrations_dir,
+            migration_files=migration_files,
+        )
+
+    def squash(self, up_to: str) -> str:
+        """
+        Creates baseline of migrations up to the version inclusive.
+
+        The newest existing baseline is applied
+        to the scratch database first, so migrations
+        covered by it may be already deleted.
+
+        :param up_to: last covered version.
+
+        :raises SquashMigrationsError: if baseline exists or can't be created.
+
+        :returns: path to the baseline file.
+        """
+        path = join(self.migrations_dir, baseline_name(up_to))
+        if exists(path):
+            raise SquashMigrationsError(f"Baseline {up_to} already exists.")
+        previous = find_baseline(self.migrations_dir)
+        if previous and version_parse(previous.version) > version_parse(up_to):
+            raise SquashMigrationsError(
+                f"Baseline {previous.version} is newer than {up_to}.",
+            )
+        versions = self.covered_versions(up_to)
+
+        self.migrator.initialize_database()
+        state = self.migrator.state
+        self.migrator._apply_baseline()  # noqa: WPS437
+        for version, migrations in versions.items():
+            if to_apply_migrations := state.not_applied(migrations):
+                self.migrator.run_migrations(to_apply_migrations, version)
+        covered = [
+            (migration, state.version_by_name[migration])
+            for migration in state.applied_names
+        ]
+        schema = self.dump_schema()
+
+        makedirs(join(self.migrations_dir, BASELINE_DIR), exist_ok=True)
+        with open(path, "w") as baseline_file:
+            baseline_file.write(render_baseline(up_to, covered, schema))
+        print(success_text(f"Baseline {up_to} of {len(covered)} migrations created."))
+        return path
+
+    def covered_versions(self, up_to: str) -> Dict[str, List[str]]:
+        """
+        Returns migrations of versions up to the version inclusive.
+
+        Covered migrations must be the first migrations,
+        so the baseline never skips a migration.
+
+        :param up_to: last covered version.
+
+        :raises SquashMigrationsError: if migrations can't be squashed.
+
+        :returns: migrations by version.
+        """
+        last_version = version_parse(up_to)
+        versions: Dict[str, List[str]] = {}
+        is_previous_covered = True
+        exist_migrations = self.migrator._get_exist_migrations()  # noqa: WPS437
+        for version, migrations in exist_migrations.items():
+            if version_parse(version) > last_version:
+                is_previous_covered = False
+                continue
+            if not is_previous_covered:
+                raise SquashMigrationsError(
+                    f"Version {version} is after versions bigger than {up_to}.",
+                )
+            versions[version] = migrations
+        if not versions:
+            raise SquashMigrationsError(f"There are no migrations up to {up_to}.")
+        return versions
+
+    def dump_schema(self) -> str:
+        """
+        Dumps schema of the scratch database.
+
+        :raises SquashMigrationsError: if pg_dump failed.
+
+        :returns: pg_dump output.
+        """
+        command = [
+            self.pg_dump,
+            "--schema-only",
+            "--no-owner",
+            "--no-privileges",
+            *(f"--exclude-table={table}" for table in PG_DUMP_EXCLUDED_TABLES),
+            self.scratch_engine.database_url,
+        ]
+        try:
+            dump = subprocess.run(  # noqa: S603
+                command,
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+        except OSError as exc:
+            raise SquashMigrationsError(f"Can't run {self.pg_dump} - {exc}") from exc
+        except subprocess.CalledProcessError as exc:
+            raise SquashMigrationsError(
+                f"{self.pg_dump} failed - {exc.stderr.strip()}",
+            ) from exc
+        return dump.stdout
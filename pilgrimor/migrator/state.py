@@ -0,0 +1,328 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from pilgrimor.migrator.system_table import FIRST_SCHEMA_VERSION, parse_schema_version
+from pilgrimor.migrator.version_key import version_key
+
+StateRecord = Tuple[int, str, str]
+
+
+class VersionLookup(NamedTuple):
+    """
+    Records of pilgrimor table found by indexed query.
+
+    Lookup for a version has records of the version and of all bigger
+    versions, lookup without version has records of the biggest version.
+    Records are (name, version, version_key) in apply order.
+    """
+
+    version: Optional[str]
+    records: List[Tuple[Any, ...]]
+
+
+class MigrationStateSnapshot:
+    """
+    State of the pilgrimor table at the start of the command.
+
+    The table and its schema version are read with one query,
+    after that questions about applied migrations are answered from memory.
+    Commands that compare versions add the version lookup,
+    records found by the index on version key, otherwise
+    versions are compared in memory.
+
+    The snapshot must be updated by the migrator
+    after every successful apply or rollback.
+    """
+
+    def __init__(
+        self,
+        records: Iterable[StateRecord] = (),
+        schema_version: int = FIRST_SCHEMA_VERSION,
+    ) -> None:
+        """
+        Builds indexes from pilgrimor table records.
+
+        :param records: (id, name, version) records sorted by id.
+        :param schema_version: schema version of pilgrimor table.
+        """
+        self.schema_version = schema_version
+        self.ids_by_name: Dict[str, int] = {}
+        self.version_by_name: Dict[str, str] = {}
+        self.names_by_version: Dict[str, List[str]] = {}
+        self.lookup: Optional[VersionLookup] = None
+        # Versions sorted by their keys, keys are in the same order,
+        # None until a question isn't answered by the lookup.
+        self._version_keys: Optional[List[str]] = None
+        self._sorted_versions: List[str] = []
+        self._next_id = 1
+        for record_id, name, version in records:
+            self._add_record(record_id, name, version)
+
+    @classmethod
+    def from_result(cls, result: Optional[List[Any]]) -> "MigrationStateSnapshot":
+        """
+        Builds snapshot from result of state query of the system table.
+
+        Every row has the comment of pilgrimor table after the record,
+        the row of empty table has the comment only.
+
+        :param result: result from the engine.
+
+        :returns: new snapshot.
+        """
+        rows = cls.normalize_rows(result)
+        if not rows:
+            return cls()
+        records = [
+            (record_id, name, version)
+            for record_id, name, version, _ in rows
+            if record_id is not None
+        ]
+        return cls(records, parse_schema_version(rows[0][-1]))
+
+    @staticmethod
+    def normalize_rows(result: Optional[List[Any]]) -> List[Tuple[Any, ...]]:
+        """
+        Converts engine result into list of rows.
+
+        Engines return single record as flat list,
+        and many records as list of tuples.
+
+        :param result: result from the engine.
+
+        :returns: list of rows.
+        """
+        if not result:
+            return []
+        if not isinstance(result[0], (tuple, list)):
+            return [tuple(result)]  # type: ignore
+        return [tuple(record) for record in result]  # type: ignore
+
+    @property
+    def applied_names(self) -> List[str]:
+        """
+        Returns names of all applied migrations.
+
+        :returns: list of names in apply order.
+        """
+        return list(self.ids_by_name)
+
+    @property
+    def last_version(self) -> Optional[str]:
+        """
+        Returns version of the last applied migration.
+
+        :returns: version or None if nothing was applied.
+        """
+        if not self.version_by_name:
+            return None
+        return self.version_by_name[next(reversed(self.ids_by_name))]
+
+    def is_applied(self, migration: str) -> bool:
+        """
+        Checks is migration applied.
+
+        :param migration: migration name.
+
+        :returns: True if applied else False.
+        """
+        return migration in self.ids_by_name
+
+    def not_applied(self, migrations: Iterable[str]) -> List[str]:
+        """
+        Filters out applied migrations.
+
+        :param migrations: migration names.
+
+        :returns: list of not applied migrations.
+        """
+        return [
+            migration for migration in migrations if migration not in self.ids_by_name
+        ]
+
+    def is_version_exists(self, version: str) -> bool:
+        """
+        Checks is version exists.
+
+        :param version: version number.
+
+        :returns: True if version exists else False.
+        """
+        return version in self.names_by_version
+
+    def bigger_versions(self, version: str) -> Optional[Tuple[str, ...]]:
+        """
+        Returns versions that are bigger than the specified one.
+
+        Versions are taken from the version lookup if it was made
+        for the version, otherwise versions are sorted
+        by version keys and the first bigger one is found by binary search.
+
+        :param version: version number.
+
+        :returns: tuple with sorted versions or None if there are no versions at all.
+        """
+        if not self.names_by_version:
+            return None
+        key = version_key(version)
+        if (records := self._looked_up(version)) is not None:
+            keys = {
+                record_version: record_key
+                for _, record_version, record_key in records
+                if record_key > key
+            }
+            return tuple(sorted(keys, key=keys.__getitem__))
+        version_keys, sorted_versions = self._sorted_version_index()
+        return tuple(sorted_versions[bisect_right(version_keys, key) :])  # noqa: E203
+
+    def last_version_migrations(self) -> List[str]:
+        """
+        Returns migrations of the biggest applied version.
+
+        :returns: list of migration names.
+        """
+        if self.lookup is not None and self.lookup.version is None:
+            return [name for name, _, _ in self.lookup.records]
+        if not self.names_by_version:
+            return []
+        _, sorted_versions = self._sorted_version_index()
+        return list(self.names_by_version[sorted_versions[-1]])
+
+    def migrations_since_version(self, version: str) -> List[str]:
+        """
+        Returns migrations of the version and of all bigger versions.
+
+        :param version: version number.
+
+        :returns: list of migration names.
+        """
+        if version not in self.names_by_version:
+            return []
+        if (records := self._looked_up(version)) is not None:
+            key = version_key(version)
+            return [
+                name
+                for name, record_version, record_key in records
+                if record_version == version or record_key > key
+            ]
+        since_versions = {version, *(self.bigger_versions(version) or ())}
+        return [
+            name
+            for name, name_version in self.version_by_name.items()
+            if name_version in since_versions
+        ]
+
+    def use_lookup(self, version: Optional[str], result: Optional[List[Any]]) -> None:
+        """
+        Keeps records found by indexed lookup of versions.
+
+        Questions about the version are answered from them
+        until the snapshot is changed.
+
+        :param version: version the lookup was made for,
+            None if the lookup found the biggest version.
+        :param result: (name, version, version_key) records from the engine.
+        """
+        self.lookup = VersionLookup(version, self.normalize_rows(result))
+
+    def add(self, migrations: Iterable[str], version: str) -> None:
+        """
+        Registers applied migrations.
+
+        :param migrations: applied migrations.
+        :param version: version of migrations.
+        """
+        self.lookup = None
+        for migration in migrations:
+            self._add_record(self._next_id, migration, version)
+
+    def remove(self, migrations: Iterable[str]) -> None:
+        """
+        Unregisters rolled back migrations.
+
+        :param migrations: rolled back migrations.
+        """
+        self.lookup = None
+        removed_versions: Set[str] = set()
+        for migration in migrations:
+            if migration not in self.ids_by_name:
+                continue
+            del self.ids_by_name[migration]  # noqa: WPS420
+            version = self.version_by_name.pop(migration)
+            self.names_by_version[version].remove(migration)
+            removed_versions.add(version)
+
+        for version in removed_versions:
+            if not self.names_by_version[version]:
+                del self.names_by_version[version]  # noqa: WPS420
+                self._unindex_version(version)
+
+    def _add_record(self, record_id: int, name: str, version: str) -> None:
+        """
+        Adds one record to indexes.
+
+        :param record_id: id in pilgrimor table.
+        :param name: migration name.
+        :param version: migration version.
+        """
+        self.ids_by_name[name] = record_id
+        self.version_by_name[name] = version
+        if version not in self.names_by_version:
+            self._index_version(version)
+        self.names_by_version.setdefault(version, []).append(name)
+        self._next_id = max(self._next_id, record_id + 1)
+
+    def _looked_up(self, version: str) -> Optional[List[Tuple[Any, ...]]]:
+        """
+        Returns records of the version lookup made for the version.
+
+        :param version: version number.
+
+        :returns: records or None if there is no lookup for the version.
+        """
+        if self.lookup is None or self.lookup.version != version:
+            return None
+        return self.lookup.records
+
+    def _sorted_version_index(self) -> Tuple[List[str], List[str]]:
+        """
+        Returns versions sorted by their keys.
+
+        Versions are sorted on the first use,
+        snapshots answered by version lookups never sort them.
+
+        :returns: sorted keys and versions in the same order.
+        """
+        if self._version_keys is None:
+            self._sorted_versions = sorted(self.names_by_version, key=version_key)
+            self._version_keys = [
+                version_key(version) for version in self._sorted_versions
+            ]
+        return self._version_keys, self._sorted_versions
+
+    def _index_version(self, version: str) -> None:
+        """
+        Adds new version to sorted versions if they are sorted.
+
+        :param version: version number.
+        """
+        if self._version_keys is None:
+            return
+        key = version_key(version)
+        position = bisect_right(self._version_keys, key)
+        self._version_keys.insert(position, key)
+        self._sorted_versions.insert(position, version)
+
+    def _unindex_version(self, version: str) -> None:
+        """
+        Removes version from sorted versions if they are sorted.
+
+        :param version: version number.
+        """
+        if self._version_keys is None:
+            return
+        position = bisect_left(self._version_keys, version_key(version))
+        while self._sorted_versions[position] != version:
+            position += 1
+        del self._version_keys[position]  # noqa: WPS420
+        del self._sorted_versions[position]  # noqa: WPS420
@@ -0,0 +1,426 @@
+"""
+Schema of pilgrimor system table.
+
+Schema version is kept in the comment of the table.
+Tables created before versioning have no comment, they are version 1.
+`initdb` creates the latest schema, `initdb --upgrade`
+applies upgrades to an existing table.
+
+Since schema 3 `pilgrimor_meta` table keeps fingerprint
+of the migrations directory that is fully applied.
+Since schema 4 every record has `version_key`, its byte order
+is the order of versions, so versions are compared by indexes.
+
+Only PostgreSQL engines use the versioned schema,
+other engines keep the table of the first schema,
+see SystemTable and PostgreSQLSystemTable.
+"""
+import hashlib
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pilgrimor.migrator.version_key import version_key
+
+SCHEMA_COMMENT = "pilgrimor schema {0}"
+SCHEMA_COMMENT_PATTERN = re.compile(r"^pilgrimor schema (?P<version>\d+)$")
+FIRST_SCHEMA_VERSION = 1
+HISTORY_SCHEMA_VERSION = 2
+META_SCHEMA_VERSION = 3
+VERSION_KEY_SCHEMA_VERSION = 4
+
+CREATE_TABLE_QUERY = """
+CREATE TABLE pilgrimor (
+    id SERIAL,
+    name VARCHAR(100) NOT NULL,
+    version VARCHAR(25) NOT NULL
+)
+"""
+# Records with the comment of the table in every row,
+# empty table gives one row with the comment only.
+STATE_QUERY = """
+SELECT pilgrimor.id, pilgrimor.name, pilgrimor.version, pilgrimor_schema.comment
+FROM (
+    SELECT obj_description('pilgrimor'::regclass, 'pg_class') AS comment
+) AS pilgrimor_schema
+LEFT JOIN pilgrimor ON true
+ORDER BY pilgrimor.id
+"""
+# Records of the table without comment, in the same columns.
+RECORDS_QUERY = """
+SELECT id, name, version, NULL
+FROM pilgrimor
+ORDER BY id
+"""
+
+# Statements that upgrade the table to the version.
+SCHEMA_UPGRADES: Dict[int, List[str]] = {
+    HISTORY_SCHEMA_VERSION: [
+        """
+        ALTER TABLE pilgrimor
+            ADD COLUMN checksum VARCHAR(64),
+            ADD COLUMN host VARCHAR(255),
+            ADD COLUMN started_at TIMESTAMPTZ,
+            ADD COLUMN finished_at TIMESTAMPTZ,
+            ADD COLUMN duration DOUBLE PRECISION,
+            ADD COLUMN rows BIGINT
+        """,
+    ],
+    META_SCHEMA_VERSION: [
+        """
+        CREATE TABLE pilgrimor_meta (
+            key VARCHAR(100) PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+        """,
+    ],
+    VERSION_KEY_SCHEMA_VERSION: [
+        """
+        ALTER TABLE pilgrimor ADD COLUMN version_key VARCHAR(255) COLLATE "C"
+        """,
+        "CREATE INDEX pilgrimor_version_key_idx ON pilgrimor (version_key)",
+        "CREATE INDEX pilgrimor_name_idx ON pilgrimor (name)",
+        "CREATE INDEX pilgrimor_version_id_idx ON pilgrimor (version, id)",
+    ],
+}
+SCHEMA_VERSION = max(SCHEMA_UPGRADES)
+
+# Records of the version and of all bigger versions,
+# range of pilgrimor_version_key_idx.
+VERSIONS_SINCE_QUERY = """
+SELECT name, version, version_key
+FROM pilgrimor
+WHERE version_key >= %s
+ORDER BY id
+"""
+# Records of the biggest version, the last key of pilgrimor_version_key_idx
+# and records of it by pilgrimor_version_id_idx.
+LATEST_VERSION_QUERY = """
+SELECT name, version, version_key
+FROM pilgrimor
+WHERE version = (
+    SELECT version
+    FROM pilgrimor
+    WHERE version_key IS NOT NULL
+    ORDER BY version_key DESC
+    LIMIT 1
+)
+ORDER BY id
+"""
+
+HISTORY_COLUMNS = (
+    "name",
+    "version",
+    "host",
+    "started_at",
+    "finished_at",
+    "duration",
+    "rows",
+)
+HISTORY_QUERY = """
+SELECT {0}
+FROM pilgrimor
+WHERE duration IS NOT NULL
+ORDER BY id
+""".format(
+    ", ".join(HISTORY_COLUMNS),
+)
+
+# Rows changed in the current transaction, pg_stat_xact_user_tables
+# counts them only until commit.
+CHANGED_ROWS = """(
+    SELECT coalesce(sum(n_tup_ins + n_tup_upd + n_tup_del), 0)
+    FROM pg_stat_xact_user_tables
+)"""
+START_MARK_COMMAND = (
+    "SELECT set_config('pilgrimor.started_at', clock_timestamp()::text, false)"
+)
+START_MARK_WITH_ROWS_COMMAND = (
+    f"{START_MARK_COMMAND}, "
+    f"set_config('pilgrimor.changed_rows', {CHANGED_ROWS}::text, false)"
+)
+STARTED_AT = "current_setting('pilgrimor.started_at')::timestamptz"
+
+FINGERPRINT_KEY = "fingerprint"
+# Comment of pilgrimor table with the fingerprint, one lookup by primary key.
+FINGERPRINT_QUERY = f"""
+SELECT obj_description('pilgrimor'::regclass, 'pg_class'), value
+FROM pilgrimor_meta
+WHERE key = '{FINGERPRINT_KEY}'
+"""
+CLEAR_FINGERPRINT_COMMAND = (
+    f"DELETE FROM pilgrimor_meta WHERE key = '{FINGERPRINT_KEY}'"
+)
+
+
+def parse_schema_version(comment: Optional[str]) -> int:
+    """
+    Returns schema version from the comment of pilgrimor table.
+
+    :param comment: comment of the table.
+
+    :returns: schema version.
+    """
+    if comment and (match := SCHEMA_COMMENT_PATTERN.match(comment)):
+        return int(match.group("version"))
+    return FIRST_SCHEMA_VERSION
+
+
+def version_key_updates(versions: Iterable[str]) -> List[str]:
+    """
+    Returns statements that fill version_key of existing records.
+
+    :param versions: versions in pilgrimor table.
+
+    :returns: list of statements.
+    """
+    return [
+        f"UPDATE pilgrimor SET version_key = '{version_key(version)}' "
+        f"WHERE version = '{version}'"
+        for version in versions
+    ]
+
+
+def upgrade_query(schema_version: int, versions: Iterable[str] = ()) -> str:
+    """
+    Returns query that upgrades the table to the latest schema.
+
+    :param schema_version: current schema version.
+    :param versions: versions in pilgrimor table, their keys are filled
+        if the table gets version_key.
+
+    :returns: sql query, empty if the table is up to date.
+    """
+    statements = [
+        statement.strip()
+        for version, upgrade in sorted(SCHEMA_UPGRADES.items())
+        if version > schema_version
+        for statement in upgrade
+    ]
+    if not statements:
+        return ""
+    if schema_version < VERSION_KEY_SCHEMA_VERSION:
+        statements.extend(version_key_updates(versions))
+    statements.append(
+        f"COMMENT ON TABLE pilgrimor IS '{SCHEMA_COMMENT.format(SCHEMA_VERSION)}'",
+    )
+    return "".join(f"{statement};\n" for statement in statements)
+
+
+def initialize_table_query() -> str:
+    """
+    Returns query that creates pilgrimor table of the latest schema.
+
+    :returns: sql query.
+    """
+    return "{0};\n{1}".format(
+        CREATE_TABLE_QUERY.strip(),
+        upgrade_query(FIRST_SCHEMA_VERSION),
+    )
+
+
+def migration_checksum(query: str) -> str:
+    """
+    Returns checksum of applied part of migration.
+
+    :param query: apply query.
+
+    :returns: sha256 hex digest.
+    """
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+def start_mark_command(in_transaction: bool) -> str:
+    """
+    Returns statement that remembers start of the migration.
+
+    Start time and changed rows are kept in session settings,
+    so they are known to the insert into pilgrimor table
+    at the end of the migration.
+    Rows are counted only in transaction.
+
+    :param in_transaction: migration runs in transaction or not.
+
+    :returns: query without semicolon.
+    """
+    if in_transaction:
+        return START_MARK_WITH_ROWS_COMMAND
+    return START_MARK_COMMAND
+
+
+def history_insert_command(  # noqa: WPS211
+    migration: str,
+    version: str,
+    checksum: str,
+    host: str,
+    in_transaction: bool,
+    key: Optional[str] = None,
+) -> str:
+    """
+    Returns query that inserts migration with its timings.
+
+    :param migration: migration.
+    :param version: version.
+    :param checksum: checksum of the migration.
+    :param host: host that applies the migration.
+    :param in_transaction: migration runs in transaction or not.
+    :param key: version key, if the table has version_key column.
+
+    :returns: query without semicolon.
+    """
+    rows = "NULL"
+    if in_transaction:
+        rows = (
+            f"{CHANGED_ROWS} - current_setting('pilgrimor.changed_rows')::bigint"
+        )
+    quoted_host = host.replace("'", "''")
+    key_column = key_value = ""
+    if key is not None:
+        key_column = ", version_key"
+        key_value = f", '{key}'"
+    return f"""
+        INSERT INTO pilgrimor (
+            name, version, checksum, host,
+            started_at, finished_at, duration, rows{key_column}
+        )
+        SELECT
+            '{migration}', '{version}', '{checksum}', '{quoted_host}',
+            {STARTED_AT}, clock_timestamp(),
+            extract(epoch FROM clock_timestamp() - {STARTED_AT}),
+            {rows}{key_value}
+        """.strip()
+
+
+def save_fingerprint_command(fingerprint: str, stat_fingerprint: str) -> str:
+    """
+    Returns query that saves fingerprint of applied migrations.
+
+    Both fingerprints are saved in one value separated by space.
+
+    :param fingerprint: fingerprint of contents of migrations.
+    :param stat_fingerprint: fingerprint of stats of migration files.
+
+    :returns: sql query.
+    """
+    return (
+        "INSERT INTO pilgrimor_meta (key, value) "
+        f"VALUES ('{FINGERPRINT_KEY}', '{fingerprint} {stat_fingerprint}') "
+        "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value"
+    )
+
+
+class SystemTable:
+    """
+    SQL of pilgrimor table that any database understands.
+
+    Migrators get it from `system_table` attribute of the engine.
+    The table stays at the first schema, it has no comment,
+    so its snapshot is never older or newer than the first schema
+    and history, fingerprint and upgrade statements aren't executed.
+    """
+
+    # The latest schema of the table.
+    schema_version = FIRST_SCHEMA_VERSION
+    # Records with comment of the table, see MigrationStateSnapshot.from_result.
+    state_query = RECORDS_QUERY
+    # Comment of the table with saved fingerprint, None without pilgrimor_meta.
+    fingerprint_query: Optional[str] = None
+
+    def initialize_query(self) -> str:
+        """
+        Returns query that creates pilgrimor table of the latest schema.
+
+        :returns: sql query.
+        """
+        return f"{CREATE_TABLE_QUERY.strip()};\n"
+
+    def upgrade_query(
+        self,
+        schema_version: int,
+        versions: Iterable[str] = (),
+    ) -> str:
+        """
+        Returns query that upgrades the table to the latest schema.
+
+        :param schema_version: current schema version.
+        :param versions: versions in pilgrimor table.
+
+        :returns: sql query, empty if the table is up to date.
+        """
+        return ""
+
+    def version_lookup(
+        self,
+        version: Optional[str],
+        latest: bool,
+    ) -> Optional[Tuple[str, Optional[List[Any]]]]:
+        """
+        Returns indexed query of records that answers version questions.
+
+        :param version: version of the command.
+        :param latest: command works with the biggest version or not.
+
+        :returns: query and its parameters or None if versions
+            are compared in memory.
+        """
+        return None
+
+
+class PostgreSQLSystemTable(SystemTable):
+    """
+    SQL of pilgrimor table with versioned schema.
+
+    Schema version is kept in the comment of the table,
+    history is recorded with PostgreSQL session settings
+    and statistics of the transaction.
+    """
+
+    schema_version = SCHEMA_VERSION
+    state_query = STATE_QUERY
+    fingerprint_query: Optional[str] = FINGERPRINT_QUERY
+
+    def initialize_query(self) -> str:
+        """
+        Returns query that creates pilgrimor table of the latest schema.
+
+        :returns: sql query.
+        """
+        return initialize_table_query()
+
+    def upgrade_query(
+        self,
+        schema_version: int,
+        versions: Iterable[str] = (),
+    ) -> str:
+        """
+        Returns query that upgrades the table to the latest schema.
+
+        :param schema_version: current schema version.
+        :param versions: versions in pilgrimor table,
+            their keys are filled if the table gets version_key.
+
+        :returns: sql query, empty if the table is up to date.
+        """
+        return upgrade_query(schema_version, versions)
+
+    def version_lookup(
+        self,
+        version: Optional[str],
+        latest: bool,
+    ) -> Optional[Tuple[str, Optional[List[Any]]]]:
+        """
+        Returns indexed query of records that answers version questions.
+
+        The biggest version is found for rollback of the latest version,
+        the version and all bigger versions for other commands with version.
+
+        :param version: version of the command.
+        :param latest: command works with the biggest version or not.
+
+        :returns: query and its parameters or None
+            if the command doesn't compare versions.
+        """
+        if latest:
+            return LATEST_VERSION_QUERY, None
+        if version:
+            return VERSIONS_SINCE_QUERY, [version_key(version)]
+        return None
@@ -0,0 +1,181 @@
+from typing import Any, Dict, List, Optional, Type
+
+import psycopg
+from psycopg import sql
+from psycopg.conninfo import make_conninfo
+
+from pilgrimor.abc.engine import PilgrimoreEngine
+from pilgrimor.engine.advisory_lock import lock_key
+from pilgrimor.engine.postgresql_engine import PostgreSQLEngine
+from pilgrimor.migrator.rawsql_migrator.migration_files import migrations_hash
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+from pilgrimor.utils import success_text
+
+TEMPLATE_COMMENT = "pilgrimor {0}"
+TEMPLATE_HASH_QUERY = """
+SELECT shobj_description(oid, 'pg_database')
+FROM pg_database
+WHERE datname = %s
+"""
+PENDING_VERSION_SUFFIX = ".post1"
+
+
+class TemplateDatabase:
+    """
+    Migrated template for fast creation of databases.
+
+    Template is migrated once, its comment keeps hash
+    of migrations directory, so it is rebuilt only
+    when migrations change. New databases are
+    copies of the template made with `CREATE DATABASE ... TEMPLATE`.
+
+    Template is built under an advisory lock,
+    so parallel workers wait for one build.
+    Migrations without version are applied too,
+    migration files are never changed.
+    """
+
+    def __init__(
+        self,
+        admin_url: str,
+        migrations_dir: str,
+        template_name: str = "pilgrimor_template",
+        engine_class: Type[PilgrimoreEngine] = PostgreSQLEngine,
+        engine_options: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Initialize the template.
+
+        :param admin_url: url to database of user that can create databases.
+        :param migrations_dir: directory with migrations.
+        :param template_name: name of template database.
+        :param engine_class: engine that migrates the template.
+        :param engine_options: options of the engine.
+        """
+        self.admin_url = admin_url
+        self.migrations_dir = migrations_dir
+        self.template_name = template_name
+        self.engine_class = engine_class
+        self.engine_options = engine_options or {}
+
+    def database_url(self, database: str) -> str:
+        """
+        Returns url to database on the same server.
+
+        :param database: database name.
+
+        :returns: connection string.
+        """
+        return make_conninfo(self.admin_url, dbname=database)
+
+    def ensure(self) -> bool:
+        """
+        Builds template if it is missing or migrations changed.
+
+        :returns: True if template was built.
+        """
+        migrations_digest = migrations_hash(self.migrations_dir)
+        comment = TEMPLATE_COMMENT.format(migrations_digest)
+        with psycopg.connect(self.admin_url, autocommit=True) as connection:
+            key = lock_key(self.template_name)
+            connection.execute("SELECT pg_advisory_lock(%s)", (key,))
+            try:
+                row = connection.execute(
+                    TEMPLATE_HASH_QUERY,
+                    (self.template_name,),
+                ).fetchone()
+                if row is not None and row[0] == comment:
+                    return False
+                self._drop(connection, self.template_name)
+                connection.execute(
+                    sql.SQL("CREATE DATABASE {0}").format(
+                        sql.Identifier(self.template_name),
+                    ),
+                )
+                self._migrate()
+                connection.execute(
+                    sql.SQL("COMMENT ON DATABASE {0} IS {1}").format(
+                        sql.Identifier(self.template_name),
+                        sql.Literal(comment),
+                    ),
+                )
+            finally:
+                connection.execute("SELECT pg_advisory_unlock(%s)", (key,))
+        print(success_text(f"Template {self.template_name} is built."))
+        return True
+
+    def create_database(self, database: str) -> str:
+        """
+        Creates database from the template.
+
+        Existing database with the same name is dropped.
+
+        :param database: database name.
+
+        :returns: url to the new database.
+        """
+        with psycopg.connect(self.admin_url, autocommit=True) as connection:
+            self._drop(connection, database)
+            connection.execute(
+                sql.SQL("CREATE DATABASE {0} TEMPLATE {1}").format(
+                    sql.Identifier(database),
+                    sql.Identifier(self.template_name),
+                ),
+            )
+        return self.database_url(database)
+
+    def provision(self, databases: int, prefix: Optional[str] = None) -> List[str]:
+        """
+        Builds template if needed and creates databases from it.
+
+        :param databases: number of databases.
+        :param prefix: prefix of database names, template name by default.
+
+        :returns: urls to new databases.
+        """
+        self.ensure()
+        prefix = prefix or self.template_name
+        return [
+            self.create_database(f"{prefix}_{number}") for number in range(databases)
+        ]
+
+    def drop_database(self, database: str) -> None:
+        """
+        Drops database.
+
+        :param database: database name.
+        """
+        with psycopg.connect(self.admin_url, autocommit=True) as connection:
+            self._drop(connection, database)
+
+    def _drop(self, connection: "psycopg.Connection[Any]", database: str) -> None:
+        """
+        Drops database, other connections to it are terminated.
+
+        :param connection: connection in autocommit mode.
+        :param database: database name.
+        """
+        connection.execute(
+            sql.SQL("DROP DATABASE IF EXISTS {0} WITH (FORCE)").format(
+                sql.Identifier(database),
+            ),
+        )
+
+    def _migrate(self) -> None:
+        """
+        Applies all migrations to the template.
+
+        Migrations without version get a version
+        after the last applied one.
+        """
+        with self.engine_class(
+            self.database_url(self.template_name),
+            **self.engine_options,
+        ) as engine:
+            migrator = RawSQLMigator(
+                engine,
+                self.migrations_dir,
+                write_versions=False,
+            )
+            migrator.initialize_database()
+            migrator.apply_all_migrations(PENDING_VERSION_SUFFIX)
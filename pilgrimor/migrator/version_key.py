@@ -0,0 +1,134 @@
+"""
+Version keys, text that sorts byte by byte like versions.
+
+Keys are kept in `version_key` column of pilgrimor table,
+so versions are compared by its index in SQL.
+"""
+from typing import Optional, Tuple
+
+from packaging.version import InvalidVersion, Version
+
+# Parts of version key, every part sorts before the next one.
+KEY_LEGACY = "!"
+KEY_RELEASE_END = "!"
+KEY_LOWEST = "0"
+KEY_PRESENT = "1"
+KEY_HIGHEST = "2"
+
+
+def key_number(number: int) -> str:
+    """
+    Returns number as text that sorts like the number.
+
+    :param number: not negative number.
+
+    :returns: length of the number with two digits and the number.
+    """
+    digits = str(number)
+    return f"{len(digits):02d}{digits}"
+
+
+def version_key(version: str) -> str:
+    """
+    Returns key that sorts like the version.
+
+    Keys are compared byte by byte, they follow PEP 440 order:
+    `1.0.dev1 < 1.0a1 < 1.0 < 1.0+local < 1.0.post1`,
+    equal versions like `1.0` and `1.0.0` have the same key.
+    Versions that are not PEP 440, like `release-2022`,
+    sort as text before all PEP 440 versions,
+    like legacy versions of packaging did.
+
+    :param version: version number.
+
+    :returns: version key.
+    """
+    try:
+        parsed = Version(version)
+    except InvalidVersion:
+        return f"{KEY_LEGACY}{version}"
+    return "".join(
+        (
+            key_number(parsed.epoch),
+            _release_key(parsed.release),
+            KEY_RELEASE_END,
+            _pre_release_key(parsed),
+            _number_key(parsed.post, KEY_LOWEST),
+            _number_key(parsed.dev, KEY_HIGHEST),
+            _local_key(parsed.local),
+        ),
+    )
+
+
+def _release_key(release: Tuple[int, ...]) -> str:
+    """
+    Returns key of release numbers without trailing zeros.
+
+    :param release: release numbers.
+
+    :returns: release key.
+    """
+    numbers = list(release)
+    while len(numbers) > 1 and numbers[-1] == 0:
+        numbers.pop()
+    return "".join(f".{key_number(number)}" for number in numbers)
+
+
+def _pre_release_key(parsed: Version) -> str:
+    """
+    Returns key of pre-release.
+
+    Development releases without pre-release and post-release
+    sort before pre-releases, final releases sort after them.
+
+    :param parsed: parsed version.
+
+    :returns: pre-release key.
+    """
+    if parsed.pre is not None:
+        return f"{KEY_PRESENT}{parsed.pre[0]}{key_number(parsed.pre[1])}"
+    if parsed.post is None and parsed.dev is not None:
+        return KEY_LOWEST
+    return KEY_HIGHEST
+
+
+def _number_key(number: Optional[int], missing_key: str) -> str:
+    """
+    Returns key of optional number, like post-release.
+
+    :param number: number or None if the version doesn't have it.
+    :param missing_key: key if the version doesn't have the number.
+
+    :returns: number key.
+    """
+    if number is None:
+        return missing_key
+    return f"{KEY_PRESENT}{key_number(number)}"
+
+
+def _local_key(local: Optional[str]) -> str:
+    """
+    Returns key of local version label.
+
+    :param local: local label or None.
+
+    :returns: local label key.
+    """
+    if local is None:
+        return KEY_LOWEST
+    return KEY_PRESENT + "".join(_local_part_key(part) for part in local.split("."))
+
+
+def _local_part_key(part: str) -> str:
+    """
+    Returns key of one part of local version label.
+
+    Numbers sort after strings, like in PEP 440.
+
+    :param part: part of local label.
+
+    :returns: part key.
+    """
+    if part.isdigit():
+        return f"{KEY_PRESENT}{key_number(int(part))}"
+    return f"{KEY_LOWEST}{part}{KEY_RELEASE_END}"
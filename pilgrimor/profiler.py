@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+STATEMENT_PREVIEW_LENGTH = 60
+
+
+class StatementProfile(NamedTuple):
+    """Timing of one executed statement."""
+
+    migration: str
+    statement: str
+    seconds: float
+    rows: int
+
+
+class Profiler:
+    """
+    Collects timings of one migrator command.
+
+    Migrator records its planning phases,
+    engine records every statement and every connection.
+    Disabled profiler records nothing.
+
+    Server time of a statement is estimated as its wall time
+    minus the shortest round trip of `SELECT 1`.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        """
+        Initialize the profiler.
+
+        :param enabled: record timings or not.
+        """
+        self.enabled = enabled
+        self.phases: Dict[str, float] = defaultdict(float)
+        self.statements: List[StatementProfile] = []
+        self.connections = 0
+        self.connection_seconds = 0.0
+        self.round_trip: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Measures a phase of the command.
+
+        Time of phases with the same name is summed.
+
+        :param name: name of the phase.
+
+        :yields: nothing.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                with self._lock:
+                    self.phases[name] += time.perf_counter() - started
+
+    def add_statement(
+        self,
+        migration: str,
+        statement: str,
+        seconds: float,
+        rows: int,
+    ) -> None:
+        """
+        Records executed statement.
+
+        :param migration: migration name.
+        :param statement: statement text.
+        :param seconds: wall time of the statement.
+        :param rows: rows affected, -1 if unknown.
+        """
+        if self.enabled:
+            with self._lock:
+                self.statements.append(
+                    StatementProfile(migration, statement, seconds, rows),
+                )
+
+    def add_connection(self, seconds: float, round_trip: float) -> None:
+        """
+        Records opened connection.
+
+        :param seconds: time to get the connection.
+        :param round_trip: time of empty query on the connection.
+        """
+        if self.enabled:
+            with self._lock:
+                self.connections += 1
+                self.connection_seconds += seconds
+                if self.round_trip is None or round_trip < self.round_trip:
+                    self.round_trip = round_trip
+
+    def server_seconds(self, statement: StatementProfile) -> float:
+        """
+        Estimates server time of the statement.
+
+        :param statement: statement profile.
+
+        :returns: seconds.
+        """
+        return max(statement.seconds - (self.round_trip or 0), 0)
+
+    def migration_totals(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Sums statements by migration.
+
+        :returns: totals by migration name in execution order.
+        """
+        totals: Dict[str, Dict[str, Any]] = {}
+        for statement in self.statements:
+            total = totals.setdefault(
+                statement.migration,
+                {"statements": 0, "seconds": 0.0, "server_seconds": 0.0, "rows": 0},
+            )
+            total["statements"] += 1
+            total["seconds"] += statement.seconds
+            total["server_seconds"] += self.server_seconds(statement)
+            total["rows"] += max(statement.rows, 0)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns profile for JSON output.
+
+        :returns: dict with phases, migrations, statements and connections.
+        """
+        return {
+            "phases": dict(self.phases),
+            "migrations": [
+                {"migration": migration, **total}
+                for migration, total in self.migration_totals().items()
+            ],
+            "statements": [
+                {
+                    **statement._asdict(),
+                    "server_seconds": self.server_seconds(statement),
+                }
+                for statement in self.statements
+            ],
+            "connections": {
+                "count": self.connections,
+                "seconds": self.connection_seconds,
+                "round_trip": self.round_trip,
+            },
+        }
+
+    def report(self, limit: int = 20) -> str:
+        """
+        Returns profile as text tables sorted by time.
+
+        :param limit: number of the slowest statements in the report.
+
+        :returns: report text.
+        """
+        lines = ["Planning and execution phases:"]
+        for name, seconds in sorted(self.phases.items(), key=lambda item: -item[1]):
+            lines.append(f"  {seconds:10.3f}s  {name}")
+
+        lines.append(
+            f"Connections: {self.connections}, {self.connection_seconds:.3f}s, "
+            f"round trip {(self.round_trip or 0) * 1000:.2f}ms",
+        )
+
+        lines.append("Migrations:")
+        lines.append(f"  {'wall':>10}  {'server':>10}  {'rows':>10}  migration")
+        totals = self.migration_totals()
+        for migration, total in sorted(
+            totals.items(),
+            key=lambda item: -item[1]["seconds"],
+        ):
+            lines.append(
+                f"  {total['seconds']:9.3f}s  {total['server_seconds']:9.3f}s  "
+                f"{total['rows']:>10}  {migration}",
+            )
+
+        lines.append(f"Slowest statements (top {limit}):")
+        lines.append(
+            f"  {'wall':>10}  {'server':>10}  {'rows':>10}  migration: statement",
+        )
+        for statement in sorted(self.statements, key=lambda item: -item.seconds)[
+            :limit
+        ]:
+            preview = " ".join(statement.statement.split())[:STATEMENT_PREVIEW_LENGTH]
+            lines.append(
+                f"  {statement.seconds:9.3f}s  {self.server_seconds(statement):9.3f}s  "
+                f"{statement.rows:>10}  {statement.migration}: {preview}",
+            )
+        return "\n".join(lines)
@@ -0,0 +1,80 @@
+"""
+Pytest fixtures with migrated databases.
+
+Template database is migrated once and every
+pytest-xdist worker gets its own copy of it.
+
+Plugin is enabled with `pytest_plugins = ["pilgrimor.pytest_plugin"]`
+in conftest.py.
+"""
+import os
+from typing import Iterator
+
+import pytest
+
+from pilgrimor.engine.engine import get_engine
+from pilgrimor.migrator.template import TemplateDatabase
+from pilgrimor.settings import get_settings
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """
+    Adds pilgrimor options.
+
+    :param parser: pytest parser.
+    """
+    group = parser.getgroup("pilgrimor")
+    group.addoption(
+        "--pilgrimor-admin-url",
+        help="Url to database of user that can create databases.",
+    )
+    parser.addini(
+        "pilgrimor_admin_url",
+        help="Url to database of user that can create databases.",
+    )
+    parser.addini(
+        "pilgrimor_template",
+        default="pilgrimor_template",
+        help="Name of pilgrimor template database.",
+    )
+
+
+@pytest.fixture(scope="session")
+def pilgrimor_template(request: pytest.FixtureRequest) -> TemplateDatabase:
+    """
+    Returns migrated template database.
+
+    Settings are taken from pyproject.toml,
+    database_url is used as admin url if it is not set.
+
+    :param request: pytest request.
+
+    :returns: template database.
+    """
+    settings = get_settings()
+    template = TemplateDatabase(
+        request.config.getoption("pilgrimor_admin_url")
+        or request.config.getini("pilgrimor_admin_url")
+        or settings.database_url,
+        settings.migrations_dir,
+        template_name=request.config.getini("pilgrimor_template"),
+        engine_class=get_engine(settings),  # type: ignore
+        engine_options=settings.engine_options(),
+    )
+    template.ensure()
+    return template
+
+
+@pytest.fixture(scope="session")
+def pilgrimor_database_url(pilgrimor_template: TemplateDatabase) -> Iterator[str]:
+    """
+    Creates database of the worker from the template.
+
+    :param pilgrimor_template: template database.
+
+    :yields: url to migrated database.
+    """
+    worker = os.environ.get("PYTEST_XDIST_WORKER", "main")
+    database = f"{pilgrimor_template.template_name}_{worker}"
+    yield pilgrimor_template.create_database(database)
+    pilgrimor_template.drop_database(database)
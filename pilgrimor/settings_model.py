@@ -0,0 +1,102 @@
+"""
+Settings validated by pydantic.
+
+The module is imported only when settings are not
+in the startup cache, pydantic is slow to import.
+"""
+import sys
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseSettings
+
+from pilgrimor.settings import DEFAULT_DATABASE_URL, OPTIONAL_SETTINGS, parse_toml
+from pilgrimor.utils import error_text
+
+
+class PilgrimorSettings(BaseSettings):
+    """BaseSettings for Pilgrimor."""
+
+    migrations_dir: str = "./migrations"
+    database_engine: str = "PSQL"
+    database_url: str = DEFAULT_DATABASE_URL
+    migrator_cli: str = "RAW"
+
+    connection_pool: bool = False
+    pool_min_size: int = 1
+    pool_max_size: int = 4
+    pipeline: bool = False
+
+    parse_cache: bool = False
+    version_manifest: bool = False
+    parallel_migrations: int = 1
+    lock_timeout: Optional[str] = None
+    lock_retries: int = 0
+    lock_retry_delay: float = 0.5
+    lock_retry_max_delay: float = 30
+    leader_election: bool = False
+    leader_poll_interval: float = 1
+
+    database_urls: List[str] = []
+    database_urls_file: Optional[str] = None
+    database_url_template: Optional[str] = None
+    shards: int = 0
+    concurrency: int = 4
+    fail_fast: bool = True
+
+    class Config:
+        env_file = ".env"
+        env_prefix = "PILGRIMOR_"
+        env_file_encoding = "utf-8"
+
+    def add_new_fields(self) -> "PilgrimorSettings":  # noqa: C901, WPS210
+        """
+        Create new instance of Settings.
+
+        Parse .env and pyproject.toml file to get settings.
+
+        :returns: PilgrimorSettings.
+        """
+        try:
+            with open("pyproject.toml", "r") as pyproject_file:
+                raw_poetry_settings = pyproject_file.read()
+        except Exception:
+            sys.exit("Can't find pyproject.toml.")
+
+        pyproject_toml = parse_toml(raw_poetry_settings)
+        try:
+            pilgrimor_settings: Dict[str, str] = pyproject_toml["tool"][  # type: ignore
+                "pilgrimor"
+            ]
+        except KeyError:
+            sys.exit(error_text("Can't find pyproject.toml."))
+
+        try:
+            self.database_engine = pilgrimor_settings["database_engine"]
+            self.migrations_dir = pilgrimor_settings["migrations_dir"]
+        except KeyError as exc:
+            sys.exit(error_text(f"Error in getting settings - {str(exc)}"))
+
+        for field_name in OPTIONAL_SETTINGS:
+            if field_name in pilgrimor_settings:
+                self._set_optional_field(
+                    field_name,
+                    pilgrimor_settings[field_name],
+                )
+
+        return self
+
+    def _set_optional_field(self, field_name: str, raw_value: Any) -> None:
+        """
+        Validates and sets optional field from pyproject.toml.
+
+        :param field_name: name of the field.
+        :param raw_value: value from pyproject.toml.
+        """
+        value, errors = self.__fields__[field_name].validate(
+            raw_value,
+            {},
+            loc=field_name,
+        )
+        if errors:
+            sys.exit(error_text(f"Wrong value for setting - {field_name}"))
+        setattr(self, field_name, value)
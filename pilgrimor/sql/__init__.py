@@ -0,0 +1,5 @@
+"""SQL text utilities for pilgrimor."""
+
+from pilgrimor.sql.tokenizer import Statement, code_only, iter_statements
+
+__all__ = ["Statement", "code_only", "iter_statements"]
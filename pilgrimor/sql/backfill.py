@@ -0,0 +1,113 @@
+import re
+from typing import NamedTuple, Optional
+
+from pilgrimor.sql.directives import Directives
+from pilgrimor.sql.tokenizer import IDENTIFIER, QUALIFIED_NAME
+
+BACKFILL_TYPE = "backfill"
+DEFAULT_BATCH_SIZE = 1000
+DURATION_PATTERN = re.compile(r"^(?P<amount>\d+(?:\.\d+)?)(?P<unit>ms|s|min)?$")
+DURATION_UNITS = {None: 1, "s": 1, "ms": 0.001, "min": 60}
+QUALIFIED_NAME_PATTERN = re.compile(QUALIFIED_NAME)
+IDENTIFIER_PATTERN = re.compile(IDENTIFIER)
+
+INITIALIZE_PROGRESS_QUERY = """
+CREATE TABLE IF NOT EXISTS pilgrimor_backfill (
+    migration VARCHAR(100) PRIMARY KEY,
+    last_key TEXT NOT NULL,
+    rows BIGINT NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+)
+"""
+GET_PROGRESS_QUERY = """
+SELECT last_key, rows FROM pilgrimor_backfill WHERE migration = %(migration)s
+"""
+SAVE_PROGRESS_QUERY = """
+INSERT INTO pilgrimor_backfill (migration, last_key, rows)
+VALUES (%(migration)s, %(last_key)s, %(rows)s)
+ON CONFLICT (migration) DO UPDATE
+SET last_key = excluded.last_key, rows = excluded.rows, updated_at = now()
+"""
+DROP_PROGRESS_QUERY = """
+DELETE FROM pilgrimor_backfill WHERE migration = %(migration)s
+"""
+
+
+def parse_duration(duration: str) -> float:
+    """
+    Converts duration like `100ms`, `2s` or `1min` to seconds.
+
+    :param duration: duration, seconds without unit.
+
+    :raises ValueError: if duration is wrong.
+
+    :returns: seconds.
+    """
+    match = DURATION_PATTERN.match(duration.strip())
+    if match is None:
+        raise ValueError(f"Wrong duration - {duration}")
+    return float(match.group("amount")) * DURATION_UNITS[match.group("unit")]
+
+
+class Backfill(NamedTuple):
+    """
+    Backfill of a big table by chunks.
+
+    Migration with `-- pilgrimor: type=backfill table=users key=id` directive
+    is executed for every chunk of the table ordered by key,
+    every chunk is committed, so locks are short and WAL is written evenly.
+    Statements get `%(start)s` and `%(end)s` parameters,
+    inclusive bounds of the chunk keys.
+    Last key of committed chunk is saved in pilgrimor_backfill table,
+    killed backfill continues after it.
+    """
+
+    table: str
+    key: str
+    batch_size: int = DEFAULT_BATCH_SIZE
+    sleep: float = 0
+
+    @classmethod
+    def from_directives(cls, directives: Directives) -> Optional["Backfill"]:
+        """
+        Creates backfill from migration directives.
+
+        :param directives: parsed directives.
+
+        :raises ValueError: if directives are wrong.
+
+        :returns: backfill or None if migration is not a backfill.
+        """
+        values = dict(directives)
+        if values.get("type") != BACKFILL_TYPE:
+            return None
+        table = values.get("table", "")
+        key = values.get("key", "")
+        if not QUALIFIED_NAME_PATTERN.fullmatch(table):
+            raise ValueError(f"Wrong backfill table - {table!r}")
+        if not IDENTIFIER_PATTERN.fullmatch(key):
+            raise ValueError(f"Wrong backfill key - {key!r}")
+        batch_size = int(values.get("batch_size", DEFAULT_BATCH_SIZE))
+        if batch_size < 1:
+            raise ValueError(f"Wrong backfill batch_size - {batch_size}")
+        return cls(
+            table=table,
+            key=key,
+            batch_size=batch_size,
+            sleep=parse_duration(values.get("sleep", "0")),
+        )
+
+    def chunk_query(self, resume: bool) -> str:
+        """
+        Returns query that finds bounds of the next chunk.
+
+        :param resume: the chunk is after `%(after)s` key or the first one.
+
+        :returns: sql query returning first key, last key and number of keys.
+        """
+        condition = f"WHERE {self.key} > %(after)s " if resume else ""
+        return (
+            f"SELECT min(chunk_key), max(chunk_key), count(*) FROM ("  # noqa: S608
+            f"SELECT {self.key} AS chunk_key FROM {self.table} {condition}"
+            f"ORDER BY {self.key} LIMIT {self.batch_size}) chunk"
+        )
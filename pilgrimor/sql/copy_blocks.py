@@ -0,0 +1,138 @@
+import gzip
+import re
+from os.path import isabs, join
+from typing import BinaryIO, Generator, List, NamedTuple, Optional, Tuple, Union
+
+from pilgrimor.sql.tokenizer import QUALIFIED_NAME
+
+COPY_CHUNK_SIZE = 1024 * 1024
+COPY_BLOCK_PATTERN = re.compile(
+    rf"""
+    ^[ \t]*--[ \t]*copy[ \t]+
+    (?P<table>{QUALIFIED_NAME})[ \t]*
+    (?:\((?P<columns>[A-Za-z0-9_$",\s]*)\))?[ \t]*
+    from[ \t]+'(?P<path>[^'\n]+)'
+    (?P<header>[ \t]+header)?[ \t]*$
+    """,
+    re.IGNORECASE | re.MULTILINE | re.VERBOSE,
+)
+
+
+class CopyBlock(NamedTuple):
+    """
+    Data file that is loaded with COPY.
+
+    Block is written in migration as a comment:
+    `-- copy table(col1, col2) from 'data/table.csv.gz' header`.
+    """
+
+    table: str
+    columns: Optional[str]
+    path: str
+    header: bool = False
+
+    @property
+    def format(self) -> str:
+        """
+        Returns COPY format by file extension.
+
+        :returns: csv for .csv and .csv.gz files, text for others.
+        """
+        path = self.path.lower()
+        if path.endswith(".gz"):
+            path = path[:-3]
+        return "csv" if path.endswith(".csv") else "text"
+
+    def copy_query(self) -> str:
+        """
+        Returns COPY FROM STDIN query.
+
+        :returns: sql query.
+        """
+        columns = f" ({self.columns})" if self.columns else ""
+        options = f"FORMAT {self.format}"
+        if self.header:
+            options = f"{options}, HEADER true"
+        return f"COPY {self.table}{columns} FROM STDIN WITH ({options})"
+
+    def full_path(self, base_dir: Optional[str]) -> str:
+        """
+        Returns path to data file.
+
+        :param base_dir: directory for relative paths.
+
+        :returns: path to data file.
+        """
+        if base_dir is None or isabs(self.path):
+            return self.path
+        return join(base_dir, self.path)
+
+    def iter_chunks(
+        self,
+        base_dir: Optional[str],
+        chunk_size: int = COPY_CHUNK_SIZE,
+    ) -> Generator[bytes, None, None]:
+        """
+        Reads data file by chunks, .gz files are decompressed.
+
+        :param base_dir: directory for relative paths.
+        :param chunk_size: size of one chunk in bytes.
+
+        :yields: chunks of data.
+        """
+        path = self.full_path(base_dir)
+        data_file: Union[gzip.GzipFile, BinaryIO]
+        if path.endswith(".gz"):
+            data_file = gzip.open(path, "rb")
+        else:
+            data_file = open(path, "rb")  # noqa: WPS515
+        with data_file:
+            while chunk := data_file.read(chunk_size):
+                yield chunk
+
+
+def parse_copy_block(statement: str) -> Optional[CopyBlock]:
+    """
+    Parses copy block.
+
+    :param statement: statement of migration.
+
+    :returns: copy block or None if statement is not a copy block.
+    """
+    if not statement.lstrip().startswith("--"):
+        return None
+    match = COPY_BLOCK_PATTERN.fullmatch(statement.strip())
+    if match is None:
+        return None
+    columns = match.group("columns")
+    return CopyBlock(
+        table=match.group("table"),
+        columns=" ".join(columns.split()) if columns else None,
+        path=match.group("path"),
+        header=match.group("header") is not None,
+    )
+
+
+def find_copy_blocks(sql: str) -> List[Tuple[int, int]]:
+    """
+    Returns offsets of copy blocks.
+
+    :param sql: SQL text.
+
+    :returns: list with (start, end) of every copy block.
+    """
+    return [
+        (match.start() + len(match.group()) - len(match.group().lstrip()), match.end())
+        for match in COPY_BLOCK_PATTERN.finditer(sql)
+    ]
+
+
+def has_copy_blocks(statements: List[str]) -> bool:
+    """
+    Checks if any statement is a copy block.
+
+    :param statements: statements of migration.
+
+    :returns: True if there are copy blocks.
+    """
+    return any(parse_copy_block(statement) for statement in statements)
@@ -0,0 +1,82 @@
+import re
+from typing import Dict, FrozenSet, Iterable, List, Sequence, Set
+
+from pilgrimor.sql.tokenizer import QUALIFIED_NAME
+
+COMMENT_PATTERN = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+OBJECT_PATTERN = re.compile(
+    rf"""
+    \b(?:
+        (?:table|into|update|from|join|references|on|truncate|sequence|view)
+        \s+(?:only\s+)?(?:if\s+(?:not\s+)?exists\s+)?
+        |index\s+(?:concurrently\s+)?(?:if\s+(?:not\s+)?exists\s+)?(?!on\b)
+    )
+    (?P<name>{QUALIFIED_NAME})
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+NOT_OBJECTS = frozenset(
+    ("only", "if", "concurrently", "select", "conflict", "delete", "update"),
+)
+DEFAULT_SCHEMA = "public."
+
+
+def touched_objects(statements: Iterable[str]) -> FrozenSet[str]:
+    """
+    Returns names of tables, indexes and other objects used by statements.
+
+    Names are found with regular expressions, so the result
+    is an estimation, it is used only to find migrations
+    that can run at the same time.
+
+    :param statements: SQL statements.
+
+    :returns: set with lower case names without `public.` schema.
+    """
+    objects: Set[str] = set()
+    for statement in statements:
+        for match in OBJECT_PATTERN.finditer(COMMENT_PATTERN.sub(" ", statement)):
+            name = match.group("name")
+            if name.lower() in NOT_OBJECTS:
+                continue
+            name = name.replace('"', "") if '"' in name else name.lower()
+            if name.startswith(DEFAULT_SCHEMA):
+                name = name[len(DEFAULT_SCHEMA) :]  # noqa: E203
+            objects.add(name)
+    return frozenset(objects)
+
+
+def build_dependencies(
+    migrations: Sequence[str],
+    objects: Dict[str, FrozenSet[str]],
+    declared: Dict[str, FrozenSet[str]],
+) -> Dict[str, List[str]]:
+    """
+    Builds dependency graph of migrations.
+
+    Migration depends on every previous migration
+    that uses the same object or is declared in its depends_on,
+    migration without found objects depends on all previous migrations
+    and all next migrations depend on it.
+    Declared dependencies are conflicts, so they work
+    in both apply and rollback order.
+
+    :param migrations: migrations in execution order.
+    :param objects: used objects by migration.
+    :param declared: declared dependencies by migration.
+
+    :returns: previous migrations by migration.
+    """
+    dependencies: Dict[str, List[str]] = {}
+    for index, migration in enumerate(migrations):
+        migration_objects = objects.get(migration, frozenset())
+        dependencies[migration] = [
+            previous
+            for previous in migrations[:index]
+            if not migration_objects
+            or not objects.get(previous)
+            or migration_objects & objects[previous]
+            or previous in declared.get(migration, frozenset())
+            or migration in declared.get(previous, frozenset())
+        ]
+    return dependencies
@@ -0,0 +1,93 @@
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+from pilgrimor.sql.tokenizer import code_only
+
+DIRECTIVE_PATTERN = re.compile(
+    r"^[ \t]*--[ \t]*pilgrimor:(.*)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+AUTOCOMMIT_PATTERN = re.compile(
+    r"\b(?:concurrently|vacuum|alter\s+system|(?:create|drop)\s+database)\b",
+    re.IGNORECASE,
+)
+SESSION_SETTINGS = frozenset(
+    (
+        "lock_timeout",
+        "statement_timeout",
+        "idle_in_transaction_session_timeout",
+        "maintenance_work_mem",
+        "max_parallel_maintenance_workers",
+        "work_mem",
+    ),
+)
+TRUE_VALUES = frozenset(("true", "on", "yes", "1"))
+FALSE_VALUES = frozenset(("false", "off", "no", "0"))
+
+Directives = Tuple[Tuple[str, str], ...]
+
+
+def parse_directives(sql: str) -> Directives:
+    """
+    Parses pilgrimor directives from comments.
+
+    Directive is a line comment like
+    `-- pilgrimor: depends_on=1_users.sql,2_orders.sql`,
+    one line can have many space separated `key=value` pairs.
+    Later values override earlier ones.
+
+    :param sql: SQL text.
+
+    :returns: tuple with (key, value) pairs.
+    """
+    directives: Dict[str, str] = {}
+    for match in DIRECTIVE_PATTERN.finditer(sql):
+        for pair in match.group(1).split():
+            key, _, value = pair.partition("=")
+            directives[key.strip().lower()] = value.strip()
+    return tuple(directives.items())
+
+
+def directive_flag(value: Optional[str]) -> Optional[bool]:
+    """
+    Converts directive value to bool.
+
+    :param value: directive value.
+
+    :raises ValueError: if value is not a bool.
+
+    :returns: bool or None if value is not set.
+    """
+    if value is None:
+        return None
+    if value.lower() in TRUE_VALUES:
+        return True
+    if value.lower() in FALSE_VALUES:
+        return False
+    raise ValueError(f"Wrong bool value - {value}")
+
+
+def requires_autocommit(statements: Iterable[str]) -> bool:
+    """
+    Checks if any statement can't run in transaction block.
+
+    Keywords in comments and string literals are not counted.
+
+    :param statements: SQL statements.
+
+    :returns: True if migration must run not in transaction.
+    """
+    return any(
+        AUTOCOMMIT_PATTERN.search(code_only(statement)) for statement in statements
+    )
+
+
+def session_settings(directives: Directives) -> Dict[str, str]:
+    """
+    Returns directives that are database settings.
+
+    :param directives: parsed directives.
+
+    :returns: setting values by name.
+    """
+    return {key: value for key, value in directives if key in SESSION_SETTINGS}
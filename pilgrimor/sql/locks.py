@@ -0,0 +1,91 @@
+import re
+from typing import Iterable, Optional, Tuple
+
+from pilgrimor.sql.tokenizer import SQLTokenizeError, code_only
+
+ACCESS_SHARE = "ACCESS SHARE"
+ROW_EXCLUSIVE = "ROW EXCLUSIVE"
+SHARE_UPDATE_EXCLUSIVE = "SHARE UPDATE EXCLUSIVE"
+SHARE = "SHARE"
+SHARE_ROW_EXCLUSIVE = "SHARE ROW EXCLUSIVE"
+EXCLUSIVE = "EXCLUSIVE"
+ACCESS_EXCLUSIVE = "ACCESS EXCLUSIVE"
+
+LOCK_LEVELS = (
+    ACCESS_SHARE,
+    ROW_EXCLUSIVE,
+    SHARE_UPDATE_EXCLUSIVE,
+    SHARE,
+    SHARE_ROW_EXCLUSIVE,
+    EXCLUSIVE,
+    ACCESS_EXCLUSIVE,
+)
+
+LOCK_RULES: Tuple[Tuple[str, Optional[str]], ...] = (
+    (r"create\s+(?:unique\s+)?index\s+concurrently", SHARE_UPDATE_EXCLUSIVE),
+    (r"(?:drop\s+index|reindex\s+\w+)\s+concurrently", SHARE_UPDATE_EXCLUSIVE),
+    (r"create\s+(?:unique\s+)?index", SHARE),
+    (r"refresh\s+materialized\s+view\s+concurrently", EXCLUSIVE),
+    (r"alter\s+table\b.*\bvalidate\s+constraint", SHARE_UPDATE_EXCLUSIVE),
+    (r"alter\s+table\b.*\battach\s+partition", SHARE_UPDATE_EXCLUSIVE),
+    (r"alter\s+table\b.*\bset\s+statistics", SHARE_UPDATE_EXCLUSIVE),
+    (r"alter\s+table\b.*\bforeign\s+key", SHARE_ROW_EXCLUSIVE),
+    (r"create\s+(?:or\s+replace\s+)?(?:constraint\s+)?trigger", SHARE_ROW_EXCLUSIVE),
+    (r"vacuum\s+(?:\(\s*)?full", ACCESS_EXCLUSIVE),
+    (r"vacuum|analyze|create\s+statistics|comment\s+on", SHARE_UPDATE_EXCLUSIVE),
+    (
+        r"alter\s+(?:table|index|materialized\s+view)|drop\s+(?:table|index)"
+        r"|truncate|cluster|reindex|refresh\s+materialized\s+view|lock\b",
+        ACCESS_EXCLUSIVE,
+    ),
+    (r"insert|update|delete|merge|copy\b", ROW_EXCLUSIVE),
+    (r"with\b.*\b(?:insert|update|delete|merge)\b", ROW_EXCLUSIVE),
+    (r"select\s+set_config\b", None),
+    (r"select|with\b", ACCESS_SHARE),
+    (r"create|set\b|reset\b|drop|grant|revoke|do\b", None),
+)
+LOCK_PATTERNS = tuple(
+    (re.compile(rf"^\s*(?:{rule})", re.IGNORECASE | re.DOTALL), level)
+    for rule, level in LOCK_RULES
+)
+
+
+def estimate_lock(statement: str) -> Optional[str]:
+    """
+    Estimates the strongest table lock of the statement.
+
+    Estimation is made with regular expressions
+    by the first keywords of the statement,
+    it shows how much the statement blocks other queries
+    on existing tables, new objects are not counted.
+
+    :param statement: SQL statement.
+
+    :returns: lock level or None if no existing table is locked.
+    """
+    try:
+        code = code_only(statement)
+    except SQLTokenizeError:
+        code = statement
+    for pattern, level in LOCK_PATTERNS:
+        if pattern.match(code):
+            return level
+    return None
+
+
+def strongest_lock(statements: Iterable[str]) -> Optional[str]:
+    """
+    Returns the strongest estimated lock of statements.
+
+    :param statements: SQL statements.
+
+    :returns: lock level or None.
+    """
+    levels = [
+        LOCK_LEVELS.index(level)
+        for level in map(estimate_lock, statements)
+        if level is not None
+    ]
+    if not levels:
+        return None
+    return LOCK_LEVELS[max(levels)]
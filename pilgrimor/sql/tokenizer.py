@@ -0,0 +1,247 @@
+import re
+from typing import Iterator, List, NamedTuple, Optional
+
+# The lookahead lets the regex engine skip plain text quickly.
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?=[;\-'"$/bce])
+    (?:
+        (?P<semicolon>;)
+        |(?P<line_comment>--[^\n]*)
+        |(?P<escape_string>(?<![A-Za-z0-9_$])e'(?:[^'\\]|\\.|'')*')
+        |(?P<string>'[^']*(?:''[^']*)*')
+        |(?P<identifier>"[^"]*(?:""[^"]*)*")
+        |(?P<dollar>(?<![A-Za-z0-9_$])\$(?:[A-Za-z_][A-Za-z0-9_]*)?\$)
+        |(?P<block_comment>/\*)
+        |(?P<keyword>\b(?:begin|case|end)\b)
+        |(?P<unterminated>['"])
+    )
+    """,
+    re.IGNORECASE | re.VERBOSE | re.DOTALL,
+)
+ATOMIC_PATTERN = re.compile(r"\s+atomic\b", re.IGNORECASE)
+BLOCK_COMMENT_PATTERN = re.compile(r"/\*|\*/")
+NON_SPACE_PATTERN = re.compile(r"\S")
+IDENTIFIER = r'(?:"[^"]+"|[A-Za-z_][A-Za-z0-9_$]*)'
+QUALIFIED_NAME = rf"{IDENTIFIER}(?:\.{IDENTIFIER})?"
+
+
+class Statement(NamedTuple):
+    """
+    One SQL statement.
+
+    start and end are offsets of the statement in the source text,
+    the terminating semicolon is not included.
+    """
+
+    text: str
+    start: int
+    end: int
+
+
+class SQLTokenizeError(ValueError):
+    """Error if SQL text has unterminated quote or comment."""
+
+
+def iter_statements(sql: str) -> Iterator[Statement]:  # noqa: C901, WPS210, WPS231
+    """
+    Splits SQL text into statements.
+
+    The text is scanned once, semicolons inside
+    string literals, quoted identifiers, dollar quoted bodies,
+    comments and BEGIN ATOMIC ... END blocks
+    do not split statements.
+    Statements that contain only comments are skipped.
+
+    :param sql: SQL text.
+
+    :raises SQLTokenizeError: if quote or comment is not terminated.
+
+    :yields: statements in the order of the text.
+    """
+    segment_start = 0
+    has_code = False
+    atomic_blocks: List[str] = []
+    position = 0
+    while match := TOKEN_PATTERN.search(sql, position):
+        token_start = match.start()
+        if not has_code and NON_SPACE_PATTERN.search(sql, position, token_start):
+            has_code = True
+        kind = match.lastgroup
+        position = match.end()
+
+        if kind == "semicolon":
+            if not atomic_blocks:
+                if has_code:
+                    yield _make_statement(sql, segment_start, token_start)
+                segment_start = position
+                has_code = False
+            continue
+
+        if kind == "line_comment":
+            continue
+
+        if kind == "block_comment":
+            position = _skip_block_comment(sql, position)
+            continue
+
+        if kind == "unterminated":
+            raise SQLTokenizeError(f"Unterminated {match.group()} quote")
+
+        has_code = True
+        if kind == "dollar":
+            position = _skip_dollar_quote(sql, match.group(), position)
+        elif kind == "keyword":
+            _track_atomic_block(sql, match.group().lower(), position, atomic_blocks)
+
+    if not has_code and NON_SPACE_PATTERN.search(sql, position):
+        has_code = True
+    if has_code:
+        yield _make_statement(sql, segment_start, len(sql))
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    Returns texts of all statements.
+
+    :param sql: SQL text.
+
+    :returns: list with statements.
+    """
+    return [statement.text for statement in iter_statements(sql)]
+
+
+def code_only(sql: str) -> str:
+    """
+    Returns SQL text without comments and quoted text.
+
+    Comments, string literals, quoted identifiers
+    and dollar quoted bodies are replaced with spaces,
+    so keywords can be searched with regular expressions.
+
+    :param sql: SQL text.
+
+    :raises SQLTokenizeError: if quote or comment is not terminated.
+
+    :returns: SQL text with code only.
+    """
+    parts: List[str] = []
+    code_start = 0
+    position = 0
+    while match := TOKEN_PATTERN.search(sql, position):
+        kind = match.lastgroup
+        position = match.end()
+        if kind in {"semicolon", "keyword"}:
+            continue
+        if kind == "unterminated":
+            raise SQLTokenizeError(f"Unterminated {match.group()} quote")
+        if kind == "block_comment":
+            position = _skip_block_comment(sql, position)
+        elif kind == "dollar":
+            position = _skip_dollar_quote(sql, match.group(), position)
+        parts.append(sql[code_start : match.start()])  # noqa: E203
+        parts.append(" ")
+        code_start = position
+    parts.append(sql[code_start:])
+    return "".join(parts)
+
+
+def statement_at(
+    statements: List[Statement],
+    position: int,
+) -> Optional[Statement]:
+    """
+    Returns statement that contains position.
+
+    :param statements: statements of the text.
+    :param position: offset in the text.
+
+    :returns: statement or None.
+    """
+    for statement in statements:
+        if statement.start <= position <= statement.end:
+            return statement
+    return None
+
+
+def _make_statement(sql: str, segment_start: int, segment_end: int) -> Statement:
+    """
+    Creates statement without surrounding whitespace.
+
+    :param sql: SQL text.
+    :param segment_start: offset after previous statement.
+    :param segment_end: offset of statement terminator.
+
+    :returns: statement.
+    """
+    non_space = NON_SPACE_PATTERN.search(sql, segment_start, segment_end)
+    start = non_space.start()  # type: ignore
+    text = sql[start:segment_end].rstrip()
+    return Statement(text=text, start=start, end=start + len(text))
+
+
+def _track_atomic_block(
+    sql: str,
+    keyword: str,
+    position: int,
+    atomic_blocks: List[str],
+) -> None:
+    """
+    Tracks nesting of BEGIN ATOMIC ... END blocks.
+
+    CASE ... END is tracked inside the block,
+    because its END must not close the block.
+
+    :param sql: SQL text.
+    :param keyword: found keyword in lower case.
+    :param position: offset after the keyword.
+    :param atomic_blocks: stack of opened blocks.
+    """
+    if keyword == "begin":
+        if ATOMIC_PATTERN.match(sql, position):
+            atomic_blocks.append(keyword)
+    elif not atomic_blocks:
+        return
+    elif keyword == "case":
+        atomic_blocks.append(keyword)
+    else:
+        atomic_blocks.pop()
+
+
+def _skip_block_comment(sql: str, position: int) -> int:
+    """
+    Returns offset after the end of nested block comment.
+
+    :param sql: SQL text.
+    :param position: offset after the opening of the comment.
+
+    :raises SQLTokenizeError: if comment is not terminated.
+
+    :returns: offset after the comment.
+    """
+    depth = 1
+    while depth:
+        match = BLOCK_COMMENT_PATTERN.search(sql, position)
+        if match is None:
+            raise SQLTokenizeError("Unterminated block comment")
+        depth += 1 if match.group() == "/*" else -1
+        position = match.end()
+    return position
+
+
+def _skip_dollar_quote(sql: str, tag: str, position: int) -> int:
+    """
+    Returns offset after the end of dollar quoted body.
+
+    :param sql: SQL text.
+    :param tag: opening tag, like $$ or $body$.
+    :param position: offset after the opening tag.
+
+    :raises SQLTokenizeError: if dollar quote is not terminated.
+
+    :returns: offset after the closing tag.
+    """
+    tag_end = sql.find(tag, position)
+    if tag_end == -1:
+        raise SQLTokenizeError(f"Unterminated dollar quote {tag}")
+    return tag_end + len(tag)
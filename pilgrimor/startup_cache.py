@@ -0,0 +1,105 @@
+"""
+Cache of values resolved on CLI start.
+
+Every run of the CLI is a new process, so values
+that are slow to resolve, like settings validated
+by pydantic, are kept in files of the user cache
+directory between runs.
+
+Every value is stored with a key of everything it was
+resolved from, the value is used only if the key is the same.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from os.path import expanduser, join
+from typing import Any, Optional
+
+CACHE_DIR_VARIABLE = "PILGRIMOR_CACHE_DIR"
+
+
+def cache_dir() -> str:
+    """
+    Returns directory of the cache.
+
+    :returns: PILGRIMOR_CACHE_DIR or pilgrimor directory in XDG cache home.
+    """
+    if directory := os.environ.get(CACHE_DIR_VARIABLE):
+        return directory
+    cache_home = os.environ.get("XDG_CACHE_HOME") or join(expanduser("~"), ".cache")
+    return join(cache_home, "pilgrimor")
+
+
+def cache_path(name: str) -> str:
+    """
+    Returns path to the cache file of the current directory.
+
+    Projects in different directories have different files.
+
+    :param name: name of the cached value.
+
+    :returns: path to the cache file.
+    """
+    project = hashlib.sha256(os.getcwd().encode()).hexdigest()[:16]
+    return join(cache_dir(), f"{name}-{project}.json")
+
+
+def read_cache(name: str, key: str) -> Optional[Any]:
+    """
+    Returns cached value if it was stored with the same key.
+
+    :param name: name of the cached value.
+    :param key: key of everything the value depends on.
+
+    :returns: value or None if there is no valid value.
+    """
+    try:
+        with open(cache_path(name)) as cache_file:
+            cached = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("key") != key:
+        return None
+    return cached.get("value")
+
+
+def write_cache(name: str, key: str, value: Any) -> None:
+    """
+    Stores value in the cache.
+
+    File is readable only by the user, values must not
+    have credentials anyway. Errors are ignored,
+    the value is resolved again on the next run.
+
+    :param name: name of the cached value.
+    :param key: key of everything the value depends on.
+    :param value: JSON compatible value.
+    """
+    path = cache_path(name)
+    try:
+        os.makedirs(cache_dir(), mode=0o700, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(prefix=".", dir=cache_dir())
+    except OSError:
+        return
+    try:
+        with os.fdopen(descriptor, "w") as cache_file:
+            json.dump({"key": key, "value": value}, cache_file)
+        os.replace(temp_path, path)
+    except (OSError, TypeError, ValueError):
+        os.unlink(temp_path)
+
+
+def file_key(path: str) -> Optional[str]:
+    """
+    Returns part of the key for a file.
+
+    :param path: path to the file.
+
+    :returns: size and mtime of the file or None if it doesn't exist.
+    """
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return f"{stat_result.st_size}:{stat_result.st_mtime_ns}"
@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import pytest
+
+from pilgrimor.engine.postgresql_engine import PostgreSQLEngine
+from pilgrimor.migrator.rawsql_migrator.migration_files import parse_migration
+from pilgrimor.sql.backfill import Backfill, parse_duration
+
+UPDATE_QUERY = "UPDATE users SET active = true WHERE id BETWEEN %(start)s AND %(end)s"
+
+
+class FakeConnection:
+    """Connection with no-op transactions."""
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Does nothing."""
+        yield
+
+
+class FakeCursor:
+    """Cursor that emulates users table with keys from 1 to 25."""
+
+    def __init__(self, progress: Dict[str, Any], fail_after: Optional[int] = None):
+        self.connection = FakeConnection()
+        self.progress = progress
+        self.fail_after = fail_after
+        self.updated: List[int] = []
+        self.rowcount = -1
+        self.result: Any = None
+
+    def execute(self, query: str, params: Optional[Dict[str, Any]] = None) -> None:
+        """Emulates queries of backfill."""
+        params = params or {}
+        if query.startswith("SELECT min(chunk_key)"):
+            self.result = self.next_chunk(int(params.get("after", 0)))
+        elif query == UPDATE_QUERY:
+            self.update(params["start"], params["end"])
+        elif "SELECT last_key" in query:
+            self.result = self.progress.get(params["migration"])
+        elif "INSERT INTO pilgrimor_backfill" in query:
+            self.progress[params["migration"]] = (params["last_key"], params["rows"])
+        elif "DELETE FROM pilgrimor_backfill" in query:
+            self.progress.pop(params["migration"])
+
+    def next_chunk(self, after: int) -> Any:
+        """Returns bounds and size of the chunk after the key."""
+        chunk = [key for key in range(1, 26) if key > after][:10]
+        return (min(chunk), max(chunk), len(chunk)) if chunk else (None,) * 3
+
+    def update(self, start: int, end: int) -> None:
+        """Updates keys of the chunk or fails after fail_after key."""
+        if self.fail_after is not None and start > self.fail_after:
+            raise RuntimeError("killed")
+        keys = list(range(start, end + 1))
+        self.updated.extend(keys)
+        self.rowcount = len(keys)
+
+    def fetchone(self) -> Any:
+        """Returns result of the last query."""
+        return self.result
+
+
+def run_backfill(cursor: FakeCursor) -> None:
+    """Runs backfill with batch of 10 keys."""
+    PostgreSQLEngine("postgresql://localhost/db")._execute_backfill(
+        cursor,  # type: ignore
+        {"migration": "5_backfill.sql", "backfill_statements": [UPDATE_QUERY]},
+        Backfill(table="users", key="id", batch_size=10),
+    )
+
+
+def test_backfill_resume() -> None:
+    """Test killed backfill continues after the last committed chunk."""
+    progress: Dict[str, Any] = {}
+    cursor = FakeCursor(progress, fail_after=10)
+    with pytest.raises(RuntimeError):
+        run_backfill(cursor)
+    assert progress == {"5_backfill.sql": ("10", 10)}
+
+    cursor = FakeCursor(progress)
+    run_backfill(cursor)
+    assert cursor.updated == list(range(11, 26))
+    assert not progress
+
+
+def test_backfill_directives() -> None:
+    """Test backfill migration is parsed and runs not in transaction."""
+    parsed = parse_migration(
+        "-- pilgrimor: type=backfill table=users key=id batch_size=500 sleep=50ms\n"
+        f"{UPDATE_QUERY};\n",
+        "checksum",
+    )
+    assert not parsed.apply_in_transaction
+    assert Backfill.from_directives(parsed.directives) == Backfill(
+        table="users",
+        key="id",
+        batch_size=500,
+        sleep=0.05,
+    )
+    assert parse_duration("2min") == 120
+    with pytest.raises(ValueError):
+        Backfill.from_directives((("type", "backfill"), ("table", "users;")))
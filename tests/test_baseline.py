@@ -0,0 +1,111 @@
+import stat
+from pathlib import Path
+
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.migrator.rawsql_migrator.baseline import find_baseline
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+from pilgrimor.migrator.squash import MigrationSquasher
+
+DUMP = """\\restrict abc
+SET statement_timeout = 0;
+SELECT pg_catalog.set_config('search_path', '', false);
+CREATE TABLE public.a (id integer);
+CREATE TABLE public.b (id integer);
+\\unrestrict abc
+"""
+
+
+def write_migrations(migrations_dir: Path) -> None:
+    """Creates migrations of versions 0.1 and 0.2 and a new one."""
+    for number, table, version in (
+        (1, "a", "0.1"),
+        (2, "b", "0.1"),
+        (3, "c", "0.2"),
+        (4, "d", None),
+    ):
+        text = f"-- apply --\nCREATE TABLE {table} (id INT);\n"
+        text += f"-- rollback --\nDROP TABLE {table};\n"
+        if version:
+            text += f"\n-- pilgrimore_version {version} -- \n"
+        (migrations_dir / f"{number}_{table}.sql").write_text(text)
+
+
+def fake_pg_dump(tmp_path: Path) -> str:
+    """Creates executable that prints the dump."""
+    (tmp_path / "dump.sql").write_text(DUMP)
+    pg_dump = tmp_path / "pg_dump"
+    pg_dump.write_text(f"#!/bin/sh\ncat {tmp_path / 'dump.sql'}\n")
+    pg_dump.chmod(pg_dump.stat().st_mode | stat.S_IEXEC)
+    return str(pg_dump)
+
+
+def test_squash_and_apply(tmp_path: Path) -> None:
+    """Test fresh database gets baseline and newer versions."""
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    write_migrations(migrations_dir)
+
+    path = MigrationSquasher(
+        InMemoryEngine("memory://"),
+        str(migrations_dir),
+        pg_dump=fake_pg_dump(tmp_path),
+    ).squash("0.1")
+    assert path == str(migrations_dir / "baseline" / "0.1.sql")
+    assert Path(path).read_text() == (
+        "-- pilgrimor baseline 0.1\n"
+        "-- covers: 1_a.sql 0.1\n"
+        "-- covers: 2_b.sql 0.1\n"
+        "\n"
+        "SET statement_timeout = 0;\n"
+        "CREATE TABLE public.a (id integer);\n"
+        "CREATE TABLE public.b (id integer);\n"
+    )
+
+    engine = InMemoryEngine("memory://")
+    RawSQLMigator(engine, str(migrations_dir)).initialize_database()
+    RawSQLMigator(engine, str(migrations_dir)).apply_migrations(None)
+    assert engine.records == [
+        (1, "1_a.sql", "0.1"),
+        (2, "2_b.sql", "0.1"),
+        (3, "3_c.sql", "0.2"),
+    ]
+    assert "CREATE TABLE public.a (id integer)" in engine.statements
+    assert not [
+        statement
+        for statement in engine.statements
+        if statement.endswith("CREATE TABLE a (id INT)")
+    ]
+
+
+def test_baseline_is_not_applied_to_existing_database(tmp_path: Path) -> None:
+    """Test database with applied migrations ignores the baseline."""
+    write_migrations(tmp_path)
+    (tmp_path / "baseline").mkdir()
+    (tmp_path / "baseline" / "0.1.sql").write_text(
+        "-- pilgrimor baseline 0.1\n-- covers: 1_a.sql 0.1\nCREATE TABLE x ();\n",
+    )
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path))
+    migrator.initialize_database()
+    migrator.run_migrations(["1_a.sql"], "0.1")
+    migrator.apply_migrations(None)
+    assert "CREATE TABLE x ()" not in engine.statements
+    assert [record[1] for record in engine.records] == [
+        "1_a.sql",
+        "2_b.sql",
+        "3_c.sql",
+    ]
+
+
+def test_find_newest_baseline(tmp_path: Path) -> None:
+    """Test baseline with the biggest version is used."""
+    assert find_baseline(str(tmp_path)) is None
+    (tmp_path / "baseline").mkdir()
+    for version in ("0.9", "0.10"):
+        (tmp_path / "baseline" / f"{version}.sql").write_text(
+            f"-- covers: 1_a.sql {version}\n",
+        )
+    baseline = find_baseline(str(tmp_path))
+    assert baseline is not None
+    assert baseline.version == "0.10"
+    assert baseline.covered == [("1_a.sql", "0.10")]
@@ -0,0 +1,86 @@
+from pathlib import Path
+
+import pytest
+
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.exceptions import (
+    MigrationNumberRepeatNumberError,
+    WrongMigrationNumberError,
+)
+from pilgrimor.migrator.rawsql_migrator import migration_files
+from pilgrimor.migrator.rawsql_migrator.migration_files import MigrationFileReader
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+
+
+def test_numeric_order(tmp_path: Path) -> None:
+    """Test migrations are applied and rolled back by numbers, not names."""
+    for number in (10, 9, 100):
+        (tmp_path / f"{number}_m.sql").write_text(
+            f"-- apply --\nCREATE TABLE m_{number} (id INT);\n"
+            f"-- rollback --\nDROP TABLE m_{number};\n",
+        )
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path))
+    migrator.initialize_database()
+    migrator.apply_migrations("0.1")
+
+    names = ["9_m.sql", "10_m.sql", "100_m.sql"]
+    assert [name for _, name, _ in engine.records] == names
+    assert migrator._get_last_applied_migrations() == names[::-1]  # noqa: WPS437
+
+
+def test_catalog_checks_numbers(tmp_path: Path) -> None:
+    """Test wrong and repeated numbers are found."""
+    (tmp_path / "1_a.sql").write_text("CREATE TABLE a (id INT);")
+    (tmp_path / "01_b.sql").write_text("CREATE TABLE b (id INT);")
+    with pytest.raises(MigrationNumberRepeatNumberError):
+        MigrationFileReader(str(tmp_path)).catalog()
+
+    (tmp_path / "01_b.sql").rename(tmp_path / "b.sql")
+    with pytest.raises(WrongMigrationNumberError):
+        MigrationFileReader(str(tmp_path)).catalog()
+
+
+def test_catalog_is_built_once(tmp_path: Path) -> None:
+    """Test catalog is kept until invalidation and remembers checksums."""
+    (tmp_path / "1_a.sql").write_text("CREATE TABLE a (id INT);")
+    (tmp_path / "baseline").mkdir()
+    reader = MigrationFileReader(str(tmp_path))
+    catalog = reader.catalog()
+    assert reader.catalog() is catalog
+    assert catalog.names == ["1_a.sql"]
+
+    reader.fingerprint(catalog.names)
+    assert catalog.by_name["1_a.sql"].checksum is not None
+
+    (tmp_path / "2_b.sql").write_text("CREATE TABLE b (id INT);")
+    assert reader.catalog() is catalog
+
+    reader.invalidate_catalog()
+    updated = reader.catalog()
+    assert updated.by_number[2].name == "2_b.sql"
+    assert updated.by_name["1_a.sql"].checksum == catalog.by_name["1_a.sql"].checksum
+
+
+def test_directory_is_listed_once_per_command(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test a command lists the directory once and sees files added before it."""
+    listings = []
+    list_entries = migration_files._migration_entries  # noqa: WPS437
+
+    def counted_entries(migrations_dir: str) -> object:  # noqa: WPS430
+        listings.append(migrations_dir)
+        return list_entries(migrations_dir)
+
+    monkeypatch.setattr(migration_files, "_migration_entries", counted_entries)
+    (tmp_path / "1_a.sql").write_text("CREATE TABLE a (id INT);")
+    migrator = RawSQLMigator(InMemoryEngine("memory://"), str(tmp_path))
+    migrator.initialize_database()
+    migrator.apply_migrations("0.1")
+    listings.clear()
+
+    (tmp_path / "2_b.sql").write_text("CREATE TABLE b (id INT);")
+    assert migrator.get_pending_migrations() == ["2_b.sql"]
+    assert len(listings) == 1
@@ -0,0 +1,152 @@
+import os
+import threading
+from pathlib import Path
+from typing import Callable, List
+
+import pytest
+
+from pilgrimor.abc.engine import PilgrimoreEngine
+from pilgrimor.engine import memory_engine
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.engine.postgresql_engine import PostgreSQLEngine
+from pilgrimor.exceptions import EngineConfigurationError
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+
+RUNNERS = 16
+DATABASE_URL = os.environ.get("PILGRIMOR_TEST_DATABASE_URL")
+
+
+def create_migrations(migrations_dir: Path, version: str = "") -> None:
+    """Creates migrations that fail if they are applied twice."""
+    marker = f"\n-- pilgrimore_version {version} -- \n" if version else ""
+    for number in range(1, 4):
+        (migrations_dir / f"{number}_stress.sql").write_text(
+            f"-- apply --\nCREATE TABLE stress_{number} (id INT);\n"
+            f"-- rollback --\nDROP TABLE stress_{number};\n{marker}",
+        )
+
+
+def run_concurrently(
+    migrations_dir: Path,
+    engine_factory: Callable[[], PilgrimoreEngine],
+) -> List[BaseException]:
+    """
+    Starts runners at the same time.
+
+    Every runner applies migrations with versions from the files.
+
+    :param migrations_dir: directory with migrations.
+    :param engine_factory: returns engine for a runner.
+
+    :returns: errors of the runners.
+    """
+    barrier = threading.Barrier(RUNNERS)
+    errors: List[BaseException] = []
+
+    def runner() -> None:  # noqa: WPS430
+        engine = engine_factory()
+        migrator = RawSQLMigator(engine, str(migrations_dir))
+        barrier.wait()
+        try:
+            migrator.apply_migrations(None)
+        except BaseException as exc:  # noqa: B902
+            errors.append(exc)
+        finally:
+            engine.close()
+
+    threads = [threading.Thread(target=runner) for _ in range(RUNNERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+def test_one_runner_applies_memory(tmp_path: Path) -> None:
+    """Test runners see migrations applied by each other."""
+    create_migrations(tmp_path, "0.1")
+    engine = InMemoryEngine("memory://")
+    RawSQLMigator(engine, str(tmp_path)).initialize_database()
+
+    assert run_concurrently(tmp_path, lambda: engine) == []
+    assert [name for _, name, _ in engine.records] == [
+        "1_stress.sql",
+        "2_stress.sql",
+        "3_stress.sql",
+    ]
+    assert len(engine.version_migrations) == 3
+
+
+def test_follower_skips_applied_version(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test runner that waited for the leader does not fail on its version."""
+    create_migrations(tmp_path)
+    engine = InMemoryEngine("memory://")
+    RawSQLMigator(engine, str(tmp_path)).initialize_database()
+    waiting = threading.Event()
+    monkeypatch.setattr(
+        memory_engine,
+        "attention_text",
+        lambda text: waiting.set() or text,
+    )
+    errors: List[BaseException] = []
+
+    def follower() -> None:  # noqa: WPS430
+        try:
+            RawSQLMigator(engine, str(tmp_path)).apply_migrations("0.1")
+        except BaseException as exc:  # noqa: B902
+            errors.append(exc)
+
+    with engine.migration_lock():
+        follower_thread = threading.Thread(target=follower)
+        follower_thread.start()
+        waiting.wait()
+        leader = RawSQLMigator(engine, str(tmp_path))
+        leader._state = leader._load_state()  # noqa: WPS437
+        leader.run_migrations(["1_stress.sql", "2_stress.sql", "3_stress.sql"], "0.1")
+    follower_thread.join()
+
+    assert errors == []
+    assert len(engine.records) == 3
+
+
+def test_lock_needs_second_pool_connection() -> None:
+    """Test leader election with one pool connection is an error, not an exit."""
+    engine = PostgreSQLEngine(
+        "postgresql://localhost/db",
+        connection_pool=True,
+        pool_max_size=1,
+        leader_election=True,
+    )
+    with pytest.raises(EngineConfigurationError):
+        with engine.migration_lock():
+            pytest.fail("lock must not be taken")
+
+
+@pytest.mark.skipif(
+    DATABASE_URL is None,
+    reason="PILGRIMOR_TEST_DATABASE_URL is not set",
+)
+def test_one_runner_applies_postgres(tmp_path: Path) -> None:
+    """Test many runners against one database apply every migration once."""
+    create_migrations(tmp_path, "0.1")
+    with PostgreSQLEngine(DATABASE_URL, leader_election=True) as engine:  # type: ignore
+        engine.execute_sql_with_no_return(
+            "DROP TABLE IF EXISTS pilgrimor, pilgrimor_meta, "
+            "stress_1, stress_2, stress_3",
+        )
+        RawSQLMigator(engine, str(tmp_path)).initialize_database()
+
+        errors = run_concurrently(
+            tmp_path,
+            lambda: PostgreSQLEngine(  # type: ignore
+                DATABASE_URL,
+                leader_election=True,
+            ),
+        )
+        assert errors == []
+        assert engine.execute_sql_with_return(
+            "SELECT count(*), count(DISTINCT name) FROM pilgrimor",
+        ) == [3, 3]
@@ -0,0 +1,158 @@
+import asyncio
+import gzip
+import threading
+from typing import Any, Iterator, List, Optional
+
+import pytest
+
+from pilgrimor.engine.async_postgresql_engine import AsyncPostgreSQLEngine
+from pilgrimor.engine.postgresql_engine import PostgreSQLEngine, split_copy_blocks
+from pilgrimor.migrator.rawsql_migrator.migration_files import parse_migration
+from pilgrimor.sql.copy_blocks import CopyBlock, parse_copy_block
+
+
+def test_parse_copy_block() -> None:
+    """Test copy block is parsed from comment."""
+    copy_block = parse_copy_block(
+        "-- copy countries (code, name) from 'data/countries.csv.gz' header",
+    )
+    assert copy_block == CopyBlock(
+        table="countries",
+        columns="code, name",
+        path="data/countries.csv.gz",
+        header=True,
+    )
+    assert copy_block.copy_query() == (
+        "COPY countries (code, name) FROM STDIN WITH (FORMAT csv, HEADER true)"
+    )
+    assert parse_copy_block("-- copy is a comment") is None
+    assert parse_copy_block("SELECT 1") is None
+
+
+def test_copy_block_statements() -> None:
+    """Test copy blocks are statements, but not inside dollar quotes."""
+    text = (
+        "CREATE TABLE countries (code text, name text);\n"
+        "-- copy countries from 'countries.tsv'\n"
+        "CREATE FUNCTION f() RETURNS void AS $$\n"
+        "-- copy countries from 'other.tsv'\n"
+        "$$ LANGUAGE sql;\n"
+        "-- rollback --\n"
+        "DROP TABLE countries;\n"
+    )
+    statements = parse_migration(text, "checksum").statements(text)
+    assert len(statements) == 3
+    assert statements[1] == "-- copy countries from 'countries.tsv'"
+    assert statements[2].startswith("CREATE FUNCTION")
+
+    parts = split_copy_blocks(statements)
+    assert isinstance(parts[1], CopyBlock)
+    assert parts[0] == [statements[0]]
+
+
+class FakeCopy:
+    """Collects written chunks."""
+
+    def __init__(self, chunks: List[bytes]) -> None:
+        self.chunks = chunks
+
+    def __enter__(self) -> "FakeCopy":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Does nothing."""
+
+    def write(self, chunk: bytes) -> None:
+        """Stores chunk."""
+        self.chunks.append(chunk)
+
+
+class FakeCursor:
+    """Cursor that supports only COPY."""
+
+    def __init__(self) -> None:
+        self.queries: List[str] = []
+        self.chunks: List[bytes] = []
+
+    def copy(self, query: str) -> FakeCopy:
+        """Starts COPY."""
+        self.queries.append(query)
+        return FakeCopy(self.chunks)
+
+
+def test_copy_from_gzip_file(tmp_path: Any) -> None:
+    """Test gzip file is streamed and relative path uses base_dir."""
+    with gzip.open(tmp_path / "countries.csv.gz", "wb") as data_file:
+        data_file.write(b"code,name\nNL,Netherlands\n")
+    cursor = FakeCursor()
+    copy_block = parse_copy_block("-- copy countries from 'countries.csv.gz' header")
+    PostgreSQLEngine("postgresql://localhost/db")._copy_from_file(
+        cursor,  # type: ignore
+        {"migration": "1_countries.sql", "base_dir": str(tmp_path)},
+        copy_block,  # type: ignore
+    )
+    assert cursor.queries == [
+        "COPY countries FROM STDIN WITH (FORMAT csv, HEADER true)",
+    ]
+    assert b"".join(cursor.chunks) == b"code,name\nNL,Netherlands\n"
+
+
+class FakeAsyncCopy:
+    """Collects written chunks with asyncio interface."""
+
+    def __init__(self, chunks: List[bytes]) -> None:
+        self.chunks = chunks
+
+    async def __aenter__(self) -> "FakeAsyncCopy":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        """Does nothing."""
+
+    async def write(self, chunk: bytes) -> None:
+        """Stores chunk."""
+        self.chunks.append(chunk)
+
+
+class FakeAsyncCursor(FakeCursor):
+    """Async cursor that supports only COPY."""
+
+    rowcount = 1
+
+    def copy(self, query: str) -> FakeAsyncCopy:  # type: ignore
+        """Starts COPY."""
+        self.queries.append(query)
+        return FakeAsyncCopy(self.chunks)
+
+
+def test_async_copy_reads_file_in_thread(
+    tmp_path: Any,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test asyncio engine reads data file outside of the event loop thread."""
+    (tmp_path / "countries.csv").write_bytes(b"NL,Netherlands\n")
+    reading_threads: List[threading.Thread] = []
+    iter_chunks = CopyBlock.iter_chunks
+
+    def recording_iter_chunks(
+        copy_block: CopyBlock,
+        base_dir: Optional[str],
+        chunk_size: int = 4,
+    ) -> Iterator[bytes]:
+        for chunk in iter_chunks(copy_block, base_dir, chunk_size):
+            reading_threads.append(threading.current_thread())
+            yield chunk
+
+    monkeypatch.setattr(CopyBlock, "iter_chunks", recording_iter_chunks)
+    cursor = FakeAsyncCursor()
+    copy_block = parse_copy_block("-- copy countries from 'countries.csv'")
+    asyncio.run(
+        AsyncPostgreSQLEngine("postgresql://localhost/db")._copy_from_file(
+            cursor,  # type: ignore
+            {"migration": "1_countries.sql", "base_dir": str(tmp_path)},
+            copy_block,  # type: ignore
+        ),
+    )
+    assert b"".join(cursor.chunks) == b"NL,Netherlands\n"
+    assert len(reading_threads) == 4
+    assert threading.main_thread() not in reading_threads
@@ -0,0 +1,64 @@
+from pilgrimor.engine.postgresql_engine import (
+    get_migration_queries,
+    split_by_transaction,
+)
+from pilgrimor.migrator.rawsql_migrator.migration_files import parse_migration
+
+
+def test_transaction_detection() -> None:
+    """Test CONCURRENTLY in comments and strings is ignored."""
+    parsed = parse_migration(
+        "-- create index concurrently later\n"
+        "INSERT INTO notes VALUES ('concurrently');\n"
+        "-- rollback --\n"
+        "DROP INDEX CONCURRENTLY notes_idx;\n",
+        "checksum",
+    )
+    assert parsed.apply_in_transaction
+    assert not parsed.rollback_in_transaction
+
+
+def test_transaction_directive() -> None:
+    """Test transaction directive overrides detection."""
+    parsed = parse_migration(
+        "-- pilgrimor: transaction=false lock_timeout=2s\n"
+        "UPDATE users SET active = true;\n",
+        "checksum",
+    )
+    assert not parsed.apply_in_transaction
+    assert parsed.directive("lock_timeout") == "2s"
+
+
+def test_split_by_transaction() -> None:
+    """Test consecutive transactional migrations are grouped."""
+    migrations = [
+        {"migration": "1.sql", "in_transaction": True},
+        {"migration": "2.sql", "in_transaction": True},
+        {"migration": "3.sql", "in_transaction": False},
+        {"migration": "4.sql"},
+    ]
+    groups = split_by_transaction(migrations)
+    assert [(mode, len(group)) for mode, group in groups] == [
+        (True, 2),
+        (False, 1),
+        (True, 1),
+    ]
+
+
+def test_migration_settings() -> None:
+    """Test settings are set and reset around statements."""
+    migration = {
+        "migration": "1.sql",
+        "statements": ["SELECT 1"],
+        "settings": {"lock_timeout": "2s"},
+    }
+    assert get_migration_queries(migration, in_transaction=True) == [
+        "SET LOCAL lock_timeout = '2s'",
+        "SELECT 1",
+        "SET LOCAL lock_timeout TO DEFAULT",
+    ]
+    assert get_migration_queries(migration, in_transaction=False) == [
+        "SET lock_timeout = '2s'",
+        "SELECT 1",
+        "RESET lock_timeout",
+    ]
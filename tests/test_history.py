@@ -0,0 +1,70 @@
+from pathlib import Path
+
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.migrator.history import (
+    HistoryRecord,
+    describe_history,
+    describe_trends,
+    estimate_pending,
+    read_reference,
+    write_histories,
+)
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+from pilgrimor.migrator.system_table import (
+    CREATE_TABLE_QUERY,
+    SCHEMA_VERSION,
+    upgrade_query,
+)
+
+
+def record(name: str, duration: float) -> HistoryRecord:
+    """Returns history record without timestamps."""
+    return HistoryRecord(name, "0.1", "host", None, None, duration, 10)
+
+
+def test_upgrade_old_table(tmp_path: Path) -> None:
+    """Test table created before versioning is upgraded."""
+    (tmp_path / "1_a.sql").write_text("CREATE TABLE a (id INT);")
+    engine = InMemoryEngine("memory://")
+    engine.execute_sql_with_no_return(CREATE_TABLE_QUERY)
+    migrator = RawSQLMigator(engine, str(tmp_path), write_versions=False)
+    migrator.apply_migrations("0.1")
+    assert engine.statements[-1].startswith("INSERT INTO pilgrimor (name, version)")
+
+    migrator.upgrade_database()
+    assert engine.comment == f"pilgrimor schema {SCHEMA_VERSION}"
+    assert upgrade_query(SCHEMA_VERSION) == ""
+    (tmp_path / "2_b.sql").write_text("CREATE TABLE b (id INT);")
+    migrator.apply_migrations("0.2")
+    assert "clock_timestamp()" in engine.statements[-2]
+    assert [name for _, name, _ in engine.records] == ["1_a.sql", "2_b.sql"]
+
+
+def test_slowest_and_trends() -> None:
+    """Test the slowest migrations are first."""
+    staging = [record("1_a.sql", 1), record("2_b.sql", 3)]
+    production = [record("1_a.sql", 2)]
+    assert describe_history(staging, 1).splitlines()[-1].endswith("2_b.sql")
+    assert describe_trends(
+        [("staging", staging), ("production", production)],
+        limit=2,
+    ).splitlines()[-2:] == [
+        "     3.000         -  2_b.sql",
+        "     1.000     2.000  1_a.sql",
+    ]
+
+
+def test_estimate_from_reference(tmp_path: Path) -> None:
+    """Test pending migrations are estimated from staging history."""
+    write_histories(
+        [("staging", [record("1_a.sql", 1), record("2_b.sql", 3)])],
+        str(tmp_path / "staging.json"),
+    )
+    estimate = estimate_pending(
+        ["2_b.sql", "3_c.sql"],
+        [record("1_a.sql", 2)],
+        read_reference(str(tmp_path / "staging.json")),
+    )
+    assert estimate.seconds == 6
+    assert estimate.scale == 2
+    assert estimate.unknown == ["3_c.sql"]
@@ -0,0 +1,97 @@
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.exceptions import VersionManifestError
+from pilgrimor.migrator.rawsql_migrator import manifest
+from pilgrimor.migrator.rawsql_migrator.manifest import (
+    MANIFEST_FILE_NAME,
+    VersionManifest,
+)
+from pilgrimor.migrator.rawsql_migrator.migration_files import MigrationFileReader
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+
+
+def create_migrations(migrations_dir: Path, numbers: range) -> None:
+    """Creates migrations with apply and rollback parts."""
+    for number in numbers:
+        (migrations_dir / f"{number}_m.sql").write_text(
+            f"-- apply --\nCREATE TABLE m_{number} (id INT);\n"
+            f"-- rollback --\nDROP TABLE m_{number};\n",
+        )
+
+
+def apply(
+    migrations_dir: Path,
+    version: Optional[str],
+    **kwargs: bool,
+) -> InMemoryEngine:
+    """Applies migrations to a fresh database."""
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(migrations_dir), **kwargs)
+    migrator.initialize_database()
+    migrator.apply_migrations(version)
+    return engine
+
+
+def test_versions_in_manifest(tmp_path: Path) -> None:
+    """Test versions are written to manifest, not to migration files."""
+    create_migrations(tmp_path, range(1, 3))
+    texts = {path.name: path.read_text() for path in tmp_path.iterdir()}
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path), version_manifest=True)
+    migrator.initialize_database()
+    migrator.apply_migrations("0.1")
+    create_migrations(tmp_path, range(3, 4))
+    migrator.apply_migrations("0.2")
+
+    assert {name: (tmp_path / name).read_text() for name in texts} == texts
+    assert json.loads((tmp_path / MANIFEST_FILE_NAME).read_text())["versions"] == {
+        "1_m.sql": "0.1",
+        "2_m.sql": "0.1",
+        "3_m.sql": "0.2",
+    }
+    assert sorted(os.listdir(tmp_path)) == [
+        "1_m.sql",
+        "2_m.sql",
+        "3_m.sql",
+        MANIFEST_FILE_NAME,
+    ]
+
+    engine = apply(tmp_path, None, version_manifest=True)
+    assert [version for _, _, version in engine.records] == ["0.1", "0.1", "0.2"]
+
+
+def test_convert_markers(tmp_path: Path) -> None:
+    """Test markers are converted once and manifest is not a migration."""
+    create_migrations(tmp_path, range(1, 3))
+    apply(tmp_path, "0.1")
+
+    reader = MigrationFileReader(str(tmp_path), version_manifest=True)
+    assert reader.convert_to_manifest() == 2
+    assert reader.catalog().names == ["1_m.sql", "2_m.sql"]
+    assert reader.version("2_m.sql") == "0.1"
+    with pytest.raises(VersionManifestError):
+        reader.convert_to_manifest()
+
+
+def test_failed_write_keeps_manifest(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test manifest is replaced as a whole or not at all."""
+    version_manifest = VersionManifest(str(tmp_path / MANIFEST_FILE_NAME))
+    version_manifest.write([("1_m.sql", "0.1")])
+
+    def fail(*args: str) -> None:
+        raise OSError("disk is full")
+
+    monkeypatch.setattr(manifest.os, "replace", fail)
+    with pytest.raises(OSError):
+        version_manifest.write([("1_m.sql", "0.1"), ("2_m.sql", "0.2")])
+    assert version_manifest.versions() == {"1_m.sql": "0.1"}
+    assert os.listdir(tmp_path) == [MANIFEST_FILE_NAME]
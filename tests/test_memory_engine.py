@@ -0,0 +1,143 @@
+import os
+import subprocess  # noqa: S404
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from pilgrimor.engine.engine import get_engine
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.exceptions import InMemoryEngineError
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+from pilgrimor.migrator.system_table import START_MARK_WITH_ROWS_COMMAND
+from pilgrimor.settings import ResolvedSettings
+from pilgrimor.startup_cache import CACHE_DIR_VARIABLE
+
+
+def write_migrations(migrations_dir: Path) -> None:
+    """Creates two migrations."""
+    for number, table in ((1, "users"), (2, "orders")):
+        (migrations_dir / f"{number}_{table}.sql").write_text(
+            f"-- apply --\n"
+            f"CREATE TABLE {table} (id INT);\n"
+            f"INSERT INTO {table} VALUES (1);\n"
+            f"-- rollback --\n"
+            f"DROP TABLE {table};\n",
+        )
+
+
+def test_apply_and_rollback(tmp_path: Path) -> None:
+    """Test pilgrimor table follows apply and rollback."""
+    write_migrations(tmp_path)
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path))
+    migrator.initialize_database()
+    migrator.apply_migrations("0.1.0")
+
+    assert engine.records == [
+        (1, "1_users.sql", "0.1.0"),
+        (2, "2_orders.sql", "0.1.0"),
+    ]
+    assert engine.statements[-5] == START_MARK_WITH_ROWS_COMMAND
+    assert engine.statements[-4:-2] == [
+        "-- apply --\nCREATE TABLE orders (id INT)",
+        "INSERT INTO orders VALUES (1)",
+    ]
+    assert "'2_orders.sql', '0.1.0'" in engine.statements[-2]
+    assert engine.meta["fingerprint"].startswith(migrator.migrations_fingerprint())
+    assert "-- pilgrimore_version 0.1.0 --" in (tmp_path / "1_users.sql").read_text()
+
+    RawSQLMigator(engine, str(tmp_path)).rollback_migrations(latest=True)
+    assert not engine.records
+    assert engine.meta == {}
+    assert engine.statements[-2:] == [
+        "DROP TABLE users",
+        "DELETE FROM pilgrimor\n        WHERE name = '1_users.sql'",
+    ]
+
+
+def test_state_file(tmp_path: Path) -> None:
+    """Test pilgrimor table is saved and loaded."""
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    write_migrations(migrations_dir)
+    database_url = f"memory://{tmp_path / 'state.json'}"
+    engine = InMemoryEngine(database_url)
+    RawSQLMigator(engine, str(migrations_dir)).initialize_database()
+    RawSQLMigator(engine, str(migrations_dir)).apply_migrations("0.1.0")
+
+    restored = InMemoryEngine(database_url)
+    assert restored.initialized
+    assert restored.records == engine.records
+    assert not restored.statements
+    history = RawSQLMigator(restored, str(migrations_dir)).get_history()
+    assert [record.name for record in history] == ["1_users.sql", "2_orders.sql"]
+    assert all(record.host for record in history)
+
+
+def test_not_initialized() -> None:
+    """Test pilgrimor table must be created first."""
+    engine = InMemoryEngine("memory://")
+    with pytest.raises(InMemoryEngineError):
+        engine.execute_sql_with_return(engine.system_table.state_query)
+    engine.execute_sql_with_no_return(engine.system_table.initialize_query())
+    with pytest.raises(InMemoryEngineError):
+        engine.execute_sql_with_no_return(engine.system_table.initialize_query())
+
+
+def test_engine_is_imported_lazily() -> None:
+    """Test CLI entry point does not import engines before parsing arguments."""
+    modules = subprocess.check_output(  # noqa: S603
+        [
+            sys.executable,
+            "-c",
+            "import sys, pilgrimor.__main__; print(' '.join(sys.modules))",
+        ],
+        text=True,
+    ).split()
+    assert "psycopg" not in modules
+    assert "pydantic" not in modules
+    assert "pilgrimor.engine.postgresql_engine" not in modules
+
+
+def test_get_builtin_engine() -> None:
+    """Test built-in engine is found without entry points."""
+    settings = ResolvedSettings({"database_engine": "MEMORY"})
+    assert get_engine(settings) is InMemoryEngine
+
+
+def test_settings_cache(tmp_path: Path) -> None:
+    """Test settings are cached between runs until pyproject.toml is changed."""
+    pyproject = tmp_path / "pyproject.toml"
+    pyproject.write_text(
+        '[tool.pilgrimor]\ndatabase_engine = "MEMORY"\nmigrations_dir = "first"\n',
+    )
+    environment = {
+        name: env_value
+        for name, env_value in os.environ.items()
+        if not name.upper().startswith("PILGRIMOR_")
+    }
+    environment[CACHE_DIR_VARIABLE] = str(tmp_path / "cache")
+    environment["PYTHONPATH"] = str(Path(__file__).parents[1])
+
+    def run() -> List[str]:
+        return subprocess.check_output(  # noqa: S603
+            [
+                sys.executable,
+                "-c",
+                "import sys; from pilgrimor.settings import get_settings; "
+                "print(get_settings().migrations_dir, 'pydantic' in sys.modules)",
+            ],
+            cwd=tmp_path,
+            env=environment,
+            text=True,
+        ).split()
+
+    assert run() == ["first", "True"]
+    assert run() == ["first", "False"]
+
+    pyproject.write_text(pyproject.read_text().replace("first", "second"))
+    os.utime(pyproject, ns=(0, 0))
+    assert run() == ["second", "True"]
+    assert run() == ["second", "False"]
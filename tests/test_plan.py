@@ -0,0 +1,133 @@
+from pathlib import Path
+
+import pytest
+
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.exceptions import PlanMismatchError
+from pilgrimor.migrator.plan import describe_plan, read_plan, write_plan
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+from pilgrimor.sql.locks import (
+    ACCESS_EXCLUSIVE,
+    ROW_EXCLUSIVE,
+    SHARE,
+    SHARE_ROW_EXCLUSIVE,
+    SHARE_UPDATE_EXCLUSIVE,
+    estimate_lock,
+    strongest_lock,
+)
+
+
+def write_migrations(migrations_dir: Path) -> None:
+    """Creates table, index and data migrations."""
+    (migrations_dir / "1_users.sql").write_text(
+        "-- apply --\nCREATE TABLE users (id INT);\n"
+        "ALTER TABLE users ADD COLUMN name TEXT;\n"
+        "-- rollback --\nDROP TABLE users;\n",
+    )
+    (migrations_dir / "2_index.sql").write_text(
+        "-- apply --\nCREATE INDEX CONCURRENTLY users_id ON users (id);\n"
+        "-- rollback --\nDROP INDEX CONCURRENTLY users_id;\n",
+    )
+    (migrations_dir / "3_data.sql").write_text(
+        "-- apply --\nINSERT INTO users VALUES (1);\n"
+        "-- rollback --\nDELETE FROM users;\n",
+    )
+
+
+@pytest.mark.parametrize(
+    "statement, lock",
+    [
+        ("CREATE TABLE users (id INT)", None),
+        ("create index users_id on users (id)", SHARE),
+        ("CREATE UNIQUE INDEX CONCURRENTLY u ON users (id)", SHARE_UPDATE_EXCLUSIVE),
+        ("ALTER TABLE users ADD COLUMN name TEXT", ACCESS_EXCLUSIVE),
+        ("ALTER TABLE users VALIDATE CONSTRAINT users_fk", SHARE_UPDATE_EXCLUSIVE),
+        (
+            "ALTER TABLE users ADD CONSTRAINT users_fk FOREIGN KEY (id) "
+            "REFERENCES accounts (id) NOT VALID",
+            SHARE_ROW_EXCLUSIVE,
+        ),
+        (
+            "ALTER TABLE users ADD CONSTRAINT users_id CHECK (id > 0) NOT VALID",
+            ACCESS_EXCLUSIVE,
+        ),
+        ("-- comment\nUPDATE users SET name = 'a'", ROW_EXCLUSIVE),
+        ("WITH a AS (SELECT 1) DELETE FROM users", ROW_EXCLUSIVE),
+    ],
+)
+def test_estimate_lock(statement: str, lock: str) -> None:
+    """Test lock is estimated by first keywords."""
+    assert estimate_lock(statement) == lock
+
+
+def test_strongest_lock() -> None:
+    """Test the strongest lock of statements."""
+    assert strongest_lock(["SELECT 1", "CREATE TABLE a ()"]) == "ACCESS SHARE"
+    assert strongest_lock(["CREATE TABLE a ()"]) is None
+
+
+def test_plan_does_not_execute(tmp_path: Path) -> None:
+    """Test plan shows groups and locks and changes nothing."""
+    write_migrations(tmp_path)
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path))
+    migrator.initialize_database()
+
+    plan = migrator.plan_migrations("apply", "0.1")
+    assert engine.records == []
+    assert "pilgrimore_version" not in (tmp_path / "1_users.sql").read_text()
+
+    (step,) = plan["steps"]
+    assert step["migrations"] == ["1_users.sql", "2_index.sql", "3_data.sql"]
+    assert step["transaction_groups"] == [
+        {"in_transaction": True, "migrations": ["1_users.sql"]},
+        {"in_transaction": False, "migrations": ["2_index.sql"]},
+        {"in_transaction": True, "migrations": ["3_data.sql"]},
+    ]
+    assert [migration["lock"] for migration in step["version_migrations"]] == [
+        ACCESS_EXCLUSIVE,
+        SHARE_UPDATE_EXCLUSIVE,
+        ROW_EXCLUSIVE,
+    ]
+    assert "Step 1: apply 0.1" in describe_plan(plan)
+
+
+def test_apply_saved_plan(tmp_path: Path) -> None:
+    """Test saved plan is executed like apply."""
+    migrations_dir = tmp_path / "migrations"
+    migrations_dir.mkdir()
+    write_migrations(migrations_dir)
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(migrations_dir))
+    migrator.initialize_database()
+    write_plan(migrator.plan_migrations("apply", "0.1"), str(tmp_path / "plan.json"))
+
+    migrator.apply_plan(read_plan(str(tmp_path / "plan.json")))
+    assert [record[1:] for record in engine.records] == [
+        ("1_users.sql", "0.1"),
+        ("2_index.sql", "0.1"),
+        ("3_data.sql", "0.1"),
+    ]
+    assert "pilgrimore_version 0.1" in (migrations_dir / "3_data.sql").read_text()
+
+    rollback_plan = migrator.plan_migrations("rollback")
+    assert rollback_plan["steps"][0]["migrations"] == [
+        "3_data.sql",
+        "2_index.sql",
+        "1_users.sql",
+    ]
+    migrator.apply_plan(rollback_plan)
+    assert engine.records == []
+
+
+def test_plan_mismatch(tmp_path: Path) -> None:
+    """Test plan is not executed after the database changed."""
+    write_migrations(tmp_path)
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path), write_versions=False)
+    migrator.initialize_database()
+    plan = migrator.plan_migrations("apply", "0.1")
+    migrator.apply_migrations("0.1")
+
+    with pytest.raises(PlanMismatchError):
+        migrator.apply_plan(plan)
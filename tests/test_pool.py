@@ -0,0 +1,150 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+import pytest
+
+from pilgrimor.engine.async_postgresql_engine import AsyncPostgreSQLEngine
+from pilgrimor.engine.postgresql_engine import PostgreSQLEngine
+from pilgrimor.exceptions import EngineConfigurationError
+
+DATABASE_URL = "postgresql://localhost/db"
+
+
+class FakeConnection:
+    """Connection that keeps autocommit mode only."""
+
+    autocommit = False
+
+    async def set_autocommit(self, autocommit: bool) -> None:
+        """Sets autocommit like psycopg.AsyncConnection."""
+        self.autocommit = autocommit
+
+
+class FakePool:
+    """Pool that records how it was opened and used."""
+
+    created: List["FakePool"] = []
+
+    def __init__(self, conninfo: str, **options: Any) -> None:
+        self.conninfo = conninfo
+        self.options: Dict[str, Any] = options
+        self.given: List[FakeConnection] = []
+        self.closed = False
+        self.created.append(self)
+
+    @contextmanager
+    def connection(self) -> Iterator[FakeConnection]:
+        """Gives a new connection."""
+        self.given.append(FakeConnection())
+        yield self.given[-1]
+
+    def close(self) -> None:
+        """Closes the pool."""
+        self.closed = True
+
+
+class FakeAsyncPool(FakePool):
+    """Asyncio pool that records how it was opened and used."""
+
+    opened = False
+
+    async def open(self) -> None:  # noqa: A003
+        """Opens the pool."""
+        self.opened = True
+
+    @asynccontextmanager  # type: ignore
+    async def connection(self) -> AsyncIterator[FakeConnection]:  # noqa: WPS463
+        """Gives a new connection."""
+        self.given.append(FakeConnection())
+        yield self.given[-1]
+
+    async def close(self) -> None:  # type: ignore
+        """Closes the pool."""
+        self.closed = True
+
+
+@pytest.fixture
+def pools(monkeypatch: pytest.MonkeyPatch) -> List[FakePool]:
+    """Replaces pools of psycopg_pool with fakes."""
+    FakePool.created = []
+    monkeypatch.setattr("psycopg_pool.ConnectionPool", FakePool)
+    monkeypatch.setattr("psycopg_pool.AsyncConnectionPool", FakeAsyncPool)
+    return FakePool.created
+
+
+def test_pool_is_opened_once(pools: List[FakePool]) -> None:
+    """Test all connections are taken from one pool with engine options."""
+    engine = PostgreSQLEngine(
+        DATABASE_URL,
+        connection_pool=True,
+        pool_min_size=2,
+        pool_max_size=8,
+    )
+    with engine._connection(autocommit=True) as first:  # noqa: WPS437
+        assert first.autocommit
+    with engine._connection(autocommit=False) as second:  # noqa: WPS437
+        assert not second.autocommit
+
+    assert len(pools) == 1
+    assert pools[0].conninfo == DATABASE_URL
+    assert pools[0].options == {"open": True, "min_size": 2, "max_size": 8}
+    assert len(pools[0].given) == 2
+
+
+def test_close_closes_pool(pools: List[FakePool]) -> None:
+    """Test engine closes its pool and opens a new one after that."""
+    with PostgreSQLEngine(DATABASE_URL, connection_pool=True) as engine:
+        with engine._connection(autocommit=True):  # noqa: WPS437
+            pass  # noqa: WPS420
+    assert pools[0].closed
+
+    with engine._connection(autocommit=True):  # noqa: WPS437
+        pass  # noqa: WPS420
+    assert len(pools) == 2
+
+
+def test_pool_is_not_used_by_default(pools: List[FakePool]) -> None:
+    """Test engine without connection_pool doesn't open a pool."""
+    PostgreSQLEngine(DATABASE_URL).close()
+    assert pools == []
+
+
+def test_pool_needs_psycopg_pool(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test missing psycopg-pool is a configuration error."""
+    monkeypatch.setitem(sys.modules, "psycopg_pool", None)
+    engine = PostgreSQLEngine(DATABASE_URL, connection_pool=True)
+    with pytest.raises(EngineConfigurationError):
+        engine._get_pool()  # noqa: WPS437
+
+
+def test_async_pool(pools: List[FakePool]) -> None:
+    """Test asyncio engine opens its pool and closes it."""
+
+    async def use_engine() -> None:  # noqa: WPS430
+        engine = AsyncPostgreSQLEngine(DATABASE_URL, connection_pool=True)
+        async with engine._connection(autocommit=True) as connection:  # noqa: WPS437
+            assert connection.autocommit
+        await engine.close()
+
+    asyncio.run(use_engine())
+    assert pools[0].opened
+    assert pools[0].options == {"open": False, "min_size": 1, "max_size": 4}
+    assert pools[0].closed
+
+
+def test_async_application_pool(pools: List[FakePool]) -> None:
+    """Test pool of the application is used, but not closed."""
+    pool = FakeAsyncPool(DATABASE_URL)
+
+    async def use_engine() -> None:  # noqa: WPS430
+        engine = AsyncPostgreSQLEngine(DATABASE_URL, pool=pool)
+        async with engine._connection(autocommit=False):  # noqa: WPS437
+            pass  # noqa: WPS420
+        await engine.close()
+
+    asyncio.run(use_engine())
+    assert pools == [pool]
+    assert len(pool.given) == 1
+    assert not pool.closed
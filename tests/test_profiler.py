@@ -0,0 +1,50 @@
+from pilgrimor.profiler import Profiler
+
+
+def test_disabled_profiler_records_nothing() -> None:
+    """Test disabled profiler ignores timings."""
+    profiler = Profiler()
+    with profiler.phase("scan migrations"):
+        profiler.add_statement("1_a.sql", "SELECT 1", 0.5, 1)
+    profiler.add_connection(0.1, 0.01)
+
+    assert profiler.to_dict() == {
+        "phases": {},
+        "migrations": [],
+        "statements": [],
+        "connections": {"count": 0, "seconds": 0, "round_trip": None},
+    }
+
+
+def test_profiler_totals() -> None:
+    """Test statements are summed by migration with estimated server time."""
+    profiler = Profiler(enabled=True)
+    profiler.add_connection(0.2, 0.02)
+    profiler.add_connection(0.1, 0.01)
+    profiler.add_statement("1_a.sql", "CREATE TABLE a (id INT)", 0.11, -1)
+    profiler.add_statement("1_a.sql", "INSERT INTO a VALUES (1)", 0.21, 1)
+    profiler.add_statement("2_b.sql", "SELECT 1", 0.005, 1)
+    with profiler.phase("build queries"):
+        pass  # noqa: WPS420
+
+    profile = profiler.to_dict()
+    assert set(profile["phases"]) == {"build queries"}
+    assert profile["connections"]["count"] == 2
+    assert profile["connections"]["round_trip"] == 0.01
+    first, second = profile["migrations"]
+    assert first["migration"] == "1_a.sql"
+    assert first["statements"] == 2
+    assert first["rows"] == 1
+    assert round(first["server_seconds"], 3) == 0.3
+    assert second["server_seconds"] == 0
+
+
+def test_report_is_sorted_by_time() -> None:
+    """Test the slowest migration and statement are reported first."""
+    profiler = Profiler(enabled=True)
+    profiler.add_statement("1_fast.sql", "SELECT 1", 0.1, 1)
+    profiler.add_statement("2_slow.sql", "UPDATE big SET x = 1", 2.5, 1000)
+
+    report = profiler.report()
+    assert report.index("2_slow.sql") < report.index("1_fast.sql")
+    assert "2_slow.sql: UPDATE big SET x = 1" in report
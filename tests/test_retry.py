@@ -0,0 +1,121 @@
+import time
+from typing import Any, List
+
+import pytest
+from psycopg import errors
+
+from pilgrimor.engine.postgresql_engine import PostgreSQLEngine, with_default_settings
+from pilgrimor.engine.retry import RetryPolicy, RetryReport, run_with_retries
+
+
+def test_retry_after_lock_timeout(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test operation is retried and retries are reported."""
+    attempts: List[int] = []
+
+    def operation() -> str:
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise errors.LockNotAvailable("lock timeout")
+        return "done"
+
+    policy = RetryPolicy(retries=3, delay=0.001)
+    assert run_with_retries(operation, RetryReport("1_a.sql", policy)) == "done"
+    assert len(attempts) == 3
+    assert "1_a.sql: 2 retries" in capsys.readouterr().out
+
+
+def test_lock_wait_by_migration(capsys: pytest.CaptureFixture[str]) -> None:
+    """Test lock wait of failed and successful attempts is recorded by migration."""
+    report = RetryReport("1_a.sql, 2_b.sql", RetryPolicy(retries=1, delay=0.001))
+    attempts: List[int] = []
+
+    def operation() -> None:
+        attempts.append(1)
+        with report.measure("1_a.sql"):
+            time.sleep(0.01)
+        with report.measure("2_b.sql"):
+            if len(attempts) == 1:
+                raise errors.LockNotAvailable("lock timeout")
+
+    run_with_retries(operation, report)
+    assert set(report.lock_wait) == {"1_a.sql", "2_b.sql"}
+    assert report.lock_wait["1_a.sql"] >= 0.02
+    assert "1_a.sql, 2_b.sql: 1 retries, lock wait 1_a.sql" in capsys.readouterr().out
+
+
+def test_no_retries_left() -> None:
+    """Test error is raised after the last retry."""
+
+    def operation() -> None:
+        raise errors.DeadlockDetected("deadlock")
+
+    with pytest.raises(errors.DeadlockDetected):
+        run_with_retries(
+            operation,
+            RetryReport("1_a.sql", RetryPolicy(retries=1, delay=0.001)),
+        )
+
+
+def test_other_errors_are_not_retried() -> None:
+    """Test only lock errors are retried."""
+    attempts: List[int] = []
+
+    def operation() -> None:
+        attempts.append(1)
+        raise errors.UndefinedTable("no table")
+
+    with pytest.raises(errors.UndefinedTable):
+        run_with_retries(operation, RetryReport("1_a.sql", RetryPolicy(retries=3)))
+    assert len(attempts) == 1
+
+
+def test_backoff_is_bounded() -> None:
+    """Test backoff does not exceed max_delay."""
+    policy = RetryPolicy(retries=10, delay=1, max_delay=4)
+    assert all(0 <= policy.backoff(attempt) <= 4 for attempt in range(10))
+
+
+def test_default_lock_timeout() -> None:
+    """Test lock_timeout directive overrides default."""
+    migrations = with_default_settings(
+        [
+            {"migration": "1_a.sql", "settings": {"lock_timeout": "10s"}},
+            {"migration": "2_b.sql"},
+        ],
+        {"lock_timeout": "2s"},
+    )
+    assert [migration["settings"] for migration in migrations] == [
+        {"lock_timeout": "10s"},
+        {"lock_timeout": "2s"},
+    ]
+
+
+class LockedCursor:
+    """Cursor that fails CREATE INDEX CONCURRENTLY with lock timeout."""
+
+    def __init__(self) -> None:
+        self.queries: List[str] = []
+        self.rowcount = -1
+
+    def execute(self, query: str, params: Any = None) -> None:
+        """Records the query and fails on index creation."""
+        self.queries.append(query)
+        if "CONCURRENTLY" in query:
+            raise errors.LockNotAvailable("lock timeout")
+
+
+def test_not_in_transaction_is_not_retried() -> None:
+    """Test failed statement out of transaction is not retried and is raised."""
+    engine = PostgreSQLEngine("postgresql://localhost/db", lock_retries=3)
+    cursor = LockedCursor()
+    migration = {
+        "migration": "1_a.sql",
+        "query": "CREATE INDEX CONCURRENTLY a_idx ON a (id); SELECT 1",
+    }
+    with pytest.raises(errors.LockNotAvailable):
+        engine._execute_migration_operations(  # noqa: WPS437
+            cursor,  # type: ignore
+            migration,
+            in_transaction=False,
+        )
+    assert len(cursor.queries) == 1
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List
+
+import pytest
+
+from pilgrimor.engine.scheduler import async_run_migration_graph, run_migration_graph
+from pilgrimor.sql.dependencies import build_dependencies, touched_objects
+from pilgrimor.sql.directives import parse_directives
+
+
+def test_touched_objects() -> None:
+    """Test tables and indexes are found in statements."""
+    assert touched_objects(
+        ["CREATE INDEX CONCURRENTLY idx_email ON public.users (email)"],
+    ) == {"idx_email", "users"}
+    assert touched_objects(["CREATE INDEX CONCURRENTLY ON orders (id)"]) == {
+        "orders",
+    }
+    assert touched_objects(["DROP INDEX CONCURRENTLY IF EXISTS idx_email"]) == {
+        "idx_email",
+    }
+
+
+def test_build_dependencies() -> None:
+    """Test migrations depend only on conflicting previous migrations."""
+    migrations = ["1_a.sql", "2_b.sql", "3_a.sql", "4_vacuum.sql", "5_c.sql"]
+    objects = {
+        "1_a.sql": frozenset(("a",)),
+        "2_b.sql": frozenset(("b",)),
+        "3_a.sql": frozenset(("a",)),
+        "4_vacuum.sql": frozenset(),
+        "5_c.sql": frozenset(("c",)),
+    }
+    dependencies = build_dependencies(
+        migrations,
+        objects,
+        {"2_b.sql": frozenset(("1_a.sql",))},
+    )
+    assert dependencies["2_b.sql"] == ["1_a.sql"]
+    assert dependencies["3_a.sql"] == ["1_a.sql"]
+    assert dependencies["4_vacuum.sql"] == migrations[:3]
+    assert dependencies["5_c.sql"] == ["4_vacuum.sql"]
+
+
+def test_parse_directives() -> None:
+    """Test directives are parsed from comments."""
+    directives = parse_directives(
+        "-- pilgrimor: depends_on=1_a.sql,2_b.sql\nSELECT 1;\n",
+    )
+    assert dict(directives) == {"depends_on": "1_a.sql,2_b.sql"}
+
+
+def make_migrations() -> List[Dict[str, Any]]:
+    """Two independent migrations and one dependent."""
+    return [
+        {"migration": "1_a.sql", "depends_on": []},
+        {"migration": "2_b.sql", "depends_on": []},
+        {"migration": "3_a.sql", "depends_on": ["1_a.sql"]},
+    ]
+
+
+def test_run_migration_graph() -> None:
+    """Test independent migrations run at the same time."""
+    barrier = threading.Barrier(2, timeout=5)
+    finished: List[str] = []
+
+    def run(migration: Dict[str, Any]) -> None:
+        if migration["migration"] != "3_a.sql":
+            barrier.wait()
+        else:
+            assert "1_a.sql" in finished
+        finished.append(migration["migration"])
+
+    run_migration_graph(make_migrations(), run, max_workers=2)
+    assert sorted(finished) == ["1_a.sql", "2_b.sql", "3_a.sql"]
+
+
+def test_run_migration_graph_error() -> None:
+    """Test dependent migrations are not started after error."""
+    started: List[str] = []
+
+    def run(migration: Dict[str, Any]) -> None:
+        started.append(migration["migration"])
+        if migration["migration"] == "1_a.sql":
+            raise RuntimeError("failed")
+        time.sleep(0.01)
+
+    with pytest.raises(RuntimeError):
+        run_migration_graph(make_migrations(), run, max_workers=2)
+    assert "3_a.sql" not in started
+
+
+def test_async_run_migration_graph() -> None:
+    """Test asyncio variant keeps the order of dependencies."""
+    finished: List[str] = []
+
+    async def run(migration: Dict[str, Any]) -> None:
+        if migration["migration"] == "1_a.sql":
+            await asyncio.sleep(0.01)
+        finished.append(migration["migration"])
+
+    asyncio.run(async_run_migration_graph(make_migrations(), run, max_workers=2))
+    assert finished == ["2_b.sql", "1_a.sql", "3_a.sql"]
@@ -0,0 +1,171 @@
+from pathlib import Path
+
+import pytest
+
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.exceptions import BiggerVersionsExistsError
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+from pilgrimor.migrator.state import MigrationStateSnapshot
+from pilgrimor.migrator.system_table import (
+    LATEST_VERSION_QUERY,
+    VERSIONS_SINCE_QUERY,
+    upgrade_query,
+)
+from pilgrimor.migrator.version_key import version_key
+
+
+def make_snapshot() -> MigrationStateSnapshot:
+    """Snapshot with three versions."""
+    return MigrationStateSnapshot(
+        [
+            (1, "1_a.sql", "0.1"),
+            (2, "2_b.sql", "0.1"),
+            (3, "3_c.sql", "0.2"),
+            (4, "4_d.sql", "0.10"),
+        ],
+    )
+
+
+def test_versions() -> None:
+    """Test version checks."""
+    snapshot = make_snapshot()
+    assert snapshot.is_version_exists("0.2")
+    assert not snapshot.is_version_exists("0.3")
+    assert snapshot.bigger_versions("0.2") == ("0.10",)
+    assert snapshot.last_version == "0.10"
+    assert MigrationStateSnapshot().bigger_versions("0.1") is None
+
+
+def test_migrations_since_version() -> None:
+    """Test migrations of version and all after it."""
+    snapshot = make_snapshot()
+    assert snapshot.migrations_since_version("0.1") == [
+        "1_a.sql",
+        "2_b.sql",
+        "3_c.sql",
+        "4_d.sql",
+    ]
+    assert snapshot.migrations_since_version("0.2") == ["3_c.sql", "4_d.sql"]
+    assert snapshot.last_version_migrations() == ["4_d.sql"]
+
+
+def test_add_and_remove() -> None:
+    """Test snapshot updates after apply and rollback."""
+    snapshot = make_snapshot()
+    snapshot.add(["5_e.sql"], "0.11")
+    assert snapshot.last_version_migrations() == ["5_e.sql"]
+    snapshot.remove(["5_e.sql", "4_d.sql"])
+    assert snapshot.last_version == "0.2"
+    assert snapshot.not_applied(["3_c.sql", "4_d.sql"]) == ["4_d.sql"]
+    assert snapshot.bigger_versions("0.1") == ("0.2",)
+
+
+def test_version_key_order() -> None:
+    """Test version keys sort like PEP 440 versions."""
+    versions = ["1.0.dev1", "1.0a1", "1.0rc1", "1.0", "1.0+5", "1.0.post1", "1.1"]
+    assert sorted(versions, key=version_key) == versions
+    assert sorted(map(version_key, reversed(versions))) == list(
+        map(version_key, versions),
+    )
+    assert version_key("1.0") == version_key("1.0.0")
+    assert version_key("0.9") < version_key("0.10")
+    assert version_key("release-2021") < version_key("release-2022")
+    assert version_key("release-2022") < version_key("0.0.dev0")
+
+
+def test_not_pep440_versions() -> None:
+    """Test snapshot and upgrade accept versions that are not PEP 440."""
+    snapshot = MigrationStateSnapshot(
+        [(1, "1_a.sql", "release-2022"), (2, "2_b.sql", "0.1")],
+    )
+    assert snapshot.bigger_versions("release-2022") == ("0.1",)
+    snapshot.remove(["1_a.sql"])
+    assert snapshot.bigger_versions("release-2021") == ("0.1",)
+    assert "'!release-2022'" in upgrade_query(3, ["release-2022"])
+
+
+def test_upgrade_fills_version_keys() -> None:
+    """Test existing records get version keys on upgrade."""
+    query = upgrade_query(3, ["0.1"])
+    assert f"SET version_key = '{version_key('0.1')}' WHERE version = '0.1'" in query
+    assert "UPDATE" not in upgrade_query(4, ["0.1"]) + upgrade_query(1)
+
+
+def test_lookup_answers_versions() -> None:
+    """Test records found by index answer version questions."""
+    snapshot = make_snapshot()
+    snapshot.use_lookup(
+        "0.2",
+        [("3_c.sql", "0.2", version_key("0.2")), ("4_d.sql", "0.10", "not sorted")],
+    )
+    assert snapshot.bigger_versions("0.2") == ("0.10",)
+    assert snapshot.migrations_since_version("0.2") == ["3_c.sql", "4_d.sql"]
+    assert snapshot._version_keys is None  # noqa: WPS437
+
+    snapshot.use_lookup(None, ["4_d.sql", "0.10", version_key("0.10")])
+    assert snapshot.last_version_migrations() == ["4_d.sql"]
+    snapshot.remove(["4_d.sql"])
+    assert snapshot.lookup is None
+    assert snapshot.last_version_migrations() == ["3_c.sql"]
+
+
+def test_versions_are_looked_up_by_index(tmp_path: Path) -> None:
+    """Test versioned commands look versions up with one indexed query."""
+    (tmp_path / "1_a.sql").write_text(
+        "-- apply --\nCREATE TABLE a (id INT);\n-- rollback --\nDROP TABLE a;\n",
+    )
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path), write_versions=False)
+    migrator.initialize_database()
+    migrator.apply_migrations("0.10")
+    assert VERSIONS_SINCE_QUERY in engine.statements
+    assert any(
+        f"'{version_key('0.10')}'" in statement for statement in engine.statements
+    )
+
+    (tmp_path / "2_b.sql").write_text("CREATE TABLE b (id INT);")
+    with pytest.raises(BiggerVersionsExistsError, match="0.10"):
+        migrator.apply_migrations("0.9")
+
+    migrator.rollback_migrations(latest=True)
+    assert LATEST_VERSION_QUERY in engine.statements
+    assert not engine.records
+
+
+def test_normalize_rows() -> None:
+    """Test engine results normalization."""
+    assert MigrationStateSnapshot.normalize_rows(None) == []
+    assert MigrationStateSnapshot.normalize_rows([1, "1_a.sql", "0.1"]) == [
+        (1, "1_a.sql", "0.1"),
+    ]
+    assert MigrationStateSnapshot.normalize_rows([(1, "a", "1"), (2, "b", "1")]) == [
+        (1, "a", "1"),
+        (2, "b", "1"),
+    ]
+
+
+def test_snapshot_from_result() -> None:
+    """Test snapshot takes records and schema version from one result."""
+    empty = MigrationStateSnapshot.from_result(
+        [None, None, None, "pilgrimor schema 3"],
+    )
+    assert empty.applied_names == []
+    assert empty.schema_version == 3
+
+    snapshot = MigrationStateSnapshot.from_result(
+        [(1, "1_a.sql", "0.1", None), (2, "2_b.sql", "0.2", None)],
+    )
+    assert snapshot.applied_names == ["1_a.sql", "2_b.sql"]
+    assert snapshot.schema_version == 1
+
+
+def test_state_is_loaded_with_one_query(tmp_path: Path) -> None:
+    """Test records and schema version are loaded in one round trip."""
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path))
+    migrator.initialize_database()
+    statements = len(engine.statements)
+
+    state = migrator._load_state()  # noqa: WPS437
+    assert engine.statements[statements:] == [engine.system_table.state_query]
+    assert state.schema_version == 4
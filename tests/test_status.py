@@ -0,0 +1,160 @@
+import asyncio
+import os
+from argparse import Namespace
+from pathlib import Path
+from typing import Any, List, Optional
+
+import pytest
+
+from pilgrimor.abc.engine import AsyncPilgrimoreEngine
+from pilgrimor.cli.rawsql_cli import RawSQLMigratorCLI
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.migrator.rawsql_migrator.async_rawsql_migrator import (
+    AsyncRawSQLMigator,
+)
+from pilgrimor.migrator.rawsql_migrator.migration_files import MigrationFileReader
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+from pilgrimor.migrator.system_table import CREATE_TABLE_QUERY
+
+
+class AsyncMemoryEngine(AsyncPilgrimoreEngine):
+    """Asyncio interface of in-memory engine."""
+
+    def __init__(self, engine: InMemoryEngine) -> None:
+        """Wraps the engine."""
+        super().__init__(engine.database_url)
+        self.engine = engine
+        self.system_table = engine.system_table
+
+    async def execute_sql_with_return(
+        self,
+        sql_query: str,
+        sql_query_params: Optional[List[Any]] = None,
+    ) -> Optional[List[Any]]:
+        """Executes query in in-memory engine."""
+        return self.engine.execute_sql_with_return(sql_query, sql_query_params)
+
+    async def execute_sql_with_no_return(
+        self,
+        sql_query: str,
+        sql_query_params: Optional[List[Any]] = None,
+    ) -> None:
+        """Executes query in in-memory engine."""
+        self.engine.execute_sql_with_no_return(sql_query, sql_query_params)
+
+    async def execute_version_migrations(self, **kwargs: Any) -> None:
+        """Executes migrations in in-memory engine."""
+        self.engine.execute_version_migrations(**kwargs)
+
+
+def applied_engine(migrations_dir: Path) -> InMemoryEngine:
+    """Returns engine with all migrations applied."""
+    for number, name in enumerate(("a", "b"), start=1):
+        (migrations_dir / f"{number}_{name}.sql").write_text(
+            f"-- apply --\nCREATE TABLE {name} (id INT);\n"
+            f"-- rollback --\nDROP TABLE {name};\n",
+        )
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(migrations_dir))
+    migrator.initialize_database()
+    migrator.apply_migrations("0.1")
+    return engine
+
+
+def test_fingerprint_changes(tmp_path: Path) -> None:
+    """Test fingerprint follows names, versions and contents."""
+    (tmp_path / "1_a.sql").write_text("CREATE TABLE a (id INT);")
+    fingerprint = MigrationFileReader(str(tmp_path)).fingerprint(["1_a.sql"])
+    assert MigrationFileReader(str(tmp_path), parse_cache=True).fingerprint(
+        ["1_a.sql"],
+    ) == fingerprint
+
+    (tmp_path / "1_a.sql").write_text("CREATE TABLE a (id BIGINT);")
+    changed = MigrationFileReader(str(tmp_path)).fingerprint(["1_a.sql"])
+    assert changed != fingerprint
+    assert MigrationFileReader(str(tmp_path)).fingerprint([]) != changed
+
+
+def test_apply_without_changes_does_not_load_state(tmp_path: Path) -> None:
+    """Test apply of applied directory checks fingerprint with one query."""
+    engine = applied_engine(tmp_path)
+    statements = len(engine.statements)
+
+    RawSQLMigator(engine, str(tmp_path)).apply_migrations(None)
+    assert engine.statements[statements:] == [engine.system_table.fingerprint_query]
+    assert engine.system_table.state_query not in engine.statements[statements:]
+
+
+def test_table_without_meta_is_checked_in_full(tmp_path: Path) -> None:
+    """Test fingerprint query fails before schema 3 and the state is loaded."""
+    (tmp_path / "1_a.sql").write_text("CREATE TABLE a (id INT);")
+    engine = InMemoryEngine("memory://")
+    engine.execute_sql_with_no_return(CREATE_TABLE_QUERY)
+
+    assert RawSQLMigator(engine, str(tmp_path)).get_pending_migrations() == [
+        "1_a.sql",
+    ]
+    assert engine.statements[-1] == engine.system_table.state_query
+
+
+def test_up_to_date_by_stats(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test files are hashed only if their stats changed."""
+    engine = applied_engine(tmp_path)
+    migrator = RawSQLMigator(engine, str(tmp_path))
+    fingerprint = MigrationFileReader.fingerprint
+    hashed = []
+
+    def tracked_fingerprint(reader: MigrationFileReader, migrations: List[str]) -> str:
+        hashed.append(migrations)
+        return fingerprint(reader, migrations)
+
+    monkeypatch.setattr(MigrationFileReader, "fingerprint", tracked_fingerprint)
+    assert migrator._is_up_to_date()  # noqa: WPS437
+    assert not hashed
+
+    os.utime(tmp_path / "1_a.sql", ns=(0, 0))
+    assert migrator._is_up_to_date()  # noqa: WPS437
+    assert hashed
+
+
+def test_status_check(tmp_path: Path) -> None:
+    """Test status --check fails with pending migrations."""
+    engine = applied_engine(tmp_path)
+    cli = RawSQLMigratorCLI(
+        Namespace(command="status", check=True),
+        engine,
+        str(tmp_path),
+    )
+    cli()
+
+    (tmp_path / "3_c.sql").write_text("CREATE TABLE c (id INT);")
+    with pytest.raises(SystemExit):
+        cli()
+
+
+def test_rollback_drops_fingerprint(tmp_path: Path) -> None:
+    """Test full check after rollback finds pending migrations."""
+    engine = applied_engine(tmp_path)
+    migrator = RawSQLMigator(engine, str(tmp_path))
+    migrator.rollback_migrations(latest=True)
+
+    assert engine.meta == {}
+    assert migrator.get_pending_migrations() == ["1_a.sql", "2_b.sql"]
+
+
+def test_async_apply_uses_fingerprint(tmp_path: Path) -> None:
+    """Test asyncio migrator saves, checks and drops fingerprint."""
+    engine = applied_engine(tmp_path)
+    statements = len(engine.statements)
+    migrator = AsyncRawSQLMigator(AsyncMemoryEngine(engine), str(tmp_path))
+
+    asyncio.run(migrator.apply_migrations(None))
+    assert engine.statements[statements:] == [engine.system_table.fingerprint_query]
+
+    asyncio.run(migrator.rollback_migrations(latest=True))
+    assert engine.meta == {}
+    asyncio.run(migrator.apply_migrations(None))
+    assert engine.meta
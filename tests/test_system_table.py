@@ -0,0 +1,122 @@
+from pathlib import Path
+
+import pytest
+
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.exceptions import BasePilgrimorError
+from pilgrimor.migrator.history import HistoryRecord, history_records
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+from pilgrimor.migrator.state import MigrationStateSnapshot
+from pilgrimor.migrator.system_table import (
+    CLEAR_FINGERPRINT_COMMAND,
+    CREATE_TABLE_QUERY,
+    FIRST_SCHEMA_VERSION,
+    HISTORY_QUERY,
+    LATEST_VERSION_QUERY,
+    SCHEMA_VERSION,
+    VERSIONS_SINCE_QUERY,
+    SystemTable,
+    history_insert_command,
+    save_fingerprint_command,
+    start_mark_command,
+)
+from pilgrimor.migrator.version_key import version_key
+
+POSTGRESQL_ONLY = (
+    "obj_description",
+    "set_config",
+    "pg_stat_xact_user_tables",
+    "pilgrimor_meta",
+    "COMMENT ON",
+)
+
+
+class PortableEngine(InMemoryEngine):
+    """In-memory engine of a database without PostgreSQL features."""
+
+    system_table = SystemTable()
+
+
+def test_portable_engine(tmp_path: Path) -> None:
+    """Test engines without versioned schema get only portable statements."""
+    (tmp_path / "1_a.sql").write_text(
+        "-- apply --\nCREATE TABLE a (id INT);\n-- rollback --\nDROP TABLE a;\n",
+    )
+    engine = PortableEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path), write_versions=False)
+    migrator.initialize_database()
+    migrator.upgrade_database()
+    assert migrator.get_pending_migrations() == ["1_a.sql"]
+    migrator.apply_migrations("0.1")
+    assert migrator.get_pending_migrations() == []
+    migrator.apply_migrations(None)
+    with pytest.raises(BasePilgrimorError):
+        migrator.get_history()
+    migrator.rollback_migrations(latest=True)
+
+    assert not engine.records
+    assert engine.comment is None
+    for statement in engine.statements:
+        assert not any(sql in statement for sql in POSTGRESQL_ONLY), statement
+
+
+def test_memory_engine_runs_system_table_commands(tmp_path: Path) -> None:
+    """Test every command of PostgreSQL system table changes the memory engine."""
+    engine = InMemoryEngine("memory://")
+    engine.execute_sql_with_no_return(CREATE_TABLE_QUERY)
+    engine.execute_sql_with_no_return(
+        engine.system_table.upgrade_query(FIRST_SCHEMA_VERSION, ["0.1"]),
+    )
+    assert engine.comment == f"pilgrimor schema {SCHEMA_VERSION}"
+    assert engine.meta == {}
+
+    migrator = RawSQLMigator(engine, str(tmp_path))
+    engine.execute_sql_with_no_return(
+        ";\n".join(
+            [
+                migrator._get_insert_system_command(  # noqa: WPS437
+                    "1_a.sql",
+                    "0.1",
+                ),
+                start_mark_command(in_transaction=True),
+                history_insert_command(
+                    "2_b.sql",
+                    "0.2",
+                    "checksum",
+                    "host's",
+                    in_transaction=True,
+                    key=version_key("0.2"),
+                ),
+            ],
+        ),
+    )
+    assert engine.records == [(1, "1_a.sql", "0.1"), (2, "2_b.sql", "0.2")]
+    assert history_records(engine.execute_sql_with_return(HISTORY_QUERY)) == [
+        HistoryRecord("2_b.sql", "0.2", "host's", None, None, 0, None),
+    ]
+    assert MigrationStateSnapshot.from_result(
+        engine.execute_sql_with_return(engine.system_table.state_query),
+    ).applied_names == ["1_a.sql", "2_b.sql"]
+    assert engine.execute_sql_with_return(
+        VERSIONS_SINCE_QUERY,
+        [version_key("0.2")],
+    ) == [("2_b.sql", "0.2", version_key("0.2"))]
+    assert engine.execute_sql_with_return(LATEST_VERSION_QUERY) == [
+        ("2_b.sql", "0.2", version_key("0.2")),
+    ]
+
+    fingerprint_query = engine.system_table.fingerprint_query or ""
+    assert engine.execute_sql_with_return(fingerprint_query) is None
+    engine.execute_sql_with_no_return(save_fingerprint_command("hash", "stat"))
+    assert engine.execute_sql_with_return(fingerprint_query) == [
+        engine.comment,
+        "hash stat",
+    ]
+    engine.execute_sql_with_no_return(CLEAR_FINGERPRINT_COMMAND)
+    assert engine.execute_sql_with_return(fingerprint_query) is None
+
+    engine.execute_sql_with_no_return(
+        migrator._get_drop_system_command("2_b.sql"),  # noqa: WPS437
+    )
+    assert engine.records == [(1, "1_a.sql", "0.1")]
+    assert engine.execute_sql_with_return(HISTORY_QUERY) is None
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from pilgrimor.engine.advisory_lock import lock_key
+from pilgrimor.engine.memory_engine import InMemoryEngine
+from pilgrimor.migrator.rawsql_migrator.migration_files import migrations_hash
+from pilgrimor.migrator.rawsql_migrator.rawsql_migrator import RawSQLMigator
+
+
+def test_migrations_hash(tmp_path: Path) -> None:
+    """Test hash changes with migrations only."""
+    (tmp_path / "1_a.sql").write_text("CREATE TABLE a (id INT);")
+    first_hash = migrations_hash(str(tmp_path))
+
+    (tmp_path / ".pilgrimor_cache").write_text("cache")
+    assert migrations_hash(str(tmp_path)) == first_hash
+
+    (tmp_path / "baseline").mkdir()
+    (tmp_path / "baseline" / "0.1.sql").write_text("CREATE TABLE a (id INT);")
+    second_hash = migrations_hash(str(tmp_path))
+    assert second_hash != first_hash
+
+    (tmp_path / "1_a.sql").write_text("CREATE TABLE a (id BIGINT);")
+    assert migrations_hash(str(tmp_path)) not in {first_hash, second_hash}
+
+
+def test_lock_key() -> None:
+    """Test lock key is stable signed bigint."""
+    assert lock_key("pilgrimor_template") == lock_key("pilgrimor_template")
+    assert -(2**63) <= lock_key("pilgrimor_template") < 2**63
+
+
+def test_migrator_without_writing_versions(tmp_path: Path) -> None:
+    """Test migration files are not changed."""
+    text = "-- apply --\nCREATE TABLE a (id INT);\n-- rollback --\nDROP TABLE a;\n"
+    (tmp_path / "1_a.sql").write_text(text)
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path), write_versions=False)
+    migrator.initialize_database()
+    migrator.apply_migrations("0.1")
+    assert engine.records == [(1, "1_a.sql", "0.1")]
+    assert (tmp_path / "1_a.sql").read_text() == text
+
+
+def test_apply_all_migrations(tmp_path: Path) -> None:
+    """Test migrations without version get version after the last one."""
+    (tmp_path / "1_a.sql").write_text(
+        "CREATE TABLE a (id INT);\n-- pilgrimore_version 0.1 -- \n",
+    )
+    (tmp_path / "2_b.sql").write_text("CREATE TABLE b (id INT);")
+    engine = InMemoryEngine("memory://")
+    migrator = RawSQLMigator(engine, str(tmp_path), write_versions=False)
+    migrator.initialize_database()
+    migrator.apply_all_migrations()
+    assert engine.records == [(1, "1_a.sql", "0.1"), (2, "2_b.sql", "0.1.post1")]
+    assert "pilgrimore_version" not in (tmp_path / "2_b.sql").read_text()
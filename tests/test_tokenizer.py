@@ -0,0 +1,58 @@
+import pytest
+
+from pilgrimor.sql.tokenizer import SQLTokenizeError, iter_statements, split_statements
+
+
+def test_simple_statements() -> None:
+    """Test splitting by semicolons and skipping empty statements."""
+    assert split_statements("SELECT 1;\n;; SELECT 2;\n  -- comment;\n") == [
+        "SELECT 1",
+        "SELECT 2",
+    ]
+
+
+def test_quotes_and_comments() -> None:
+    """Test semicolons inside literals, identifiers and comments."""
+    sql = (
+        "INSERT INTO \"a;b\" VALUES ('x;''y', E'\\';');\n"
+        "/* one; /* nested; */ */ SELECT 1"
+    )
+    assert split_statements(sql) == [
+        "INSERT INTO \"a;b\" VALUES ('x;''y', E'\\';')",
+        "/* one; /* nested; */ */ SELECT 1",
+    ]
+
+
+def test_dollar_quotes() -> None:
+    """Test dollar quoted function bodies."""
+    sql = (
+        "CREATE FUNCTION f() RETURNS int AS $body$ BEGIN RETURN 1; END; $body$ "
+        "LANGUAGE plpgsql;\nSELECT $1;"
+    )
+    assert len(split_statements(sql)) == 2
+    assert split_statements("SELECT a$b$ FROM t; SELECT 1;") == [
+        "SELECT a$b$ FROM t",
+        "SELECT 1",
+    ]
+
+
+def test_begin_atomic() -> None:
+    """Test SQL standard function bodies."""
+    sql = (
+        "CREATE FUNCTION f() RETURNS int LANGUAGE sql BEGIN ATOMIC "
+        "SELECT CASE WHEN true THEN 1 END; SELECT 2; END;\nBEGIN;\nSELECT 3;"
+    )
+    assert split_statements(sql)[1:] == ["BEGIN", "SELECT 3"]
+
+
+def test_offsets() -> None:
+    """Test that offsets point to statements in the source text."""
+    sql = "  SELECT 1 ;\n\nSELECT 2"
+    for statement in iter_statements(sql):
+        assert sql[statement.start : statement.end] == statement.text  # noqa: E203
+
+
+def test_unterminated_quote() -> None:
+    """Test error on unterminated string literal."""
+    with pytest.raises(SQLTokenizeError):
+        split_statements("SELECT 'abc")